@@ -1,49 +1,32 @@
 """Módulo de conexão com o Databricks para trazer dados do banco de dados"""
 
-import os
-# import polars as pl
-import pandas as pd
-from dotenv import load_dotenv
-from databricks import sql
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
+from api.query_builder import build_select_query
 
-load_dotenv()
-
-def get_catlote(filter_promotion="0"):
+def get_catlote(filter_promotion="0", columns=None):
     print("get_catlote")
 
     base_name_db = 'maxis_sandbox.pricing_db.d_catlotes_resumo_historico_vf'
 
-    db_server = os.getenv('DB_SERVER')
-    db_http_path = os.getenv('DB_HTTP_PATH')
-    db_token = os.getenv('DB_TOKEN')
-
-    if not db_server or not db_http_path or not db_token:
-        raise EnvironmentError("Erro: Uma ou mais variáveis de ambiente não foram carregadas. Verifique seu arquivo .env.")
-
     try:
-        with sql.connect(
-            server_hostname=db_server,
-            http_path=db_http_path,
-            access_token=db_token
-        ) as connection:
+        with get_connection() as connection:
             with connection.cursor() as cursor:
 
-                cursor.execute(f"SELECT * from {base_name_db} where CHECK_MES_PROMO = {filter_promotion}")
-                result = cursor.fetchall()
+                query, params = build_select_query(
+                    base_name_db,
+                    columns=columns,
+                    filters={"CHECK_MES_PROMO": int(filter_promotion)},
+                )
+                cursor.execute(query, params)
+                df = fetch_pandas(cursor, label=base_name_db)
 
-                if not result:
+                if df.empty:
                     raise ValueError("Erro: A consulta retornou resultados vazios.")
 
-                # df = pl.DataFrame(result, orient="row", schema=[desc[0] for desc in cursor.description])
-                # df.with_row_index()
-                df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
-
                 # print("[desc[0] for desc in cursor.description]", [desc[0] for desc in cursor.description])
                 # print("df", df.head(10))
 
-                cursor.close()
-                connection.close()
-
     except Exception as e:
         raise ConnectionError(f"Erro ao conectar ou executar a query: {str(e)}") from e
 
@@ -1,50 +1,38 @@
 """Módulo de conexão com o Databricks para trazer dados do banco de dados"""
 
-import os
-# import polars as pl
-import pandas as pd
-from dotenv import load_dotenv
-from databricks import sql
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
+from api.query_builder import build_select_query
 
-load_dotenv()
-
-def get_catlote_sim(catlote_filter):
+def get_catlote_sim(catlote_filter, columns=None):
     print("get_catlote_sim")
 
     base_name_db = 'maxis_sandbox.pricing_db.d_catlote_produto_vf'
 
-    db_server = os.getenv('DB_SERVER')
-    db_http_path = os.getenv('DB_HTTP_PATH')
-    db_token = os.getenv('DB_TOKEN')
-
-    if not db_server or not db_http_path or not db_token:
-        raise EnvironmentError("Erro: Uma ou mais variáveis de ambiente não foram carregadas. Verifique seu arquivo .env.")
-
     try:
-        with sql.connect(
-            server_hostname=db_server,
-            http_path=db_http_path,
-            access_token=db_token
-        ) as connection:
+        with get_connection() as connection:
             with connection.cursor() as cursor:
 
-                placeholders = ', '.join(['?'] * len(catlote_filter))
-                query = f"SELECT * FROM {base_name_db} WHERE CATLOTE_1 IN ({placeholders}) ORDER BY CATLOTE_1"
-                cursor.execute(query, catlote_filter)
+                if not catlote_filter:
+                    raise ValueError("Erro: Nenhum catlote informado para a consulta.")
+
+                query, params = build_select_query(
+                    base_name_db,
+                    columns=columns,
+                    filters={"CATLOTE_1": list(catlote_filter)},
+                    order_by=["CATLOTE_1"],
+                )
+                cursor.execute(query, params)
                 # cursor.execute(f"SELECT * FROM {base_name_db}")
 
-                result = cursor.fetchall()
+                df = fetch_pandas(cursor, label=base_name_db)
 
-                if not result:
+                if df.empty:
                     raise ValueError("Erro: A consulta retornou resultados vazios.")
 
-                df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
-
-                print("[desc[0] for desc in cursor.description]", [desc[0] for desc in cursor.description])
+                print("df.columns", list(df.columns))
                 # print("df", df.head(10))
 
-                cursor.close()
-
     except Exception as e:
         raise ConnectionError(f"Erro ao conectar ou executar a query: {str(e)}") from e
 
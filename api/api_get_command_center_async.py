@@ -1,12 +1,29 @@
 import os
-import asyncio
 from dotenv import load_dotenv
-from databricks import sql
-import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
+from api.query_executor import query_executor
+from api.table_cache import TableCache
 
 load_dotenv()
 
+COMMAND_CENTER_CACHE_TTL = float(os.getenv('COMMAND_CENTER_CACHE_TTL', str(720 * 60)))
+COMMAND_CENTER_VERSION_CHECK_INTERVAL = float(os.getenv('COMMAND_CENTER_VERSION_CHECK_INTERVAL', '300'))
+
+TABLE_NAMES = [
+    "zero_cost",
+    "negative_cost",
+    "low_cost_high_margin",
+    "low_cost_negative_margin",
+    "low_cost_zero_margin",
+    "low_cost_high_sales",
+    "low_price_negative_margin",
+    "negative_margin_and_others",
+    "price_gm",
+    "price_research",
+    "update_cpc"
+]
+
 def select_table(selected_table):
     base = {
         "zero_cost": 'maxis_sandbox.pricing_db.cc_custo_zerado',
@@ -23,65 +40,57 @@ def select_table(selected_table):
     }
     return base[selected_table]
 
-def get_data_for_table(selected_table):
-    """Execute a single database query"""
-    DB_SERVER = os.getenv('DB_SERVER')
-    DB_HTTP_PATH = os.getenv('DB_HTTP_PATH')
-    DB_TOKEN = os.getenv('DB_TOKEN')
-
-    connection = sql.connect(
-        server_hostname=DB_SERVER,
-        http_path=DB_HTTP_PATH,
-        access_token=DB_TOKEN
-    )
+def fetch_table_version(cursor, selected_table):
+    """Versão atual da tabela Delta (última linha do DESCRIBE HISTORY), ou None se não for possível obter"""
+    try:
+        cursor.execute(f"DESCRIBE HISTORY {select_table(selected_table)} LIMIT 1")
+        row = cursor.fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"Erro ao consultar o histórico de {selected_table}: {e}")
+        return None
 
-    cursor = connection.cursor()
-    cursor.execute(f"SELECT * from {select_table(selected_table)}")
+def get_table_version(selected_table):
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            return fetch_table_version(cursor, selected_table)
 
-    result = cursor.fetchall()
-    df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
+def get_data_for_table(selected_table):
+    """Execute a single database query, returning the data and the table version read before it"""
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            version = fetch_table_version(cursor, selected_table)
+            cursor.execute(f"SELECT * from {select_table(selected_table)}")
 
-    cursor.close()
-    connection.close()
+            df = fetch_pandas(cursor, label=select_table(selected_table))
 
-    return selected_table, df
+    return selected_table, (df, version)
 
-async def get_command_center_async(table_names):
+def load_command_center_tables(table_names):
+    """
+    Fetch the given tables concurrently on the shared query executor: {table: (df, version)}
+    """
     print("table_names", table_names)
+    return dict(query_executor.map(get_data_for_table, table_names, label="command center"))
 
+# Cada tabela tem a sua entrada: só é recarregada quando vence ou quando a origem muda
+command_center_cache = TableCache(
+    loader=lambda table: get_data_for_table(table)[1],
+    version_loader=get_table_version,
+    load_many=load_command_center_tables,
+    ttl=COMMAND_CENTER_CACHE_TTL,
+    check_interval=COMMAND_CENTER_VERSION_CHECK_INTERVAL,
+    executor=query_executor,
+)
+
+def get_command_center_table(table_name):
     """
-    Fetch data for multiple tables concurrently using a thread pool
+    Cached data of a single command center table
     """
-    with ThreadPoolExecutor(max_workers=11) as executor:
-        loop = asyncio.get_event_loop()
-        futures = [
-            loop.run_in_executor(executor, get_data_for_table, table_name)
-            for table_name in table_names
-        ]
-        results = await asyncio.gather(*futures)
-        return dict(results)
+    return command_center_cache.get(table_name)
 
 def get_all_command_center_data():
     """
-    Synchronous wrapper for getting all command center data
+    Cached data of all command center tables: {table: df}
     """
-    table_names = [
-        "zero_cost",
-        "negative_cost",
-        "low_cost_high_margin",
-        "low_cost_negative_margin",
-        "low_cost_zero_margin",
-        "low_cost_high_sales",
-        "low_price_negative_margin",
-        "negative_margin_and_others",
-        "price_gm",
-        "price_research",
-        "update_cpc"
-    ]
-    
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(get_command_center_async(table_names))
-    finally:
-        loop.close()
+    return command_center_cache.get_many(TABLE_NAMES)
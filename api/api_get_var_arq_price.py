@@ -1,23 +1,9 @@
-import os
-from dotenv import load_dotenv
-from databricks import sql
-import pandas as pd
-
-load_dotenv()
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
 
 def get_var_arq_price(variable):
     print("get_var_arq_price")
 
-    DB_SERVER = os.getenv('DB_SERVER')
-    DB_HTTP_PATH = os.getenv('DB_HTTP_PATH')
-    DB_TOKEN = os.getenv('DB_TOKEN')
-
-    connection = sql.connect(
-        server_hostname = DB_SERVER,
-        http_path = DB_HTTP_PATH,
-        access_token = DB_TOKEN
-    )
-
     BASE_NAME_DB = 'maxis_sandbox.pricing_db.'
 
     NOTEBOOK_PATHS = {
@@ -30,14 +16,11 @@ def get_var_arq_price(variable):
         'price index': BASE_NAME_DB + 'var_price_index_resumo',
     }
 
-    cursor = connection.cursor()
-    cursor.execute(f"SELECT * from {NOTEBOOK_PATHS[variable]}")
-
-    result = cursor.fetchall()
-    df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
-    # print("df", df)
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT * from {NOTEBOOK_PATHS[variable]}")
 
-    cursor.close()
-    connection.close()
+            df = fetch_pandas(cursor, label=NOTEBOOK_PATHS[variable])
+            # print("df", df)
 
     return df
@@ -1,11 +1,11 @@
-import json
 import os
-import requests
 from dotenv import load_dotenv
+from api.job_runner import job_runner
+from api.payload_staging import encode_parameter
 
 load_dotenv()
 
-def post_captain_variables(data_variables):
+def post_captain_variables(data_variables, wait=True):
     print("post_captain_variables")
 
     DB_SERVER = os.getenv('DB_SERVER')
@@ -16,79 +16,24 @@ def post_captain_variables(data_variables):
     if not all([DB_SERVER, DB_TOKEN, DB_CLUSTER_ID]):
         raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
 
-    ENDPOINT = f'{DB_SERVER}/api/2.0/jobs/runs/submit'
-
-    HEADERS = {
-        'Authorization': f'Bearer {DB_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
     NOTEBOOK_PATH = f'{BASE_NOTEBOOK_PATH}/proc_atualizar_porcentagens_capitao_e_gerar_simulacao'
 
-    payload = {
-        "existing_cluster_id": DB_CLUSTER_ID,
-        "notebook_task": {
-            "notebook_path": NOTEBOOK_PATH,
-            "base_parameters": {
-                'targetTable': 'var_fatores_capitao_sim',
-                'updateValues': json.dumps(data_variables),
-            }
-        }
+    base_parameters = {
+        'targetTable': 'var_fatores_capitao_sim',
+        **encode_parameter('updateValues', data_variables, "captain_variables"),
     }
 
-    response = requests.post(
-        ENDPOINT,
-        headers=HEADERS,
-        data=json.dumps(payload),
-        timeout=120,
-    )
-
-    if response.status_code == 200:
-        run_id = response.json().get('run_id')
-        print(f"Notebook initiated successfully. Run ID: {run_id}")
-
-        job_status_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get?run_id={run_id}'
-
-        while True:
-            job_status_response = requests.get(
-                job_status_endpoint,
-                headers=HEADERS,
-                timeout=120,
-            )
-
-            job_status = job_status_response.json()
-            print("job_status", job_status)
-
-            if job_status['state']['life_cycle_state'] == 'TERMINATED':
-                if job_status['state']['result_state'] == 'SUCCESS':
-                    print("Notebook run completed successfully.")
-                    
-                    # Retrieve the list of tasks
-                    tasks = job_status.get('tasks', [])
-                    for task in tasks:
-                        task_run_id = task.get('run_id')
-                        output_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get-output?run_id={task_run_id}'
-                        output_response = requests.get(
-                            output_endpoint,
-                            headers=HEADERS,
-                            timeout=120,
-                        )
-                        output = output_response.json()
-                        log_json = output.get('notebook_output', {}).get('result')
-                        print(f"Log JSON for task {task_run_id}:", log_json)
-                        print(output)
-                else:
-                    print("Notebook run failed.")
-                break
-            elif job_status['state']['life_cycle_state'] == 'INTERNAL_ERROR':
-                print("Notebook run encountered an internal error.")
-                break
-            else:
-                print("Notebook run is still in progress...")
+    try:
+        job_run = job_runner.submit_notebook(NOTEBOOK_PATH, base_parameters)
+    except ConnectionError as e:
+        print(f"Falha ao acionar o job. {e}")
+        return False
 
-    else:
-        print("Falha ao acionar o job. Código de status:", response.status_code)
+    if not wait:
+        return job_run
 
-    response.close()
+    job_run.wait()
+    if job_run.success:
+        print("Log JSON:", job_run.output())
 
-    return True if job_status['state']['life_cycle_state'] == 'TERMINATED' and job_status['state']['result_state'] == 'SUCCESS' else False
+    return job_run.success
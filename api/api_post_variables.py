@@ -1,11 +1,23 @@
 import json
 import os
-import requests
 from dotenv import load_dotenv
+from api.job_runner import JobRun, job_runner
+from api.payload_staging import encode_parameter
 
 load_dotenv()
 
-def post_variables(data_variables):
+def post_variables(data_variables, wait=False, timeout=None):
+    """Atualiza as variáveis da arquitetura de preços, submetendo um notebook por variável em paralelo.
+
+    Args:
+        data_variables (str): JSON com {variável: alterações}.
+        wait (bool): Se True, espera todas as execuções em paralelo (prazo único `timeout`).
+        timeout (float, optional): Prazo máximo da espera, em segundos.
+
+    Returns:
+        dict: Para cada variável, run_id, life_cycle_state, result_state, success, timed_out e error.
+    """
+
     print("post_variables")
 
     DB_SERVER = os.getenv('DB_SERVER')
@@ -16,13 +28,6 @@ def post_variables(data_variables):
     if not all([DB_SERVER, DB_TOKEN, DB_CLUSTER_ID]):
         raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
 
-    ENDPOINT = f'{DB_SERVER}/api/2.0/jobs/runs/submit'
-
-    HEADERS = {
-        'Authorization': f'Bearer {DB_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
     BASE_NAME_DB = 'maxis_sandbox.pricing_db.'
     NOTEBOOK_PATH = f'{BASE_NOTEBOOK_PATH}/proc_atualizar_porcentagens'
     NOTEBOOK_PATH_MARCA_ELASTICIDADE = f'{BASE_NOTEBOOK_PATH}/proc_atualizar_porcentagens_marca_elasticidade'
@@ -39,36 +44,42 @@ def post_variables(data_variables):
 
     data_dict = json.loads(data_variables)
 
-    for key, value in data_dict.items():
-
-        notebook_path = NOTEBOOK_PATH_MARCA_ELASTICIDADE if key in ['marca', 'elasticidade'] else NOTEBOOK_PATH
-
-        payload = {
+    # Todas as variáveis são submetidas ao mesmo tempo pela sessão HTTP compartilhada
+    submissions = {
+        key: {
+            "notebook_path": NOTEBOOK_PATH_MARCA_ELASTICIDADE if key in ['marca', 'elasticidade'] else NOTEBOOK_PATH,
+            "base_parameters": {
+                'targetTable': tables_parameters[key],
+                **encode_parameter('updateValues', value, f"variables_{key.replace(' ', '_')}"),
+            },
             "run_name": f"Notebook Run for {key}",
-            "existing_cluster_id": DB_CLUSTER_ID,
-            "notebook_task": {
-                "notebook_path": notebook_path,
-                "base_parameters": {
-                    'targetTable': tables_parameters[key],
-                    'updateValues': json.dumps(value),
-                }
-            }
         }
+        for key, value in data_dict.items()
+    }
 
-        response = requests.post(
-            ENDPOINT,
-            headers=HEADERS,
-            data=json.dumps(payload),
-            timeout=120,
-        )
+    job_runs = job_runner.submit_notebooks(submissions)
+    submitted = [job_run for job_run in job_runs.values() if isinstance(job_run, JobRun)]
 
-        if response.status_code == 200:
-            print(f"Notebook run for {key} initiated successfully.")
-            print("Run ID:", response.json().get('run_id'))
-        else:
-            print(f"Failed to initiate notebook run for {key}. Status Code: {response.status_code}")
-            print("Response:", response.text)
+    if wait and submitted:
+        # O tempo total é o da execução mais longa, não a soma de todas
+        job_runner.wait_all(submitted, timeout=timeout)
 
-    response.close()
+    status = {}
+    for key, job_run in job_runs.items():
+        if isinstance(job_run, JobRun):
+            status[key] = {**job_run.to_dict(), 'error': None}
+            if not wait:
+                status[key]['life_cycle_state'] = 'SUBMITTED'
+        else:
+            status[key] = {
+                'run_id': None,
+                'life_cycle_state': 'SUBMIT_FAILED',
+                'result_state': None,
+                'state_message': None,
+                'success': False,
+                'timed_out': False,
+                'error': str(job_run),
+            }
+        print(f"Notebook run for {key}: {status[key]['life_cycle_state']} (Run ID: {status[key]['run_id']})")
 
-    return True
+    return status
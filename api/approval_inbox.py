@@ -0,0 +1,126 @@
+"""Caixa de entrada das aprovações: contagem de pendências e lista paginada por processo.
+
+A contagem dos nove processos vem de uma única query agregada sobre as tabelas
+de histórico, e a lista de solicitações de um processo é lida por páginas
+(as mais recentes primeiro). As linhas do dump são buscadas apenas para a
+solicitação aberta pelo aprovador (`get_requests_for_approval(..., request_id=...)`).
+
+Os resultados ficam no `query_cache` e são invalidados junto com as filas
+("approval_inbox" e "approval_<processo>") ao enviar ou aprovar/reprovar.
+"""
+
+import os
+import pandas as pd
+from dotenv import load_dotenv
+from api.approval_tables import APPROVAL_TABLE, date_column, identifier_column
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
+from api.get_requests_for_approval import APPROVAL_CACHE_TTL, ALLOWED_TABLES
+from api.query_cache import query_cache
+
+load_dotenv()
+
+APPROVAL_INBOX_PAGE_SIZE = int(os.getenv('APPROVAL_INBOX_PAGE_SIZE', '20'))
+
+# Status das solicitações aguardando aprovação nas tabelas de histórico
+PENDING_STATUS = 3
+
+def build_pending_counts_query():
+    """Query agregada com a quantidade de solicitações pendentes (e a mais recente) de cada processo"""
+
+    branches = [
+        f"SELECT '{table_name}' AS source_table, {identifier_column(table_name)} AS request_id, "
+        f"{date_column(table_name)} AS request_date "
+        f"FROM {config['historic_table']} WHERE status = {PENDING_STATUS}"
+        for table_name, config in APPROVAL_TABLE.items()
+    ]
+
+    return (
+        "SELECT source_table, COUNT(DISTINCT request_id) AS pending, MAX(request_date) AS last_request "
+        f"FROM ({' UNION ALL '.join(branches)}) GROUP BY source_table"
+    )
+
+def build_pending_requests_query(table, page, page_size):
+    """Query de uma página das solicitações pendentes de um processo, das mais recentes para as mais antigas"""
+
+    identifier = identifier_column(table)
+    date = date_column(table)
+
+    return (
+        f"SELECT {identifier} AS uuid_alteracoes, usuario_id, {date} AS data_alteracoes "
+        f"FROM {APPROVAL_TABLE[table]['historic_table']} WHERE status = {PENDING_STATUS} "
+        f"ORDER BY {date} DESC, {identifier} "
+        f"LIMIT {int(page_size)} OFFSET {int(page) * int(page_size)}"
+    )
+
+def fetch_pending_counts():
+    try:
+        with get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(build_pending_counts_query())
+                return fetch_pandas(cursor, label="historico_* pendentes")
+    except Exception as e:
+        print(f"Erro ao buscar pendências de aprovação: {str(e)}")
+        return None
+
+def get_pending_counts():
+    """Solicitações pendentes por processo.
+
+    Returns:
+        dict: processo -> {"pending": quantidade, "last_request": data da mais recente}.
+        Processos sem pendências têm quantidade 0. Em caso de erro, retorna {}.
+    """
+
+    df = query_cache.get_or_load("approval_inbox", fetch_pending_counts, ttl=APPROVAL_CACHE_TTL)
+    if df is None:
+        return {}
+
+    counts = {table: {"pending": 0, "last_request": None} for table in ALLOWED_TABLES}
+    for row in df.to_dict("records"):
+        if row["source_table"] in counts:
+            counts[row["source_table"]] = {"pending": int(row["pending"]), "last_request": row["last_request"]}
+    return counts
+
+def fetch_pending_requests(table, page, page_size):
+    try:
+        with get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(build_pending_requests_query(table, page, page_size))
+                return fetch_pandas(cursor, label=APPROVAL_TABLE[table]['historic_table'])
+    except Exception as e:
+        print(f"Erro ao buscar solicitações pendentes: {str(e)}")
+        return None
+
+def get_pending_requests(table, page=0, page_size=APPROVAL_INBOX_PAGE_SIZE):
+    """Uma página das solicitações pendentes de um processo.
+
+    Args:
+        table (str): Processo (buildup, catlote, captain, ...).
+        page (int): Página, começando em 0.
+        page_size (int): Solicitações por página.
+
+    Returns:
+        pandas.DataFrame: uuid_alteracoes, usuario_id e data_alteracoes, das mais recentes
+        para as mais antigas (vazio se não houver pendências), ou None em caso de erro.
+    """
+
+    if table not in ALLOWED_TABLES:
+        print(f"Erro ao buscar solicitações pendentes: O parâmetro 'table' deve ser um dos seguintes: {ALLOWED_TABLES}")
+        return None
+
+    df = query_cache.get_or_load(
+        f"approval_{table}",
+        lambda: fetch_pending_requests(table, page, page_size),
+        filters={"inbox_page": page, "page_size": page_size},
+        ttl=APPROVAL_CACHE_TTL,
+    )
+
+    return df.copy() if isinstance(df, pd.DataFrame) else df
+
+def newest_pending_request(table):
+    """Id da solicitação pendente mais recente do processo, ou None"""
+
+    df = get_pending_requests(table, page=0)
+    if df is None or df.empty:
+        return None
+    return df["uuid_alteracoes"].iloc[0]
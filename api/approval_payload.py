@@ -0,0 +1,102 @@
+"""Payload enviado ao notebook de recebimento de cada processo em send_to_approval.
+
+As páginas com marcação de alteração enviam apenas as linhas marcadas
+(manual == "1" no Delta Preço, new_alteration == "sim" na Otimização): para
+esses notebooks as linhas marcadas sempre foram o payload completo. Aqui o
+payload é apenas codificado no parâmetro de dados do notebook (o mesmo
+`output_key` de antes), sem nenhuma passagem extra pela tabela.
+
+Conjunto de alterações (change set)
+-----------------------------------
+Quando a página envia só parte de uma tabela que o notebook recebia inteira
+(hoje, o CatLote: apenas os produtos diferentes dos buscados ao abrir a
+simulação), os parâmetros dizem isso explicitamente:
+
+- `changeSet`: "true". Sem este parâmetro, o payload é a tabela completa,
+  como sempre foi.
+- `baseVersion`: momento (ISO 8601, UTC) em que a página buscou os dados base.
+  O notebook reconstrói o conjunto completo lendo a tabela de origem nessa
+  versão (por exemplo, `TIMESTAMP AS OF` no Delta) e aplicando as linhas
+  recebidas por cima.
+- `baseFilter`: JSON com os filtros da busca base (ex.: {"CATLOTE_1": [...]}).
+- `totalRows`: quantidade de linhas do conjunto completo, para conferência.
+
+As linhas ausentes do payload são as da base, sem alteração. Um notebook que
+não reconhecer `changeSet` não deve gravar o payload como snapshot completo.
+
+O tamanho e o tempo de codificação de cada payload são impressos no log. Com o
+staging configurado (ver api.payload_staging), payloads grandes vão em um
+arquivo Parquet e apenas o caminho e o checksum vão nos parâmetros.
+"""
+
+import json
+import time
+import pandas as pd
+import polars as pl
+from api.payload_staging import encode_parameter
+
+def change_set_parameters(change_set):
+    """Parâmetros que identificam um conjunto de alterações e a base de onde ele veio.
+
+    Args:
+        change_set (dict): base_version (str), base_filter (dict) e total_rows (int).
+
+    Returns:
+        dict: changeSet, baseVersion, baseFilter e totalRows (todos texto, como os demais parâmetros).
+    """
+
+    return {
+        "changeSet": "true",
+        "baseVersion": str(change_set["base_version"]),
+        "baseFilter": json.dumps(change_set.get("base_filter") or {}, default=str),
+        "totalRows": str(int(change_set["total_rows"])),
+    }
+
+def build_approval_payload(notebook_name, table_data, output_key="payload", stager=None, change_set=None):
+    """Monta os parâmetros de dados do notebook de recebimento.
+
+    Args:
+        notebook_name (str): Processo (buildup, captain, delta, ...).
+        table_data: Linhas enviadas pela página (DataFrame, lista de dicionários
+            ou o formato próprio do processo, como [uuid, linhas] no captain).
+        output_key (str): Parâmetro de dados do notebook.
+        stager (PayloadStager, optional): Staging dos arquivos. Se None, usa o configurado pelo .env.
+        change_set (dict, optional): Se informado, `table_data` é só parte da tabela
+            (ver "Conjunto de alterações" acima e `change_set_parameters`).
+
+    Returns:
+        tuple: (parâmetros, métricas). Parâmetros: `output_key` (JSON das linhas) ou
+        `output_key`_path e `output_key`_sha256 (arquivo em staging), mais os parâmetros
+        do conjunto de alterações. Métricas: rows, bytes (nos parâmetros), staged e encode_seconds.
+    """
+
+    started_at = time.perf_counter()
+
+    payload = encode_parameter(output_key, table_data, notebook_name, stager)
+
+    if isinstance(table_data, (pd.DataFrame, pl.DataFrame)):
+        rows = len(table_data)
+    elif isinstance(table_data, list) and all(isinstance(row, dict) for row in table_data):
+        rows = len(table_data)
+    else:
+        # Formato próprio do processo (ex.: captain envia [uuid, linhas]): conta como um payload
+        rows = 1 if table_data else 0
+
+    metrics = {
+        "rows": rows,
+        "bytes": sum(len(value.encode("utf-8")) for value in payload.values()),
+        "staged": output_key not in payload,
+        "encode_seconds": time.perf_counter() - started_at,
+    }
+    of_total = ""
+    if change_set is not None:
+        payload = {**payload, **change_set_parameters(change_set)}
+        of_total = f" alteradas de {change_set['total_rows']}"
+
+    print(
+        f"Payload {notebook_name}: {metrics['rows']} linhas{of_total}, "
+        f"{metrics['bytes']} bytes nos parâmetros{' (staging)' if metrics['staged'] else ''}, "
+        f"codificado em {metrics['encode_seconds'] * 1000:.1f} ms"
+    )
+
+    return payload, metrics
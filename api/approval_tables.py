@@ -0,0 +1,50 @@
+"""Tabelas de dump e de histórico de cada processo que passa pela aprovação"""
+
+BASE_NAME_DB = 'maxis_sandbox.pricing_db.'
+
+APPROVAL_TABLE = {
+    "buildup": {
+        "dump_table": BASE_NAME_DB + "dump_buildup",
+        "historic_table": BASE_NAME_DB + "historico_buildup"
+    },
+    "catlote": {
+        "dump_table": BASE_NAME_DB + "dump_catlote",
+        "historic_table": BASE_NAME_DB + "historico_catlote"
+    },
+    "captain": {
+        "dump_table": BASE_NAME_DB + "dump_capitao",
+        "historic_table": BASE_NAME_DB + "historico_capitao"
+    },
+    "captain_margin": {
+        "dump_table": BASE_NAME_DB + "dump_margem_do_capitao",
+        "historic_table": BASE_NAME_DB + "historico_margem_do_capitao"
+    },
+    "delta": {
+        "dump_table": BASE_NAME_DB + "dump_delta_preco",
+        "historic_table": BASE_NAME_DB + "historico_delta_preco"
+    },
+    "marketing": {
+        "dump_table": BASE_NAME_DB + "dump_posicionamento_de_mercado",
+        "historic_table": BASE_NAME_DB + "historico_posicionamento_de_mercado"
+    },
+    "price": {
+        "dump_table": BASE_NAME_DB + "dump_simulacao",
+        "historic_table": BASE_NAME_DB + "historico_simulacoes"
+    },
+    "optimization": {
+        "dump_table": BASE_NAME_DB + "dump_otimizacao",
+        "historic_table": BASE_NAME_DB + "historico_otimizacao"
+    },
+    "strategy": {
+        "dump_table": BASE_NAME_DB + "dump_estrategia_comercial",
+        "historic_table": BASE_NAME_DB + "historico_estrategia_comercial"
+    },
+}
+
+def identifier_column(table):
+    """Coluna que identifica uma solicitação no processo (a arquitetura de preços usa o hash da simulação)"""
+    return "hash_simulacao" if table == "price" else "uuid_alteracoes"
+
+def date_column(table):
+    """Coluna com a data da solicitação no histórico do processo"""
+    return "data_simulacao" if table in ("captain", "price") else "data_alteracoes"
@@ -0,0 +1,81 @@
+"""Leitura dos resultados do Databricks SQL em lotes Arrow, sem passar por tuplas Python"""
+
+import os
+import sys
+import time
+import pyarrow as pa
+import polars as pl
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+load_dotenv()
+
+ARROW_BATCH_SIZE = int(os.getenv('ARROW_BATCH_SIZE', '100000'))
+
+def get_peak_rss_mb():
+    """Retorna o pico de memória residente do processo em MB, ou None se não suportado"""
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em kilobytes no Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def fetch_arrow(cursor, label=None, batch_size=ARROW_BATCH_SIZE):
+    """Lê o resultado do cursor em lotes Arrow (`fetchmany_arrow`) e os junta em uma única tabela.
+
+    Args:
+        cursor: Cursor do Databricks SQL com a query já executada.
+        label (str, optional): Nome exibido no relatório de desempenho (normalmente a tabela).
+        batch_size (int, optional): Quantidade de linhas por lote. Se None, usa `fetchall_arrow`.
+
+    Returns:
+        pa.Table: Resultado da query.
+    """
+
+    start_time = time.time()
+
+    if batch_size is None:
+        table = cursor.fetchall_arrow()
+    else:
+        batches = []
+        while True:
+            batch = cursor.fetchmany_arrow(batch_size)
+            if batch.num_rows == 0:
+                break
+            batches.append(batch)
+        # Sem lotes, o fetchall_arrow devolve a tabela vazia com o schema da query
+        table = pa.concat_tables(batches) if batches else cursor.fetchall_arrow()
+
+    report_fetch(label, table.num_rows, time.time() - start_time)
+
+    return table
+
+def report_fetch(label, rows, elapsed):
+    """Imprime linhas/segundo e o pico de memória de uma leitura"""
+
+    rows_per_second = rows / elapsed if elapsed > 0 else float(rows)
+    peak_rss = get_peak_rss_mb()
+    peak_rss_text = f"{peak_rss:.0f} MB" if peak_rss is not None else "n/d"
+
+    print(f"Fetch Arrow {label or ''}: {rows} linhas em {elapsed:.2f} segundos ({rows_per_second:,.0f} linhas/s), pico de memória {peak_rss_text}")
+
+def fetch_polars(cursor, label=None, batch_size=ARROW_BATCH_SIZE):
+    """Lê o resultado do cursor como um DataFrame do Polars (conversão zero-copy a partir do Arrow)"""
+
+    return pl.from_arrow(fetch_arrow(cursor, label=label, batch_size=batch_size))
+
+def fetch_pandas(cursor, label=None, batch_size=ARROW_BATCH_SIZE):
+    """Lê o resultado do cursor como um DataFrame do Pandas.
+
+    A tabela Arrow é liberada durante a conversão (`self_destruct`) para não
+    manter duas cópias dos dados em memória.
+    """
+
+    table = fetch_arrow(cursor, label=label, batch_size=batch_size)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -0,0 +1,223 @@
+"""Pool de conexões com o Databricks SQL compartilhado por todos os loaders da pasta api/"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from databricks import sql
+
+load_dotenv()
+
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', '600'))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', '120'))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '60'))
+
+def connect_sql():
+    """Abre uma nova conexão com o Databricks SQL a partir das variáveis de ambiente.
+
+    Raises:
+        EnvironmentError: Se as variáveis de ambiente não estiverem configuradas corretamente.
+    """
+
+    db_server = os.getenv('DB_SERVER')
+    db_http_path = os.getenv('DB_HTTP_PATH')
+    db_token = os.getenv('DB_TOKEN')
+
+    if not db_server or not db_http_path or not db_token:
+        raise EnvironmentError("Erro: Uma ou mais variáveis de ambiente não foram carregadas. Verifique seu arquivo .env.")
+
+    return sql.connect(
+        server_hostname=db_server,
+        http_path=db_http_path,
+        access_token=db_token
+    )
+
+class ConnectionPool:
+    """Pool limitado de conexões reaproveitáveis.
+
+    - No máximo `max_size` conexões abertas ao mesmo tempo; quem excede espera
+      até `checkout_timeout` segundos por uma conexão livre.
+    - Conexões ociosas há mais de `idle_timeout` segundos são fechadas.
+    - Conexões ociosas há mais de `health_check_interval` segundos passam por um
+      `SELECT 1` antes de serem entregues; as que falham são descartadas.
+    - O checkout é por thread: blocos `connection()` aninhados na mesma thread
+      reutilizam a mesma conexão.
+    """
+
+    def __init__(
+        self,
+        connect=connect_sql,
+        max_size=DB_POOL_MAX_SIZE,
+        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+        checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT,
+        health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+    ):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle = []  # [(conexão, instante em que foi devolvida)]
+        self._size = 0
+        self._local = threading.local()
+
+    @property
+    def size(self):
+        """Quantidade de conexões abertas (em uso + ociosas)"""
+        return self._size
+
+    @property
+    def idle_count(self):
+        """Quantidade de conexões ociosas disponíveis para checkout"""
+        return len(self._idle)
+
+    @contextmanager
+    def connection(self):
+        """Entrega uma conexão do pool e a devolve ao final do bloco `with`"""
+
+        local = self._local
+        if getattr(local, 'connection', None) is not None:
+            local.depth += 1
+            try:
+                yield local.connection
+            finally:
+                local.depth -= 1
+            return
+
+        connection = self._checkout()
+        local.connection = connection
+        local.depth = 1
+        failed = False
+
+        try:
+            yield connection
+        except Exception:
+            failed = True
+            raise
+        finally:
+            local.connection = None
+            local.depth = 0
+            self._checkin(connection, check_health=failed)
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas (as que estão em uso são fechadas ao serem devolvidas)"""
+
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for connection, _ in idle:
+            self._close(connection)
+
+    def reset(self):
+        """Esquece todas as conexões sem fechá-las (usado no processo filho após um fork)"""
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._size = 0
+        self._local = threading.local()
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            self._evict_idle()
+
+            with self._condition:
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    connection, last_used = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Erro: Nenhuma conexão disponível no pool após {self.checkout_timeout} segundos.")
+                    self._condition.wait(remaining)
+                    continue
+
+            if connection is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._discard()
+                    raise
+
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(connection):
+                return connection
+
+            self._close(connection)
+            self._discard()
+
+    def _checkin(self, connection, check_health=False):
+        if check_health and not self._is_healthy(connection):
+            self._close(connection)
+            self._discard()
+            return
+
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+
+        with self._condition:
+            expired = [item for item in self._idle if now - item[1] >= self.idle_timeout]
+            if not expired:
+                return
+            self._idle = [item for item in self._idle if now - item[1] < self.idle_timeout]
+            self._size -= len(expired)
+            self._condition.notify_all()
+
+        for connection, _ in expired:
+            self._close(connection)
+
+    @staticmethod
+    def _is_healthy(connection):
+        if not getattr(connection, 'open', True):
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except Exception as e:
+            print(f"Conexão descartada do pool: {e}")
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+_pool = ConnectionPool()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pool.reset)
+
+def get_pool():
+    """Retorna o pool de conexões do processo"""
+    return _pool
+
+def get_connection():
+    """Atalho para `get_pool().connection()`.
+
+    Example:
+        >>> with get_connection() as connection:
+        ...     with connection.cursor() as cursor:
+        ...         cursor.execute("SELECT 1")
+    """
+    return _pool.connection()
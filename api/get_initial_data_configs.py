@@ -1,28 +1,36 @@
 import os
 from dotenv import load_dotenv
 from databricks import sql
-import pandas as pd
-import polars as pl
+from api.arrow_fetch import fetch_pandas, fetch_polars
+from api.connection_pool import get_connection
+from api.query_builder import build_select_query
 
 load_dotenv()
 
-def get_initial_data_configs(process_name, cpc=None, quarter=None, year=None):
+# Colunas usadas pelos filtros de trimestre e ano em cada processo.
+# Processos sem entrada aqui não possuem essas colunas e ignoram os filtros.
+PERIOD_FILTER_COLUMNS = {
+    "buildup": {"quarter": "quarter", "year": "formatted_year"},
+    "buildup_fx": {"year": "RATEYEAR"},
+}
+
+def get_initial_data_configs(process_name, cpc=None, quarter=None, year=None, columns=None):
     """
     Retrieves data configurations from the database based on the process name and filters.
-    
+
+    All filters are sent as bound parameters and only the declared columns are selected.
+
     Args:
         process_name (str): The name of the process to retrieve data for.
         cpc (list, optional): List of CPC codes to filter by. Defaults to None.
-        quarter (str, optional): Quarter to filter by. Defaults to None.
-        year (str, optional): Year to filter by. Defaults to None.
-        
+        quarter (str, optional): Quarter to filter by (see PERIOD_FILTER_COLUMNS). Defaults to None.
+        year (str, optional): Year to filter by (see PERIOD_FILTER_COLUMNS). Defaults to None.
+        columns (list, optional): Columns to select. Defaults to None (all columns).
+
     Returns:
         DataFrame: A pandas or polars DataFrame containing the requested data.
         If an error occurs or no data is found, returns a dictionary with an error message.
     """
-    connection = None
-    cursor = None
-    
     try:
         DB_SERVER = os.getenv('DB_SERVER')
         DB_HTTP_PATH = os.getenv('DB_HTTP_PATH')
@@ -31,12 +39,6 @@ def get_initial_data_configs(process_name, cpc=None, quarter=None, year=None):
         if not all([DB_SERVER, DB_HTTP_PATH, DB_TOKEN]):
             return {"error": "Configurações de banco de dados incompletas. Verifique as variáveis de ambiente."}
 
-        connection = sql.connect(
-            server_hostname=DB_SERVER,
-            http_path=DB_HTTP_PATH,
-            access_token=DB_TOKEN
-        )
-
         base_name_db = {
             "buildup": 'maxis_sandbox.pricing_db.de_para_buildup',
             "buildup_fx": 'maxis_sandbox.tabelas_cca.mpg_fx_actuals',
@@ -51,40 +53,29 @@ def get_initial_data_configs(process_name, cpc=None, quarter=None, year=None):
         if process_name not in base_name_db:
             return {"error": f"Processo '{process_name}' não encontrado. Processos válidos: {', '.join(base_name_db.keys())}"}
 
-        cursor = connection.cursor()
+        with get_connection() as connection:
+            with connection.cursor() as cursor:
+                period_columns = PERIOD_FILTER_COLUMNS.get(process_name, {})
+                filters = {"cpc1_3_6": cpc}
+                if "quarter" in period_columns:
+                    filters[period_columns["quarter"]] = quarter
+                if "year" in period_columns:
+                    filters[period_columns["year"]] = year
 
-        if cpc in (None, []):
-            if process_name == "buildup":
-                cursor.execute(f"SELECT * FROM {base_name_db['buildup']}")
-            else:
-                cursor.execute(f"SELECT * FROM {base_name_db[process_name]}")
-        else:
-            cpc_filter = "', '".join(cpc)
-            cursor.execute(f"SELECT * FROM {base_name_db[process_name]} WHERE cpc1_3_6 IN ('{cpc_filter}')")
+                query, params = build_select_query(base_name_db[process_name], columns=columns, filters=filters)
+                cursor.execute(query, params)
 
-        result = cursor.fetchall()
-        if not result:
-            return {"error": f"Nenhum dado retornado para o processo de '{process_name}', por favor verificar com o suporte técnico."}
+                if process_name == "buildup":
+                    df = fetch_polars(cursor, label=base_name_db[process_name])
+                else:
+                    df = fetch_pandas(cursor, label=base_name_db[process_name])
 
-        if process_name == "buildup":
-            df = pl.DataFrame(result, orient="row", schema=[desc[0] for desc in cursor.description])
-        else:
-            df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
+                if len(df) == 0:
+                    return {"error": f"Nenhum dado retornado para o processo de '{process_name}', por favor verificar com o suporte técnico."}
 
-        return df
+                return df
 
     except sql.Error as e:
         return {"error": f"Erro de banco de dados: {str(e)}"}
     except Exception as e:
         return {"error": f"Erro inesperado: {str(e)}"}
-    finally:
-        if cursor:
-            try:
-                cursor.close()
-            except:
-                pass
-        if connection:
-            try:
-                connection.close()
-            except:
-                pass
@@ -1,98 +1,82 @@
 import os
-from dotenv import load_dotenv
-from databricks import sql
 import pandas as pd
-import polars as pl
+from api.approval_tables import APPROVAL_TABLE, identifier_column
+from api.arrow_fetch import fetch_pandas, fetch_polars
+from api.connection_pool import get_connection
+from api.query_builder import build_select_query
+from api.query_cache import query_cache
 
-load_dotenv()
+# As filas são invalidadas ao enviar ou aprovar/reprovar uma solicitação (invalidate_cache("approval_<processo>"))
+APPROVAL_CACHE_TTL = float(os.getenv('APPROVAL_CACHE_TTL', '300'))
+
+ALLOWED_TABLES = [
+    "buildup",
+    "catlote",
+    "captain",
+    "captain_margin",
+    "delta",
+    "marketing",
+    "price",
+    "optimization",
+    "strategy",
+]
+
+def get_requests_for_approval(table, columns=None, request_id=None):
+    """Retorna as solicitações pendentes (status 3) de um processo.
+
+    O resultado fica em cache por processo, colunas e solicitação, o que permite
+    pré-buscar a próxima aba da tela de aprovações sem repetir a query ao abri-la.
+
+    Args:
+        table (str): Processo (buildup, catlote, captain, ...).
+        columns (list, optional): Colunas da tabela de dump a serem trazidas. Se None, traz todas.
+        request_id (str, optional): Traz apenas as linhas desta solicitação (uuid_alteracoes,
+            ou hash_simulacao na arquitetura de preços). Se None, traz todas as pendentes.
+    """
 
-def get_requests_for_approval(table):
     print("get_requests_for_approval")
     print("table", table)
 
+    if table not in ALLOWED_TABLES:
+        print(f"Erro ao buscar aprovações: O parâmetro 'table' deve ser um dos seguintes: {ALLOWED_TABLES}")
+        return None
+
+    df = query_cache.get_or_load(
+        f"approval_{table}",
+        lambda: fetch_requests_for_approval(table, columns, request_id),
+        filters={"columns": columns or [], "request_id": request_id},
+        ttl=APPROVAL_CACHE_TTL,
+    )
+
+    # As páginas acrescentam colunas no DataFrame do Pandas: não altera o objeto em cache
+    return df.copy() if isinstance(df, pd.DataFrame) else df
+
+def fetch_requests_for_approval(table, columns=None, request_id=None):
+    """Busca as solicitações pendentes diretamente no Databricks, sem cache"""
+
     try:
-        allowed_values = [
-            "buildup",
-            "catlote",
-            "captain",
-            "captain_margin",
-            "delta",
-            "marketing",
-            "price",
-            "optimization",
-            "strategy",
-        ]
-
-        if table not in allowed_values:
-            raise ValueError(f"O parâmetro 'table' deve ser um dos seguintes: {allowed_values}")
-        print(f"Valor aceito: {table}")
-
-        DB_SERVER = os.getenv('DB_SERVER')
-        DB_HTTP_PATH = os.getenv('DB_HTTP_PATH')
-        DB_TOKEN = os.getenv('DB_TOKEN')
-
-        connection = sql.connect(
-            server_hostname = DB_SERVER,
-            http_path = DB_HTTP_PATH,
-            access_token = DB_TOKEN
-        )
-
-        APPROVAL_TABLE = {
-            "buildup": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_buildup",
-                "historic_table": "maxis_sandbox.pricing_db.historico_buildup"
-            },
-            "catlote": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_catlote",
-                "historic_table": "maxis_sandbox.pricing_db.historico_catlote"
-            },
-            "captain": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_capitao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_capitao"
-            },
-            "captain_margin": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_margem_do_capitao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_margem_do_capitao"
-            },
-            "delta": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_delta_preco",
-                "historic_table": "maxis_sandbox.pricing_db.historico_delta_preco"
-            },
-            "marketing": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_posicionamento_de_mercado",
-                "historic_table": "maxis_sandbox.pricing_db.historico_posicionamento_de_mercado"
-            },
-            "price": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_simulacao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_simulacoes"
-            },
-            "optimization": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_otimizacao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_otimizacao"
-            },
-            "strategy": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_estrategia_comercial",
-                "historic_table": "maxis_sandbox.pricing_db.historico_estrategia_comercial"
-            },
-        }
-
-        identifier = "hash_simulacao" if table == "price" else "uuid_alteracoes"
-
-        cursor = connection.cursor()
-        cursor.execute(f"SELECT a.* FROM {APPROVAL_TABLE[table]['dump_table']} a LEFT JOIN {APPROVAL_TABLE[table]['historic_table']} b ON a.{identifier} = b.{identifier} WHERE b.status = 3")
-
-        result = cursor.fetchall()
-        print("cursor.description", [desc[0] for desc in cursor.description])
-
-        if not result:
-            cursor.close()
-            connection.close()
-            return None
-
-        if table == "buildup":
-            df = pl.DataFrame(result, orient="row", schema=[desc[0] for desc in cursor.description])
-        else:
-            df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
+        identifier = identifier_column(table)
+
+        with get_connection() as connection:
+            with connection.cursor() as cursor:
+                query, params = build_select_query(
+                    f"{APPROVAL_TABLE[table]['dump_table']} a LEFT JOIN {APPROVAL_TABLE[table]['historic_table']} b ON a.{identifier} = b.{identifier}",
+                    columns=columns,
+                    filters={identifier: request_id},
+                    conditions=["b.status = 3"],
+                    column_prefix="a",
+                )
+                cursor.execute(query, params)
+
+                if table == "buildup":
+                    df = fetch_polars(cursor, label=APPROVAL_TABLE[table]['dump_table'])
+                else:
+                    df = fetch_pandas(cursor, label=APPROVAL_TABLE[table]['dump_table'])
+
+                print("df.columns", list(df.columns))
+
+                if len(df) == 0:
+                    return None
 
         print("table 123", table)
         print("df", df.head(10))
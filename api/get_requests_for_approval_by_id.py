@@ -1,110 +1,43 @@
-import os
-from dotenv import load_dotenv
-from databricks import sql
-import pandas as pd
-import polars as pl
-
-load_dotenv()
+from api.approval_tables import APPROVAL_TABLE, identifier_column
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
+from api.query_builder import build_select_query
+from api.request_source_index import resolve_request_source
 
 def get_requests_for_approval_by_id(request_id):
     print("get_requests_for_approval_by_id")
     print("request_id", request_id)
 
     try:
-        DB_SERVER = os.getenv('DB_SERVER')
-        DB_HTTP_PATH = os.getenv('DB_HTTP_PATH')
-        DB_TOKEN = os.getenv('DB_TOKEN')
-
-        connection = sql.connect(
-            server_hostname = DB_SERVER,
-            http_path = DB_HTTP_PATH,
-            access_token = DB_TOKEN
-        )
+        with get_connection() as connection:
+            with connection.cursor() as cursor:
+                # Processo da solicitação: pelo índice ou com uma única query em todos os históricos
+                table_name = resolve_request_source(cursor, request_id)
 
-        APPROVAL_TABLE = {
-            "buildup": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_buildup",
-                "historic_table": "maxis_sandbox.pricing_db.historico_buildup"
-            },
-            "catlote": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_catlote",
-                "historic_table": "maxis_sandbox.pricing_db.historico_catlote"
-            },
-            "captain": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_capitao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_capitao"
-            },
-            "captain_margin": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_margem_do_capitao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_margem_do_capitao"
-            },
-            "delta": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_delta_preco",
-                "historic_table": "maxis_sandbox.pricing_db.historico_delta_preco"
-            },
-            "marketing": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_posicionamento_de_mercado",
-                "historic_table": "maxis_sandbox.pricing_db.historico_posicionamento_de_mercado"
-            },
-            "price": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_simulacao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_simulacoes"
-            },
-            "optimization": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_otimizacao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_otimizacao"
-            },
-            "strategy": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_estrategia_comercial",
-                "historic_table": "maxis_sandbox.pricing_db.historico_estrategia_comercial"
-            },
-        }
+                if table_name is None:
+                    print(f"No data found for request ID: {request_id}")
+                    return None
 
-        # Search through all tables for the request ID
-        for table_name, config in APPROVAL_TABLE.items():
-            # Determine which identifier column to use based on the table
-            identifier = "hash_simulacao" if table_name == "price" else "uuid_alteracoes"
-            
-            # Query to find the request in the historic table
-            cursor = connection.cursor()
-            historic_query = f"SELECT * FROM {config['historic_table']} WHERE {identifier} = '{request_id}'"
-            cursor.execute(historic_query)
-            historic_result = cursor.fetchall()
-            
-            # If we found the request in the historic table
-            if historic_result:
                 print(f"Found request in {table_name} table")
-                historic_columns = [desc[0] for desc in cursor.description]
-                
-                # Now get the corresponding data from the dump table
-                dump_query = f"SELECT a.* FROM {config['dump_table']} a JOIN {config['historic_table']} b ON a.{identifier} = b.{identifier} WHERE b.{identifier} = '{request_id}'"
-                cursor.execute(dump_query)
-                dump_result = cursor.fetchall()
-                
-                if dump_result:
-                    dump_columns = [desc[0] for desc in cursor.description]
-                    
-                    # Create the appropriate dataframe based on the table
-                    if table_name == "buildup":
-                        df = pl.DataFrame(dump_result, orient="row", schema=dump_columns)
-                    else:
-                        df = pd.DataFrame(dump_result, columns=dump_columns)
-                    
-                    # Add metadata about which table this came from
-                    df['source_table'] = table_name
-                    
-                    print(f"Found data in {table_name} table")
-                    print("df", df.head(10))
-                    
-                    cursor.close()
-                    connection.close()
-                    return df
-        
-        # If we got here, we didn't find the request in any table
-        cursor.close()
-        connection.close()
-        print(f"No data found for request ID: {request_id}")
-        return None
+                config = APPROVAL_TABLE[table_name]
+
+                query, params = build_select_query(config['dump_table'], filters={identifier_column(table_name): str(request_id)})
+                cursor.execute(query, params)
+
+                # Pandas para todos os processos: o modal de detalhes usa df.empty e to_dict("records")
+                df = fetch_pandas(cursor, label=config['dump_table'])
+
+        if len(df) == 0:
+            print(f"No data found for request ID: {request_id}")
+            return None
+
+        # Add metadata about which table this came from
+        df['source_table'] = table_name
+
+        print(f"Found data in {table_name} table")
+        print("df", df.head(10))
+
+        return df
 
     except Exception as e:
         print(f"Erro ao buscar aprovações: {str(e)}")
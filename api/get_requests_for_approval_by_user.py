@@ -1,69 +1,17 @@
-import os
-from dotenv import load_dotenv
-from databricks import sql
-import pandas as pd
-import polars as pl
-
-load_dotenv()
+from api.approval_tables import APPROVAL_TABLE, date_column, identifier_column
+from api.arrow_fetch import fetch_pandas
+from api.connection_pool import get_connection
+from api.request_source_index import request_source_index
 
 def get_requests_for_approval_by_user(user_id):
     print("get_requests_for_approval_by_user")
 
     try:
-        DB_SERVER = os.getenv('DB_SERVER')
-        DB_HTTP_PATH = os.getenv('DB_HTTP_PATH')
-        DB_TOKEN = os.getenv('DB_TOKEN')
-
-        connection = sql.connect(
-            server_hostname = DB_SERVER,
-            http_path = DB_HTTP_PATH,
-            access_token = DB_TOKEN
-        )
-
-        APPROVAL_TABLE = {
-            "buildup": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_buildup",
-                "historic_table": "maxis_sandbox.pricing_db.historico_buildup"
-            },
-            "catlote": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_catlote",
-                "historic_table": "maxis_sandbox.pricing_db.historico_catlote"
-            },
-            "captain_margin": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_margem_do_capitao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_margem_do_capitao"
-            },
-            "delta": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_delta_preco",
-                "historic_table": "maxis_sandbox.pricing_db.historico_delta_preco"
-            },
-            "marketing": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_posicionamento_de_mercado",
-                "historic_table": "maxis_sandbox.pricing_db.historico_posicionamento_de_mercado"
-            },
-            "optimization": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_otimizacao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_otimizacao"
-            },
-            "strategy": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_estrategia_comercial",
-                "historic_table": "maxis_sandbox.pricing_db.historico_estrategia_comercial"
-            },
-            "captain": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_capitao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_capitao"
-            },
-            "price": {
-                "dump_table": "maxis_sandbox.pricing_db.dump_simulacao",
-                "historic_table": "maxis_sandbox.pricing_db.historico_simulacoes"
-            },
-        }
-
         union_queries = []
         for table_name, config in APPROVAL_TABLE.items():
 
-            data_column = "data_simulacao" if table_name == "captain" or table_name == "price" else "data_alteracoes"
-            uuid_column = "hash_simulacao" if table_name == "price" else "uuid_alteracoes"
+            data_column = date_column(table_name)
+            uuid_column = identifier_column(table_name)
 
             # do not include status 4 (simulation)
             union_queries.append(f"""
@@ -80,23 +28,19 @@ def get_requests_for_approval_by_user(user_id):
 
         full_query = " UNION ALL ".join(union_queries)
 
-        cursor = connection.cursor()
-        cursor.execute(full_query)
+        with get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(full_query)
 
-        result = cursor.fetchall()
-        print("cursor.description", [desc[0] for desc in cursor.description])
+                df = fetch_pandas(cursor, label="historico_*")
 
-        if not result:
-            cursor.close()
-            connection.close()
-            return None
+                print("df.columns", list(df.columns))
 
-        # if table == "buildup":
-        #     df = pl.DataFrame(result, orient="row", schema=[desc[0] for desc in cursor.description])
-        # else:
-        #     df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
+                if df.empty:
+                    return None
 
-        df = pd.DataFrame(result, columns=[desc[0] for desc in cursor.description])
+        # Os detalhes de cada solicitação são buscados direto no processo certo
+        request_source_index.remember_many(df)
 
         print("df", df.head(10))
 
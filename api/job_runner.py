@@ -0,0 +1,388 @@
+"""Submissão e acompanhamento de execuções de notebooks/jobs no Databricks (Jobs API 2.0).
+
+Todas as chamadas usam uma única `requests.Session` (conexões HTTP reaproveitadas)
+e o acompanhamento da execução é feito com backoff exponencial limitado e um
+prazo máximo, em vez de consultar o `runs/get` sem parar.
+
+Há dois modos de uso:
+
+- Bloqueante: `runner.submit_notebook(...).wait()` espera o fim da execução.
+- Assíncrono: `runner.submit_notebook(...)` devolve um `JobRun` na hora; quem
+  chamou pode consultar `poll()` depois (ou em outro processo, a partir do
+  `run_id`) sem prender o worker do Dash.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_POLL_INITIAL_INTERVAL = float(os.getenv('JOB_POLL_INITIAL_INTERVAL', '1'))
+JOB_POLL_MAX_INTERVAL = float(os.getenv('JOB_POLL_MAX_INTERVAL', '15'))
+JOB_POLL_BACKOFF = float(os.getenv('JOB_POLL_BACKOFF', '2'))
+JOB_RUN_TIMEOUT = float(os.getenv('JOB_RUN_TIMEOUT', '1800'))
+JOB_HTTP_TIMEOUT = float(os.getenv('JOB_HTTP_TIMEOUT', '120'))
+JOB_HTTP_POOL_SIZE = int(os.getenv('JOB_HTTP_POOL_SIZE', '16'))
+
+# Estados em que a execução não muda mais
+TERMINAL_STATES = ('TERMINATED', 'SKIPPED', 'INTERNAL_ERROR')
+
+def create_session(pool_size=JOB_HTTP_POOL_SIZE):
+    """Cria uma `requests.Session` com um pool de conexões HTTP do tamanho informado"""
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class JobRun:
+    """Handle de uma execução submetida ao Databricks.
+
+    Args:
+        runner (JobRunner): Runner usado para consultar a execução.
+        run_id (int): Identificador da execução (`run_id`).
+        on_success (list, optional): Funções chamadas uma única vez quando a
+            execução termina com sucesso (por exemplo, invalidar o cache).
+    """
+
+    def __init__(self, runner, run_id, on_success=None):
+        self.runner = runner
+        self.run_id = run_id
+        self.on_success = list(on_success or [])
+        self.state = {}
+        self.run = {}
+        self.timed_out = False
+        self._notified = False
+
+    @property
+    def life_cycle_state(self):
+        return self.state.get('life_cycle_state')
+
+    @property
+    def result_state(self):
+        return self.state.get('result_state')
+
+    @property
+    def done(self):
+        """True se a execução terminou (com ou sem sucesso)"""
+        return self.life_cycle_state in TERMINAL_STATES
+
+    @property
+    def success(self):
+        """True se a execução terminou com sucesso"""
+        return self.life_cycle_state == 'TERMINATED' and self.result_state == 'SUCCESS'
+
+    def poll(self):
+        """Consulta o estado atual da execução uma única vez (não bloqueia)"""
+
+        self.run = self.runner.get_run(self.run_id)
+        self.state = self.run.get('state', {})
+
+        if self.success and not self._notified:
+            self._notified = True
+            for callback in self.on_success:
+                callback()
+
+        return self
+
+    def wait(self, timeout=None, on_poll=None):
+        """Espera o fim da execução consultando o estado com backoff exponencial.
+
+        Args:
+            timeout (float, optional): Prazo máximo em segundos. Se None, usa o do runner.
+            on_poll (callable, optional): Chamada com o handle após cada consulta (progresso).
+
+        Returns:
+            JobRun: O próprio handle. Se o prazo acabar, `timed_out` fica True e
+            `success` False; a execução continua no Databricks.
+        """
+
+        return self.runner.wait(self, timeout=timeout, on_poll=on_poll)
+
+    def cancel(self):
+        """Pede o cancelamento da execução no Databricks"""
+        self.runner.cancel_run(self.run_id)
+
+    def output(self):
+        """Retorna o resultado do notebook (`dbutils.notebook.exit`) ou None.
+
+        Sempre um único valor: o resultado da tarefa quando a execução tem
+        exatamente uma tarefa, senão o da própria execução. Para jobs com várias
+        tarefas, use `task_outputs`.
+        """
+
+        tasks = self.run.get('tasks') or []
+        if len(tasks) == 1:
+            return self.runner.get_run_output(tasks[0].get('run_id'))
+        return self.runner.get_run_output(self.run_id)
+
+    def task_outputs(self):
+        """Retorna a lista com o resultado de cada tarefa (ou só o da execução, se ela não tiver tarefas)"""
+
+        tasks = self.run.get('tasks') or []
+        if not tasks:
+            return [self.runner.get_run_output(self.run_id)]
+        return [self.runner.get_run_output(task.get('run_id')) for task in tasks]
+
+    def to_dict(self):
+        """Representação serializável (para dcc.Store ou logs)"""
+
+        return {
+            'run_id': self.run_id,
+            'life_cycle_state': self.life_cycle_state,
+            'result_state': self.result_state,
+            'state_message': self.state.get('state_message'),
+            'success': self.success,
+            'timed_out': self.timed_out,
+        }
+
+class JobRunner:
+    """Cliente da Jobs API do Databricks com sessão HTTP compartilhada e polling com backoff.
+
+    Args:
+        session (requests.Session, optional): Sessão HTTP. Se None, é criada na primeira chamada.
+        initial_interval (float): Intervalo da primeira consulta ao estado, em segundos.
+        max_interval (float): Intervalo máximo entre consultas.
+        backoff (float): Fator de crescimento do intervalo a cada consulta.
+        timeout (float): Prazo máximo padrão de espera de uma execução.
+        http_timeout (float): Timeout de cada requisição HTTP.
+        sleep (callable): Função de espera (substituível nos testes).
+        clock (callable): Relógio monotônico (substituível nos testes).
+    """
+
+    def __init__(
+        self,
+        session=None,
+        initial_interval=JOB_POLL_INITIAL_INTERVAL,
+        max_interval=JOB_POLL_MAX_INTERVAL,
+        backoff=JOB_POLL_BACKOFF,
+        timeout=JOB_RUN_TIMEOUT,
+        http_timeout=JOB_HTTP_TIMEOUT,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        self._session = session
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.http_timeout = http_timeout
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = create_session()
+        return self._session
+
+    def reset(self):
+        """Descarta a sessão HTTP (usado no processo filho após um fork)"""
+
+        self._session = None
+        self._lock = threading.Lock()
+
+    def submit_notebook(self, notebook_path, base_parameters=None, run_name=None, on_success=None):
+        """Submete um notebook no cluster configurado (`runs/submit`) e retorna o `JobRun` sem esperar.
+
+        Raises:
+            ValueError: Se as variáveis de ambiente não estiverem configuradas.
+            ConnectionError: Se o Databricks recusar a submissão.
+        """
+
+        cluster_id = os.getenv('DB_CLUSTER_ID')
+        if not cluster_id:
+            raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
+
+        payload = {
+            "existing_cluster_id": cluster_id,
+            "notebook_task": {
+                "notebook_path": notebook_path,
+                "base_parameters": base_parameters or {},
+            }
+        }
+        if run_name:
+            payload["run_name"] = run_name
+
+        response = self._request('POST', 'runs/submit', json=payload)
+        run_id = response.get('run_id')
+        print(f"Notebook initiated successfully. Run ID: {run_id}")
+
+        return JobRun(self, run_id, on_success=on_success)
+
+    def run_job(self, job_id, notebook_params=None, on_success=None):
+        """Dispara um job existente (`run-now`) e retorna o `JobRun` sem esperar"""
+
+        response = self._request('POST', 'run-now', json={
+            "job_id": job_id,
+            "notebook_params": notebook_params or {},
+        })
+        run_id = response.get('run_id')
+        print(f"Job initiated successfully. Run ID: {run_id}")
+
+        return JobRun(self, run_id, on_success=on_success)
+
+    def get_run(self, run_id):
+        """Retorna os dados da execução (`runs/get`)"""
+        return self._request('GET', 'runs/get', params={'run_id': run_id})
+
+    def get_run_output(self, run_id):
+        """Retorna o resultado do notebook da execução (`runs/get-output`) ou None"""
+
+        try:
+            output = self._request('GET', 'runs/get-output', params={'run_id': run_id})
+        except ConnectionError as e:
+            print(f"Failed to get notebook output: {e}")
+            return None
+        return output.get('notebook_output', {}).get('result')
+
+    def cancel_run(self, run_id):
+        """Cancela a execução (`runs/cancel`)"""
+
+        self._request('POST', 'runs/cancel', json={'run_id': run_id})
+        print(f"Notebook run cancelled. Run ID: {run_id}")
+
+    def submit_notebooks(self, submissions, max_workers=None):
+        """Submete vários notebooks ao mesmo tempo, sem esperar as execuções.
+
+        Args:
+            submissions (dict): chave -> argumentos de `submit_notebook`
+                (notebook_path, base_parameters, run_name, on_success).
+            max_workers (int, optional): Submissões simultâneas. Se None, uma por notebook
+                (limitado ao tamanho do pool HTTP).
+
+        Returns:
+            dict: chave -> `JobRun`, ou a exceção se a submissão daquela chave falhou.
+        """
+
+        if not submissions:
+            return {}
+
+        max_workers = max_workers or min(len(submissions), JOB_HTTP_POOL_SIZE)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {key: executor.submit(self.submit_notebook, **kwargs) for key, kwargs in submissions.items()}
+
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"Failed to initiate notebook for {key}: {e}")
+                results[key] = e
+
+        return results
+
+    def wait(self, job_run, timeout=None, on_poll=None):
+        """Consulta o estado de `job_run` até o fim da execução ou até o prazo"""
+
+        self.wait_all([job_run], timeout=timeout, on_poll=on_poll)
+
+        if job_run.timed_out:
+            print(f"Notebook run still {job_run.life_cycle_state} after {self.timeout if timeout is None else timeout:.0f} seconds. Run ID: {job_run.run_id}")
+        elif job_run.success:
+            print("Notebook run completed successfully.")
+        elif job_run.life_cycle_state == 'INTERNAL_ERROR':
+            print("Notebook run encountered an internal error.")
+        else:
+            print(f"Notebook run failed. State: {job_run.result_state}")
+
+        return job_run
+
+    def wait_all(self, job_runs, timeout=None, on_poll=None):
+        """Espera várias execuções ao mesmo tempo, com um único prazo para todas.
+
+        A cada rodada consulta apenas as execuções que ainda não terminaram; o
+        intervalo entre rodadas cresce com backoff exponencial. As execuções que
+        não terminarem até o prazo ficam com `timed_out` True.
+        """
+
+        pending = self._wait(job_runs, timeout, on_poll, first_completed=False)
+        for job_run in pending:
+            job_run.timed_out = True
+        return job_runs
+
+    def wait_any(self, job_runs, timeout=None, on_poll=None):
+        """Espera até que ao menos uma das execuções termine, ou até o prazo.
+
+        Usado para manter um número fixo de execuções em andamento: assim que uma
+        termina, quem chamou pode submeter a próxima. Ao contrário de `wait_all`,
+        não marca `timed_out` (o prazo de cada execução fica com quem chamou).
+
+        Returns:
+            list: As execuções que terminaram (vazia se o prazo acabou antes).
+        """
+
+        pending = self._wait(job_runs, timeout, on_poll, first_completed=True)
+        return [job_run for job_run in job_runs if job_run not in pending]
+
+    def _wait(self, job_runs, timeout, on_poll, first_completed):
+        """Consulta as execuções com backoff até todas (ou a primeira) terminarem; retorna as pendentes"""
+
+        timeout = self.timeout if timeout is None else timeout
+        deadline = self._clock() + timeout
+        interval = self.initial_interval
+        pending = list(job_runs)
+
+        while True:
+            for job_run in pending:
+                try:
+                    job_run.poll()
+                except ConnectionError as e:
+                    # Falha momentânea na consulta: tenta de novo na próxima rodada
+                    print(f"Failed to get run status. Run ID: {job_run.run_id}. {e}")
+                    continue
+                if on_poll is not None:
+                    on_poll(job_run)
+
+            still_pending = [job_run for job_run in pending if not job_run.done]
+            if not still_pending or first_completed and len(still_pending) < len(pending):
+                return still_pending
+            pending = still_pending
+
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return pending
+
+            # Pequena variação aleatória para que várias execuções não consultem juntas
+            self._sleep(min(interval * random.uniform(0.9, 1.1), remaining))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    def _request(self, method, path, **kwargs):
+        db_server = os.getenv('DB_SERVER')
+        db_token = os.getenv('DB_TOKEN')
+
+        if not all([db_server, db_token]):
+            raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
+
+        # Timeouts e falhas de rede do requests não herdam do ConnectionError nativo:
+        # convertidos aqui, são tratados como falha momentânea por quem chama (ex.: wait_all)
+        try:
+            response = self.session.request(
+                method,
+                f'{db_server}/api/2.0/jobs/{path}',
+                headers={'Authorization': f'Bearer {db_token}'},
+                timeout=self.http_timeout,
+                **kwargs,
+            )
+        except requests.RequestException as e:
+            raise ConnectionError(f"Falha na chamada {path}: {e}") from e
+
+        if response.status_code != 200:
+            raise ConnectionError(f"Falha na chamada {path}. Código de status: {response.status_code}. Resposta: {response.text}")
+
+        return response.json()
+
+job_runner = JobRunner()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=job_runner.reset)
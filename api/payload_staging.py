@@ -0,0 +1,181 @@
+"""Transporte de payloads grandes para os notebooks por arquivo, fora dos parâmetros do job.
+
+Por padrão os dados vão como JSON dentro de base_parameters/notebook_params,
+o que exige codificar e decodificar dezenas de milhares de linhas e esbarra no
+limite de tamanho dos parâmetros da Jobs API. Com `PAYLOAD_STAGING_PATH`
+configurado, payloads tabulares com pelo menos `PAYLOAD_STAGING_MIN_ROWS`
+linhas são gravados como Parquet (zstd) nesse caminho, e o parâmetro `<chave>`
+é substituído por:
+
+- `<chave>_path`: caminho do arquivo.
+- `<chave>_sha256`: checksum do arquivo, conferido pelo notebook antes de ler.
+
+Destinos (`PAYLOAD_STAGING_BACKEND`):
+
+- "volume": Volume do Unity Catalog (ex.: /Volumes/catalogo/schema/staging),
+  gravado pela Files API com a sessão HTTP do job_runner.
+- "local": diretório do sistema de arquivos (testes, ou volume montado localmente).
+
+Sem `PAYLOAD_STAGING_PATH`, tudo continua indo como JSON nos parâmetros.
+"""
+
+import hashlib
+import io
+import os
+import pathlib
+import uuid
+import pandas as pd
+import polars as pl
+import requests
+from dotenv import load_dotenv
+from api.job_runner import job_runner
+from utils.serialize_to_json import serialize_to_json
+
+load_dotenv()
+
+PAYLOAD_STAGING_PATH = os.getenv('PAYLOAD_STAGING_PATH', '')
+PAYLOAD_STAGING_BACKEND = os.getenv('PAYLOAD_STAGING_BACKEND', 'volume')
+PAYLOAD_STAGING_MIN_ROWS = int(os.getenv('PAYLOAD_STAGING_MIN_ROWS', '1000'))
+
+class LocalStagingStore:
+    """Grava os arquivos em um diretório local"""
+
+    def __init__(self, root):
+        self.root = pathlib.Path(root)
+
+    def write(self, relative_path, content):
+        path = self.root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Escrita atômica: o notebook nunca vê um arquivo pela metade
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+        return str(path)
+
+    def read(self, path):
+        return pathlib.Path(path).read_bytes()
+
+class VolumeStagingStore:
+    """Grava os arquivos em um Volume do Unity Catalog pela Files API (`PUT /api/2.0/fs/files`)"""
+
+    def __init__(self, root, runner=job_runner):
+        self.root = root.rstrip("/")
+        self.runner = runner
+
+    def write(self, relative_path, content):
+        db_server = os.getenv('DB_SERVER')
+        db_token = os.getenv('DB_TOKEN')
+
+        if not all([db_server, db_token]):
+            raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
+
+        path = f"{self.root}/{relative_path}"
+        try:
+            response = self.runner.session.put(
+                f"{db_server}/api/2.0/fs/files{path}",
+                params={"overwrite": "true"},
+                data=content,
+                headers={'Authorization': f'Bearer {db_token}', 'Content-Type': 'application/octet-stream'},
+                timeout=self.runner.http_timeout,
+            )
+        except requests.RequestException as e:
+            raise ConnectionError(f"Falha ao gravar {path}: {e}") from e
+
+        if response.status_code not in (200, 201, 204):
+            raise ConnectionError(f"Falha ao gravar {path}. Código de status: {response.status_code}. Resposta: {response.text}")
+
+        return path
+
+def to_parquet_bytes(data):
+    """Converte um payload tabular em Parquet (zstd).
+
+    Args:
+        data (list | pd.DataFrame | pl.DataFrame): Lista de dicionários ou DataFrame.
+
+    Returns:
+        tuple: (conteúdo, linhas), ou None se o payload não for tabular.
+    """
+
+    try:
+        if isinstance(data, pl.DataFrame):
+            df = data
+        elif isinstance(data, pd.DataFrame):
+            df = pl.from_pandas(data)
+        elif isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+            df = pl.DataFrame(data, infer_schema_length=None)
+        else:
+            return None
+
+        buffer = io.BytesIO()
+        df.write_parquet(buffer, compression="zstd")
+    except Exception as e:
+        print(f"Payload não convertido para Parquet, será enviado como JSON: {e}")
+        return None
+
+    return buffer.getvalue(), df.height
+
+class PayloadStager:
+    """Grava payloads tabulares como Parquet e devolve os parâmetros com caminho e checksum.
+
+    Args:
+        store (LocalStagingStore | VolumeStagingStore): Destino dos arquivos.
+        min_rows (int): Payloads com menos linhas continuam indo como JSON.
+    """
+
+    def __init__(self, store, min_rows=PAYLOAD_STAGING_MIN_ROWS):
+        self.store = store
+        self.min_rows = min_rows
+
+    def stage(self, name, data):
+        """Grava o payload e retorna {"path", "sha256", "rows", "bytes"}, ou None se deve ir como JSON"""
+
+        if len(data) < self.min_rows:
+            return None
+
+        converted = to_parquet_bytes(data)
+        if converted is None:
+            return None
+
+        content, rows = converted
+        path = self.store.write(f"{name}/{uuid.uuid4().hex}.parquet", content)
+
+        return {
+            "path": path,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "rows": rows,
+            "bytes": len(content),
+        }
+
+def create_payload_stager(path=PAYLOAD_STAGING_PATH, backend=PAYLOAD_STAGING_BACKEND):
+    """Stager configurado pelo .env, ou None se `PAYLOAD_STAGING_PATH` não estiver definido"""
+
+    if not path:
+        return None
+    if backend == "local":
+        return PayloadStager(LocalStagingStore(path))
+    return PayloadStager(VolumeStagingStore(path))
+
+payload_stager = create_payload_stager()
+
+def encode_parameter(key, data, name, stager=None):
+    """Parâmetros do job para um payload: o arquivo em staging ou o JSON de sempre.
+
+    Args:
+        key (str): Nome do parâmetro no notebook (ex.: "outputDeltaPreco").
+        data: Payload (DataFrame, lista de dicionários ou outro valor aceito por serialize_to_json).
+        name (str): Prefixo dos arquivos no staging (processo ou notebook).
+        stager (PayloadStager, optional): Se None, usa o configurado pelo .env.
+
+    Returns:
+        dict: {key: JSON} ou {f"{key}_path": caminho, f"{key}_sha256": checksum}.
+    """
+
+    stager = stager or payload_stager
+    staged = stager.stage(name, data) if stager is not None and isinstance(data, (list, pd.DataFrame, pl.DataFrame)) else None
+
+    if staged is None:
+        return {key: serialize_to_json(data)}
+
+    print(f"Payload {name}/{key} em staging: {staged['rows']} linhas, {staged['bytes']} bytes em {staged['path']}")
+    return {f"{key}_path": staged["path"], f"{key}_sha256": staged["sha256"]}
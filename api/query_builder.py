@@ -0,0 +1,62 @@
+"""Montagem de queries SELECT com projeção de colunas e filtros com parâmetros (bind)"""
+
+def quote_identifier(name):
+    """Coloca o nome da coluna entre crases, escapando crases internas.
+
+    Example:
+        >>> quote_identifier("mg_min")
+        '`mg_min`'
+    """
+    return "`" + str(name).replace("`", "``") + "`"
+
+def build_select_query(table, columns=None, filters=None, conditions=None, column_prefix=None, order_by=None):
+    """Monta um SELECT com as colunas declaradas e filtros passados como parâmetros `?`.
+
+    Args:
+        table (str): Tabela (ou expressão FROM, como um JOIN) a ser consultada.
+        columns (list, optional): Colunas a serem trazidas. Se None ou vazia, usa `*`.
+        filters (dict, optional): {coluna: valor}. Listas geram `IN (?, ...)`, escalares geram `= ?`.
+            Valores None ou listas vazias são ignorados.
+        conditions (list, optional): Condições fixas em SQL, sem valores vindos do usuário.
+        column_prefix (str, optional): Alias da tabela aplicado às colunas e aos filtros (ex.: "a").
+        order_by (list, optional): Colunas de ordenação.
+
+    Returns:
+        tuple: (query, params) prontos para `cursor.execute(query, params)`.
+
+    Example:
+        >>> build_select_query("d_mercado", ["cpc1_3_6"], {"cpc1_3_6": ["A", "B"]})
+        ('SELECT `cpc1_3_6` FROM d_mercado WHERE `cpc1_3_6` IN (?, ?)', ['A', 'B'])
+    """
+
+    prefix = f"{column_prefix}." if column_prefix else ""
+
+    select = ", ".join(prefix + quote_identifier(column) for column in columns) if columns else f"{prefix}*"
+
+    clauses = list(conditions or [])
+    params = []
+
+    for column, value in (filters or {}).items():
+        if value is None:
+            continue
+
+        if isinstance(value, (list, tuple, set)):
+            values = list(value)
+            if not values:
+                continue
+            placeholders = ", ".join(["?"] * len(values))
+            clauses.append(f"{prefix}{quote_identifier(column)} IN ({placeholders})")
+            params.extend(values)
+        else:
+            clauses.append(f"{prefix}{quote_identifier(column)} = ?")
+            params.append(value)
+
+    query = f"SELECT {select} FROM {table}"
+
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+
+    if order_by:
+        query += " ORDER BY " + ", ".join(prefix + quote_identifier(column) for column in order_by)
+
+    return query, params
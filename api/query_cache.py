@@ -0,0 +1,287 @@
+"""Cache de resultados de queries com TTL, LRU limitado e invalidação explícita.
+
+As entradas são identificadas por (tabela, filtros, escopo do usuário), de modo
+que uma consulta filtrada nunca é servida para outra consulta com filtros
+diferentes. DataFrames (Polars ou Pandas) também podem ser persistidos em
+parquet no disco, o que permite reaproveitá-los entre processos e reinícios.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+import polars as pl
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '43200'))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '32'))
+QUERY_CACHE_DIR = os.getenv('QUERY_CACHE_DIR') or str(pathlib.Path(__file__).parent / "cache")
+
+# Intervalo mínimo entre consultas ao marcador de invalidação de uma tabela no disco
+INVALIDATION_CHECK_INTERVAL = 1.0
+
+def make_cache_key(table, filters=None, scope=None):
+    """Gera uma chave estável a partir da tabela, dos filtros e do escopo do usuário.
+
+    Listas de filtros são ordenadas, então ["A", "B"] e ["B", "A"] geram a mesma chave.
+
+    Example:
+        >>> make_cache_key("optimization", {"cpc": ["B", "A"]})
+        'optimization-...'
+    """
+
+    def normalize(value):
+        if isinstance(value, dict):
+            return {str(key): normalize(item) for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))}
+        if isinstance(value, (list, tuple, set)):
+            return sorted((normalize(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True, default=str))
+        return value
+
+    payload = json.dumps({"filters": normalize(filters), "scope": normalize(scope)}, sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    return f"{table}-{digest}"
+
+class QueryCache:
+    """Cache em memória (LRU com no máximo `max_entries` entradas) com persistência opcional em disco.
+
+    Args:
+        ttl (float): Tempo de vida padrão das entradas, em segundos.
+        max_entries (int): Quantidade máxima de entradas em memória (e de arquivos em disco).
+        cache_dir (str, optional): Pasta para persistir DataFrames em parquet. Se None, só memória.
+    """
+
+    def __init__(self, ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_MAX_ENTRIES, cache_dir=QUERY_CACHE_DIR):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else None
+
+        self._entries = OrderedDict()  # chave -> (tabela, valor, criado_em, expira_em)
+        self._lock = threading.RLock()
+        self._load_locks = {}  # chave -> [lock, chamadas usando o lock]; removido quando ninguém mais usa
+        self._invalidations = {}  # tabela -> (invalidado_em, mtime do marcador, consultado_em)
+
+    def get(self, table, filters=None, scope=None, ttl=None):
+        """Retorna o valor em cache ou None se não existir, estiver expirado ou invalidado"""
+
+        key = make_cache_key(table, filters, scope)
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                _, value, created_at, expires_at = entry
+                if now < expires_at and created_at >= self._invalidated_at(table):
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        value = self._read_disk(table, key, now, ttl)
+        if value is not None:
+            self._store(table, key, value, now, now + ttl)
+
+        return value
+
+    def set(self, table, value, filters=None, scope=None, ttl=None, persist=True):
+        """Armazena um valor no cache (e em disco, se for um DataFrame e `persist` for True)"""
+
+        key = make_cache_key(table, filters, scope)
+        now = time.time()
+        self._store(table, key, value, now, now + (self.ttl if ttl is None else ttl))
+
+        if persist:
+            self._write_disk(key, value)
+
+        return value
+
+    def get_or_load(self, table, loader, filters=None, scope=None, ttl=None, persist=True):
+        """Retorna o valor em cache ou executa `loader()` e guarda o resultado.
+
+        Chamadas simultâneas para a mesma chave executam o `loader` uma única vez.
+        Resultados None não são armazenados.
+        """
+
+        value = self.get(table, filters, scope, ttl=ttl)
+        if value is not None:
+            return value
+
+        key = make_cache_key(table, filters, scope)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, [threading.Lock(), 0])
+            load_lock[1] += 1
+
+        try:
+            with load_lock[0]:
+                value = self.get(table, filters, scope, ttl=ttl)
+                if value is not None:
+                    return value
+
+                value = loader()
+                if value is not None:
+                    self.set(table, value, filters, scope, ttl=ttl, persist=persist)
+        finally:
+            with self._lock:
+                load_lock[1] -= 1
+                if load_lock[1] == 0:
+                    del self._load_locks[key]
+
+        return value
+
+    def invalidate(self, *tables):
+        """Remove as entradas das tabelas informadas (ou todas, se nenhuma for informada).
+
+        A invalidação também é registrada em disco, para que outros processos
+        descartem as entradas anteriores a ela.
+        """
+
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if not tables or entry[0] in tables]:
+                del self._entries[key]
+
+        if self.cache_dir is None:
+            return
+
+        for path in self._disk_files():
+            if not tables or path.name.rsplit("-", 1)[0] in tables:
+                self._remove(path)
+
+        for table in tables:
+            invalidated_at = time.time()
+            path = self.cache_dir / f"{table}.invalidated"
+            self._atomic_write(path, lambda tmp: pathlib.Path(tmp).write_text(str(invalidated_at)))
+            with self._lock:
+                self._invalidations[table] = (invalidated_at, self._mtime(path), time.monotonic())
+
+    def _store(self, table, key, value, created_at, expires_at):
+        with self._lock:
+            self._entries[key] = (table, value, created_at, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _invalidated_at(self, table):
+        """Momento da última invalidação da tabela (por qualquer processo).
+
+        O marcador em disco é consultado no máximo uma vez por INVALIDATION_CHECK_INTERVAL,
+        e só é lido de novo quando o arquivo muda.
+        """
+
+        if self.cache_dir is None:
+            return 0.0
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._invalidations.get(table)
+        if cached is not None and now - cached[2] < INVALIDATION_CHECK_INTERVAL:
+            return cached[0]
+
+        path = self.cache_dir / f"{table}.invalidated"
+        mtime = self._mtime(path)
+        if cached is not None and mtime == cached[1]:
+            invalidated_at = cached[0]
+        else:
+            try:
+                invalidated_at = float(path.read_text())
+            except (OSError, ValueError):
+                invalidated_at = 0.0
+
+        with self._lock:
+            self._invalidations[table] = (invalidated_at, mtime, now)
+        return invalidated_at
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _disk_files(self):
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return []
+        return [path for path in self.cache_dir.iterdir() if path.suffix in (".parquet", ".pdparquet")]
+
+    def _read_disk(self, table, key, now, ttl):
+        if self.cache_dir is None:
+            return None
+
+        for suffix, reader in ((".parquet", pl.read_parquet), (".pdparquet", pd.read_parquet)):
+            path = self.cache_dir / f"{key}{suffix}"
+            try:
+                modified_at = os.stat(path).st_mtime
+            except OSError:
+                continue
+
+            if now - modified_at >= ttl or modified_at < self._invalidated_at(table):
+                self._remove(path)
+                return None
+
+            try:
+                print(f"Usando cache em disco: {path.name}")
+                return reader(path)
+            except Exception as e:
+                print(f"Erro ao ler cache: {e}")
+                self._remove(path)
+                return None
+
+        return None
+
+    def _write_disk(self, key, value):
+        if self.cache_dir is None:
+            return
+
+        if isinstance(value, pl.DataFrame):
+            path = self.cache_dir / f"{key}.parquet"
+            writer = value.write_parquet
+        elif isinstance(value, pd.DataFrame):
+            path = self.cache_dir / f"{key}.pdparquet"
+            writer = value.to_parquet
+        else:
+            return
+
+        try:
+            self._atomic_write(path, writer)
+        except Exception as e:
+            # Mesmo se falhar ao salvar o cache, o valor continua disponível em memória
+            print(f"Erro ao salvar cache: {e}")
+            return
+
+        files = sorted(self._disk_files(), key=lambda item: item.stat().st_mtime)
+        for old_path in files[:max(0, len(files) - self.max_entries)]:
+            self._remove(old_path)
+
+    def _atomic_write(self, path, writer):
+        """Escreve em um arquivo temporário na mesma pasta e o renomeia para o destino"""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(pathlib.Path(tmp_path))
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+query_cache = QueryCache()
+
+def invalidate_cache(*tables):
+    """Invalida as entradas em cache das tabelas (processos) informadas após uma escrita"""
+
+    print(f"Invalidando cache: {', '.join(tables) if tables else 'todas as tabelas'}")
+    query_cache.invalidate(*tables)
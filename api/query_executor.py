@@ -0,0 +1,195 @@
+"""Executor compartilhado e limitado para consultas em paralelo ao Databricks SQL.
+
+Antes cada chamada que disparava várias queries criava o seu próprio
+ThreadPoolExecutor (o command center abria 11 threads e um event loop por
+chamada). Com vários usuários ao mesmo tempo, isso multiplicava as sessões
+abertas no SQL warehouse. Agora todo fan-out (command center, pré-busca das abas
+de aprovação, categorias da arquitetura de preços) passa por um único executor
+por processo:
+
+- No máximo `max_workers` consultas em execução ao mesmo tempo.
+- No máximo `max_queued` tarefas esperando na fila; além disso, quem submete
+  espera uma vaga (em vez de acumular trabalho sem limite). Tarefas opcionais,
+  como as atualizações em segundo plano do cache, usam `try_submit`, que nunca
+  espera: com a fila cheia a tarefa é descartada.
+- Métricas de fila e de espera em `stats()`, e um resumo impresso a cada `map`.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+from api.connection_pool import DB_POOL_MAX_SIZE
+
+load_dotenv()
+
+# Metade do pool de conexões por padrão: o restante fica livre para os callbacks que consultam diretamente
+QUERY_EXECUTOR_MAX_WORKERS = int(os.getenv('QUERY_EXECUTOR_MAX_WORKERS', str(max(1, DB_POOL_MAX_SIZE // 2))))
+QUERY_EXECUTOR_MAX_QUEUED = int(os.getenv('QUERY_EXECUTOR_MAX_QUEUED', '64'))
+
+class QueryExecutor:
+    """Pool de threads limitado, com fila limitada e métricas de espera.
+
+    Args:
+        max_workers (int): Consultas executando ao mesmo tempo.
+        max_queued (int): Tarefas aguardando uma thread livre antes de `submit` bloquear.
+    """
+
+    def __init__(self, max_workers=QUERY_EXECUTOR_MAX_WORKERS, max_queued=QUERY_EXECUTOR_MAX_QUEUED, clock=time.monotonic):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._clock = clock
+
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = None
+        self._pid = None
+        self._metrics = self._empty_metrics()
+
+    def submit(self, fn, *args, **kwargs):
+        """Agenda `fn(*args, **kwargs)` e retorna um Future.
+
+        Chamadas feitas de dentro de uma tarefa do próprio executor rodam na hora,
+        na mesma thread, para que uma tarefa nunca espere por outra que está na fila atrás dela.
+        """
+
+        if getattr(self._local, 'in_worker', False):
+            return self._run_inline(fn, *args, **kwargs)
+
+        executor = self._get_executor()
+        self._slots.acquire()
+        return self._enqueue(executor, fn, *args, **kwargs)
+
+    def try_submit(self, fn, *args, **kwargs):
+        """Agenda `fn(*args, **kwargs)` sem esperar: retorna um Future, ou None se a fila estiver cheia.
+
+        De dentro de uma tarefa do próprio executor também retorna None (em vez de
+        rodar na hora), para que quem chama nunca execute a tarefa na sua thread.
+        """
+
+        if getattr(self._local, 'in_worker', False):
+            return None
+
+        executor = self._get_executor()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._metrics["rejected"] += 1
+            return None
+        return self._enqueue(executor, fn, *args, **kwargs)
+
+    def _enqueue(self, executor, fn, *args, **kwargs):
+        submitted_at = self._clock()
+        with self._lock:
+            self._metrics["submitted"] += 1
+            self._metrics["queued"] += 1
+            self._metrics["max_queued"] = max(self._metrics["max_queued"], self._metrics["queued"])
+
+        try:
+            return executor.submit(self._run, submitted_at, fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._metrics["queued"] -= 1
+            self._slots.release()
+            raise
+
+    def map(self, fn, items, label=None):
+        """Executa `fn(item)` para cada item em paralelo e retorna os resultados na mesma ordem.
+
+        Se alguma tarefa falhar, a exceção é propagada depois que todas terminarem.
+        """
+
+        items = list(items)
+        start_time = time.time()
+        before = self.stats()
+
+        futures = [self.submit(fn, item) for item in items]
+        for future in futures:
+            future.exception()
+
+        after = self.stats()
+        waited = after["wait_seconds_total"] - before["wait_seconds_total"]
+        print(
+            f"Consultas em paralelo {label or ''}: {len(items)} tarefas em {time.time() - start_time:.2f} segundos, "
+            f"espera média na fila {waited / len(items) if items else 0:.2f} s, "
+            f"máximo de {self.max_workers} simultâneas (fila atual {after['queued']})"
+        )
+
+        return [future.result() for future in futures]
+
+    def stats(self):
+        """Métricas acumuladas do executor: tarefas, fila atual/máxima e tempos de espera e execução"""
+
+        with self._lock:
+            metrics = dict(self._metrics)
+
+        started = metrics["started"]
+        metrics["max_workers"] = self.max_workers
+        metrics["max_queued_allowed"] = self.max_queued
+        metrics["wait_seconds_avg"] = metrics["wait_seconds_total"] / started if started else 0.0
+        metrics["run_seconds_avg"] = metrics["run_seconds_total"] / metrics["completed"] if metrics["completed"] else 0.0
+        return metrics
+
+    def _run(self, submitted_at, fn, *args, **kwargs):
+        started_at = self._clock()
+        wait = started_at - submitted_at
+        with self._lock:
+            self._metrics["queued"] -= 1
+            self._metrics["active"] += 1
+            self._metrics["started"] += 1
+            self._metrics["wait_seconds_total"] += wait
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], wait)
+
+        failed = False
+        self._local.in_worker = True
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._local.in_worker = False
+            with self._lock:
+                self._metrics["active"] -= 1
+                self._metrics["completed"] += 1
+                self._metrics["failed"] += failed
+                self._metrics["run_seconds_total"] += self._clock() - started_at
+            self._slots.release()
+
+    def _run_inline(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _get_executor(self):
+        # Threads não sobrevivem a um fork: cada processo cria o seu executor (e zera fila e métricas)
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queued)
+                    self._metrics = self._empty_metrics()
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="databricks-query")
+                    self._pid = os.getpid()
+        return self._executor
+
+    @staticmethod
+    def _empty_metrics():
+        return {
+            "submitted": 0,
+            "started": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "active": 0,
+            "queued": 0,
+            "max_queued": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+query_executor = QueryExecutor()
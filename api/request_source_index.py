@@ -0,0 +1,87 @@
+"""Descobre em qual processo (tabela de histórico) está uma solicitação de aprovação.
+
+Antes os detalhes de uma solicitação consultavam os históricos um a um (até 9
+queries) e depois o dump correspondente. Agora o processo de cada id fica em um
+índice em memória, alimentado pela lista de solicitações do usuário (que já traz
+o `source_table`). Ids fora do índice são resolvidos com uma única query
+UNION ALL sobre todos os históricos.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from api.approval_tables import APPROVAL_TABLE, identifier_column
+
+load_dotenv()
+
+REQUEST_SOURCE_INDEX_MAX_ENTRIES = int(os.getenv('REQUEST_SOURCE_INDEX_MAX_ENTRIES', '10000'))
+
+class RequestSourceIndex:
+    """Mapa id da solicitação -> processo, limitado a `max_entries` ids (LRU).
+
+    O processo de uma solicitação não muda, então as entradas não expiram.
+    """
+
+    def __init__(self, max_entries=REQUEST_SOURCE_INDEX_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._sources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, request_id):
+        with self._lock:
+            source = self._sources.get(str(request_id))
+            if source is not None:
+                self._sources.move_to_end(str(request_id))
+            return source
+
+    def remember(self, request_id, source_table):
+        if request_id is None or source_table not in APPROVAL_TABLE:
+            return
+
+        with self._lock:
+            self._sources[str(request_id)] = source_table
+            self._sources.move_to_end(str(request_id))
+            while len(self._sources) > self.max_entries:
+                self._sources.popitem(last=False)
+
+    def remember_many(self, df, id_column="uuid_alteracoes", source_column="source_table"):
+        """Guarda os pares (id, processo) de um DataFrame, como o de get_requests_for_approval_by_user"""
+        for request_id, source_table in zip(df[id_column], df[source_column]):
+            self.remember(request_id, source_table)
+
+request_source_index = RequestSourceIndex()
+
+def build_source_lookup_query(request_id):
+    """Query única que procura o id em todos os históricos, na ordem de APPROVAL_TABLE.
+
+    Returns:
+        tuple: (query, params) prontos para `cursor.execute(query, params)`.
+    """
+
+    branches = [
+        f"SELECT '{table_name}' AS source_table, {priority} AS priority "
+        f"FROM {config['historic_table']} WHERE {identifier_column(table_name)} = ?"
+        for priority, (table_name, config) in enumerate(APPROVAL_TABLE.items())
+    ]
+    query = f"SELECT source_table FROM ({' UNION ALL '.join(branches)}) ORDER BY priority LIMIT 1"
+
+    return query, [str(request_id)] * len(branches)
+
+def resolve_request_source(cursor, request_id, index=None):
+    """Retorna o processo da solicitação (ou None), consultando o banco apenas se o id não estiver no índice"""
+
+    index = index or request_source_index
+    source_table = index.get(request_id)
+    if source_table is not None:
+        return source_table
+
+    query, params = build_source_lookup_query(request_id)
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    source_table = row[0]
+    index.remember(request_id, source_table)
+    return source_table
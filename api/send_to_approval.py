@@ -1,12 +1,25 @@
-import json
 import os
-import requests
 from dotenv import load_dotenv
-from utils.serialize_to_json import serialize_to_json
+from api.approval_payload import build_approval_payload
+from api.job_runner import job_runner
+from api.query_cache import invalidate_cache
 
 load_dotenv()
 
-def send_to_approval(notebook_name, data_variables):
+def send_to_approval(notebook_name, data_variables, wait=True):
+    """Envia as alterações do processo para aprovação executando o notebook correspondente.
+
+    Args:
+        notebook_name (str): Processo (buildup, captain, catlote, ...).
+        data_variables (dict): user_token e table_data (ou uuid_alteracoes para price_simulation).
+            table_data são as linhas enviadas pela página (as páginas com marcação de alteração já filtram as alteradas).
+            Com `change_set`, table_data é só parte da tabela (ver api.approval_payload).
+        wait (bool): Se False, retorna o `JobRun` logo após a submissão, sem esperar o notebook.
+
+    Returns:
+        bool | JobRun: True se o notebook terminou com sucesso, ou o `JobRun` quando `wait` é False.
+    """
+
     print(f"send_{notebook_name}_to_approval")
 
     DB_SERVER = os.getenv('DB_SERVER')
@@ -17,12 +30,6 @@ def send_to_approval(notebook_name, data_variables):
     if not all([DB_SERVER, DB_TOKEN, DB_CLUSTER_ID]):
         raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
 
-    ENDPOINT = f'{DB_SERVER}/api/2.0/jobs/runs/submit'
-    HEADERS = {
-        'Authorization': f'Bearer {DB_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
 
     handler = {
         'buildup': {
@@ -75,62 +82,34 @@ def send_to_approval(notebook_name, data_variables):
     NOTEBOOK_PATH = f'{BASE_NOTEBOOK_PATH}/{handler[notebook_name]["notebook_path_end"]}'
     output_key = handler[notebook_name]["output_key"]
 
-    payload = {
-        "existing_cluster_id": DB_CLUSTER_ID,
-        "notebook_task": {
-            "notebook_path": NOTEBOOK_PATH,
-            "base_parameters": {
-                'user_token': data_variables['user_token'],
-                output_key: data_variables['uuid_alteracoes'] if notebook_name == "price_simulation" else serialize_to_json(data_variables['table_data']),
-            }
-        }
-    }
+    base_parameters = {'user_token': data_variables['user_token']}
 
-    response = requests.post(
-        ENDPOINT,
-        headers=HEADERS,
-        data=json.dumps(payload),
-        timeout=120,
-    )
-
-    if response.status_code == 200: 
-        run_id = response.json().get('run_id')
-        print(f"Notebook initiated successfully. Run ID: {run_id}")
-
-        # Polling the job run status
-        job_status_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get?run_id={run_id}'
-        while True:
-            job_status_response = requests.get(
-                job_status_endpoint,
-                headers=HEADERS,
-                timeout=120,
-            )
-            job_status = job_status_response.json()
-            if job_status['state']['life_cycle_state'] == 'TERMINATED':
-                if job_status['state']['result_state'] == 'SUCCESS':
-                    print("Notebook run completed successfully.")
-                    output_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get-output?run_id={run_id}'
-                    output_response = requests.get(
-                        output_endpoint,
-                        headers=HEADERS,
-                        timeout=120,
-                    )
-                    output = output_response.json()
-                    log_json = output.get('notebook_output', {}).get('result')
-                    print("Log JSON:", log_json)
-                    print(output)
-                else:
-                    print("Notebook run failed.")
-                break
-            elif job_status['state']['life_cycle_state'] == 'INTERNAL_ERROR':
-                print("Notebook run encountered an internal error.")
-                break
-            else:
-                print("Notebook run is still in progress...")
+    if notebook_name == "price_simulation":
+        base_parameters[output_key] = data_variables['uuid_alteracoes']
     else:
-        print(f"Failed to initiate notebook. Status Code: {response.status_code}")
-        print("Response:", response.text)
+        # JSON inline ou arquivo em staging, com o tamanho no log (ver api.approval_payload e api.payload_staging)
+        parameters, _metrics = build_approval_payload(
+            notebook_name, data_variables['table_data'], output_key, change_set=data_variables.get('change_set'),
+        )
+        base_parameters.update(parameters)
+
+    process_name = "price" if notebook_name == "price_simulation" else notebook_name
+
+    # Nova solicitação pendente: a fila de aprovação do processo mudou
+    def on_success():
+        invalidate_cache(f"approval_{process_name}", "approval_inbox")
+
+    try:
+        job_run = job_runner.submit_notebook(NOTEBOOK_PATH, base_parameters, on_success=[on_success])
+    except ConnectionError as e:
+        print(f"Failed to initiate notebook. {e}")
+        return False
+
+    if not wait:
+        return job_run
 
-    response.close()
+    job_run.wait()
+    if job_run.success:
+        print("Log JSON:", job_run.output())
 
-    return True if job_status['state']['life_cycle_state'] == 'TERMINATED' and job_status['state']['result_state'] == 'SUCCESS' else False
+    return job_run.success
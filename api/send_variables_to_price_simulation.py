@@ -1,90 +1,52 @@
 import os
-import json
-import requests
 from dotenv import load_dotenv
+from api.job_runner import job_runner
+from api.payload_staging import encode_parameter
 from utils.serialize_to_json import serialize_to_json
 
 load_dotenv()
 
-def send_variables_to_price_simulation(data_variables):
+def send_variables_to_price_simulation(data_variables, wait=True):
+    """Dispara o job de simulação da arquitetura de preços com as alterações das variáveis.
 
-    DB_SERVER = os.getenv('DB_SERVER')
-    JOB_ID = os.getenv('JOB_ID')
-    DB_TOKEN = os.getenv('DB_TOKEN')
-
-    HEADERS = {
-        'Authorization': f'Bearer {DB_TOKEN}',
-        'Content-Type': 'application/json',
-    }
-
-    params = {
-        "user_token": serialize_to_json(data_variables.get("user_token", "")),
-        "alteracoes_marca": serialize_to_json(data_variables.get("table_data", {}).get("marca", "")),
-        "alteracoes_elasticidade": serialize_to_json(data_variables.get("table_data", {}).get("elasticidade", "")),
-        "alteracoes_ano_frota": serialize_to_json(data_variables.get("table_data", {}).get("ano frota", "")),
-        "alteracoes_frota_disponivel": serialize_to_json(data_variables.get("table_data", {}).get("frota", "")),
-        "alteracoes_meses_em_estoque": serialize_to_json(data_variables.get("table_data", {}).get("estoque", "")),
-        # Não permitir o envio do price index, será somente visualização, embora o back-end esteja preparado para aceitar esse parâmetro
-        # "alteracoes_price_index": serialize_to_json(data_variables.get("table_data", {}).get("price index", "")),
-        "alteracoes_aplicacoes": serialize_to_json(data_variables.get("table_data", {}).get("aplicacoes", "")),
-    }
-
-    response = requests.post(
-        f"{DB_SERVER}/api/2.0/jobs/run-now",
-        headers=HEADERS,
-        json={
-            "job_id": JOB_ID,
-            "notebook_params": params
-        },
-        timeout=300,
-    )
+    Args:
+        data_variables (dict): user_token e table_data com as alterações por variável.
+        wait (bool): Se False, retorna o `JobRun` logo após o disparo, sem esperar o job.
 
-    if response.status_code == 200:
-        run_id = response.json().get('run_id')
-        print(f"Notebook initiated successfully. Run ID: {run_id}")
+    Returns:
+        bool | JobRun: True se o job terminou com sucesso, ou o `JobRun` quando `wait` é False.
+    """
 
-        job_status_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get?run_id={run_id}'
+    JOB_ID = os.getenv('JOB_ID')
 
-        while True:
-            job_status_response = requests.get(
-                job_status_endpoint,
-                headers=HEADERS,
-                timeout=120,
-            )
+    table_data = data_variables.get("table_data", {})
+
+    # Parâmetro do job -> variável da arquitetura (o price index é somente visualização,
+    # embora o back-end esteja preparado para aceitar o parâmetro "alteracoes_price_index")
+    changes = {
+        "alteracoes_marca": "marca",
+        "alteracoes_elasticidade": "elasticidade",
+        "alteracoes_ano_frota": "ano frota",
+        "alteracoes_frota_disponivel": "frota",
+        "alteracoes_meses_em_estoque": "estoque",
+        "alteracoes_aplicacoes": "aplicacoes",
+    }
 
-            job_status = job_status_response.json()
-            print("job_status", job_status)
+    params = {"user_token": serialize_to_json(data_variables.get("user_token", ""))}
+    for parameter, variable in changes.items():
+        params.update(encode_parameter(parameter, table_data.get(variable, ""), "price_simulation"))
 
-            if job_status['state']['life_cycle_state'] == 'TERMINATED':
-                if job_status['state']['result_state'] == 'SUCCESS':
-                    print("Notebook run completed successfully.")
-                    
-                    # Retrieve the list of tasks
-                    tasks = job_status.get('tasks', [])
-                    for task in tasks:
-                        task_run_id = task.get('run_id')
-                        output_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get-output?run_id={task_run_id}'
-                        output_response = requests.get(
-                            output_endpoint,
-                            headers=HEADERS,
-                            timeout=120,
-                        )
-                        output = output_response.json()
-                        log_json = output.get('notebook_output', {}).get('result')
-                        print(f"Log JSON for task {task_run_id}:", log_json)
-                        print(output)
-                else:
-                    print("Notebook run failed.")
-                break
-            elif job_status['state']['life_cycle_state'] == 'INTERNAL_ERROR':
-                print("Notebook run encountered an internal error.")
-                break
-            else:
-                print("Notebook run is still in progress...")
+    try:
+        job_run = job_runner.run_job(JOB_ID, params)
+    except ConnectionError as e:
+        print(f"Falha ao acionar o job. {e}")
+        return False
 
-    else:
-        print("Falha ao acionar o job. Código de status:", response.status_code)
+    if not wait:
+        return job_run
 
-    response.close()
+    job_run.wait()
+    if job_run.success:
+        print("Log JSON:", job_run.output())
 
-    return True if job_status['state']['life_cycle_state'] == 'TERMINATED' and job_status['state']['result_state'] == 'SUCCESS' else False
+    return job_run.success
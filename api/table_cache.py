@@ -0,0 +1,158 @@
+"""Cache por tabela com TTL próprio, verificação de versão e atualização em segundo plano.
+
+Cada tabela tem a sua entrada: (valor, versão da tabela de origem, carregado_em,
+verificado_em). Na leitura:
+
+- Tabela ainda não carregada: carrega agora (as ausentes em conjunto, via `load_many`).
+- Entrada com mais de `ttl` segundos: devolve o valor atual e recarrega em segundo plano.
+- Versão não verificada há `check_interval` segundos: consulta a versão em segundo
+  plano (por exemplo, `DESCRIBE HISTORY`) e recarrega apenas se ela mudou.
+
+Quem lê nunca espera uma atualização, e uma falha ao atualizar mantém o último
+valor válido. DataFrames pandas são entregues como cópias rasas: substituir uma
+coluna no resultado (por exemplo, com `tz_localize`) não altera o cache.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+class TableCache:
+    """Cache de tabelas com atualização individual.
+
+    Args:
+        loader (callable): `loader(tabela)` -> (valor, versão). A versão pode ser None.
+        version_loader (callable, optional): `version_loader(tabela)` -> versão atual da
+            origem. Se None, as tabelas só são recarregadas pelo TTL.
+        load_many (callable, optional): `load_many(tabelas)` -> {tabela: (valor, versão)},
+            usado para carregar várias tabelas ausentes de uma vez. Padrão: `loader` em sequência.
+        ttl (float): Idade máxima de uma entrada antes de recarregá-la, em segundos.
+        check_interval (float): Intervalo entre verificações de versão (e entre novas
+            tentativas após uma falha), em segundos.
+        executor (Executor, optional): Onde rodam as atualizações em segundo plano. Se ele
+            tiver `try_submit` (como o QueryExecutor), as atualizações são agendadas sem
+            esperar: com a fila cheia, a atualização fica para a próxima leitura.
+    """
+
+    def __init__(self, loader, version_loader=None, load_many=None, ttl=43200, check_interval=300, clock=time.time, executor=None):
+        self.loader = loader
+        self.version_loader = version_loader
+        self.load_many = load_many or (lambda tables: {table: loader(table) for table in tables})
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._clock = clock
+        self._executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="table-cache")
+
+        self._entries = {}  # tabela -> {"value", "version", "loaded_at", "checked_at"}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = set()
+
+    def get(self, table):
+        """Retorna o valor da tabela (ou None se nunca foi possível carregá-la)"""
+        return self.get_many([table]).get(table)
+
+    def get_many(self, tables):
+        """Retorna {tabela: valor}, carregando de uma vez as tabelas que ainda não estão no cache"""
+
+        if any(table not in self._entries for table in tables):
+            with self._load_lock:
+                missing = [table for table in tables if table not in self._entries]
+                if missing:
+                    self._store_loaded(self.load_many(missing))
+
+        result = {}
+        for table in tables:
+            entry = self._entries.get(table)
+            if entry is None:
+                result[table] = None
+                continue
+            self._revalidate(table, entry)
+            result[table] = self._snapshot(entry["value"])
+        return result
+
+    def invalidate(self, *tables):
+        """Descarta as entradas informadas (ou todas); a próxima leitura carrega de novo"""
+
+        with self._lock:
+            for table in tables or list(self._entries):
+                self._entries.pop(table, None)
+
+    def _store_loaded(self, loaded):
+        now = self._clock()
+        with self._lock:
+            for table, (value, version) in loaded.items():
+                if value is not None:
+                    self._entries[table] = {"value": value, "version": version, "loaded_at": now, "checked_at": now}
+
+    def _revalidate(self, table, entry):
+        now = self._clock()
+        if now - entry["loaded_at"] >= self.ttl:
+            self._schedule(table, self._refresh)
+        elif self.version_loader is not None and now - entry["checked_at"] >= self.check_interval:
+            self._schedule(table, self._check_version)
+
+    def _schedule(self, table, task):
+        with self._lock:
+            if table in self._refreshing:
+                return
+            self._refreshing.add(table)
+
+        def run():
+            try:
+                task(table)
+            except Exception as e:
+                # Mantém o último valor válido e tenta de novo após check_interval
+                print(f"Erro ao atualizar a tabela '{table}' em cache: {e}")
+                self._postpone(table)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(table)
+
+        # Quem lê não pode esperar por uma vaga na fila nem rodar a atualização na sua thread
+        submit = getattr(self._executor, "try_submit", self._executor.submit)
+        if submit(run) is None:
+            with self._lock:
+                self._refreshing.discard(table)
+
+    def _check_version(self, table):
+        version = self.version_loader(table)
+        entry = self._entries.get(table)
+        if entry is None:
+            return
+
+        if version is None or version == entry["version"]:
+            with self._lock:
+                entry["checked_at"] = self._clock()
+            return
+
+        print(f"Tabela '{table}' alterada (versão {entry['version']} -> {version}): recarregando")
+        self._refresh(table)
+
+    def _refresh(self, table):
+        start_time = time.time()
+        value, version = self.loader(table)
+        if value is None:
+            raise ValueError("nenhum dado retornado")
+
+        self._store_loaded({table: (value, version)})
+        print(f"Tabela '{table}' atualizada em segundo plano em {time.time() - start_time:.2f} segundos")
+
+    def _postpone(self, table):
+        entry = self._entries.get(table)
+        if entry is None:
+            return
+
+        now = self._clock()
+        with self._lock:
+            entry["checked_at"] = now
+            if now - entry["loaded_at"] >= self.ttl:
+                # Uma entrada vencida volta a ser tentada só depois de check_interval
+                entry["loaded_at"] = now - self.ttl + min(self.check_interval, self.ttl)
+
+    @staticmethod
+    def _snapshot(value):
+        if isinstance(value, pd.DataFrame):
+            return value.copy(deep=False)
+        return value
@@ -1,11 +1,18 @@
-import json
 import os
-import requests
+import time
+from collections import deque
 from dotenv import load_dotenv
+from api.approval_tables import APPROVAL_TABLE
+from api.job_runner import JobRun, job_runner
+from api.query_cache import invalidate_cache
 
 load_dotenv()
 
-def update_approval_status(data_variables):
+# Execuções do notebook de aprovação ao mesmo tempo na aprovação em lote
+APPROVAL_BULK_MAX_PARALLEL = int(os.getenv('APPROVAL_BULK_MAX_PARALLEL', '4'))
+
+def approval_submission(target_table, uuid_alteracoes, status, user_token):
+    """Argumentos de `job_runner.submit_notebook` para aprovar ou reprovar uma solicitação"""
 
     DB_SERVER = os.getenv('DB_SERVER')
     DB_TOKEN = os.getenv('DB_TOKEN')
@@ -15,90 +22,147 @@ def update_approval_status(data_variables):
     if not all([DB_SERVER, DB_TOKEN, DB_CLUSTER_ID]):
         raise ValueError("Uma ou mais variáveis de ambiente estão ausentes. Verifique seu arquivo .env.")
 
-    ENDPOINT = f'{DB_SERVER}/api/2.0/jobs/runs/submit'
-
-    HEADERS = {
-        'Authorization': f'Bearer {DB_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
-    BASE_NAME_DB = 'maxis_sandbox.pricing_db.'
     NOTEBOOK_PRICE_PATH = f'{BASE_NOTEBOOK_PATH}/proc_aprovar_arquitetura'
     NOTEBOOK_OTHERS_PATH = f'{BASE_NOTEBOOK_PATH}/proc_aprovar_configuracoes'
 
-    NOTEBOOK_PATH = NOTEBOOK_PRICE_PATH if data_variables['target_table'] == "price" else NOTEBOOK_OTHERS_PATH
-
-    TABLES = {
-        "buildup": f"{BASE_NAME_DB}historico_buildup",
-        "catlote": f"{BASE_NAME_DB}historico_catlote",
-        "captain": f"{BASE_NAME_DB}historico_capitao",
-        "captain_margin": f"{BASE_NAME_DB}historico_margem_do_capitao",
-        "delta": f"{BASE_NAME_DB}historico_delta_preco",
-        "marketing": f"{BASE_NAME_DB}historico_posicionamento_de_mercado",
-        "price": f"{BASE_NAME_DB}historico_simulacoes",
-        "optimization": f"{BASE_NAME_DB}historico_otimizacao",
-        "strategy": f"{BASE_NAME_DB}historico_estrategia_comercial",
+    return {
+        "notebook_path": NOTEBOOK_PRICE_PATH if target_table == "price" else NOTEBOOK_OTHERS_PATH,
+        "base_parameters": {
+            'uuidAlteracoes': uuid_alteracoes,
+            'statusAlteracoesId': status,
+            'user_token': user_token,
+            'targetTable': APPROVAL_TABLE[target_table]['historic_table'],
+        },
     }
 
-    payload = {
-        "existing_cluster_id": DB_CLUSTER_ID,
-        "notebook_task": {
-            "notebook_path": NOTEBOOK_PATH,
-            "base_parameters": {
-                'uuidAlteracoes': data_variables['uuid_alteracoes'],
-                'statusAlteracoesId': data_variables['status'],
-                'user_token': data_variables['user_token'],
-                'targetTable': TABLES[data_variables['target_table']],
-            }
-        }
-    }
+def update_approval_status(data_variables, wait=True):
+    """Aprova ou reprova uma solicitação executando o notebook de aprovação.
+
+    Args:
+        data_variables (dict): uuid_alteracoes, status, user_token e target_table.
+        wait (bool): Se False, retorna o `JobRun` logo após a submissão, sem esperar o notebook.
 
-    response = requests.post(
-        ENDPOINT,
-        headers=HEADERS,
-        data=json.dumps(payload),
-        timeout=120,
+    Returns:
+        bool | JobRun: True se o notebook terminou com sucesso, ou o `JobRun` quando `wait` é False.
+    """
+
+    target_table = data_variables['target_table']
+    submission = approval_submission(
+        target_table,
+        data_variables['uuid_alteracoes'],
+        data_variables['status'],
+        data_variables['user_token'],
     )
 
-    if response.status_code == 200: ### a API retorna 200 ou 401/403 no momento exato da requisicao, e nao para determinar sucesso na execucao ou nao
-        run_id = response.json().get('run_id')
-        print(f"Notebook initiated successfully. Run ID: {run_id}")
-
-        # Polling the job run status
-        job_status_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get?run_id={run_id}'
-        while True:
-            job_status_response = requests.get(
-                job_status_endpoint,
-                headers=HEADERS,
-                timeout=120,
-            )
-            job_status = job_status_response.json()
-            if job_status['state']['life_cycle_state'] == 'TERMINATED':
-                if job_status['state']['result_state'] == 'SUCCESS':
-                    print("Notebook run completed successfully.")
-                    output_endpoint = f'{DB_SERVER}/api/2.0/jobs/runs/get-output?run_id={run_id}'
-                    output_response = requests.get(
-                        output_endpoint,
-                        headers=HEADERS,
-                        timeout=120,
-                    )
-                    output = output_response.json()
-                    log_json = output.get('notebook_output', {}).get('result')
-                    print("Log JSON:", log_json)
-                    print(output)
-                else:
-                    print("Notebook run failed.")
-                break
-            elif job_status['state']['life_cycle_state'] == 'INTERNAL_ERROR':
-                print("Notebook run encountered an internal error.")
-                break
-            else:
-                print("Notebook run is still in progress...")
-    else:
-        print(f"Failed to initiate notebook. Status Code: {response.status_code}")
-        print("Response:", response.text)
-
-    response.close()
-
-    return True if job_status['state']['life_cycle_state'] == 'TERMINATED' and job_status['state']['result_state'] == 'SUCCESS' else False
+    # A aprovação altera os dados do processo e remove a solicitação da fila
+    def on_success():
+        invalidate_cache(target_table, f"approval_{target_table}", "approval_inbox")
+
+    try:
+        job_run = job_runner.submit_notebook(**submission, on_success=[on_success])
+    except ConnectionError as e:
+        print(f"Failed to initiate notebook. {e}")
+        return False
+
+    if not wait:
+        return job_run
+
+    job_run.wait()
+    if job_run.success:
+        print("Log JSON:", job_run.output())
+
+    return job_run.success
+
+def update_approval_statuses(items, user_token, max_parallel=APPROVAL_BULK_MAX_PARALLEL, timeout=None, on_submit=None, on_poll=None):
+    """Aprova ou reprova várias solicitações, com no máximo `max_parallel` notebooks executando ao mesmo tempo.
+
+    O notebook de aprovação recebe uma solicitação por execução. As solicitações
+    são mantidas em uma janela deslizante: assim que uma execução termina, a
+    próxima solicitação da fila é submetida. Os caches dos processos com alguma
+    solicitação concluída são invalidados uma única vez, ao final, mesmo se a
+    espera for interrompida (por exemplo, pelo cancelamento do usuário).
+
+    Args:
+        items (list): Tuplas (target_table, uuid_alteracoes, status).
+        user_token (str): Token do usuário que aprova.
+        max_parallel (int): Execuções simultâneas no Databricks.
+        timeout (float, optional): Prazo máximo de espera de cada execução, em segundos,
+            contado da submissão. Se None, usa o do runner.
+        on_submit (callable, optional): Chamada com a lista de `JobRun` a cada submissão
+            (por exemplo, para permitir o cancelamento pelo usuário).
+        on_poll (callable, optional): Chamada com o handle após cada consulta (progresso).
+
+    Returns:
+        dict: Para cada uuid_alteracoes, target_table, status, run_id, life_cycle_state,
+        result_state, success, timed_out e error.
+    """
+
+    items = [tuple(item) for item in items]
+    timeout = job_runner.timeout if timeout is None else timeout
+    queue = deque(items)
+    results = {}
+    running = {}  # uuid_alteracoes -> (JobRun, prazo)
+
+    try:
+        while queue or running:
+            submissions = {}
+            while queue and len(running) + len(submissions) < max(1, max_parallel):
+                target_table, uuid_alteracoes, status = queue.popleft()
+                try:
+                    submissions[uuid_alteracoes] = {
+                        **approval_submission(target_table, uuid_alteracoes, status, user_token),
+                        "run_name": f"Aprovação {target_table} {uuid_alteracoes}",
+                    }
+                except (KeyError, ValueError) as e:
+                    results[uuid_alteracoes] = e
+
+            job_runs = job_runner.submit_notebooks(submissions) if submissions else {}
+            results.update(job_runs)
+
+            submitted = [job_run for job_run in job_runs.values() if isinstance(job_run, JobRun)]
+            if submitted and on_submit is not None:
+                on_submit(submitted)
+            deadline = time.monotonic() + timeout
+            running.update({key: (job_run, deadline) for key, job_run in job_runs.items() if isinstance(job_run, JobRun)})
+
+            if not running:
+                continue
+
+            # Espera a primeira execução terminar (ou o prazo da mais antiga) para liberar a vaga
+            remaining = min(deadline for _, deadline in running.values()) - time.monotonic()
+            job_runner.wait_any([job_run for job_run, _ in running.values()], timeout=max(remaining, 0), on_poll=on_poll)
+
+            now = time.monotonic()
+            for key, (job_run, deadline) in list(running.items()):
+                if not job_run.done and now >= deadline:
+                    job_run.timed_out = True
+                if job_run.done or job_run.timed_out:
+                    del running[key]
+    finally:
+        # Uma única invalidação para todos os processos com alguma solicitação concluída
+        affected = sorted({
+            target_table for target_table, uuid_alteracoes, _ in items
+            if isinstance(results.get(uuid_alteracoes), JobRun) and results[uuid_alteracoes].success
+        })
+        if affected:
+            invalidate_cache(*affected, *(f"approval_{table}" for table in affected), "approval_inbox")
+
+    status = {}
+    for target_table, uuid_alteracoes, item_status in items:
+        job_run = results[uuid_alteracoes]
+        if isinstance(job_run, JobRun):
+            status[uuid_alteracoes] = {**job_run.to_dict(), 'error': None}
+        else:
+            status[uuid_alteracoes] = {
+                'run_id': None,
+                'life_cycle_state': 'SUBMIT_FAILED',
+                'result_state': None,
+                'state_message': None,
+                'success': False,
+                'timed_out': False,
+                'error': str(job_run),
+            }
+        status[uuid_alteracoes].update({'target_table': target_table, 'status': item_status})
+        print(f"Aprovação em lote {target_table} {uuid_alteracoes}: {status[uuid_alteracoes]['life_cycle_state']} (Run ID: {status[uuid_alteracoes]['run_id']})")
 
+    return status
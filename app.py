@@ -24,7 +24,8 @@ from pages.strategy.strategy_page import strategy_page
 from pages.marketing.marketing_page import marketing_page
 from pages.delta.delta_page import delta_page
 from pages.buildup.buildup_page import buildup_page
-from styles import MAIN_CONTENT_STYLE, MAIN_CONTAINER_STYLE, MAIN_TITLE_STYLE
+from background_jobs import background_callback_manager
+from styles import MAIN_CONTENT_STYLE, MAIN_CONTAINER_STYLE, MAIN_TITLE_STYLE, BACKGROUND_JOB_CANCEL_HIDDEN_STYLE
 from static_data.constants import LIST_OF_ALLOWERD_ROLES_TO_ACCESS_APPROVAL
 from translations import setup_translations, _, update_language
 
@@ -37,6 +38,7 @@ app = dash.Dash(
     external_stylesheets=[dbc.themes.BOOTSTRAP],
     suppress_callback_exceptions=True,
     title="GM Pricing Software",
+    background_callback_manager=background_callback_manager,
 )
 
 server = app.server
@@ -99,7 +101,15 @@ app.layout = html.Div([
     dcc.Store(id='captain-variables-store', storage_type='session'),
     dcc.Store(id='store-language', storage_type='local'),
     dcc.Store(id='catlote-variables-store', storage_type='session'),
-    html.Div(id='page-content')
+    # Aba da /approval a ser construída (ver pages/approvals/approval_page.py)
+    dcc.Store(id='approval-tab-store'),
+    html.Div(id='page-content'),
+    # Visível apenas enquanto um callback em segundo plano está executando
+    html.Div(
+        dbc.Button(_("Cancelar"), id="background-job-cancel", color="danger", size="sm"),
+        id="background-job-cancel-container",
+        style=BACKGROUND_JOB_CANCEL_HIDDEN_STYLE,
+    ),
 ])
 
 # Callback to update translations when language changes
@@ -0,0 +1,173 @@
+"""Execução dos callbacks longos (notebooks do Databricks) em processos de fundo.
+
+Os callbacks declarados com `background_job_options(...)` rodam em um processo
+separado gerenciado pelo `DiskcacheManager` do Dash (sem Redis), então o worker
+do servidor fica livre enquanto o notebook executa. O progresso é exibido no
+Toast da página e o botão global "Cancelar" interrompe tanto o callback quanto
+a execução no Databricks.
+"""
+
+import hashlib
+import os
+import pathlib
+import time
+from contextlib import contextmanager
+import diskcache
+from dash import DiskcacheManager, Input, Output, State, callback
+from dotenv import load_dotenv
+from api.job_runner import job_runner
+from components.Toast import TOAST_DURATION
+from styles import BACKGROUND_JOB_CANCEL_STYLE, BACKGROUND_JOB_CANCEL_HIDDEN_STYLE
+
+load_dotenv()
+
+BACKGROUND_CACHE_DIR = os.getenv('BACKGROUND_CACHE_DIR') or str(pathlib.Path(__file__).parent / "cache" / "background")
+BACKGROUND_RESULT_EXPIRE = int(os.getenv('BACKGROUND_RESULT_EXPIRE', '3600'))
+
+background_cache = diskcache.Cache(BACKGROUND_CACHE_DIR)
+background_callback_manager = DiskcacheManager(background_cache, expire=BACKGROUND_RESULT_EXPIRE)
+
+def background_job_options(toast_id, running=None):
+    """Argumentos do `@callback` para rodar em segundo plano com progresso no Toast `toast_id`.
+
+    Args:
+        toast_id (str): Id do Toast da página que recebe o progresso.
+        running (list, optional): Tuplas (Output, valor durante, valor depois) adicionais.
+
+    Example:
+        >>> @callback(Output(...), Input(...), **background_job_options("toast-approval-delta"))
+        ... def handle_send_approval(set_progress, n_clicks):
+        ...     ...
+    """
+
+    return {
+        "background": True,
+        "progress": [
+            Output(toast_id, "is_open"),
+            Output(toast_id, "header"),
+            Output(toast_id, "children"),
+            Output(toast_id, "duration"),
+        ],
+        # Ao terminar (ou cancelar), o Toast volta a fechar sozinho
+        "progress_default": [False, None, None, TOAST_DURATION],
+        "running": [
+            (Output("background-job-cancel-container", "style"), BACKGROUND_JOB_CANCEL_STYLE, BACKGROUND_JOB_CANCEL_HIDDEN_STYLE),
+            *(running or []),
+        ],
+        "cancel": [Input("background-job-cancel", "n_clicks")],
+    }
+
+def wait_with_progress(job_run, set_progress, header, message, user_data=None):
+    """Espera a execução do Databricks informando o tempo decorrido no Toast.
+
+    Enquanto a execução está em andamento, o `run_id` fica registrado para o
+    usuário, permitindo cancelá-la pelo botão "Cancelar".
+
+    Args:
+        job_run (JobRun | bool): Handle retornado pelas funções da api com `wait=False`
+            (False se a submissão falhou).
+        set_progress (callable): Função de progresso recebida pelo callback.
+        header (str): Cabeçalho do Toast.
+        message (str): Mensagem exibida durante a execução.
+        user_data (dict, optional): Dados do usuário logado (store-token).
+
+    Returns:
+        bool: True se a execução terminou com sucesso.
+    """
+
+    if not job_run:
+        return False
+
+    started_at = time.monotonic()
+
+    def on_poll(_job_run):
+        set_progress((True, header, f"{message} ({time.monotonic() - started_at:.0f} s)", None))
+
+    set_progress((True, header, message, None))
+    _register_run(user_data, job_run.run_id)
+    try:
+        job_run.wait(on_poll=on_poll)
+    finally:
+        _unregister_run(user_data, job_run.run_id)
+
+    return job_run.success
+
+@contextmanager
+def tracking_runs(user_data):
+    """Registra para o botão "Cancelar" as execuções submetidas dentro do bloco.
+
+    Para quem acompanha várias execuções (por exemplo, a aprovação em lote): o
+    bloco recebe uma função que registra uma lista de `JobRun`; ao sair, todas
+    são removidas do registro do usuário.
+
+    Example:
+        >>> with tracking_runs(user_data) as register:
+        ...     update_approval_statuses(items, token, on_submit=register)
+    """
+
+    run_ids = []
+
+    def register(job_runs):
+        for job_run in job_runs:
+            _register_run(user_data, job_run.run_id)
+            run_ids.append(job_run.run_id)
+
+    try:
+        yield register
+    finally:
+        for run_id in run_ids:
+            _unregister_run(user_data, run_id)
+
+def cancel_user_runs(user_data):
+    """Cancela no Databricks as execuções em andamento do usuário"""
+
+    key = _runs_key(user_data)
+    if key is None:
+        return []
+
+    with background_cache.transact():
+        run_ids = background_cache.pop(key, default=[])
+
+    for run_id in run_ids:
+        try:
+            job_runner.cancel_run(run_id)
+        except Exception as e:
+            print(f"Erro ao cancelar execução {run_id}: {e}")
+
+    return run_ids
+
+def _runs_key(user_data):
+    token = (user_data or {}).get("access_token")
+    if not token:
+        return None
+    return "runs-" + hashlib.sha1(str(token).encode("utf-8")).hexdigest()
+
+def _register_run(user_data, run_id):
+    key = _runs_key(user_data)
+    if key is None:
+        return
+    with background_cache.transact():
+        background_cache.set(key, background_cache.get(key, default=[]) + [run_id], expire=BACKGROUND_RESULT_EXPIRE)
+
+def _unregister_run(user_data, run_id):
+    key = _runs_key(user_data)
+    if key is None:
+        return
+    with background_cache.transact():
+        run_ids = [item for item in background_cache.get(key, default=[]) if item != run_id]
+        if run_ids:
+            background_cache.set(key, run_ids, expire=BACKGROUND_RESULT_EXPIRE)
+        else:
+            background_cache.delete(key)
+
+# O cancelamento do callback em si é feito pelo Dash (`cancel`); aqui cancelamos o notebook
+@callback(
+    Output("background-job-cancel-container", "style"),
+    Input("background-job-cancel", "n_clicks"),
+    State("store-token", "data"),
+    prevent_initial_call=True,
+)
+def cancel_background_job(n_clicks, user_data):
+    if n_clicks:
+        cancel_user_runs(user_data)
+    return BACKGROUND_JOB_CANCEL_HIDDEN_STYLE
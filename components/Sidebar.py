@@ -1,5 +1,4 @@
 import os
-import shutil
 import dash_bootstrap_components as dbc
 from dash import Dash, dcc, html, callback, State, dash_table, Input, Output, no_update
 from static_data.constants import LIST_OF_ALLOWERD_ROLES_TO_ACCESS_APPROVAL
@@ -137,22 +136,6 @@ def update_avatar(user_data):
 def handle_logout(n_clicks):
     if n_clicks and n_clicks > 0:
 
-        # Limpa o cache
-        cache_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "api", "cache")
-        if os.path.exists(cache_dir):
-            try:
-                # Verifica e remove o arquivo optimization_cache.parquet primeiro
-                optimization_cache = os.path.join(cache_dir, "optimization_cache.parquet")
-                if os.path.exists(optimization_cache):
-                    os.remove(optimization_cache)
-                    print(f"Optimization cache file removed: {optimization_cache}")
-                
-                # Remove o diretório cache
-                shutil.rmtree(cache_dir)
-                print(f"Cache directory removed: {cache_dir}")
-            except Exception as e:
-                print(f"Error removing cache directory or optimization file: {str(e)}")
-
         # Limpa a session
         session_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), "api", "session")
         if os.path.exists(session_file):
@@ -2,6 +2,8 @@ from dash import html
 import dash_bootstrap_components as dbc
 from styles import TOAST_STYLE
 
+TOAST_DURATION = 4000
+
 def Toast(
         id=None,
         toast_message=None,
@@ -40,7 +42,7 @@ def Toast(
             icon=icon,
             is_open=False,
             dismissable=True,
-            duration=4000,
+            duration=TOAST_DURATION,
             style=TOAST_STYLE,
         ),
     )
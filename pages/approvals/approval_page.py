@@ -1,19 +1,37 @@
 import dash_bootstrap_components as dbc
-from dash import html
+from dash import html, dcc, callback, ctx, no_update, Input, Output, State
+from api.approval_inbox import APPROVAL_INBOX_PAGE_SIZE, get_pending_counts, get_pending_requests
+from api.update_approval_status import update_approval_statuses
+from background_jobs import background_job_options, tracking_runs
+from pages.approvals.approval_utils import prefetch_approval_data, selected_request
 from pages.catlote.catlote_simulation_page import catlote_simulation_page
-from pages.optimization.optimization_page import optimization_page
+from pages.optimization.optimization_page import optimization_page, approval_fields
 from pages.price_architecture.price_sim_architecture_page import price_sim_architecture_page
 from pages.captain.captain_simulation_page import captain_simulation_page
 from pages.strategy.strategy_page import strategy_page
 from pages.marketing.marketing_page import marketing_page
-from pages.captain_margin.captain_margin_page import captain_margin_page
+from pages.captain_margin.captain_margin_page import captain_margin_page, APPROVAL_FIELDS as CAPTAIN_MARGIN_APPROVAL_FIELDS
 from pages.delta.delta_page import delta_page
 from pages.buildup.buildup_page import buildup_page
 from components.Helper_button_with_modal import create_help_button_with_modal
+from components.Toast import Toast
 from static_data.helper_text import helper_text
-from styles import MAIN_TITLE_STYLE, CONTAINER_HELPER_BUTTON_STYLE
+from styles import MAIN_TITLE_STYLE, CONTAINER_BUTTONS_STYLE, CONTAINER_HELPER_BUTTON_STYLE, DROPDOWN_CONTAINER_STYLE
 from translations import _
 
+# Abas na ordem de exibição: o id é o processo usado em get_requests_for_approval
+APPROVAL_TABS = [
+    {"tab_id": "catlote", "label": _("CatLote"), "page": catlote_simulation_page},
+    {"tab_id": "optimization", "label": _("Otimização de Preços"), "page": optimization_page, "columns": approval_fields},
+    {"tab_id": "price", "label": _("Arquitetura de Preço"), "page": price_sim_architecture_page},
+    {"tab_id": "captain", "label": _("Capitão"), "page": captain_simulation_page},
+    {"tab_id": "strategy", "label": _("Estratégia"), "page": strategy_page},
+    {"tab_id": "marketing", "label": _("Mercado"), "page": marketing_page},
+    {"tab_id": "captain_margin", "label": _("Margem do Capitão"), "page": captain_margin_page, "columns": lambda: CAPTAIN_MARGIN_APPROVAL_FIELDS},
+    {"tab_id": "delta", "label": _("Delta Preço"), "page": delta_page},
+    {"tab_id": "buildup", "label": _("Build Up"), "page": buildup_page},
+]
+
 helper_button = html.Div(
     create_help_button_with_modal(
         modal_title=helper_text["approval"]["title"],
@@ -27,17 +45,223 @@ container_title = html.Div([
     helper_button
 ], className="container-title")
 
+# Caixa de entrada da aba selecionada: solicitações pendentes, das mais recentes para as mais antigas
+approval_inbox = html.Div([
+    dcc.Dropdown(
+        id="approval-inbox-requests",
+        clearable=False,
+        placeholder=_("Nenhuma solicitação pendente"),
+        style={"width": "600px"},
+    ),
+    html.Div([
+        dbc.Button("<", id="approval-inbox-previous", color="secondary", n_clicks=0),
+        html.Span(id="approval-inbox-page-label", style={"padding": "0px 10px"}),
+        dbc.Button(">", id="approval-inbox-next", color="secondary", n_clicks=0),
+    ], style={"display": "flex", "alignItems": "center"}),
+    dcc.Store(id="approval-inbox-page", data=0),
+], style=DROPDOWN_CONTAINER_STYLE)
+
+# Aprovação em lote das solicitações selecionadas da página atual da caixa de entrada
+approval_bulk = html.Div([
+    dcc.Dropdown(
+        id="approval-bulk-requests",
+        multi=True,
+        placeholder=_("Selecione solicitações para aprovar/recusar em lote"),
+        style={"width": "600px"},
+    ),
+    html.Div([
+        dbc.Button(_("Recusar selecionadas"), id="approval-bulk-reject", color="danger", n_clicks=0),
+        dbc.Button(_("Aprovar selecionadas"), id="approval-bulk-accept", color="success", n_clicks=0),
+    ], style=CONTAINER_BUTTONS_STYLE),
+    Toast(id="toast-approval-bulk"),
+], style=DROPDOWN_CONTAINER_STYLE)
+
 approval_page = html.Div([
     container_title,
-    dbc.Tabs([
-        dbc.Tab(catlote_simulation_page, label=_("CatLote")),
-        dbc.Tab(optimization_page, label=_("Otimização de Preços")),
-        dbc.Tab(price_sim_architecture_page, label=_("Arquitetura de Preço")),
-        dbc.Tab(captain_simulation_page, label=_("Capitão")),
-        dbc.Tab(strategy_page, label=_("Estratégia")),
-        dbc.Tab(marketing_page, label=_("Mercado")),
-        dbc.Tab(captain_margin_page, label=_("Margem do Capitão")),
-        dbc.Tab(delta_page, label=_("Delta Preço")),
-        dbc.Tab(buildup_page, label=_("Build Up")),
-    ])
+    approval_inbox,
+    approval_bulk,
+    # Abas já construídas nesta visita à página
+    dcc.Store(id="approval-loaded-tabs", data=[]),
+    dbc.Tabs(
+        [dbc.Tab(tab["page"], label=tab["label"], tab_id=tab["tab_id"], id=f"approval-tab-{tab['tab_id']}") for tab in APPROVAL_TABS],
+        id="approval-tabs",
+        active_tab=APPROVAL_TABS[0]["tab_id"],
+    ),
 ])
+
+def next_tab_to_prefetch(active_tab, loaded_tabs):
+    """Próxima aba (na ordem de exibição) ainda não aberta, a mais provável de ser selecionada em seguida"""
+
+    tab_ids = [tab["tab_id"] for tab in APPROVAL_TABS]
+    start = tab_ids.index(active_tab) + 1 if active_tab in tab_ids else 0
+
+    for tab in APPROVAL_TABS[start:] + APPROVAL_TABS[:start]:
+        if tab["tab_id"] != active_tab and tab["tab_id"] not in loaded_tabs:
+            return tab
+    return None
+
+# Callback que constrói apenas a aba selecionada (cada página lê approval-tab-store)
+@callback(
+    Output("approval-tab-store", "data"),
+    Output("approval-loaded-tabs", "data"),
+    Input("approval-tabs", "active_tab"),
+    State("approval-loaded-tabs", "data"),
+    State("approval-tab-store", "data"),
+)
+def select_approval_tab(active_tab, loaded_tabs, approval_tab):
+
+    loaded_tabs = loaded_tabs or []
+    load = None if active_tab in loaded_tabs else active_tab
+    loaded_tabs = loaded_tabs + ([active_tab] if load else [])
+
+    next_tab = next_tab_to_prefetch(active_tab, loaded_tabs)
+    if next_tab:
+        columns = next_tab.get("columns")
+        prefetch_approval_data(next_tab["tab_id"], columns() if columns else None)
+
+    # Mantém a solicitação escolhida em cada aba
+    requests = (approval_tab or {}).get("requests", {})
+    return {"load": load, "loaded": loaded_tabs, "requests": requests}, loaded_tabs
+
+def request_option(row):
+    """Opção da caixa de entrada: data e usuário da solicitação"""
+    return {"label": f"{row['data_alteracoes']} - {row['usuario_id']}", "value": row["uuid_alteracoes"]}
+
+# Callback que mostra nos títulos das abas a quantidade de solicitações pendentes (uma única query para todas),
+# atualizada a cada troca de aba e após a aprovação em lote
+@callback(
+    [Output(f"approval-tab-{tab['tab_id']}", "label") for tab in APPROVAL_TABS],
+    Input("approval-tab-store", "data"),
+)
+def update_approval_tab_labels(approval_tab):
+
+    counts = get_pending_counts()
+    if not counts:
+        return [no_update] * len(APPROVAL_TABS)
+
+    return [f"{tab['label']} ({counts[tab['tab_id']]['pending']})" for tab in APPROVAL_TABS]
+
+# Callback que lista uma página das solicitações pendentes da aba selecionada
+@callback(
+    Output("approval-inbox-requests", "options"),
+    Output("approval-inbox-requests", "value"),
+    Output("approval-inbox-page", "data"),
+    Output("approval-inbox-page-label", "children"),
+    Output("approval-inbox-previous", "disabled"),
+    Output("approval-inbox-next", "disabled"),
+    Output("approval-bulk-requests", "options"),
+    Output("approval-bulk-requests", "value"),
+    Input("approval-tabs", "active_tab"),
+    Input("approval-inbox-previous", "n_clicks"),
+    Input("approval-inbox-next", "n_clicks"),
+    Input("approval-tab-store", "data"),
+    State("approval-inbox-page", "data"),
+)
+def update_approval_inbox(active_tab, previous_clicks, next_clicks, approval_tab, page):
+
+    page = page or 0
+    if ctx.triggered_id == "approval-inbox-previous":
+        page = max(page - 1, 0)
+    elif ctx.triggered_id == "approval-inbox-next":
+        page += 1
+    elif ctx.triggered_id != "approval-tab-store":
+        # Nova aba: volta para a primeira página (ao reconstruir a aba, como após a aprovação em lote, mantém a página)
+        page = 0
+
+    pending = get_pending_counts().get(active_tab, {}).get("pending", 0)
+    last_page = max((pending - 1) // APPROVAL_INBOX_PAGE_SIZE, 0)
+    page = min(page, last_page)
+
+    requests = get_pending_requests(active_tab, page=page)
+    options = [] if requests is None else [request_option(row) for row in requests.to_dict("records")]
+
+    # Mantém a solicitação aberta se estiver nesta página; ao trocar de página, abre a primeira
+    selected = (approval_tab or {}).get("requests", {}).get(active_tab)
+    values = [option["value"] for option in options]
+    if ctx.triggered_id in ("approval-inbox-previous", "approval-inbox-next") or selected not in values:
+        selected = values[0] if values else None
+
+    page_label = _("Página {} de {} ({} pendentes)").format(page + 1, last_page + 1, pending)
+    return options, selected, page, page_label, page == 0, page >= last_page, options, []
+
+# Callback que reconstrói a aba com a solicitação escolhida na caixa de entrada
+@callback(
+    Output("approval-tab-store", "data", allow_duplicate=True),
+    Input("approval-inbox-requests", "value"),
+    State("approval-tabs", "active_tab"),
+    State("approval-tab-store", "data"),
+    prevent_initial_call=True,
+)
+def open_approval_request(request_id, active_tab, approval_tab):
+
+    approval_tab = approval_tab or {}
+    if not request_id or request_id == selected_request(approval_tab, active_tab):
+        return no_update
+
+    requests = {**approval_tab.get("requests", {}), active_tab: request_id}
+    return {"load": active_tab, "loaded": approval_tab.get("loaded", []), "requests": requests}
+
+def bulk_approval_summary(results):
+    """Mensagem do Toast com o total de solicitações concluídas e o erro de cada uma que falhou"""
+
+    failed = {request_id: item for request_id, item in results.items() if not item["success"]}
+    summary = _("{} de {} solicitações atualizadas").format(len(results) - len(failed), len(results))
+    if not failed:
+        return summary
+
+    return html.Div([
+        html.P(summary),
+        html.Ul([
+            html.Li(f"{request_id}: {item['error'] or item['state_message'] or item['life_cycle_state']}")
+            for request_id, item in failed.items()
+        ]),
+    ])
+
+# Callback que aprova/recusa em lote as solicitações selecionadas da aba atual
+@callback(
+    Output("toast-approval-bulk", "is_open"),
+    Output("toast-approval-bulk", "header"),
+    Output("toast-approval-bulk", "children"),
+    Output("approval-tab-store", "data", allow_duplicate=True),
+    Input("approval-bulk-accept", "n_clicks"),
+    Input("approval-bulk-reject", "n_clicks"),
+    State("approval-bulk-requests", "value"),
+    State("approval-tabs", "active_tab"),
+    State("approval-tab-store", "data"),
+    State("store-token", "data"),
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-bulk"),
+)
+def handle_bulk_approval(set_progress, accept_clicks, reject_clicks, request_ids, active_tab, approval_tab, user_data):
+
+    if not request_ids:
+        return True, _("Erro"), _("Selecione ao menos uma solicitação"), no_update
+
+    status = "1" if ctx.triggered_id == "approval-bulk-accept" else "2"
+    status_text = _("aprovado") if status == "1" else _("recusado")
+    items = [(active_tab, request_id, status) for request_id in request_ids]
+
+    finished = set()
+
+    def on_poll(job_run):
+        if job_run.done:
+            finished.add(job_run.run_id)
+        set_progress((True, status_text, _("Atualizando status... {} de {}").format(len(finished), len(items)), None))
+
+    set_progress((True, status_text, _("Atualizando status..."), None))
+    try:
+        with tracking_runs(user_data) as register:
+            results = update_approval_statuses(items, user_data["access_token"], on_submit=register, on_poll=on_poll)
+    except Exception as e:
+        print(f"Erro ao processar aprovação em lote: {str(e)}")
+        return True, _("Erro"), _("Erro ao processar aprovação: {}").format(str(e)), no_update
+
+    # Reconstrói a aba com a solicitação pendente mais recente que restou
+    approval_tab = approval_tab or {}
+    requests = {key: value for key, value in approval_tab.get("requests", {}).items() if key != active_tab}
+    return (
+        True,
+        status_text,
+        bulk_approval_summary(results),
+        {"load": active_tab, "loaded": approval_tab.get("loaded", []), "requests": requests},
+    )
@@ -1,5 +1,8 @@
 import dash_bootstrap_components as dbc
-from dash import html
+from dash import html, ctx
+from api.approval_inbox import newest_pending_request
+from api.get_requests_for_approval import get_requests_for_approval
+from api.query_executor import query_executor
 from styles import CONTAINER_BUTTONS_STYLE
 
 def container_approval_reject_buttons(table):
@@ -41,3 +44,45 @@ def container_approval_reject_buttons(table):
         ],
         style=CONTAINER_BUTTONS_STYLE,
     )
+
+def render_approval_tab(approval_tab, tab_id):
+    """
+    Indica se o callback de conteúdo de uma página deve construir a sua aba na /approval.
+
+    Cada aba é construída apenas quando selecionada pela primeira vez (e reconstruída
+    se o idioma ou o usuário mudar), em vez de todas as abas ao abrir a página.
+
+    Args:
+        approval_tab (dict): Valor de approval-tab-store ({"load": aba a construir, "loaded": abas já abertas,
+            "requests": solicitação escolhida na caixa de entrada de cada aba}).
+        tab_id (str): Aba da página (mesmo nome do processo em get_requests_for_approval).
+
+    Returns:
+        bool: True se a aba deve ser construída neste callback.
+    """
+    approval_tab = approval_tab or {}
+
+    if ctx.triggered_id == "approval-tab-store":
+        return approval_tab.get("load") == tab_id
+    if ctx.triggered_id in (None, "url"):
+        # A aba inicial é pedida pelo callback das abas ao montar a página
+        return False
+    return tab_id in approval_tab.get("loaded", [])
+
+def selected_request(approval_tab, tab_id):
+    """Solicitação escolhida na caixa de entrada da aba, ou a pendente mais recente do processo"""
+    return (approval_tab or {}).get("requests", {}).get(tab_id) or newest_pending_request(tab_id)
+
+def get_approval_requests(table, approval_tab=None, columns=None):
+    """Linhas do dump apenas da solicitação aberta na aba de aprovação (ver selected_request)"""
+    return get_requests_for_approval(table=table, columns=columns, request_id=selected_request(approval_tab, table))
+
+def prefetch_approval_data(table, columns=None):
+    """Busca em segundo plano a solicitação mais recente de uma aba, deixando-a no cache para quando for aberta"""
+
+    def prefetch():
+        get_approval_requests(table, columns=columns)
+        print(f"Aba de aprovação pré-carregada: {table}")
+
+    # Executor compartilhado: a pré-busca conta no limite de consultas simultâneas do app
+    return query_executor.submit(prefetch)
@@ -0,0 +1,235 @@
+"""Cálculo do Build Up (waterfall de Public Price até EBIT) para vários cenários de uma vez.
+
+Os fatores de cada tipo de Build Up (ICMS, PIS, Cofins, garantias, fretes, ...)
+são organizados uma única vez em uma tabela com uma linha por tipo. Cada cenário
+(tipo de Build Up + preço ZRSD026, IPI, ICMS-ST, MVA, dealer code, câmbio, ...)
+é associado aos seus fatores por join e todo o waterfall é calculado com
+expressões do Polars, para todos os cenários ao mesmo tempo.
+"""
+
+import polars as pl
+
+# Fatores da tabela de Build Up usados no cálculo (linhas de buildup_factors), todos aplicados sobre o preço convertido
+FACTOR_NAMES = [
+    "icms_avg",
+    "pis",
+    "cofins",
+    "warranty_parts",
+    "warranty_cars",
+    "bonus",
+    "regional_marketing",
+    "floor_plan",
+    "part_return",
+    "other_expenses",
+    "freight_in",
+    "freight_out",
+    "warranty_1_parts",
+    "warranty_2_cars",
+    "product_service_warranty",
+    "cost_adjustment",
+    "other_costs",
+    "structural_expenses",
+    "other",
+]
+
+# Entradas de um cenário: valores em moeda ou percentuais (0-100, como nos inputs da página)
+SCENARIO_DEFAULTS = {
+    "price_zrsd026": 0.0,
+    "currency_rate": 1.0,
+    "product_price_pis_cofins": 0.0,
+    "dealer_code": 0.0,
+    "icms_st": 0.0,
+    "mva_price": 0.0,
+    "ipi": 0.0,
+    "ipi_material_cost": 0.0,
+    "icms_material_cost": 0.0,
+}
+
+# Linhas da tabela de simulação: (rótulo, coluna do resultado)
+WATERFALL_FIELDS = [
+    ("Public Price", "public_price"),
+    ("Dealer Code", "dealer_code_value"),
+    ("Total Ticket Manufacturer", "total_ticket_manufacturer"),
+    ("ICMS ST", "icms_st_value"),
+    ("ICMS (GM+Manufacturer)", "icms_st_gm_manufacturer"),
+    ("ICMS ST (Charge Dealer)", "icms_st_charge_dealer"),
+    ("MVA + Price", "mva_price_value"),
+    ("Price + IPI", "price_ipi"),
+    ("IPI", "ipi_value"),
+    ("Price (ZRSD026)", "price_with_fx"),
+    ("ICMS", "icms_avg_value"),
+    ("PIS (AVG)", "pis_value"),
+    ("Cofins (AVG)", "cofins_value"),
+    ("Warranty (Parts)", "warranty_parts_value"),
+    ("Warranty (Cars)", "warranty_cars_value"),
+    ("Bonus", "bonus_value"),
+    ("Regional Marketing", "regional_marketing_value"),
+    ("Floor Plan", "floor_plan_value"),
+    ("Part Return/Autogiro/Anom", "part_return_value"),
+    ("Other Expenses", "other_expenses_value"),
+    ("Net Sales", "net_sales"),
+    ("% of GS", "percentage_of_gs"),
+    ("Material Cost/ Avg Mt Cost", "material_cost_avg_mt_cost"),
+    ("Freight In", "freight_in_value"),
+    ("Freight Out", "freight_out_value"),
+    ("Warranty 1 (Parts)", "warranty_1_parts_value"),
+    ("Warranty 2 (Cars)", "warranty_2_cars_value"),
+    ("Product Service Warranty", "product_service_warranty_value"),
+    ("Package", "package"),
+    ("Cost Adjustment", "cost_adjustment_value"),
+    ("Other Costs", "other_costs_value"),
+    ("Total Costs", "total_costs"),
+    ("Contribution Margin", "contribution_margin"),
+    ("% of NS", "percentage_of_ns"),
+    ("Structural Expenses", "structural_expenses_value"),
+    ("Other", "other_value"),
+    ("Total Expenses", "total_expenses"),
+    ("EBIT", "ebit"),
+    ("% of NS EBIT", "percentage_of_ns_ebit"),
+]
+
+_NET_SALES_FACTORS = [
+    "icms_avg", "pis", "cofins", "warranty_parts", "warranty_cars", "bonus",
+    "regional_marketing", "floor_plan", "part_return", "other_expenses",
+]
+
+_COST_FACTORS = [
+    "freight_in", "freight_out", "warranty_1_parts", "warranty_2_cars",
+    "product_service_warranty", "cost_adjustment", "other_costs",
+]
+
+def _divide(numerator, denominator):
+    """Divisão que retorna 0 quando o denominador é 0"""
+    return pl.when(denominator != 0).then(numerator / denominator).otherwise(0.0)
+
+def _value(factor):
+    return f"{factor}_value"
+
+def factor_matrix(df_buildup):
+    """
+    Organiza a tabela de Build Up (uma coluna por tipo) em uma linha por tipo com os fatores do cálculo.
+
+    Como no cálculo anterior (linha a linha), vale a primeira linha de cada fator;
+    fatores ausentes ou nulos valem 0.
+
+    Args:
+        df_buildup (polars.DataFrame): Tabela de handle_raw_dataframe (buildup_factors + colunas dos tipos).
+
+    Returns:
+        polars.DataFrame: Coluna buildup_code e uma coluna float por fator de FACTOR_NAMES.
+    """
+    if not isinstance(df_buildup, pl.DataFrame):
+        df_buildup = pl.DataFrame(df_buildup)
+
+    ignored = {"buildup_factors", "quarter", "formatted_year", "uuid_alteracoes"}
+    codes = [column for column in df_buildup.columns if column not in ignored]
+
+    factors = (
+        df_buildup
+        .filter(pl.col("buildup_factors").is_in(FACTOR_NAMES))
+        .unique(subset="buildup_factors", keep="first", maintain_order=True)
+        .select(["buildup_factors"] + [pl.col(code).cast(pl.Float64, strict=False) for code in codes])
+    )
+
+    values = {row[0]: row[1:] for row in factors.iter_rows()}
+
+    return pl.DataFrame(
+        {
+            "buildup_code": codes,
+            **{
+                factor: [float(value) if value is not None else 0.0 for value in values.get(factor, [None] * len(codes))]
+                for factor in FACTOR_NAMES
+            },
+        },
+        schema={"buildup_code": pl.Utf8, **{factor: pl.Float64 for factor in FACTOR_NAMES}},
+    )
+
+def scenario_frame(scenarios):
+    """Monta o DataFrame de cenários, completando as entradas ausentes com SCENARIO_DEFAULTS"""
+    if not isinstance(scenarios, pl.DataFrame):
+        scenarios = pl.DataFrame(scenarios)
+
+    return scenarios.with_columns([
+        pl.col(column).cast(pl.Float64, strict=False).fill_null(default).alias(column)
+        if column in scenarios.columns
+        else pl.lit(default, dtype=pl.Float64).alias(column)
+        for column, default in SCENARIO_DEFAULTS.items()
+    ])
+
+def calculate_buildup(factors, scenarios):
+    """
+    Calcula o waterfall do Build Up para vários cenários de uma vez.
+
+    Args:
+        factors (polars.DataFrame): Resultado de `factor_matrix`.
+        scenarios (polars.DataFrame | list): Um cenário por linha, com buildup_code e as
+            entradas de SCENARIO_DEFAULTS (percentuais de 0 a 100; colunas extras são mantidas).
+
+    Returns:
+        polars.DataFrame: Os cenários com as colunas de WATERFALL_FIELDS. Cenários de tipos
+        sem fatores são calculados com fatores 0.
+
+    Example:
+        >>> calculate_buildup(factor_matrix(df_buildup), [{"buildup_code": "ACC CLC", "price_zrsd026": 100}])
+    """
+    percentage = lambda column: pl.col(column) / 100
+    price = pl.col("price_with_fx")
+
+    return (
+        scenario_frame(scenarios).lazy()
+        .join(factors.lazy(), on="buildup_code", how="left")
+        .with_columns([pl.col(factor).fill_null(0.0) for factor in FACTOR_NAMES])
+        .with_columns(
+            (pl.col("price_zrsd026") * pl.col("currency_rate")).alias("price_with_fx"),
+            (pl.col("product_price_pis_cofins") * pl.col("currency_rate")).alias("product_price_w_pis_cofins"),
+        )
+        # Preço ao público, ICMS-ST e IPI
+        .with_columns(
+            (price * (1 + percentage("ipi"))).alias("price_ipi"),
+            _divide(price, 1 - percentage("dealer_code")).alias("public_price"),
+            (price * percentage("icms_st")).alias("icms_st_gm_manufacturer"),
+            (price * percentage("ipi")).alias("ipi_value"),
+            *[(price * pl.col(factor)).alias(_value(factor)) for factor in FACTOR_NAMES],
+        )
+        .with_columns((pl.col("price_ipi") * (1 + percentage("mva_price"))).alias("mva_price_value"))
+        .with_columns((pl.col("mva_price_value") * percentage("icms_st")).alias("icms_st_value"))
+        .with_columns((pl.col("icms_st_value") - pl.col("icms_st_gm_manufacturer")).alias("icms_st_charge_dealer"))
+        .with_columns((pl.col("price_ipi") + pl.col("icms_st_charge_dealer")).alias("total_ticket_manufacturer"))
+        .with_columns((pl.col("public_price") - pl.col("total_ticket_manufacturer")).alias("dealer_code_value"))
+        # Net Sales
+        .with_columns((price + pl.sum_horizontal([pl.col(_value(factor)) for factor in _NET_SALES_FACTORS])).alias("net_sales"))
+        .with_columns(_divide(pl.col("net_sales"), price).alias("percentage_of_gs"))
+        # Custo do material
+        .with_columns(
+            (
+                pl.col("product_price_w_pis_cofins")
+                - pl.col("product_price_w_pis_cofins") * pl.col("pis")
+                - pl.col("product_price_w_pis_cofins") * pl.col("cofins")
+            ).alias("base_price_net_cost"),
+        )
+        .with_columns(_divide(pl.col("base_price_net_cost"), 1 - percentage("icms_material_cost")).alias("price_without_ipi"))
+        .with_columns(
+            (-(pl.col("base_price_net_cost") + pl.col("price_without_ipi") * percentage("ipi_material_cost"))).alias("material_cost_avg_mt_cost"),
+            pl.lit(0.0).alias("package"),
+        )
+        # Margem de contribuição, despesas e EBIT
+        .with_columns(
+            (pl.col("material_cost_avg_mt_cost") + pl.sum_horizontal([pl.col(_value(factor)) for factor in _COST_FACTORS])).alias("total_costs"),
+            (pl.col("structural_expenses_value") + pl.col("other_value")).alias("total_expenses"),
+        )
+        .with_columns((pl.col("net_sales") + pl.col("total_costs")).alias("contribution_margin"))
+        .with_columns((pl.col("contribution_margin") - pl.col("total_expenses")).alias("ebit"))
+        .with_columns(
+            _divide(pl.col("contribution_margin"), pl.col("net_sales")).alias("percentage_of_ns"),
+            _divide(pl.col("ebit"), pl.col("net_sales")).alias("percentage_of_ns_ebit"),
+        )
+        .drop(FACTOR_NAMES + ["product_price_w_pis_cofins", "base_price_net_cost", "price_without_ipi"])
+        .collect()
+    )
+
+def simulation_rows(result_row):
+    """Linhas da tabela de simulação ({"field", "value"}) a partir de uma linha de `calculate_buildup`"""
+    return [
+        {"field": field, "value": round(result_row[column], 2)}
+        for field, column in WATERFALL_FIELDS
+    ]
@@ -1,32 +1,36 @@
+import time
 from datetime import datetime
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
 import polars as pl
 import pandas as pd
+import plotly.graph_objects as go
 from dash import Dash, dcc, html, callback, dash_table, Input, Output, State, no_update, ctx, callback_context
 from itertools import product
 from pages.buildup.buildup_utils import handle_raw_dataframe, reverse_raw_dataframe, merge_with_original_data, get_tax_rates, get_month_from_quarter
-from pages.approvals.approval_utils import container_approval_reject_buttons
-from api.get_initial_data_configs import get_initial_data_configs
-from api.get_requests_for_approval import get_requests_for_approval
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
+from pages.buildup.buildup_engine import calculate_buildup, simulation_rows
+from pages.buildup.buildup_sweep import BUILDUP_SWEEP_MAX_SCENARIOS, SWEEP_METRICS, check_grid_size, heatmap_matrix, range_size, run_sweep, sweep_scenarios, sweep_table, value_range
+from pages.buildup.buildup_reference_data import buildup_factors, buildup_fx, get_buildup_table, get_factor_matrix
 from api.update_approval_status import update_approval_status
 from api.send_to_approval import send_to_approval
+from background_jobs import background_job_options, wait_with_progress
 from copy import deepcopy
 from components.Input import create_input
 from components.Modal import create_modal
 from components.Helper_button_with_modal import create_help_button_with_modal
 from components.Toast import Toast
+from session_store import session_store
 from static_data.constants import VARIABLES_QUARTER
 from static_data.helper_text import helper_text
 from utils.modify_column_if_other_column_changed import modify_column_if_other_column_changed
 from utils.user_has_permission_to_edit import user_has_permission_to_edit
 from utils.handle_nothing_to_approve import handle_nothing_to_approve
+from utils.apply_grid_request import apply_grid_request
 from styles import BUTTON_STYLE, CONTAINER_BUTTONS_DUAL_STYLE, CONTAINER_TABLE_BUILD_UP_STYLE, DROPDOWN_STYLE, CONTAINER_HELPER_BUTTON_STYLE, MAIN_TITLE_STYLE
 from translations import _, setup_translations
 from .buildup_style import *  # Temporariamente usando import * para focar nos dados
 
-df_buildup = handle_raw_dataframe(get_initial_data_configs(process_name="buildup"))
-table_fx = get_initial_data_configs(process_name="buildup_fx")
 
 INPUT_CONFIGS = [
     {"id": "input-dealer-code", "input_type": "number", "label_text": "Dealer Code", "input_value": 45.82},
@@ -165,6 +169,134 @@ def tab_content(tab_id, buildups_type_data, _):
             style=STYLE_TAB_CONTENT
         )
 
+def sweep_column(input_id):
+    """Coluna do buildup_engine correspondente a um input da simulação (ex.: input-icms-st -> icms_st)"""
+    return input_id.removeprefix("input-").replace("-", "_")
+
+SWEEP_VARIABLES = [
+    {"label": input_config["label_text"], "value": sweep_column(input_config["id"])}
+    for input_config in INPUT_CONFIGS
+]
+
+# Entradas fixas da análise de sensibilidade: os valores iniciais da simulação
+SWEEP_BASE_VALUES = {sweep_column(input_config["id"]): input_config["input_value"] for input_config in INPUT_CONFIGS}
+
+SWEEP_AXES = [
+    {"id": "x", "label": "Eixo X", "variable": "price_zrsd026", "start": 300, "stop": 500, "steps": 21},
+    {"id": "y", "label": "Eixo Y", "variable": "icms_st", "start": 0, "stop": 20, "steps": 11},
+]
+
+def sweep_axis_controls(axis):
+    return html.Div(
+        [
+            html.Label(_(axis["label"]), style=STYLE_LABEL),
+            dcc.Dropdown(
+                id=f'buildup-sweep-{axis["id"]}-variable',
+                options=SWEEP_VARIABLES,
+                value=axis["variable"],
+                clearable=False,
+                style=STYLE_INPUT,
+            ),
+            html.Div(
+                [
+                    create_input(id=f'buildup-sweep-{axis["id"]}-start', label_text=_("De"), input_value=axis["start"]),
+                    create_input(id=f'buildup-sweep-{axis["id"]}-stop', label_text=_("Até"), input_value=axis["stop"]),
+                    create_input(id=f'buildup-sweep-{axis["id"]}-steps', label_text=_("Pontos"), input_value=axis["steps"], min=1, max=BUILDUP_SWEEP_MAX_SCENARIOS, step=1),
+                ],
+                style=STYLE_SWEEP_AXIS_INPUTS,
+            ),
+        ],
+        style=STYLE_SWEEP_FIELD,
+    )
+
+def sweep_buildup_codes():
+    """Tipos de Build Up disponíveis para a análise de sensibilidade"""
+    factors = get_factor_matrix()
+    return [] if factors is None else factors["buildup_code"].to_list()
+
+def sweep_grid(column_defs):
+    """Tabela dos cenários: as linhas ficam no servidor e são entregues em blocos (modelo "infinite")"""
+    return dag.AgGrid(
+        id="buildup-sweep-table",
+        rowModelType="infinite",
+        columnDefs=column_defs,
+        defaultColDef={"sortable": True, "filter": True, "resizable": True},
+        dashGridOptions={
+            "pagination": True,
+            "paginationPageSize": 50,
+            "cacheBlockSize": 50,
+            "maxBlocksInCache": 10,
+        },
+        style={'width': '100%', 'height': '400px'},
+    )
+
+def sweep_tab_content(buildup_codes, _):
+    """Aba de análise de sensibilidade: grade de cenários, mapa de calor e tabela"""
+
+    controls = html.Div(
+        [
+            html.Div(
+                [
+                    html.Label('Build Up', style=STYLE_LABEL),
+                    dcc.Dropdown(id='buildup-sweep-codes', options=buildup_codes, value=buildup_codes, multi=True, style=STYLE_INPUT),
+                ],
+                style=STYLE_SWEEP_FIELD,
+            ),
+            *[sweep_axis_controls(axis) for axis in SWEEP_AXES],
+            html.Div(
+                [
+                    html.Label('Currency', style=STYLE_LABEL),
+                    dcc.Dropdown(id='buildup-sweep-currencies', options=CURRENCY_OPTIONS, value=['BRL'], multi=True, style=STYLE_INPUT),
+                ],
+                style=STYLE_SWEEP_FIELD,
+            ),
+            dbc.Button(_("Calcular"), id="buildup-sweep-run", color="primary", n_clicks=0, style=BUTTON_STYLE),
+        ],
+        style=STYLE_SWEEP_CONTROLS,
+    )
+
+    results = html.Div(
+        [
+            html.P(
+                _("As demais entradas usam os valores iniciais da simulação."),
+                id="buildup-sweep-message",
+                style=STYLE_LABEL,
+            ),
+            html.Div(
+                [
+                    html.Div([
+                        html.Label('Build Up', style=STYLE_LABEL),
+                        dcc.Dropdown(id='buildup-sweep-view-code', options=[], clearable=False, style=STYLE_INPUT),
+                    ], style=STYLE_SWEEP_FIELD),
+                    html.Div([
+                        html.Label('Currency', style=STYLE_LABEL),
+                        dcc.Dropdown(id='buildup-sweep-view-currency', options=[], clearable=False, style=STYLE_INPUT),
+                    ], style=STYLE_SWEEP_FIELD),
+                    dcc.RadioItems(
+                        id='buildup-sweep-metric',
+                        options=[{"label": label, "value": column} for column, label in SWEEP_METRICS.items()],
+                        value="percentage_of_ns",
+                        inline=True,
+                    ),
+                ],
+                style=STYLE_SWEEP_VIEW,
+            ),
+            dcc.Graph(id="buildup-sweep-heatmap", figure=go.Figure()),
+            html.Div(sweep_grid([]), id="buildup-sweep-table-container"),
+            dcc.Store(id="buildup-sweep-handle"),
+        ],
+        style=STYLE_SWEEP_RESULTS,
+    )
+
+    return html.Div([controls, results], style=STYLE_TAB_CONTENT)
+
+def year_options():
+    """Anos com câmbio disponível (ou apenas o ano atual, se o câmbio ainda não pôde ser carregado)"""
+    fx_rates = buildup_fx.get()
+    if fx_rates is None:
+        return [str(datetime.now().year)]
+    return sorted(map(str, fx_rates.years()), reverse=True)
+
 def container_input_quarter_year(pathname):
     return html.Div([
     html.Label('Quarter / Year', style=STYLE_LABEL),
@@ -180,7 +312,7 @@ def container_input_quarter_year(pathname):
             ),
             dcc.Dropdown(
                 id='input-year',
-                options=sorted(map(str, table_fx['RATEYEAR'].unique().tolist()), reverse=True),
+                options=year_options(),
                 value=str(datetime.now().year),
                 clearable=False,
                 style=DROPDOWN_STYLE,
@@ -273,22 +405,6 @@ def create_buildup_factors_table(pathname, user_data, table_data):
         style=STYLE_BUILDUP_FACTORS_CONTAINER
     )
 
-# Função auxiliar para pegar valores do DataFrame
-def get_buildup_value(factor_name, df_buildup, buildup_code, default=0.0):
-    """Função auxiliar para pegar valores do DataFrame principal"""
-    try:
-        factor_series = df_buildup['buildup_factors']
-        if isinstance(factor_series, pl.Series):
-            row_index = factor_series.to_list().index(factor_name)
-        else:
-            row_index = factor_series.index(factor_name)
-            
-        value = df_buildup[buildup_code][row_index]
-        return float(value if value is not None else default)
-    except (ValueError, KeyError, IndexError, TypeError) as e:
-        print(f"Erro ao buscar {factor_name} para {buildup_code}: {str(e)}")
-        return default
-
 # def generate_parameter_rows(buildup_code):
 #     """Gera as linhas da tabela de parâmetros para um buildup específico"""
 #     if df_buildup is None:
@@ -310,12 +426,13 @@ def get_buildup_value(factor_name, df_buildup, buildup_code, default=0.0):
         
 #     return rows
 
-def get_layout(pathname, user_data):
+def get_layout(pathname, user_data, approval_tab=None):
     
     if pathname == "/approval":
-        table_data = handle_raw_dataframe(get_requests_for_approval(table="buildup"))
+        table_data = handle_raw_dataframe(get_approval_requests("buildup", approval_tab))
     else:
-        table_data = handle_raw_dataframe(get_initial_data_configs(process_name="buildup"))
+        # Mesma carga usada pela simulação: a tabela e os cálculos mostram os mesmos fatores
+        table_data = get_buildup_table()
 
     if table_data is None:
         return handle_nothing_to_approve()
@@ -367,7 +484,11 @@ def get_layout(pathname, user_data):
                         label=tab_config["label"]
                     )
                     for tab_config in tab_configs()
-                ],
+                ] +
+                [dbc.Tab(
+                    sweep_tab_content(sweep_buildup_codes(), _),
+                    label=_("Sensibilidade")
+                )],
                 style=STYLE_TABS
             ),
             style=STYLE_TABS_CONTAINER
@@ -426,14 +547,15 @@ buildup_page = html.Div([
     Input("url", "pathname"),
     State("store-token", "data"),
     Input("store-language", "data"),
+    Input("approval-tab-store", "data"),
 )
-def update_buildup_content(pathname, user_data, language):
+def update_buildup_content(pathname, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
-    if pathname in ["/buildup", "/approval"]:
-        return get_layout(pathname, user_data)
+    if pathname == "/buildup" or (pathname == "/approval" and render_approval_tab(approval_tab, "buildup")):
+        return get_layout(pathname, user_data, approval_tab=approval_tab)
     return no_update
 
 # Callback to update the buildup simulation tables
@@ -475,15 +597,20 @@ for tab_config, buildup in product(tab_configs(), BUILD_UPS_CODES):
         tab_name=tab_config["id"],
     ):
 
+        # Dados de referência compartilhados por todos os callbacks (carregados no primeiro uso)
+        factors = get_factor_matrix()
+        fx_rates = buildup_fx.get()
+
         month = get_month_from_quarter(input_value_quarter)
         currency_rate = get_tax_rates(
-            table_fx,
+            fx_rates,
             currency_selected=input_value_currency,
             month=month,
-            year=input_value_year
+            year=input_value_year,
+            fallback_to_latest=True,
         ) if tab_name == "base_price" else 1
 
-        if df_buildup is None:
+        if factors is None:
             print("DataFrame principal não está carregado")
             return []
 
@@ -491,272 +618,167 @@ for tab_config, buildup in product(tab_configs(), BUILD_UPS_CODES):
             print("buildup_code é None, retornando lista vazia")
             return []
 
-        # Todos os inputs de simulação
-        input_price_zrsd026 = float(input_value_price_zrsd026 or 0)
-        input_price_zrsd026_with_fx = input_price_zrsd026 * currency_rate
-        input_product_price_pis_cofins = float(input_value_product_price_pis_cofins or 0)
-        input_dealer_code_percentage = float(input_value_dealer_code or 0) / 100
-        input_icms_st_percentage = float(input_value_icms_st or 0) / 100
-        input_mva_price_percentage = float(input_value_mva_price or 0) / 100
-        input_ipi_percentage = float(input_value_ipi or 0) / 100
-        input_ipi_material_cost_percentage = float(input_value_ipi_material_cost or 0) / 100
-        input_icms_material_cost_percentage = float(input_value_icms_material_cost or 0) / 100
-
-        # Todos os inputs de fatores usando a nova função
-        input_icms_avg_percentage = get_buildup_value('icms_avg', df_buildup, buildup_code)
-        input_pis_exceto_dso_percentage = get_buildup_value('pis', df_buildup, buildup_code)
-        input_cofins_exceto_dso_percentage = get_buildup_value('cofins', df_buildup, buildup_code)
-        input_warranty_parts_percentage = get_buildup_value('warranty_parts', df_buildup, buildup_code)
-        input_warranty_cars_percentage = get_buildup_value('warranty_cars', df_buildup, buildup_code)
-        input_bonus_percentage = get_buildup_value('bonus', df_buildup, buildup_code)
-        input_regional_marketing_percentage = get_buildup_value('regional_marketing', df_buildup, buildup_code)
-        input_floor_plan_percentage = get_buildup_value('floor_plan', df_buildup, buildup_code)
-        input_part_return_autogiro_anom_percentage = get_buildup_value('part_return', df_buildup, buildup_code)
-        input_other_expenses_percentage = get_buildup_value('other_expenses', df_buildup, buildup_code)
-        input_freight_in_percentage = get_buildup_value('freight_in', df_buildup, buildup_code)
-        input_freight_out_percentage = get_buildup_value('freight_out', df_buildup, buildup_code)
-        input_warranty_1_parts_percentage = get_buildup_value('warranty_1_parts', df_buildup, buildup_code)
-        input_warranty_2_cars_percentage = get_buildup_value('warranty_2_cars', df_buildup, buildup_code)
-        input_product_service_warranty_percentage = get_buildup_value('product_service_warranty', df_buildup, buildup_code)
-        input_cost_adjustment_percentage = get_buildup_value('cost_adjustment', df_buildup, buildup_code)
-        input_other_costs_percentage = get_buildup_value('other_costs', df_buildup, buildup_code)
-        input_structural_expenses_percentage = get_buildup_value('structural_expenses', df_buildup, buildup_code)
-        input_other_percentage = get_buildup_value('other', df_buildup, buildup_code)
-
-        # Cálculos iniciais
-        price_ipi = input_price_zrsd026_with_fx * (1 + input_ipi_percentage)
-        public_price = input_price_zrsd026_with_fx / (1 - input_dealer_code_percentage)
-        icms_st_gm_manufacturer = input_price_zrsd026_with_fx * input_icms_st_percentage
-        mva_price = price_ipi * (1 + input_mva_price_percentage)
-        icms_st = mva_price * input_icms_st_percentage
-        icms_st_charge_dealer = icms_st - icms_st_gm_manufacturer
-        total_ticket_manufacturer = price_ipi + icms_st_charge_dealer
-        dealer_code = public_price - total_ticket_manufacturer
-        ipi = input_price_zrsd026_with_fx * input_ipi_percentage
-
-        # Cálculo dos componentes do Net Sales
-        icms_avg = input_price_zrsd026_with_fx * input_icms_avg_percentage
-        pis_exceto_dso = input_price_zrsd026_with_fx * input_pis_exceto_dso_percentage
-        cofins_exceto_dso = input_price_zrsd026_with_fx * input_cofins_exceto_dso_percentage
-        warranty_parts = input_price_zrsd026_with_fx * input_warranty_parts_percentage
-        warranty_cars = input_price_zrsd026_with_fx * input_warranty_cars_percentage
-        bonus = input_price_zrsd026_with_fx * input_bonus_percentage
-        regional_marketing = input_price_zrsd026_with_fx * input_regional_marketing_percentage
-        floor_plan = input_price_zrsd026_with_fx * input_floor_plan_percentage
-        part_return_autogiro_anom = input_price_zrsd026_with_fx * input_part_return_autogiro_anom_percentage
-        other_expenses = input_price_zrsd026_with_fx * input_other_expenses_percentage
-
-        # Cálculo do Net Sales Factor e Net Sales
-        net_sales = input_price_zrsd026_with_fx + icms_avg + pis_exceto_dso + cofins_exceto_dso + warranty_parts + warranty_cars + bonus + regional_marketing + floor_plan + part_return_autogiro_anom + other_expenses
-
-        # % GS
-        percentage_of_gs = net_sales / input_price_zrsd026_with_fx
-
-        # Cálculo do Material Cost
-        product_price_w_pis_cofins = input_product_price_pis_cofins * currency_rate
-        pis = product_price_w_pis_cofins * input_pis_exceto_dso_percentage
-        cofins = product_price_w_pis_cofins * input_cofins_exceto_dso_percentage
-        base_price_net_cost = product_price_w_pis_cofins - pis - cofins
-        price_without_ipi = base_price_net_cost / (1 - input_icms_material_cost_percentage)
-        material_cost_ipi = price_without_ipi * input_ipi_material_cost_percentage
-        # material_cost = price_without_ipi + material_cost_ipi
-
-        material_cost = base_price_net_cost + material_cost_ipi
-        material_cost_avg_mt_cost = -material_cost  # Negativo pois é um custo
-
-        # Cálculo dos custos
-        freight_in = input_price_zrsd026_with_fx * input_freight_in_percentage
-        freight_out = input_price_zrsd026_with_fx * input_freight_out_percentage
-        warranty_1_parts = input_price_zrsd026_with_fx * input_warranty_1_parts_percentage
-        warranty_2_cars = input_price_zrsd026_with_fx * input_warranty_2_cars_percentage
-        product_service_warranty = input_price_zrsd026_with_fx * input_product_service_warranty_percentage
-        cost_adjustment = input_price_zrsd026_with_fx * input_cost_adjustment_percentage
-        other_costs = input_price_zrsd026_with_fx * input_other_costs_percentage
-
-        # Total de custos e fator de custos
-        costs_factor = (
-            input_freight_in_percentage + input_freight_out_percentage + 
-            input_warranty_1_parts_percentage + input_warranty_2_cars_percentage + 
-            input_product_service_warranty_percentage + input_cost_adjustment_percentage + 
-            input_other_costs_percentage
-        )
+        # O cálculo é o mesmo para qualquer quantidade de cenários (ver buildup_engine)
+        result = calculate_buildup(factors, [{
+            "buildup_code": buildup_code,
+            "price_zrsd026": float(input_value_price_zrsd026 or 0),
+            "currency_rate": currency_rate,
+            "product_price_pis_cofins": float(input_value_product_price_pis_cofins or 0),
+            "dealer_code": float(input_value_dealer_code or 0),
+            "icms_st": float(input_value_icms_st or 0),
+            "mva_price": float(input_value_mva_price or 0),
+            "ipi": float(input_value_ipi or 0),
+            "ipi_material_cost": float(input_value_ipi_material_cost or 0),
+            "icms_material_cost": float(input_value_icms_material_cost or 0),
+        }])
+
+        simulation_data = simulation_rows(result.row(0, named=True))
+
+        return simulation_data, round(currency_rate, 2)
+
+def sweep_column_defs(x, y):
+    labels = {variable["value"]: variable["label"] for variable in SWEEP_VARIABLES}
+    percentage_formatter = "value != null ? `${(value * 100).toFixed(2)}%` : ''"
 
-        # total_costs = material_cost_avg_mt_cost + (input_price_zrsd026_with_fx * costs_factor)
-        total_costs = material_cost_avg_mt_cost + freight_in + freight_out + warranty_1_parts + warranty_2_cars + product_service_warranty + cost_adjustment + other_costs
-
-        # Cálculo da margem de contribuição e despesas
-        contribution_margin = net_sales + total_costs
-        percentage_of_ns = contribution_margin / net_sales if net_sales != 0 else 0
-
-        structural_expenses = input_price_zrsd026_with_fx * input_structural_expenses_percentage
-        other = input_price_zrsd026_with_fx * input_other_percentage
-        total_expenses = structural_expenses + other
-
-        # Cálculo do EBIT
-        ebit = contribution_margin - total_expenses
-        percentage_of_ns_ebit = ebit / net_sales if net_sales != 0 else 0
-
-        # Funcao para atualizar a tabela de simulacao
-        simulation_data = [
-            {
-                "field": "Public Price",
-                "value": round(public_price, 2)
-            },
-            {
-                "field": "Dealer Code",
-                "value": round(dealer_code, 2)
-            },
-            {
-                "field": "Total Ticket Manufacturer",
-                "value": round(total_ticket_manufacturer, 2)
-            },
-            {
-                "field": "ICMS ST",
-                "value": round(icms_st, 2)
-            },
-            {
-                "field": "ICMS (GM+Manufacturer)",
-                "value": round(icms_st_gm_manufacturer, 2)
-            },
-            {
-                "field": "ICMS ST (Charge Dealer)",
-                "value": round(icms_st_charge_dealer, 2)
-            },
-            {
-                "field": "MVA + Price",
-                "value": round(mva_price, 2)
-            },
-            {
-                "field": "Price + IPI",
-                "value": round(price_ipi, 2)
-            },
-            {
-                "field": "IPI",
-                "value": round(ipi, 2)
-            },
-            {
-                "field": "Price (ZRSD026)",
-                "value": round(input_price_zrsd026_with_fx, 2)
-            },
-            {
-                "field": "ICMS",
-                "value": round(icms_avg, 2)
-            },
-            {
-                "field": "PIS (AVG)",
-                "value": round(pis_exceto_dso, 2)
-            },
-            {
-                "field": "Cofins (AVG)",
-                "value": round(cofins_exceto_dso, 2)
-            },
-            {
-                "field": "Warranty (Parts)",
-                "value": round(warranty_parts, 2)
-            },
-            {
-                "field": "Warranty (Cars)",
-                "value": round(warranty_cars, 2)
-            },
-            {
-                "field": "Bonus",
-                "value": round(bonus, 2)
-            },
-            {
-                "field": "Regional Marketing",
-                "value": round(regional_marketing, 2)
-            },
-            {
-                "field": "Floor Plan",
-                "value": round(floor_plan, 2)
-            },
-            {
-                "field": "Part Return/Autogiro/Anom",
-                "value": round(part_return_autogiro_anom, 2)
-            },
-            {
-                "field": "Other Expenses",
-                "value": round(other_expenses, 2)
-            },
-            {
-                "field": "Net Sales",
-                "value": round(net_sales, 2)
-            },
-            {
-                "field": "% of GS",
-                "value": round(percentage_of_gs, 2)
-            },
-            {
-                "field": "Material Cost/ Avg Mt Cost",
-                "value": round(material_cost_avg_mt_cost, 2)
-            },
-            {
-                "field": "Freight In",
-                "value": round(freight_in, 2)
-            },
-            {
-                "field": "Freight Out",
-                "value": round(freight_out, 2)
-            },
-            {
-                "field": "Warranty 1 (Parts)",
-                "value": round(warranty_1_parts, 2)
-            },
-            {
-                "field": "Warranty 2 (Cars)",
-                "value": round(warranty_2_cars, 2)
-            },
-            {
-                "field": "Product Service Warranty",
-                "value": round(product_service_warranty, 2)
-            },
-            {
-                "field": "Package",
-                "value": round(0, 2)  # Placeholder for actual value
-            },
-            {
-                "field": "Cost Adjustment",
-                "value": round(cost_adjustment, 2)
-            },
-            {
-                "field": "Other Costs",
-                "value": round(other_costs, 2)
-            },
-            {
-                "field": "Total Costs",
-                "value": round(total_costs, 2)
-            },
-            {
-                "field": "Contribution Margin",
-                "value": round(contribution_margin, 2)
-            },
-            {
-                "field": "% of NS",
-                "value": round(percentage_of_ns, 2)
-            },
-            {
-                "field": "Structural Expenses",
-                "value": round(structural_expenses, 2)
-            },
-            {
-                "field": "Other",
-                "value": round(other, 2)
-            },
-            {
-                "field": "Total Expenses",
-                "value": round(total_expenses, 2)
-            },
-            {
-                "field": "EBIT",
-                "value": round(ebit, 2)
-            },
-            {
-                "field": "% of NS EBIT",
-                "value": round(percentage_of_ns_ebit, 2)
-            }
+    return (
+        [
+            {"headerName": "Build Up", "field": "buildup_code", "pinned": "left"},
+            {"headerName": "Currency", "field": "currency"},
         ]
+        + [{"headerName": labels.get(column, column), "field": column, "filter": "agNumberColumnFilter", "valueFormatter": "value != null ? value.toFixed(2) : ''"} for column in (x, y)]
+        + [{"headerName": label, "field": column, "filter": "agNumberColumnFilter", "valueFormatter": percentage_formatter} for column, label in SWEEP_METRICS.items()]
+    )
 
-        return simulation_data, round(currency_rate, 2)
+# Callback para calcular a análise de sensibilidade (todos os cenários em um único lote)
+@callback(
+    Output("buildup-sweep-handle", "data"),
+    Output("buildup-sweep-message", "children"),
+    Output("buildup-sweep-table-container", "children"),
+    Output("buildup-sweep-view-code", "options"),
+    Output("buildup-sweep-view-code", "value"),
+    Output("buildup-sweep-view-currency", "options"),
+    Output("buildup-sweep-view-currency", "value"),
+    Input("buildup-sweep-run", "n_clicks"),
+    State("buildup-sweep-codes", "value"),
+    State("buildup-sweep-x-variable", "value"),
+    State("buildup-sweep-x-start", "value"),
+    State("buildup-sweep-x-stop", "value"),
+    State("buildup-sweep-x-steps", "value"),
+    State("buildup-sweep-y-variable", "value"),
+    State("buildup-sweep-y-start", "value"),
+    State("buildup-sweep-y-stop", "value"),
+    State("buildup-sweep-y-steps", "value"),
+    State("buildup-sweep-currencies", "value"),
+    State("input-quarter", "value"),
+    State("input-year", "value"),
+    State("buildup-sweep-handle", "data"),
+    prevent_initial_call=True,
+)
+def run_buildup_sweep(n_clicks, buildup_codes, x, x_start, x_stop, x_steps, y, y_start, y_stop, y_steps, currencies, quarter, year, sweep_handle):
+    unchanged = [no_update] * 5
+
+    if not n_clicks:
+        return no_update, no_update, *unchanged
+
+    if not buildup_codes or not currencies:
+        return no_update, _("Selecione ao menos um Build Up e uma moeda."), *unchanged
+
+    if x == y:
+        return no_update, _("Escolha variáveis diferentes para os eixos X e Y."), *unchanged
+
+    factors = get_factor_matrix()
+    fx_rates = buildup_fx.get()
+    if factors is None or fx_rates is None:
+        return no_update, _("Os dados de referência do Build Up não estão disponíveis."), *unchanged
+
+    start_time = time.time()
+    try:
+        # Os pontos vêm da tela: o limite é conferido antes de montar qualquer faixa de valores
+        check_grid_size(buildup_codes, [range_size(x_start, x_stop, x_steps), range_size(y_start, y_stop, y_steps), len(currencies)])
+        month = get_month_from_quarter(quarter)
+        currency_rates = [
+            get_tax_rates(fx_rates, currency_selected=currency, month=month, year=year, fallback_to_latest=True)
+            for currency in currencies
+        ]
+        scenarios = sweep_scenarios(
+            buildup_codes,
+            axes=[
+                {x: value_range(x_start, x_stop, x_steps)},
+                {y: value_range(y_start, y_stop, y_steps)},
+                {"currency": currencies, "currency_rate": currency_rates},
+            ],
+            base=SWEEP_BASE_VALUES,
+        )
+    except ValueError as e:
+        return no_update, str(e), *unchanged
+
+    result = sweep_table(run_sweep(factors, scenarios), ["currency", x, y])
+    elapsed = time.time() - start_time
+    print(f"Análise de sensibilidade do Build Up: {result.height} cenários em {elapsed:.2f} segundos")
+
+    stored = session_store.put(result, handle=sweep_handle.get("handle") if sweep_handle else None)
+    message = _("{count} cenários calculados em {seconds:.2f} s. As demais entradas usam os valores iniciais da simulação.").format(
+        count=result.height, seconds=elapsed,
+    )
+
+    return (
+        {**stored, "x": x, "y": y},
+        message,
+        # Uma nova tabela pede o primeiro bloco dos novos cenários (get_sweep_rows)
+        sweep_grid(sweep_column_defs(x, y)),
+        buildup_codes,
+        buildup_codes[0],
+        currencies,
+        currencies[0],
+    )
+
+# Callback que entrega à tabela da análise de sensibilidade apenas o bloco de linhas pedido
+@callback(
+    Output("buildup-sweep-table", "getRowsResponse"),
+    Input("buildup-sweep-table", "getRowsRequest"),
+    State("buildup-sweep-handle", "data"),
+    prevent_initial_call=True,
+)
+def get_sweep_rows(request, sweep_handle):
+    result = session_store.get(sweep_handle) if sweep_handle else None
+    if request is None or result is None:
+        return no_update
+
+    return apply_grid_request(result, request)
+
+# Callback para desenhar o mapa de calor da análise de sensibilidade
+@callback(
+    Output("buildup-sweep-heatmap", "figure"),
+    Input("buildup-sweep-handle", "data"),
+    Input("buildup-sweep-view-code", "value"),
+    Input("buildup-sweep-view-currency", "value"),
+    Input("buildup-sweep-metric", "value"),
+    prevent_initial_call=True,
+)
+def update_sweep_heatmap(sweep_handle, buildup_code, currency, metric):
+    result = session_store.get(sweep_handle) if sweep_handle else None
+    if result is None or not buildup_code or not currency:
+        return go.Figure()
+
+    x, y = sweep_handle["x"], sweep_handle["y"]
+    x_values, y_values, matrix = heatmap_matrix(result, x, y, metric, filters={"buildup_code": buildup_code, "currency": currency})
+    labels = {variable["value"]: variable["label"] for variable in SWEEP_VARIABLES}
+
+    figure = go.Figure(go.Heatmap(
+        x=x_values,
+        y=y_values,
+        z=matrix,
+        colorscale="RdYlGn",
+        colorbar={"tickformat": ".1%"},
+        hovertemplate=f"{labels.get(x, x)}: %{{x:.2f}}<br>{labels.get(y, y)}: %{{y:.2f}}<br>{SWEEP_METRICS[metric]}: %{{z:.2%}}<extra></extra>",
+    ))
+    figure.update_layout(
+        title=f"{buildup_code} ({currency}) - {SWEEP_METRICS[metric]}",
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        margin={"l": 60, "r": 20, "t": 50, "b": 50},
+    )
+    return figure
 
 # Callback para filtrar a tabela de fatores de acordo com o quarter e year selecionados
 @callback(
@@ -811,6 +833,11 @@ def validate_quarter_year(quarter, year, close_clicks, prev_quarter, prev_year):
     if not quarter or not year:
         return False, "", quarter, year, quarter, year
         
+    df_buildup = get_buildup_table()
+    if df_buildup is None:
+        # Sem os fatores não há como validar: mantém a seleção
+        return False, "", quarter, year, quarter, year
+
     df = pl.DataFrame(df_buildup)
     
     # Converter quarter e year para string para garantir comparação correta
@@ -870,23 +897,30 @@ def open_confirm_approval_modal(n_clicks):
 @callback(
     Output("modal-confirm-approval-buildup", "is_open", allow_duplicate=True),
     Output("toast-approval-buildup", "is_open", allow_duplicate=True),
+    Output("toast-approval-buildup", "header", allow_duplicate=True),
+    Output("toast-approval-buildup", "children", allow_duplicate=True),
     Input("btn-confirm-approval","n_clicks"),
     Input("btn-cancel-approval","n_clicks"),
     State("table-buildup-factors", "rowData"),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-buildup", running=[(Output("modal-confirm-approval-buildup", "is_open"), False, False)]),
 )
-def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
+def handle_send_approval(set_progress, confirm_clicks, cancel_clicks, table_data, user_data):
     triggered_id = ctx.triggered_id
     
     if triggered_id == "btn-cancel-approval" and cancel_clicks:
-        return False, False
+        return False, False, no_update, no_update
 
     if triggered_id == "btn-confirm-approval" and confirm_clicks:
             
         df = pl.DataFrame(table_data)
 
-        new_table = merge_with_original_data(reverse_raw_dataframe(df))
+        original_data = buildup_factors.get()
+        if original_data is None:
+            return False, True, _("Erro"), _("Erro ao enviar para aprovação")
+
+        new_table = merge_with_original_data(reverse_raw_dataframe(df), original_data)
         new_table = new_table.select([col for col in new_table.columns if col != "manual"])
 
         # Garantir que year seja string antes de adicionar à tabela
@@ -900,10 +934,14 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
             'table_data': new_table.to_pandas().to_dict('records'),
         }
 
-        send_to_approval(notebook_name="buildup", data_variables=variables_to_send)
+        job_run = send_to_approval(notebook_name="buildup", data_variables=variables_to_send, wait=False)
+        success = wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data)
+
+        if not success:
+            return False, True, _("Erro"), _("Erro ao enviar para aprovação")
 
-        return False, True
-    return False, False
+        return False, True, _("Aprovação"), _("Enviado para aprovação")
+    return False, False, no_update, no_update
 
 # Callback para aprovação/rejeição
 @callback(
@@ -914,9 +952,10 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
     Input("button-approval-reject-buildup", "n_clicks"),
     State("table-buildup-factors", "rowData"),
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-reject-buildup"),
 )
-def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
+def handle_approval(set_progress, accept_clicks, reject_clicks, table_data, user_data):
     if not ctx.triggered_id:
         return no_update
 
@@ -937,7 +976,13 @@ def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
             "target_table": "buildup",
         }
 
-        update_approval_status(variables_to_send)
+        job_run = update_approval_status(variables_to_send, wait=False)
+        if not wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data):
+            return True, _("Erro"), _("Erro ao processar aprovação")
+
+        if status == "1":
+            # Fatores aprovados: atualiza a carga compartilhada pela tabela e pela simulação
+            buildup_factors.refresh(wait=False)
 
         return True, f"{status_text}", f"Status alterado para {status_text}"
 
@@ -0,0 +1,176 @@
+"""Dados de referência do Build Up (fatores e câmbio) carregados sob demanda.
+
+Antes os dados eram consultados na importação do módulo: a inicialização do app
+(e de cada worker) esperava duas queries no Databricks e os valores ficavam
+congelados até reiniciar o processo. Agora cada conjunto é carregado no primeiro
+uso, compartilhado por todos os callbacks e atualizado periodicamente em segundo
+plano (o câmbio já indexado em `FxRates`). Se uma atualização falhar, os últimos
+dados válidos continuam em uso. Se a primeira carga falhar, ela é tentada de novo
+após `retry_interval` segundos, e não só na próxima atualização.
+"""
+
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from api.get_initial_data_configs import get_initial_data_configs
+from pages.buildup.buildup_engine import factor_matrix
+from pages.buildup.buildup_utils import FxRates, handle_raw_dataframe
+
+load_dotenv()
+
+BUILDUP_REFERENCE_REFRESH_INTERVAL = float(os.getenv('BUILDUP_REFERENCE_REFRESH_INTERVAL', '3600'))
+BUILDUP_REFERENCE_RETRY_INTERVAL = float(os.getenv('BUILDUP_REFERENCE_RETRY_INTERVAL', '30'))
+
+class ReferenceData:
+    """Valor carregado no primeiro `get()` e recarregado a cada `refresh_interval` segundos.
+
+    Args:
+        name (str): Nome usado nos logs.
+        loader (callable): Função sem argumentos que busca os dados. Retornos None
+            ou {"error": ...} são tratados como falha.
+        refresh_interval (float): Intervalo entre atualizações, em segundos. Se 0, não atualiza.
+        retry_interval (float): Espera antes de tentar de novo uma primeira carga que falhou, em segundos.
+    """
+
+    def __init__(self, name, loader, refresh_interval=BUILDUP_REFERENCE_REFRESH_INTERVAL, clock=time.time, retry_interval=BUILDUP_REFERENCE_RETRY_INTERVAL):
+        self.name = name
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self._clock = clock
+
+        self._value = None
+        self._loaded_at = None
+        self._failed_at = None
+        self._load_lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._scheduler = None
+        self._scheduler_pid = None
+
+    def get(self):
+        """Retorna os dados, carregando-os na primeira chamada (ou None se nunca foi possível carregar)"""
+
+        if self._loaded_at is None:
+            with self._load_lock:
+                if self._loaded_at is None and not self._waiting_retry():
+                    self._load()
+        elif self.refresh_interval and self._clock() - self._loaded_at >= self.refresh_interval:
+            # Dados vencidos (por exemplo, agendador parado após um fork): atualiza sem bloquear
+            self.refresh(wait=False)
+
+        self._start_scheduler()
+        return self._value
+
+    def refresh(self, wait=True):
+        """Recarrega os dados agora. Com `wait=False`, recarrega em segundo plano.
+
+        Returns:
+            bool: False se outra atualização já estiver em andamento.
+        """
+
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._load()
+            finally:
+                self._refreshing.release()
+
+        if wait:
+            run()
+        else:
+            threading.Thread(target=run, name=f"refresh-{self.name}", daemon=True).start()
+        return True
+
+    def _load(self):
+        start_time = time.time()
+        try:
+            value = self.loader()
+        except Exception as e:
+            value = {"error": str(e)}
+
+        if value is None or isinstance(value, dict) and "error" in value:
+            error = value.get("error") if isinstance(value, dict) else "nenhum dado retornado"
+            print(f"Erro ao carregar dados de referência '{self.name}': {error}")
+            if self._loaded_at is None:
+                # Nunca carregou: tenta de novo após `retry_interval`, mantendo o valor None
+                self._failed_at = self._clock()
+            return
+
+        self._value = value
+        self._loaded_at = self._clock()
+        print(f"Dados de referência '{self.name}' carregados em {time.time() - start_time:.2f} segundos")
+
+    def _waiting_retry(self):
+        return self._failed_at is not None and self._clock() - self._failed_at < self.retry_interval
+
+    def _start_scheduler(self):
+        if not self.refresh_interval:
+            return
+
+        # Threads não sobrevivem a um fork: cada processo inicia o seu agendador
+        if self._scheduler is not None and self._scheduler_pid == os.getpid() and self._scheduler.is_alive():
+            return
+
+        with self._load_lock:
+            if self._scheduler is not None and self._scheduler_pid == os.getpid() and self._scheduler.is_alive():
+                return
+
+            def schedule():
+                while True:
+                    time.sleep(self.refresh_interval if self._loaded_at is not None else self.retry_interval)
+                    self.refresh(wait=True)
+
+            self._scheduler = threading.Thread(target=schedule, name=f"schedule-{self.name}", daemon=True)
+            self._scheduler_pid = os.getpid()
+            self._scheduler.start()
+
+def load_buildup_factors():
+    # Tabela como vem do banco: a página usa a versão pivotada (get_buildup_table) e o
+    # envio para aprovação junta as alterações de volta nesta mesma carga (merge_with_original_data)
+    return get_initial_data_configs(process_name="buildup")
+
+def load_buildup_fx():
+    # O índice de câmbio é montado uma vez por carga, não a cada simulação
+    data = get_initial_data_configs(process_name="buildup_fx")
+    return data if isinstance(data, dict) else FxRates(data)
+
+buildup_factors = ReferenceData("buildup", load_buildup_factors)
+buildup_fx = ReferenceData("buildup_fx", load_buildup_fx)
+
+_buildup_table = {"source": None, "table": None}
+_factor_matrix = {"source": None, "matrix": None}
+
+def get_buildup_table():
+    """Tabela de fatores no formato da página (handle_raw_dataframe), refeita apenas quando os dados de referência mudam.
+
+    A tabela exibida, a validação de trimestre/ano e a simulação usam esta mesma
+    carga, então mostram os mesmos valores até a próxima atualização.
+    """
+
+    raw_data = buildup_factors.get()
+    if raw_data is None:
+        return None
+
+    cached = _buildup_table
+    if cached["source"] is not raw_data:
+        cached = {"source": raw_data, "table": handle_raw_dataframe(raw_data)}
+        _buildup_table.update(cached)
+
+    return cached["table"]
+
+def get_factor_matrix():
+    """Fatores do cálculo (uma linha por tipo de Build Up), refeitos apenas quando os dados de referência mudam"""
+
+    df_buildup = get_buildup_table()
+    if df_buildup is None:
+        return None
+
+    cached = _factor_matrix
+    if cached["source"] is not df_buildup:
+        cached = {"source": df_buildup, "matrix": factor_matrix(df_buildup)}
+        _factor_matrix.update(cached)
+
+    return cached["matrix"]
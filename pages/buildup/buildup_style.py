@@ -250,3 +250,38 @@ def get_style_data_conditional(non_editable_fields):
             'color': 'darkgrey',
         } for field in non_editable_fields
     ]
+
+STYLE_SWEEP_CONTROLS = {
+    'display': 'flex',
+    'flexWrap': 'wrap',
+    'alignItems': 'flex-end',
+    'gap': '20px',
+    'padding': '15px',
+    'border': '1px solid #ddd',
+    'borderRadius': '5px',
+    'backgroundColor': '#fff',
+}
+
+STYLE_SWEEP_FIELD = {
+    'display': 'flex',
+    'flexDirection': 'column',
+    'minWidth': '250px',
+}
+
+STYLE_SWEEP_AXIS_INPUTS = {
+    'display': 'flex',
+    'gap': '5px',
+}
+
+STYLE_SWEEP_RESULTS = {
+    'display': 'flex',
+    'flexDirection': 'column',
+    'gap': '15px',
+    'marginTop': '20px',
+}
+
+STYLE_SWEEP_VIEW = {
+    'display': 'flex',
+    'alignItems': 'flex-end',
+    'gap': '20px',
+}
@@ -0,0 +1,167 @@
+"""Análise de sensibilidade do Build Up: várias combinações de entradas de uma vez.
+
+Em vez de digitar um preço ZRSD026 ou um IPI de cada vez, o usuário escolhe
+faixas de valores (por exemplo preço × ICMS-ST × moeda). A grade de cenários é
+montada com cross joins e calculada pelo `buildup_engine` em lotes, distribuídos
+em um pool de threads (o Polars libera o GIL durante o cálculo).
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import polars as pl
+from dotenv import load_dotenv
+from pages.buildup.buildup_engine import SCENARIO_DEFAULTS, calculate_buildup
+
+load_dotenv()
+
+BUILDUP_SWEEP_WORKERS = int(os.getenv('BUILDUP_SWEEP_WORKERS', str(min(4, os.cpu_count() or 1))))
+BUILDUP_SWEEP_CHUNK_SIZE = int(os.getenv('BUILDUP_SWEEP_CHUNK_SIZE', '5000'))
+BUILDUP_SWEEP_MAX_SCENARIOS = int(os.getenv('BUILDUP_SWEEP_MAX_SCENARIOS', '200000'))
+
+# Métricas exibidas no mapa de calor e na tabela: coluna do resultado -> rótulo
+SWEEP_METRICS = {
+    "percentage_of_ns": "Contribution Margin %",
+    "percentage_of_ns_ebit": "EBIT %",
+}
+
+_sweep_executor = ThreadPoolExecutor(max_workers=BUILDUP_SWEEP_WORKERS, thread_name_prefix="buildup-sweep")
+
+def _range_bounds(start, stop, steps):
+    start = float(start or 0)
+    stop = float(stop if stop is not None else start)
+    steps = max(int(steps or 1), 1)
+    return start, stop, steps
+
+def range_size(start, stop, steps):
+    """Quantidade de pontos de `value_range(start, stop, steps)`, sem montar a lista"""
+
+    start, stop, steps = _range_bounds(start, stop, steps)
+    return 1 if start == stop else steps
+
+def value_range(start, stop, steps):
+    """Valores igualmente espaçados de `start` a `stop` (inclusive), com `steps` pontos.
+
+    Os pontos vêm da tela: confira o tamanho da grade com `check_grid_size` e
+    `range_size` antes de chamar esta função.
+    """
+
+    start, stop, steps = _range_bounds(start, stop, steps)
+
+    if steps == 1 or start == stop:
+        return [start]
+
+    step = (stop - start) / (steps - 1)
+    return [start + step * index for index in range(steps - 1)] + [stop]
+
+def check_grid_size(buildup_codes, axis_sizes, max_scenarios=BUILDUP_SWEEP_MAX_SCENARIOS):
+    """
+    Confere o número de cenários da grade antes de montar qualquer eixo.
+
+    Args:
+        buildup_codes (list): Tipos de Build Up.
+        axis_sizes (list): Quantidade de valores de cada eixo.
+        max_scenarios (int): Limite de cenários da grade.
+
+    Returns:
+        int: Número de cenários.
+
+    Raises:
+        ValueError: Se a grade passar de `max_scenarios` cenários.
+    """
+
+    total = len(buildup_codes)
+    for size in axis_sizes:
+        total *= size
+    if total > max_scenarios:
+        raise ValueError(f"A grade tem {total} cenários; o limite é {max_scenarios}.")
+    return total
+
+def sweep_scenarios(buildup_codes, axes, base=None, max_scenarios=BUILDUP_SWEEP_MAX_SCENARIOS):
+    """
+    Monta a grade de cenários: todos os tipos de Build Up × todas as combinações dos eixos.
+
+    Args:
+        buildup_codes (list): Tipos de Build Up.
+        axes (list): Eixos da grade. Cada eixo é um dict coluna -> lista de valores; as
+            colunas de um mesmo eixo variam juntas (por exemplo currency e currency_rate).
+        base (dict, optional): Valores das entradas que não variam (padrão: SCENARIO_DEFAULTS).
+        max_scenarios (int): Limite de cenários da grade.
+
+    Returns:
+        polars.DataFrame: Um cenário por linha, pronto para `run_sweep`.
+
+    Raises:
+        ValueError: Se a grade passar de `max_scenarios` cenários.
+
+    Example:
+        >>> sweep_scenarios(["ACC CLC"], [{"price_zrsd026": [100, 200]}, {"icms_st": [0, 18]}])
+    """
+
+    check_grid_size(buildup_codes, [len(next(iter(axis.values()))) for axis in axes], max_scenarios)
+    axes = [pl.DataFrame(axis) for axis in axes]
+
+    base = {**SCENARIO_DEFAULTS, **(base or {})}
+    varying = {column for axis in axes for column in axis.columns}
+
+    grid = pl.DataFrame({"buildup_code": list(buildup_codes)}, schema={"buildup_code": pl.Utf8}).lazy()
+    for axis in axes:
+        grid = grid.join(axis.lazy(), how="cross")
+
+    return grid.with_columns([
+        pl.lit(value).alias(column)
+        for column, value in base.items()
+        if column not in varying
+    ]).collect()
+
+def run_sweep(factors, scenarios, chunk_size=BUILDUP_SWEEP_CHUNK_SIZE, executor=None):
+    """
+    Calcula o Build Up de todos os cenários, em lotes de `chunk_size` distribuídos no pool.
+
+    Returns:
+        polars.DataFrame: Resultado de `calculate_buildup`, na mesma ordem dos cenários.
+    """
+
+    if scenarios.height <= chunk_size:
+        return calculate_buildup(factors, scenarios)
+
+    chunks = [scenarios.slice(offset, chunk_size) for offset in range(0, scenarios.height, chunk_size)]
+    results = (executor or _sweep_executor).map(lambda chunk: calculate_buildup(factors, chunk), chunks)
+
+    return pl.concat(list(results), how="vertical")
+
+def sweep_table(result, columns):
+    """Colunas dos cenários (`columns`) e das métricas de SWEEP_METRICS, para exibir na tabela"""
+
+    return result.select(
+        [column for column in ["buildup_code", *columns] if column in result.columns]
+        + list(SWEEP_METRICS)
+    )
+
+def heatmap_matrix(result, x, y, metric, filters=None):
+    """
+    Valores de `metric` em uma grade `y` × `x`, para o mapa de calor.
+
+    Args:
+        result (polars.DataFrame): Resultado de `run_sweep` (ou de `sweep_table`).
+        x (str): Coluna do eixo horizontal.
+        y (str): Coluna do eixo vertical.
+        metric (str): Coluna de SWEEP_METRICS.
+        filters (dict, optional): coluna -> valor para fixar as demais dimensões
+            (por exemplo buildup_code e currency). Combinações repetidas usam a média.
+
+    Returns:
+        tuple: (valores de x, valores de y, matriz [linha por y][coluna por x]).
+    """
+
+    for column, value in (filters or {}).items():
+        if value is not None and column in result.columns:
+            result = result.filter(pl.col(column) == value)
+
+    grouped = result.group_by([y, x]).agg(pl.col(metric).mean())
+    x_values = sorted(grouped[x].unique().to_list())
+    y_values = sorted(grouped[y].unique().to_list())
+
+    cells = {(row[y], row[x]): row[metric] for row in grouped.iter_rows(named=True)}
+    matrix = [[cells.get((y_value, x_value)) for x_value in x_values] for y_value in y_values]
+
+    return x_values, y_values, matrix
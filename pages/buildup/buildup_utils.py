@@ -1,5 +1,5 @@
 import polars as pl
-from api.get_initial_data_configs import get_initial_data_configs
+from bisect import bisect_right
 from copy import deepcopy
 
 def get_month_from_quarter(quarter):
@@ -12,52 +12,118 @@ def get_month_from_quarter(quarter):
 
     return quarter_to_months.get(quarter, "Trimestre inválido")
 
-def fetch_tax_rates(table_currency, currency_code, month, year):
-    year = int(year)
-    month = int(month)
-
-    mask = (
-        (table_currency["TOCURRENCY"].astype(str).str.strip() == currency_code) & 
-        (table_currency["RATEYEAR"].astype(int) == year) & 
-        (table_currency["RATEMONTH"].astype(int) == month)
-    )
-
-    filtered_df = table_currency[mask]
-
-    if filtered_df.empty:
-        raise ValueError(f"No exchange rate found for {currency_code} in year {year}, month {month}")
+class FxRates:
+    """
+    Índice das taxas de câmbio da mpg_fx_actuals: (moeda, ano, mês) -> taxa.
 
-    rate = filtered_df["RATE"].iloc[0]
+    A tabela é normalizada uma única vez (moeda sem espaços, ano e mês inteiros),
+    então cada consulta é um acesso ao dicionário, em vez de filtrar a tabela toda.
+    As taxas são de USD para a moeda (TOCURRENCY); conversões entre outras moedas
+    passam pelo USD.
 
-    return float(rate) if rate is not None else rate
+    Args:
+        table_currency (pandas.DataFrame): Tabela com TOCURRENCY, RATEYEAR, RATEMONTH e RATE.
+    """
 
-def get_tax_rates(table_currency, currency_selected, month, year):
+    def __init__(self, table_currency):
+        self._rates = {}
+        self._periods = {}
+
+        codes = table_currency["TOCURRENCY"].astype(str).str.strip()
+        years = table_currency["RATEYEAR"].astype(int)
+        months = table_currency["RATEMONTH"].astype(int)
+
+        for code, year, month, rate in zip(codes, years, months, table_currency["RATE"]):
+            # Mantém a primeira linha de cada período, como o filtro anterior (iloc[0])
+            key = (code, int(year), int(month))
+            if key not in self._rates:
+                self._rates[key] = float(rate) if rate is not None else rate
+                self._periods.setdefault(code, []).append((int(year), int(month)))
+
+        for periods in self._periods.values():
+            periods.sort()
+
+    def years(self):
+        """Anos com alguma taxa disponível"""
+        return sorted({year for periods in self._periods.values() for year, _ in periods})
+
+    def latest_period(self, currency_code, month=None, year=None):
+        """
+        Período (ano, mês) mais recente com taxa para a moeda.
+
+        Se ano e mês forem informados, retorna o mais recente até esse período (ou o
+        mais recente disponível, se todos forem posteriores). Retorna None se a moeda não existir.
+        """
+        periods = self._periods.get(currency_code)
+        if not periods:
+            return None
+        if year is None or month is None:
+            return periods[-1]
+
+        position = bisect_right(periods, (int(year), int(month)))
+        return periods[position - 1] if position else periods[-1]
+
+    def rate(self, currency_code, month, year, fallback_to_latest=False):
+        """
+        Taxa de USD para `currency_code` no mês/ano.
+
+        Args:
+            fallback_to_latest (bool): Se não houver taxa no período, usa o mês mais
+                recente disponível até ele (veja `latest_period`) em vez de gerar erro.
+
+        Raises:
+            ValueError: Se não houver taxa para o período (e o fallback estiver desligado ou não encontrar nada).
+        """
+        key = (currency_code, int(year), int(month))
+        if key in self._rates:
+            return self._rates[key]
+
+        if fallback_to_latest:
+            period = self.latest_period(currency_code, month, year)
+            if period is not None:
+                print(f"Câmbio de {currency_code} indisponível em {int(month)}/{int(year)}: usando {period[1]}/{period[0]}")
+                return self._rates[(currency_code, *period)]
+
+        raise ValueError(f"No exchange rate found for {currency_code} in year {int(year)}, month {int(month)}")
+
+    def cross_rate(self, from_currency, to_currency, month, year, fallback_to_latest=False):
+        """
+        Taxa para converter `from_currency` em `to_currency`, passando pelo USD.
+
+        Example:
+            >>> fx.cross_rate("BRL", "JPY", month=1, year=2025)  # (USD -> JPY) / (USD -> BRL)
+        """
+        def usd_rate(currency_code):
+            if currency_code == "USD" and currency_code not in self._periods:
+                return 1.0
+            return self.rate(currency_code, month, year, fallback_to_latest)
+
+        return usd_rate(to_currency) / usd_rate(from_currency)
+
+def get_tax_rates(table_currency, currency_selected, month, year, fallback_to_latest=False):
     """
     Converte taxas de câmbio com base na moeda selecionada e período específico.
     Aqui faço uma "conversão" de moeda. Na aplicação os valores são em reais, mas na tabela de fx os valores são em dólares.
 
-    :param table_currency: DataFrame contendo as taxas de câmbio.
+    :param table_currency: FxRates (ou DataFrame com as taxas de câmbio, indexado a cada chamada).
     :param currency_selected: Moeda de destino ("BRL", "USD", "JPY").
-    :param quarter: Trimestre para filtrar as taxas.
+    :param month: Mês para filtrar as taxas.
     :param year: Ano para filtrar as taxas.
+    :param fallback_to_latest: Usa o mês mais recente disponível se o período não tiver taxa.
     :return: Taxa de conversão.
     """
 
-    currency_code = None
+    fx_rates = table_currency if isinstance(table_currency, FxRates) else FxRates(table_currency)
     currency_rate = None  # Evita problemas caso não seja atualizado
 
     if currency_selected == "BRL":
-        currency_code = "USD"
-        currency_rate = fetch_tax_rates(table_currency, currency_code, month, year)
+        currency_rate = fx_rates.rate("USD", month, year, fallback_to_latest)
 
     elif currency_selected == "USD":
-        currency_code = "BRL"
-        currency_rate = fetch_tax_rates(table_currency, currency_code, month, year)
+        currency_rate = fx_rates.rate("BRL", month, year, fallback_to_latest)
 
     elif currency_selected == "JPY":
-        currency_rate_USD_to_BRL = fetch_tax_rates(table_currency, currency_code="BRL", month=month, year=year)
-        currency_rate_USD_to_JPY = fetch_tax_rates(table_currency, currency_code="JPY", month=month, year=year)
-        currency_rate = currency_rate_USD_to_JPY / currency_rate_USD_to_BRL
+        currency_rate = fx_rates.cross_rate("BRL", "JPY", month, year, fallback_to_latest)
 
     return currency_rate
 
@@ -154,18 +220,19 @@ def reverse_raw_dataframe(df):
 
     return result
 
-def merge_with_original_data(reversed_df):
+def merge_with_original_data(reversed_df, original_data):
     """
-    Combina o DataFrame revertido com as colunas originais do get_initial_data_configs.
+    Combina o DataFrame revertido com as colunas originais da tabela de Build Up.
     Mantém os dados do reversed_df e adiciona apenas as colunas que existem somente na original_data.
     
     Args:
         reversed_df (polars.DataFrame): DataFrame resultado da função reverse_raw_dataframe
+        original_data (polars.DataFrame): Tabela de Build Up como vem do banco, a mesma
+            carga usada para montar a tabela da página (buildup_factors.get())
         
     Returns:
         polars.DataFrame: DataFrame com dados do reversed_df mais as colunas exclusivas do original_data
     """
-    original_data = get_initial_data_configs(process_name="buildup")
     # Converte para polars se necessário
     # if not isinstance(original_data, pl.DataFrame):
     #     original_data = pl.from_pandas(original_data)
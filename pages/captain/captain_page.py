@@ -3,9 +3,11 @@ import dash
 import dash_bootstrap_components as dbc
 import dash_ag_grid as dag
 from components.Card import Card
+from components.Toast import Toast
 from api.get_initial_data_configs import get_initial_data_configs
 from api.api_post_captain_variables import post_captain_variables
-from utils.serialize_to_json import serialize_to_json
+from background_jobs import background_job_options, wait_with_progress
+from session_store import session_store
 from utils.handle_data import handle_data
 from static_data.helper_text import helper_text
 from components.Helper_button_with_modal import create_help_button_with_modal
@@ -160,6 +162,7 @@ def get_layout(pathname, user_data):
     )
 
     return [
+        Toast(id="toast-captain-simulation", header=_("Simulação")),
         header,
         action_buttons,
         total_cards,
@@ -210,28 +213,29 @@ def validate_inputs(input1, input2, input3):
         # return "A soma das variáveis deve ser de 100%"
         return
 
-# Callback para controlar a visibilidade do spinner do botão
-@callback(
-    Output("button-simulate-captain-spinner", "spinner_style"),
-    Input("button-simulate-captain", "n_clicks"),
-    prevent_initial_call=True,
-)
-def toggle_button_spinner(n_clicks):
-    if n_clicks:
-        return {"display": "inline-block", "marginLeft": "5px"}
-    return {"display": "none"}
-
-# Callback para ao clicar no botão enviar as variáveis para o back-end e redirecionamento para a página de simulação
+# Callback para ao clicar no botão enviar as variáveis para o back-end e redirecionamento para a página de simulação.
+# Roda em segundo plano; enquanto o notebook executa, o spinner do botão fica visível e o botão desabilitado.
 @callback(
     Output("url", "pathname", allow_duplicate=True),
     Output("captain-variables-store", "data"),
+    Output("toast-captain-simulation", "is_open"),
+    Output("toast-captain-simulation", "header"),
+    Output("toast-captain-simulation", "children"),
     Input("button-simulate-captain", "n_clicks"),
-    Input("input-revenue", "value"),
-    Input("input-volume", "value"),
-    Input("input-market-share", "value"),
+    State("input-revenue", "value"),
+    State("input-volume", "value"),
+    State("input-market-share", "value"),
+    State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options(
+        "toast-captain-simulation",
+        running=[
+            (Output("button-simulate-captain-spinner", "spinner_style"), {"display": "inline-block", "marginLeft": "5px"}, {"display": "none"}),
+            (Output("button-simulate-captain", "disabled"), True, False),
+        ],
+    ),
 )
-def redirect_to_simulation(n_clicks, revenue, volume, market_share):
+def redirect_to_simulation(set_progress, n_clicks, revenue, volume, market_share, user_data):
 
     if n_clicks:
 
@@ -242,7 +246,7 @@ def redirect_to_simulation(n_clicks, revenue, volume, market_share):
             'fator_penetracao': int(float(market_share))  / 100,
         }]
 
-        variables_to_store = serialize_to_json({
+        variables_to_store = session_store.put({
             'fator_gsales': int(float(revenue)) / 100,
             'fator_qtd_faturada': int(float(volume))  / 100,
             'fator_penetracao': int(float(market_share))  / 100,
@@ -250,13 +254,14 @@ def redirect_to_simulation(n_clicks, revenue, volume, market_share):
 
         print("variables_to_store", variables_to_store)
 
-        success = post_captain_variables(data_variables=variables)
+        job_run = post_captain_variables(data_variables=variables, wait=False)
+        success = wait_with_progress(job_run, set_progress, _("Simulação"), _("Executando simulação..."), user_data)
 
         if success:
             print("success", success)
-            return "/captain-simulation", variables_to_store
+            return "/captain-simulation", variables_to_store, dash.no_update, dash.no_update, dash.no_update
         else:
             print("error")
-            return dash.no_update, dash.no_update
+            return dash.no_update, dash.no_update, True, _("Erro"), _("Erro ao executar a simulação")
     
-    return dash.no_update, dash.no_update
+    return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
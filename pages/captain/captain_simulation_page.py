@@ -6,13 +6,13 @@ from dash import Input, Output, callback, State, html, ctx, no_update, dcc
 from components.Card import Card
 from components.Toast import Toast
 from components.Modal import create_modal
-from pages.approvals.approval_utils import container_approval_reject_buttons
-from api.get_requests_for_approval import get_requests_for_approval
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
 from api.api_get_captain_simulation import get_captain_simulation
 from api.send_to_approval import send_to_approval
 from api.update_approval_status import update_approval_status
+from background_jobs import background_job_options, wait_with_progress
 from utils.handle_data import handle_data
-from utils.deserialize_json import deserialize_json
+from session_store import session_store
 from utils.handle_nothing_to_approve import handle_nothing_to_approve
 from utils.handle_no_data_to_show import handle_no_data_to_show
 from static_data.helper_text import helper_text
@@ -89,9 +89,9 @@ helper_button = html.Div(
 )
 
 
-def get_layout(pathname):
+def get_layout(pathname, approval_tab=None):
 
-    table_data = get_requests_for_approval(table="captain") if pathname == "/approval" else get_simulation_data()
+    table_data = get_approval_requests("captain", approval_tab) if pathname == "/approval" else get_simulation_data()
     formated_data = handle_data(table_data, decimal_places=2, date_format='%m-%d-%y')
 
     table = handle_no_data_to_show(table_data.get("error")) if table_data.get("error") else dag.AgGrid(
@@ -198,14 +198,15 @@ captain_simulation_page = html.Div([
     Input("url", "pathname"),
     Input("store-token", "data"),
     Input("store-language", "data"),
+    Input("approval-tab-store", "data"),
 )
-def update_simulation_content(pathname, user_data, language):
+def update_simulation_content(pathname, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
-    if pathname in ["/captain-simulation", "/approval"]:
-        return get_layout(pathname)
+    if pathname == "/captain-simulation" or (pathname == "/approval" and render_approval_tab(approval_tab, "captain")):
+        return get_layout(pathname, approval_tab=approval_tab)
     return no_update
 
 # Callback para baixar a tabela em Excel
@@ -257,7 +258,7 @@ def update_approve_change(cellValueChanged, rowData):
 )
 def get_stored_variables(data):
 
-    stored_variables = deserialize_json(data)
+    stored_variables = session_store.get(data) or {}
 
     revenue = html.Div(stored_variables.get("fator_gsales", 0) * 100, style=CAPTAIN_CARD_INSIDE_STYLE)
     volume = html.Div(stored_variables.get("fator_qtd_faturada", 0) * 100, style=CAPTAIN_CARD_INSIDE_STYLE)
@@ -327,18 +328,21 @@ def open_confirm_approval_modal(n_clicks):
 @callback(
     Output("modal-confirm-approval-captain", "is_open", allow_duplicate=True),
     Output("toast-approval-captain", "is_open", allow_duplicate=True),
+    Output("toast-approval-captain", "header", allow_duplicate=True),
+    Output("toast-approval-captain", "children", allow_duplicate=True),
     Input("btn-confirm-approval", "n_clicks"),
     Input("btn-cancel-approval", "n_clicks"),
     State("table-simulation-captain", "rowData"),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-captain", running=[(Output("modal-confirm-approval-captain", "is_open"), False, False)]),
 )
-def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
+def handle_send_approval(set_progress, confirm_clicks, cancel_clicks, table_data, user_data):
     triggered_id = ctx.triggered_id
 
     # Se for cancelamento, não abre o toast
     if triggered_id == "btn-cancel-approval" and cancel_clicks:
-        return False, False
+        return False, False, no_update, no_update
 
     if triggered_id == "btn-confirm-approval" and confirm_clicks:
 
@@ -363,10 +367,14 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
             ],
         }
 
-        send_to_approval("captain", variables_to_send)
+        job_run = send_to_approval("captain", variables_to_send, wait=False)
+        success = wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data)
 
-        return False, True
-    return False, False
+        if not success:
+            return False, True, _("Erro"), _("Erro ao enviar para aprovação")
+
+        return False, True, _("Aprovação"), _("Enviado para aprovação")
+    return False, False, no_update, no_update
 
 # Callback para aprovação/rejeição
 @callback(
@@ -378,9 +386,10 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
     Input("button-approval-reject-captain", "n_clicks"),
     State("table-simulation-captain", "rowData"),
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-captain-simulation"),
 )
-def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
+def handle_approval(set_progress, accept_clicks, reject_clicks, table_data, user_data):
 
     if accept_clicks > 0 or reject_clicks > 0:
         print("handle_approval")
@@ -405,9 +414,10 @@ def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
                 "target_table": "captain",
             }
 
-            is_true = update_approval_status(variables_to_send)
+            job_run = update_approval_status(variables_to_send, wait=False)
+            is_true = wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data)
 
-            refetch_table = get_requests_for_approval(table="captain") if is_true is True else None
+            refetch_table = get_approval_requests("captain") if is_true is True else None
 
             new_content = handle_nothing_to_approve() if refetch_table is None else refetch_table
 
@@ -4,9 +4,9 @@ import dash_bootstrap_components as dbc
 from dash import html, callback, Input, Output, State, no_update, ctx
 from api.get_initial_data_configs import get_initial_data_configs
 from api.send_to_approval import send_to_approval
-from api.get_requests_for_approval import get_requests_for_approval
 from api.update_approval_status import update_approval_status
-from pages.approvals.approval_utils import container_approval_reject_buttons
+from background_jobs import background_job_options, wait_with_progress
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
 from components.Helper_button_with_modal import create_help_button_with_modal
 from components.Toast import Toast
 from components.Modal import create_modal
@@ -110,6 +110,12 @@ def create_approval_buttons(pathname, user_data):
         )
 
 
+# Colunas de d_par_margem_cap usadas pelo pivot (create_mg_columns)
+CAPTAIN_MARGIN_FIELDS = ["cpc1_3_6", "buildup_type", "marca", "mg_min", "mg_max"]
+
+# Colunas trazidas na aba de aprovação (também usadas na pré-busca da aba)
+APPROVAL_FIELDS = CAPTAIN_MARGIN_FIELDS + ["status", "uuid_alteracoes"]
+
 def create_mg_columns(df):
     df_pivot = df.pivot_table(
         index=['cpc1_3_6', 'buildup_type'],
@@ -138,11 +144,15 @@ helper_button = html.Div(
     ), style=CONTAINER_HELPER_BUTTON_STYLE,
 )
 
-def get_layout(pathname, user_data):
+def get_layout(pathname, user_data, approval_tab=None):
 
     cpc = user_data.get('cpc1_3_6_list')
 
-    table_data = get_requests_for_approval(table="captain_margin") if pathname == "/approval" else get_initial_data_configs(process_name="captain_margin", cpc=cpc)
+    table_data = (
+        get_approval_requests("captain_margin", approval_tab, columns=APPROVAL_FIELDS)
+        if pathname == "/approval"
+        else get_initial_data_configs(process_name="captain_margin", cpc=cpc, columns=CAPTAIN_MARGIN_FIELDS)
+    )
 
     formated_table = None
     none_table = None
@@ -231,15 +241,16 @@ captain_margin_page = html.Div([
         Input("url", "pathname"),
         Input("store-token", "data"),
         Input("store-language", "data"),
+        Input("approval-tab-store", "data"),
     ],
 )
-def update_captain_margin_content(pathname, user_data, language):
+def update_captain_margin_content(pathname, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
-    if pathname in ["/captain-margin", "/approval"]:
-        return get_layout(pathname, user_data)
+    if pathname == "/captain-margin" or (pathname == "/approval" and render_approval_tab(approval_tab, "captain_margin")):
+        return get_layout(pathname, user_data, approval_tab=approval_tab)
     return no_update
 
 # Callback para atualizar a tabela e habilitar botão de aprovação
@@ -279,17 +290,20 @@ def open_confirm_approval_modal(n_clicks):
 @callback(
     Output("modal-confirm-approval-captain-margin", "is_open", allow_duplicate=True),
     Output("toast-approval-captain-margin", "is_open", allow_duplicate=True),
+    Output("toast-approval-captain-margin", "header", allow_duplicate=True),
+    Output("toast-approval-captain-margin", "children", allow_duplicate=True),
     Input("btn-confirm-approval","n_clicks"),
     Input("btn-cancel-approval","n_clicks"),
     State("table-captain-margin", "rowData"),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-captain-margin", running=[(Output("modal-confirm-approval-captain-margin", "is_open"), False, False)]),
 )
-def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
+def handle_send_approval(set_progress, confirm_clicks, cancel_clicks, table_data, user_data):
     triggered_id = ctx.triggered_id
 
     if triggered_id == "btn-cancel-approval" and cancel_clicks:
-        return False, False
+        return False, False, no_update, no_update
 
     if triggered_id == "btn-confirm-approval" and confirm_clicks:
 
@@ -300,10 +314,14 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
             "user_token": user_data["access_token"],
             "table_data": filtered_df,
         }
-        send_to_approval("captain_margin", variables_to_send)
+        job_run = send_to_approval("captain_margin", variables_to_send, wait=False)
+        success = wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data)
     
-        return False, True
-    return False, False
+        if not success:
+            return False, True, _("Erro"), _("Erro ao enviar para aprovação")
+
+        return False, True, _("Aprovação"), _("Enviado para aprovação")
+    return False, False, no_update, no_update
 
 def transform_filtered_data(filtered_df):
     """
@@ -336,9 +354,10 @@ def transform_filtered_data(filtered_df):
     Input("button-approval-reject-captain-margin", "n_clicks"),
     State("table-captain-margin", "rowData"),
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-reject-captain-margin"),
 )
-def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
+def handle_approval(set_progress, accept_clicks, reject_clicks, table_data, user_data):
     if not ctx.triggered_id:
         return no_update
 
@@ -361,7 +380,10 @@ def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
             "target_table": "captain_margin",
         }
 
-        update_approval_status(variables_to_send)
+        job_run = update_approval_status(variables_to_send, wait=False)
+        if not wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data):
+            return True, _("Erro"), _("Erro ao processar aprovação")
+
         return True, f"{status_text}", f"Status alterado para {status_text}"
 
     except Exception as e:
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 from dash import dcc, html, callback, Input, Output, State, no_update
 from dash.exceptions import PreventUpdate
 from dash.dash_table import DataTable
-from utils.serialize_to_json import serialize_to_json
+from session_store import session_store
 from api.api_get_catlote import get_catlote
 from static_data.helper_text import helper_text
 from utils.user_has_permission_to_edit import user_has_permission_to_edit
@@ -386,7 +386,7 @@ def store_catlote_values(selected_rows, table_data, n_clicks):
         table_with_converted_data = convert_columns_to_numeric(df)
         selected_catlotes = [table_with_converted_data.loc[row].to_dict() for row in selected_rows]
 
-        return serialize_to_json(selected_catlotes)
+        return session_store.put(selected_catlotes)
     return no_update
 
 # Callback para redirecionar para a pagina de simulacao
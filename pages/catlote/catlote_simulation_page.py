@@ -1,4 +1,5 @@
 import ast
+from datetime import datetime, timezone
 from dash import Dash, dcc, html, callback, State, Input, Output, dash_table, no_update, ALL, MATCH, callback_context, ctx
 from dash.exceptions import PreventUpdate
 import dash_ag_grid as dag
@@ -8,21 +9,28 @@ from components.Card import Card
 from components.Helper_button_with_modal import create_help_button_with_modal
 from components.Toast import Toast
 from components.Modal import create_modal
-from pages.approvals.approval_utils import container_approval_reject_buttons
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
 from pages.catlote.catlote_utils import (
     calculate_catlote,
+    calculate_catlote_slice,
     calculate_totals,
+    catlote_change_base,
+    changed_catlote_rows,
+    calculate_totals_by_catlote,
+    combine_totals,
+    get_catlote_id_from_index,
     get_catlote_ids,
     update_property,
     generate_code_string,
     get_unique_values,
 )
 from api.api_get_catlote_sim import get_catlote_sim
-from api.get_requests_for_approval import get_requests_for_approval
 from api.send_to_approval import send_to_approval
 from api.update_approval_status import update_approval_status
-from utils.deserialize_json import deserialize_json
+from background_jobs import background_job_options, wait_with_progress
+from session_store import session_store
 from utils.user_has_permission_to_edit import user_has_permission_to_edit
+from utils.handle_no_data_to_show import handle_no_data_to_show
 from utils.handle_nothing_to_approve import handle_nothing_to_approve
 from static_data.helper_text import helper_text
 from styles import (
@@ -68,6 +76,13 @@ SUBTITLE = {
     "fontWeight": "bold",
 }
 
+# Um produto é identificado pelo catlote + peça
+ROW_ID_GETTER = "params.data.CATLOTE_1 + '-' + params.data.PECA"
+
+def get_row_ids(df):
+    """Mesmo identificador de ROW_ID_GETTER para todas as linhas, calculado no servidor"""
+    return df["CATLOTE_1"].astype(str) + "-" + df["PECA"].astype(str)
+
 def COLUMNS():
     return [
         {"headerName": _("Peça"), "field": "PECA"},
@@ -440,19 +455,21 @@ def toggle_collapse(n_clicks, is_open):
         return not is_open
     return is_open
 
-def get_layout(pathname, user_data, stored_data=None):
+def get_layout(pathname, user_data, stored_data=None, approval_tab=None):
 
     if pathname == "/approval":
-        table_data = get_requests_for_approval(table="catlote")
+        table_data = get_approval_requests("catlote", approval_tab)
         catlote_data = None
     else:
-        if isinstance(stored_data, str):
-            catlote_data = deserialize_json(stored_data)
-            print("catlote_data", catlote_data)
-        else:
-            catlote_data = stored_data
+        catlote_data = session_store.get(stored_data)
+        print("catlote_data", catlote_data)
+
+        if not catlote_data:
+            return handle_no_data_to_show(_("Os catlotes selecionados não estão mais disponíveis. Selecione-os novamente."))
 
         catlotes_id = get_catlote_ids(catlote_data)
+        # Versão da base enviada com o conjunto de alterações (ver api.approval_payload)
+        base_version = datetime.now(timezone.utc).isoformat()
         products_data = get_catlote_sim(catlote_filter=catlotes_id)
 
         calculated_data = calculate_catlote(
@@ -516,6 +533,28 @@ def get_layout(pathname, user_data, stored_data=None):
         style={"marginBottom": "2rem"}
     )
 
+    # Totais parciais por catlote: uma alteração recalcula apenas o parcial do catlote alterado
+    totals_store = dcc.Store(
+        id="catlote-totals-store",
+        data=None if pathname == "/approval" else calculate_totals_by_catlote(table_data),
+    )
+
+    # A tabela de trabalho fica no servidor; os callbacks recebem apenas o handle
+    table_handle = dcc.Store(
+        id="catlote-table-handle",
+        data=None if pathname == "/approval" else session_store.put(table_data.reset_index(drop=True)),
+    )
+
+    # Valores buscados ao abrir a simulação: apenas os produtos alterados vão para aprovação
+    change_base_handle = dcc.Store(
+        id="catlote-change-base-handle",
+        data=None if pathname == "/approval" else {
+            **session_store.put(catlote_change_base(table_data, catlote_data)),
+            "base_version": base_version,
+            "base_filter": {"CATLOTE_1": catlotes_id},
+        },
+    )
+
     discount_editor = None if pathname == "/approval" else create_discount_editor(catlote_data)
 
     table = html.Div([
@@ -541,6 +580,8 @@ def get_layout(pathname, user_data, stored_data=None):
             id='table-simulation-catlote',
             rowData=table_data.to_dict("records"),
             columnDefs=COLUMNS_APPROVAL() if pathname == "/approval" else COLUMNS(),
+            # Identificador estável das linhas, usado nas atualizações parciais (rowTransaction)
+            getRowId=None if pathname == "/approval" else ROW_ID_GETTER,
             defaultColDef={
                 "sortable": True,
                 "filter": 'agTextColumnFilter',
@@ -572,7 +613,7 @@ def get_layout(pathname, user_data, stored_data=None):
     ], id="table-container", style={"marginTop": "1rem"})
 
     layout_page = html.Div(
-        children=[header, buttons, cards, discount_editor, table],
+        children=[header, buttons, cards, totals_store, table_handle, change_base_handle, discount_editor, table],
         style={"padding": "20px"}
     )
 
@@ -595,31 +636,35 @@ catlote_simulation_page = html.Div([
     State("catlote-variables-store", "data"),
     State("store-token", "data"),
     Input("store-language", "data"),
+    Input("approval-tab-store", "data"),
 )
-def update_catlote_content(pathname, stored_data, user_data, language):
+def update_catlote_content(pathname, stored_data, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
     if pathname == "/catlote-simulation":
         return get_layout(pathname, user_data, stored_data)
-    if pathname == "/approval":
-        return get_layout(pathname, user_data)
+    if pathname == "/approval" and render_approval_tab(approval_tab, "catlote"):
+        return get_layout(pathname, user_data, approval_tab=approval_tab)
     return no_update
 
 # Callback para recalcular quando os descontos ou participações são alterados
 @callback(
-    Output('table-simulation-catlote', 'rowData', allow_duplicate=True),
+    Output('table-simulation-catlote', 'rowTransaction', allow_duplicate=True),
     Output('cards-catlote-container', 'children', allow_duplicate=True),
     Output("catlote-variables-store", "data", allow_duplicate=True),
+    Output("catlote-totals-store", "data", allow_duplicate=True),
+    Output("catlote-table-handle", "data", allow_duplicate=True),
     Input({'type': 'discount-input', 'index': ALL}, 'value'),
     Input({'type': 'participation-input', 'index': ALL}, 'value'),
-    State('table-simulation-catlote', 'rowData'),
+    State("catlote-table-handle", "data"),
     State("catlote-variables-store", "data"),
+    State("catlote-totals-store", "data"),
     prevent_initial_call=True,
     # background=False
 )
-def update_simulation_with_changes(discount_values, participation_values, table_data, stored_data):
+def update_simulation_with_changes(discount_values, participation_values, table_handle, stored_data, totals_by_catlote):
 
     if not callback_context.triggered:
         raise PreventUpdate
@@ -632,30 +677,40 @@ def update_simulation_with_changes(discount_values, participation_values, table_
         triggered_id = ast.literal_eval(triggered_id)
         field_value = float(triggered_value or 0)
 
-        if isinstance(stored_data, str):
-            new_stored_data = deserialize_json(stored_data)
-            print("new_stored_data", new_stored_data)
-        else:
-            new_stored_data = stored_data
+        catlote_data = session_store.get(stored_data)
+        table_data = session_store.get(table_handle)
+        if catlote_data is None or table_data is None:
+            raise PreventUpdate
 
+        # Apenas os produtos do catlote alterado são recalculados
+        catlote_id = get_catlote_id_from_index(triggered_id['index'])
         property_name = generate_code_string(triggered_id['index'], triggered_id['type'])
-        updated_stored_data = update_property(new_stored_data, property_name, field_value)
-    
-        calculated_data = calculate_catlote(
+        updated_stored_data = update_property(catlote_data, property_name, field_value, catlote_id)
+
+        calculated_data = calculate_catlote_slice(
             catlote_inputs=updated_stored_data,
-            catlote_data_products=table_data
+            catlote_data_products=table_data,
+            catlote_id=catlote_id,
+            totals_by_catlote=totals_by_catlote,
         )
 
-        result_data = calculated_data["table"].to_dict("records")
-        result_totals = calculated_data["totals"]
+        print(f"Catlote {catlote_id}: {len(calculated_data['rows'])} produtos recalculados")
 
-        return result_data, create_cards(result_totals), new_stored_data
+        stored_data = session_store.put(updated_stored_data, handle=stored_data["handle"])
+        table_handle = session_store.put(calculated_data["table"], handle=table_handle["handle"])
 
+        # A tabela recebe apenas as linhas alteradas
+        row_transaction = {"update": calculated_data["rows"]}
+
+        return row_transaction, create_cards(calculated_data["totals"]), stored_data, calculated_data["totals_by_catlote"], table_handle
+
+    except PreventUpdate:
+        raise
     except Exception as e:
         print(f"Erro ao atualizar simulação: {e}")
         import traceback
         traceback.print_exc()
-        return no_update, no_update
+        return no_update, no_update, no_update, no_update, no_update
 
 # Atualiza os cards quando os dados são filtrados
 # @callback(
@@ -789,46 +844,59 @@ def handle_excel_download_catlote(n_clicks, row_data):
 
     return dcc.send_data_frame(df.to_excel, "catlote_simulation_data.xlsx", index=False)
 
-# Callback para recalcular a tabela
+# Callback para recalcular a linha editada na tabela
 @callback(
-    Output('table-simulation-catlote', 'rowData', allow_duplicate=True),
+    Output('table-simulation-catlote', 'rowTransaction', allow_duplicate=True),
     Output('cards-catlote-container', 'children', allow_duplicate=True),
-    State("catlote-variables-store", "data"),
+    Output("catlote-totals-store", "data", allow_duplicate=True),
+    Output("catlote-table-handle", "data", allow_duplicate=True),
     Input('table-simulation-catlote', 'cellValueChanged'),
-    Input('table-simulation-catlote', 'rowData'),
+    State("catlote-variables-store", "data"),
+    State("catlote-table-handle", "data"),
+    State("catlote-totals-store", "data"),
     prevent_initial_call=True
 )
-def handle_recalculate(stored_data, cellValueChanged,  table_data):
-
-    if cellValueChanged:
-        # print("Cell value changed:", cellValueChanged)
-        # print("Cell value changed:", cellValueChanged[0]["oldValue"])
-        # print("Cell value changed:", cellValueChanged[0]["value"])
-        # print("Cell value changed:", cellValueChanged[0]["colId"])
-
-        # print("Cell value changed:", cellValueChanged[0]["rowId"])
-        # print("Cell value changed:", cellValueChanged[0]["rowIndex"])
-
-        new_values = {
-            "new_value": cellValueChanged[0]["value"],
-            "old_value": cellValueChanged[0]["oldValue"],
-            "changed_col_name": cellValueChanged[0]["colId"],
-            "row_index": cellValueChanged[0]["rowIndex"]
-        }
+def handle_recalculate(cellValueChanged, stored_data, table_handle, totals_by_catlote):
 
-        if isinstance(stored_data, str):
-            stored_data_ajusted = deserialize_json(stored_data)
-        else:
-            stored_data_ajusted = stored_data
+    table_data = session_store.get(table_handle)
+    if not cellValueChanged or table_data is None or table_data.empty:
+        raise PreventUpdate
 
-        calculated_data = calculate_catlote(
-            catlote_inputs=stored_data_ajusted,
-            catlote_data_products=table_data,
-            new_values=new_values,
-        )
+    changed_cell = cellValueChanged[0]
 
-        return calculated_data['table'].to_dict('records'), create_cards(calculated_data["totals"])
-    return no_update
+    # Localiza a linha pelo identificador (o rowIndex muda com ordenação e filtros)
+    row_ids = get_row_ids(table_data)
+    matches = row_ids.index[row_ids == changed_cell.get("rowId")]
+    row_index = matches[0] if len(matches) else changed_cell["rowIndex"]
+
+    new_values = {
+        "new_value": changed_cell["value"],
+        "old_value": changed_cell["oldValue"],
+        "changed_col_name": changed_cell["colId"],
+        "row_index": 0
+    }
+
+    calculated_data = calculate_catlote(
+        catlote_inputs=session_store.get(stored_data),
+        catlote_data_products=table_data.loc[[row_index]].reset_index(drop=True),
+        new_values=new_values,
+    )
+    updated_row = calculated_data['table'].to_dict('records')[0]
+
+    # Atualiza a linha na tabela do servidor e apenas o total parcial do catlote dela
+    table_data = table_data.copy()
+    table_data.loc[row_index, list(updated_row)] = list(updated_row.values())
+    catlote_id = str(updated_row.get("CATLOTE_1"))
+    catlote_products = table_data[table_data["CATLOTE_1"].astype(str) == catlote_id]
+
+    totals_by_catlote = {
+        **(totals_by_catlote or calculate_totals_by_catlote(table_data)),
+        **calculate_totals_by_catlote(catlote_products),
+    }
+
+    table_handle = session_store.put(table_data, handle=table_handle["handle"])
+
+    return {"update": [updated_row]}, create_cards(combine_totals(totals_by_catlote)), totals_by_catlote, table_handle
 
 # Callback para abrir/fechar o modal de confirmação
 @callback(
@@ -853,21 +921,45 @@ def toggle_approval_modal(approval_clicks, cancel_clicks, is_open):
     Output("toast-approval-catlote", "header", allow_duplicate=True),
     Output("toast-approval-catlote", "children", allow_duplicate=True),
     Input('btn-confirm-approval', 'n_clicks'),
-    State('table-simulation-catlote', 'rowData'),
+    State("catlote-table-handle", "data"),
+    State("catlote-variables-store", "data"),
+    State("catlote-change-base-handle", "data"),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-catlote", running=[(Output("modal-confirm-approval-catlote", "is_open"), False, False)]),
 )
-def handle_approval(n_clicks, table_data, user_data):
+def handle_approval(set_progress, n_clicks, table_handle, stored_data, change_base_handle, user_data):
     if not n_clicks or n_clicks == 0:
         raise PreventUpdate
 
     try:
+        # A tabela de trabalho está no servidor: o navegador não reenvia as linhas
+        table_data = session_store.get(table_handle)
+        catlote_data = session_store.get(stored_data)
+        change_base = session_store.get(change_base_handle)
+        if table_data is None or catlote_data is None or change_base is None:
+            return False, True, _("Erro"), _("Os dados da tabela não estão mais disponíveis. Recarregue a página.")
+
+        # Apenas os produtos com valor editado ou cujo catlote teve descontos/participações alterados
+        changed = changed_catlote_rows(table_data, catlote_data, change_base)
+        if changed.empty:
+            return False, True, _("Aviso"), _("Não há alterações para enviar para aprovação.")
+
         print("enviando catlote para aprovação")
         variables_to_send = {
             "user_token": user_data["access_token"],
-            "table_data": table_data,
+            "table_data": changed,
+            # O notebook reconstrói a tabela completa a partir da base buscada ao abrir a simulação
+            "change_set": {
+                "base_version": change_base_handle["base_version"],
+                "base_filter": change_base_handle["base_filter"],
+                "total_rows": len(table_data),
+            },
         }
-        send_to_approval("catlote", variables_to_send)
+        job_run = send_to_approval("catlote", variables_to_send, wait=False)
+        if not wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data):
+            return False, True, _("Erro"), _("Ocorreu um erro ao enviar para aprovação.")
+
         return False, True, _("Sucesso"), _("Enviado para aprovação com sucesso.")
     except Exception as e:
         print(f"Erro ao enviar para aprovação: {str(e)}")
@@ -882,9 +974,10 @@ def handle_approval(n_clicks, table_data, user_data):
     Input("button-approval-reject-catlote", "n_clicks"),
     State("table-simulation-catlote", "rowData"),
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-catlote"),
 )
-def handle_approval_status(accept_clicks, reject_clicks, table_data, user_data):
+def handle_approval_status(set_progress, accept_clicks, reject_clicks, table_data, user_data):
     if not ctx.triggered_id:
         return no_update
 
@@ -905,7 +998,10 @@ def handle_approval_status(accept_clicks, reject_clicks, table_data, user_data):
             "target_table": "catlote",
         }
 
-        update_approval_status(variables_to_send)
+        job_run = update_approval_status(variables_to_send, wait=False)
+        if not wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data):
+            return True, _("Erro"), _("Erro ao processar aprovação")
+
         return True, status_text, _("Status alterado para {}").format(status_text)
 
     except Exception as e:
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def generate_code_string(index: str, type: str) -> str:
@@ -12,22 +13,41 @@ def generate_code_string(index: str, type: str) -> str:
     
     return f"{type_code}{code_number}"
 
-def update_property(data, property_name, new_value):
+def get_catlote_id_from_index(index: str) -> str:
+    """Extrai o catlote do índice dos inputs de desconto/participação ("<catlote>-<linha>")"""
+    return index.rsplit("-", 1)[0]
+
+def update_property(data, property_name, new_value, catlote_id=None):
     """
     Atualiza o valor de uma propriedade dentro de uma lista de dicionários.
+
+    A lista recebida não é alterada (ela pode ser o valor guardado no session_store):
+    o retorno é uma nova lista, com uma cópia do dicionário alterado.
     
     Parâmetros:
         data (list): Lista contendo um dicionário.
         property_name (str): Nome da propriedade a ser alterada.
         new_value: Novo valor a ser atribuído.
+        catlote_id (str, opcional): Catlote a ser alterado. Se None, altera o primeiro.
         
     Retorna:
         list: Lista de dicionários com a propriedade alterada.
     """
-    if data and isinstance(data, list) and isinstance(data[0], dict):
-        if property_name in data[0]:
-            data[0][property_name] = int(new_value) / 100
-    return data
+    if not (data and isinstance(data, list) and isinstance(data[0], dict)):
+        return data
+
+    index = 0
+    if catlote_id is not None:
+        index = next(
+            (i for i, item in enumerate(data) if str(item.get('CATLOT1') or item.get('CATLOTE_1')) == str(catlote_id)),
+            None
+        )
+    if index is None or property_name not in data[index]:
+        return data
+
+    updated = list(data)
+    updated[index] = {**data[index], property_name: int(new_value) / 100}
+    return updated
 
 def get_unique_values(df, column_name):
     """
@@ -55,6 +75,65 @@ def get_catlote_ids(catlote_data):
             catlotes_id.append(catlote_id)
     return catlotes_id
 
+# Parâmetros de cada catlote por linha de produto (participação atual, desconto e participação estimada)
+CATLOTE_PARAMETERS = [f"{prefix}{i}" for prefix in ("P", "D", "E") for i in range(1, 5)]
+
+# Colunas da tabela de produtos editadas pelo usuário
+CATLOTE_EDITABLE_COLUMNS = ["custo_medio_unit", "preco_sap_atual"]
+
+def catlote_change_base(df, catlote_inputs):
+    """
+    Valores que identificam uma alteração em cada produto
+
+    Guardado ao abrir a simulação (a base buscada) e comparado, no envio para
+    aprovação, com os valores atuais (ver `changed_catlote_rows`).
+
+    Parâmetros:
+    - df: DataFrame com os produtos (CATLOTE_1, PECA e as colunas editáveis)
+    - catlote_inputs: Lista de dicionários com os parâmetros dos catlotes
+
+    Retorna:
+    - DataFrame com CATLOTE_1, PECA, as colunas editáveis e os parâmetros do catlote de cada produto
+    """
+    inputs = pd.DataFrame(catlote_inputs or [], columns=["CATLOT1", *CATLOTE_PARAMETERS])
+    inputs = inputs.drop_duplicates(subset="CATLOT1", keep="first")
+    inputs[CATLOTE_PARAMETERS] = inputs[CATLOTE_PARAMETERS].apply(pd.to_numeric, errors="coerce")
+
+    base = pd.DataFrame({
+        "CATLOTE_1": df["CATLOTE_1"].to_numpy(),
+        "PECA": df["PECA"].to_numpy(),
+        **{column: _column(df, column) for column in CATLOTE_EDITABLE_COLUMNS},
+    })
+    # Um catlote por CATLOT1: o merge mantém a ordem e a quantidade de linhas de df
+    return base.merge(inputs, left_on="CATLOTE_1", right_on="CATLOT1", how="left").drop(columns="CATLOT1")
+
+def changed_catlote_rows(df, catlote_inputs, base):
+    """
+    Produtos alterados em relação à base: coluna editável diferente ou catlote com parâmetros alterados
+
+    Parâmetros:
+    - df: DataFrame com a tabela atual de produtos
+    - catlote_inputs: Lista de dicionários com os parâmetros atuais dos catlotes
+    - base: Retorno de `catlote_change_base` ao abrir a simulação
+
+    Retorna:
+    - DataFrame com as linhas de df alteradas (produtos ausentes da base também são considerados alterados)
+    """
+    df = df.reset_index(drop=True)
+    base = base.drop_duplicates(subset=["CATLOTE_1", "PECA"], keep="first")
+
+    merged = catlote_change_base(df, catlote_inputs).merge(
+        base, on=["CATLOTE_1", "PECA"], how="left", suffixes=("", "_base"), indicator=True
+    )
+
+    changed = (merged["_merge"] == "left_only").to_numpy()
+    for column in [*CATLOTE_EDITABLE_COLUMNS, *CATLOTE_PARAMETERS]:
+        current_values = merged[column]
+        base_values = merged[f"{column}_base"]
+        changed |= ~((current_values == base_values) | (current_values.isna() & base_values.isna())).to_numpy()
+
+    return df.loc[changed]
+
 def calculate_catlote(catlote_inputs, catlote_data_products, new_values=None):
     """
     Função para calcular faturamento baseado em dados de Catlote
@@ -72,122 +151,138 @@ def calculate_catlote(catlote_inputs, catlote_data_products, new_values=None):
 
     # Se não houver alterações ou se for a primeira vez, calcula todas as linhas
     if new_values is None or all(value is None for value in new_values.values()):
-        # Calcula para todas as linhas
-        for index, row in df.iterrows():
-            df = calculate_row(df, index, row, catlote_inputs, None)
+        df = calculate_rows(df, catlote_inputs)
     else:
         # Calcula apenas para a linha alterada
         row_index = new_values.get("row_index")
         if row_index is not None:
-            row = df.iloc[row_index]
-            df = calculate_row(df, row_index, row, catlote_inputs, new_values)
+            rows = np.zeros(len(df), dtype=bool)
+            rows[row_index] = True
+            df = calculate_rows(df, catlote_inputs, rows, new_values)
 
     return {
         "table": df,
         "totals": calculate_totals(df)
     }
 
-def calculate_row(df, index, row, catlote_inputs, new_values):
-    """
-    Calcula os valores para uma linha específica
+def calculate_rows(df, catlote_inputs, rows=None, new_values=None):
     """
-    matching_catlote = next((catlote for catlote in catlote_inputs if catlote['CATLOT1'] == row['CATLOTE_1']), None)
+    Calcula os valores das linhas selecionadas de uma vez (operações sobre colunas inteiras)
+
+    Os parâmetros dos catlotes são associados aos produtos por um único merge
+    pela coluna CATLOTE_1; as linhas sem catlote correspondente não são alteradas.
+
+    Parâmetros:
+    - df: DataFrame com dados de produtos
+    - catlote_inputs: Lista de dicionários com informações de Catlote
+    - rows: Máscara booleana das linhas a calcular (todas, se None)
+    - new_values: Dicionário com informações sobre a célula alterada
 
-    if matching_catlote is None:
-        print(f" Nenhum Catlote encontrado para {row['CATLOT1']}")
+    Retorna:
+    - DataFrame com as linhas recalculadas
+    """
+    if df.empty:
         return df
 
-    # Parâmetros para cálculo
-    desconto = row['desconto']
-    media_promo = row['media_promo']
-    imp = row['imp']
-    imp_icms = row['imp_icms']
-    
-    # Verifica qual campo foi alterado e usa o novo valor
-    if new_values and new_values["changed_col_name"] == "custo_medio_unit":
-        custo_medio_unit = float(new_values["new_value"])
-        df.at[index, 'custo_medio_unit'] = custo_medio_unit
-    else:
-        custo_medio_unit = row['custo_medio_unit']
+    rows = np.ones(len(df), dtype=bool) if rows is None else np.asarray(rows, dtype=bool)
 
-    if new_values and new_values["changed_col_name"] == "preco_sap_atual":
-        price_sap_new = float(new_values["new_value"])
-        df.at[index, 'preco_sap_atual'] = price_sap_new
-    else:
-        price_sap_new = row['preco_sap_atual']
+    # Aplica o valor alterado na célula antes do cálculo
+    changed_col_name = new_values["changed_col_name"] if new_values else None
+    if changed_col_name in ("custo_medio_unit", "preco_sap_atual"):
+        df[changed_col_name] = _column(df, changed_col_name)
+        df.loc[rows, changed_col_name] = float(new_values["new_value"])
 
-    price_sap_old = new_values["old_value"] if new_values and new_values["changed_col_name"] == "preco_sap_atual" else price_sap_new
-    media_regular = row['media_regular']
-    elasticity = row['e']
+    # Primeiro catlote de cada CATLOT1 (mesmo critério da busca anterior)
+    inputs = pd.DataFrame(catlote_inputs or [], columns=["CATLOT1", *CATLOTE_PARAMETERS])
+    inputs = inputs.drop_duplicates(subset="CATLOT1", keep="first")
+    inputs[CATLOTE_PARAMETERS] = inputs[CATLOTE_PARAMETERS].apply(pd.to_numeric, errors="coerce")
+    parameters = df[["CATLOTE_1"]].merge(inputs, left_on="CATLOTE_1", right_on="CATLOT1", how="left")
 
-    new_price_with_taxes = round(price_sap_new * imp_icms, 2)
-    old_price_with_taxes = row['preco_com_impostos'] if 'preco_com_impostos' in row else new_price_with_taxes
+    rows = rows & parameters["CATLOT1"].notna().to_numpy()
+    if not rows.any():
+        print(" Nenhum Catlote encontrado para os produtos")
+        return df
 
-    delta_price = round(price_sap_new / price_sap_old - 1, 4) if price_sap_old != 0 else 0
+    def values(column):
+        return _column(df, column)[rows]
 
-    # Cálculo da média regular
-    new_avg_regular = 0 if media_regular == 0 else media_regular * (1 + delta_price) ** elasticity
-    delta_volume_regular = 0 if media_regular == 0 else (new_avg_regular / media_regular - 1)
+    def parameter(name):
+        return parameters[name].to_numpy(dtype=float)[rows]
 
-    # Atualiza os valores no DataFrame com os tipos corretos
-    df.at[index, 'media_regular'] = int(round(new_avg_regular, 0))
-    df.at[index, 'delta_volume_regular'] = float(delta_volume_regular)
+    desconto = values("desconto")
+    imp = values("imp")
+    custo_medio_unit = values("custo_medio_unit")
+    price_sap_new = values("preco_sap_atual")
+    media_regular = values("media_regular")
+    media_promo = values("media_promo")
+    elasticity = values("e")
 
-    # Cálculo da média promo
-    new_avg_promo = 0 if media_promo == 0 else media_promo * (1 + delta_price) ** elasticity
-    delta_volume_promo = 0 if media_promo == 0 else (new_avg_promo / media_promo - 1)
-    avg_promo_final = int(round(new_avg_promo, 0))
+    price_sap_old = price_sap_new
+    if changed_col_name == "preco_sap_atual":
+        price_sap_old = np.full_like(price_sap_new, float(new_values["old_value"]))
 
-    # Atualiza os valores calculados na linha específica
-    df.at[index, 'media_promo'] = avg_promo_final
-    df.at[index, 'preco_com_impostos'] = new_price_with_taxes
+    new_price_with_taxes = np.round(price_sap_new * values("imp_icms"), 2)
 
-    # Cálculos sem campanha
-    df.at[index, 'faturamento_l1_sc'] = new_price_with_taxes * (1 - desconto) * matching_catlote['P1'] * int(round(new_avg_regular, 0))
-    df.at[index, 'faturamento_l2_sc'] = new_price_with_taxes * (1 - desconto) * matching_catlote['P2'] * int(round(new_avg_regular, 0))
-    df.at[index, 'faturamento_l3_sc'] = new_price_with_taxes * (1 - desconto) * matching_catlote['P3'] * int(round(new_avg_regular, 0))
-    df.at[index, 'faturamento_l4_sc'] = new_price_with_taxes * (1 - desconto) * matching_catlote['P4'] * int(round(new_avg_regular, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta_price = np.where(price_sap_old != 0, np.round(price_sap_new / price_sap_old - 1, 4), 0)
 
-    df.at[index, 'faturamento_liq_l1_sc'] = (new_price_with_taxes * (1 - desconto) * imp) * matching_catlote['P1'] * int(round(new_avg_regular, 0))
-    df.at[index, 'faturamento_liq_l2_sc'] = (new_price_with_taxes * (1 - desconto) * imp) * matching_catlote['P2'] * int(round(new_avg_regular, 0))
-    df.at[index, 'faturamento_liq_l3_sc'] = (new_price_with_taxes * (1 - desconto) * imp) * matching_catlote['P3'] * int(round(new_avg_regular, 0))
-    df.at[index, 'faturamento_liq_l4_sc'] = (new_price_with_taxes * (1 - desconto) * imp) * matching_catlote['P4'] * int(round(new_avg_regular, 0))
+        # Cálculo das médias regular e promo
+        new_avg_regular = np.where(media_regular == 0, 0, media_regular * (1 + delta_price) ** elasticity)
+        delta_volume_regular = np.where(media_regular == 0, 0, new_avg_regular / media_regular - 1)
+        new_avg_promo = np.where(media_promo == 0, 0, media_promo * (1 + delta_price) ** elasticity)
 
-    df.at[index, 'margem_l1_sc'] = ((new_price_with_taxes * (1 - desconto) * imp) - custo_medio_unit) * matching_catlote['P1'] * int(round(new_avg_regular, 0))
-    df.at[index, 'margem_l2_sc'] = ((new_price_with_taxes * (1 - desconto) * imp) - custo_medio_unit) * matching_catlote['P2'] * int(round(new_avg_regular, 0))
-    df.at[index, 'margem_l3_sc'] = ((new_price_with_taxes * (1 - desconto) * imp) - custo_medio_unit) * matching_catlote['P3'] * int(round(new_avg_regular, 0))
-    df.at[index, 'margem_l4_sc'] = ((new_price_with_taxes * (1 - desconto) * imp) - custo_medio_unit) * matching_catlote['P4'] * int(round(new_avg_regular, 0))
+    avg_regular_final = np.round(new_avg_regular, 0)
+    avg_promo_final = np.round(new_avg_promo, 0)
 
-    # Cálculos com campanha
-    df.at[index, 'faturamento_l1_cc'] = new_price_with_taxes * (1 + matching_catlote['D1']) * matching_catlote['E1'] * avg_promo_final
-    df.at[index, 'faturamento_l2_cc'] = new_price_with_taxes * (1 + matching_catlote['D2']) * matching_catlote['E2'] * avg_promo_final
-    df.at[index, 'faturamento_l3_cc'] = new_price_with_taxes * (1 + matching_catlote['D3']) * matching_catlote['E3'] * avg_promo_final
-    df.at[index, 'faturamento_l4_cc'] = new_price_with_taxes * (1 + matching_catlote['D4']) * matching_catlote['E4'] * avg_promo_final
+    results = {
+        "media_regular": avg_regular_final,
+        "delta_volume_regular": delta_volume_regular,
+        "media_promo": avg_promo_final,
+        "preco_com_impostos": new_price_with_taxes,
+    }
 
-    df.at[index, 'faturamento_liq_l1_cc'] = (new_price_with_taxes * (1 + matching_catlote['D1']) * imp) * matching_catlote['E1'] * avg_promo_final
-    df.at[index, 'faturamento_liq_l2_cc'] = (new_price_with_taxes * (1 + matching_catlote['D2']) * imp) * matching_catlote['E2'] * avg_promo_final
-    df.at[index, 'faturamento_liq_l3_cc'] = (new_price_with_taxes * (1 + matching_catlote['D3']) * imp) * matching_catlote['E3'] * avg_promo_final
-    df.at[index, 'faturamento_liq_l4_cc'] = (new_price_with_taxes * (1 + matching_catlote['D4']) * imp) * matching_catlote['E4'] * avg_promo_final
+    # Cálculos sem campanha
+    price_sc = new_price_with_taxes * (1 - desconto)
+    price_liq_sc = price_sc * imp
+    for i in range(1, 5):
+        results[f"faturamento_l{i}_sc"] = price_sc * parameter(f"P{i}") * avg_regular_final
+    for i in range(1, 5):
+        results[f"faturamento_liq_l{i}_sc"] = price_liq_sc * parameter(f"P{i}") * avg_regular_final
+    for i in range(1, 5):
+        results[f"margem_l{i}_sc"] = (price_liq_sc - custo_medio_unit) * parameter(f"P{i}") * avg_regular_final
 
-    df.at[index, 'margem_l1_cc'] = ((new_price_with_taxes * (1 + matching_catlote['D1']) * imp) - custo_medio_unit) * matching_catlote['E1'] * avg_promo_final
-    df.at[index, 'margem_l2_cc'] = ((new_price_with_taxes * (1 + matching_catlote['D2']) * imp) - custo_medio_unit) * matching_catlote['E2'] * avg_promo_final
-    df.at[index, 'margem_l3_cc'] = ((new_price_with_taxes * (1 + matching_catlote['D3']) * imp) - custo_medio_unit) * matching_catlote['E3'] * avg_promo_final
-    df.at[index, 'margem_l4_cc'] = ((new_price_with_taxes * (1 + matching_catlote['D4']) * imp) - custo_medio_unit) * matching_catlote['E4'] * avg_promo_final
+    # Cálculos com campanha
+    price_cc = {i: new_price_with_taxes * (1 + parameter(f"D{i}")) for i in range(1, 5)}
+    price_liq_cc = {i: price_cc[i] * imp for i in range(1, 5)}
+    for i in range(1, 5):
+        results[f"faturamento_l{i}_cc"] = price_cc[i] * parameter(f"E{i}") * avg_promo_final
+    for i in range(1, 5):
+        results[f"faturamento_liq_l{i}_cc"] = price_liq_cc[i] * parameter(f"E{i}") * avg_promo_final
+    for i in range(1, 5):
+        results[f"margem_l{i}_cc"] = (price_liq_cc[i] - custo_medio_unit) * parameter(f"E{i}") * avg_promo_final
 
     # Cálculo das margens relativas
-    for i in range(1, 5):
-        try:
-            denominator = new_price_with_taxes * (1 + matching_catlote[f'D{i}']) * imp
-            if denominator == 0:
-                df.at[index, f'margem_rel_l{i}_cc'] = 0
-            else:
-                numerator = (new_price_with_taxes * (1 + matching_catlote[f'D{i}']) * imp) - custo_medio_unit
-                df.at[index, f'margem_rel_l{i}_cc'] = pd.to_numeric(numerator / denominator, errors='coerce')
-        except (KeyError, ZeroDivisionError):
-            df.at[index, f'margem_rel_l{i}_cc'] = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(1, 5):
+            results[f"margem_rel_l{i}_cc"] = np.where(
+                price_liq_cc[i] == 0, 0, (price_liq_cc[i] - custo_medio_unit) / price_liq_cc[i]
+            )
+
+    for column, result in results.items():
+        if rows.all():
+            df[column] = result
+        else:
+            df[column] = _column(df, column)
+            df.loc[rows, column] = result
 
     return df.round(2)
 
+def _column(df, column):
+    """Coluna como array float (NaN se a coluna não existir)"""
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
 def calculate_totals(df):
     """
     Calcula os totais para os cards
@@ -217,3 +312,83 @@ def calculate_totals(df):
         "total_margem_rel_sc": total_margem_rel_sc,
         "total_margem_rel_cc": total_margem_rel_cc
     }
+
+def calculate_totals_by_catlote(df):
+    """
+    Calcula os totais parciais de cada catlote (CATLOTE_1)
+
+    Os totais dos cards são a combinação dos parciais (`combine_totals`); quando um
+    catlote é alterado basta recalcular o parcial dele.
+    """
+    if isinstance(df, list):
+        df = pd.DataFrame(df)
+
+    return {
+        str(catlote_id): {key: float(value) for key, value in calculate_totals(group).items()}
+        for catlote_id, group in df.groupby("CATLOTE_1", sort=False)
+    }
+
+def combine_totals(totals_by_catlote):
+    """
+    Soma os totais parciais dos catlotes no formato de `calculate_totals`
+    """
+    keys = [
+        "total_faturamento_sc",
+        "total_faturamento_cc",
+        "total_faturamento_liq_sc",
+        "total_faturamento_liq_cc",
+        "total_margem_sc",
+        "total_margem_cc",
+        "total_volume_sc",
+        "total_volume_cc",
+    ]
+    totals = {key: sum(partial[key] for partial in totals_by_catlote.values()) for key in keys}
+    totals["total_volume_sc"] = int(totals["total_volume_sc"])
+    totals["total_volume_cc"] = int(totals["total_volume_cc"])
+
+    # Calcula as margens relativas totais
+    totals["total_margem_rel_sc"] = totals["total_margem_sc"] / totals["total_faturamento_liq_sc"] if totals["total_faturamento_liq_sc"] != 0 else 0
+    totals["total_margem_rel_cc"] = totals["total_margem_cc"] / totals["total_faturamento_liq_cc"] if totals["total_faturamento_liq_cc"] != 0 else 0
+
+    return totals
+
+def calculate_catlote_slice(catlote_inputs, catlote_data_products, catlote_id, totals_by_catlote=None):
+    """
+    Recalcula apenas os produtos de um catlote, após alteração de desconto ou participação
+
+    Parâmetros:
+    - catlote_inputs: Lista de dicionários com informações de Catlote
+    - catlote_data_products: DataFrame (ou lista de dicionários) com todos os produtos
+    - catlote_id: Catlote alterado (CATLOTE_1)
+    - totals_by_catlote: Totais parciais atuais (`calculate_totals_by_catlote`)
+
+    Retorna:
+    - Dicionário com a tabela completa atualizada ("table"), as linhas recalculadas
+      ("rows"), os parciais atualizados ("totals_by_catlote") e os totais combinados ("totals")
+    """
+    catlote_id = str(catlote_id)
+    df = pd.DataFrame(catlote_data_products).reset_index(drop=True)
+
+    if totals_by_catlote is None:
+        totals_by_catlote = calculate_totals_by_catlote(df)
+
+    totals_by_catlote = dict(totals_by_catlote)
+    rows = []
+
+    mask = df["CATLOTE_1"].astype(str) == catlote_id if "CATLOTE_1" in df.columns else pd.Series(False, index=df.index)
+
+    if mask.any():
+        calculated_data = calculate_catlote(catlote_inputs=catlote_inputs, catlote_data_products=df[mask])
+        calculated_table = calculated_data["table"]
+        rows = calculated_table.to_dict("records")
+        totals_by_catlote[catlote_id] = {key: float(value) for key, value in calculated_data["totals"].items()}
+
+        # Substitui as linhas do catlote mantendo a ordem original da tabela
+        df = pd.concat([df[~mask], calculated_table]).sort_index()
+
+    return {
+        "table": df,
+        "rows": rows,
+        "totals_by_catlote": totals_by_catlote,
+        "totals": combine_totals(totals_by_catlote),
+    }
@@ -2,38 +2,16 @@ import dash
 import dash_bootstrap_components as dbc
 import dash_ag_grid as dag
 from dash import html, dcc, callback, Input, Output, State, no_update
-from api.api_get_command_center_async import get_all_command_center_data
+from api.api_get_command_center_async import get_all_command_center_data, get_command_center_table
 from styles import CONTAINER_BUTTONS_STYLE, TABLE_TITLE_STYLE, TABLE_NOTE_PARAGRAPH, CONTAINER_HELPER_BUTTON_STYLE, MAIN_TITLE_STYLE
 from static_data.helper_text import helper_text
 from components.Helper_button_with_modal import create_help_button_with_modal
-from datetime import datetime, timedelta
 from translations import setup_translations, _
 
-# Cache para armazenar os dados
-_cache = {}
-_cache_timestamp = None
-CACHE_DURATION = timedelta(minutes=720)
-
-def get_cached_data():
-    """
-    Obtém dados do cache se estiverem válidos, caso contrário busca novos dados
-    """
-    global _cache, _cache_timestamp
-    current_time = datetime.now()
-    
-    if _cache and _cache_timestamp and current_time - _cache_timestamp < CACHE_DURATION:
-        return _cache
-    
-    # Se não estiver no cache ou cache expirado, busca novos dados
-    _cache = get_all_command_center_data()
-    _cache_timestamp = current_time
-    return _cache
-
-def get_command_center_data():
-    """
-    Obtém todos os dados do command center com cache
-    """
-    return get_cached_data()
+def without_timezone(df):
+    """Cópia do DataFrame com as colunas datetime sem timezone (o Excel e o clipboard não aceitam)"""
+    columns = df.select_dtypes(include=["datetime64[ns, UTC]"]).columns
+    return df.assign(**{col: df[col].dt.tz_localize(None) for col in columns})
 
 # Estilo para o container dos cards
 cards_container_style = {
@@ -214,7 +192,7 @@ def update_command_center_content(pathname, language):
     _ = setup_translations(language)
 
     if pathname == "/command-center":
-        table_data = get_command_center_data()
+        table_data = get_all_command_center_data()
         return [
             html.Div([
                 html.H1(_('Command Center'), style=MAIN_TITLE_STYLE),
@@ -326,7 +304,7 @@ def toggle_content(*args):
     
     if section:
         table_id = f"table-{section['id']}"
-        table_data = get_command_center_data()
+        table_data = get_command_center_table(section["data_key"])
         return (
             {"display": "none"},
             {"display": "block"},
@@ -348,7 +326,7 @@ def toggle_content(*args):
                             "marginBottom": "20px"
                         }
                     ),
-                    create_table(table_id, table_data[section["data_key"]], section["columns"])
+                    create_table(table_id, table_data, section["columns"])
                 ], style={"width": "100%"})
             ])
         )
@@ -373,11 +351,7 @@ def handle_copy_to_clipboard(n_clicks, table_content):
     section = next((s for s in sections(_) if s["id"] == section_id), None)
     
     if section:
-        table_data = get_command_center_data()
-        df = table_data[section["data_key"]]
-        # Corrige colunas datetime com timezone
-        for col in df.select_dtypes(include=["datetime64[ns, UTC]"]).columns:
-            df[col] = df[col].dt.tz_localize(None)
+        df = without_timezone(get_command_center_table(section["data_key"]))
         df.to_clipboard(index=False)
         return "✓ Copiado!"
     
@@ -402,9 +376,5 @@ def handle_excel_download(n_clicks, table_content):
     section = next((s for s in sections(_) if s["id"] == section_id), None)
     
     if section:
-        table_data = get_command_center_data()
-        df = table_data[section["data_key"]]
-        # Corrige colunas datetime com timezone
-        for col in df.select_dtypes(include=["datetime64[ns, UTC]"]).columns:
-            df[col] = df[col].dt.tz_localize(None)
+        df = without_timezone(get_command_center_table(section["data_key"]))
         return dcc.send_data_frame(df.to_excel, f"{section['id']}_data.xlsx", index=False)
@@ -5,11 +5,11 @@ import dash_bootstrap_components as dbc
 import dash_ag_grid as dag
 from dash import html, callback, Input, Output, State, no_update, ctx
 from translations import _, update_language
-from pages.approvals.approval_utils import container_approval_reject_buttons
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
 from api.get_initial_data_configs import get_initial_data_configs
 from api.send_to_approval import send_to_approval
-from api.get_requests_for_approval import get_requests_for_approval
 from api.update_approval_status import update_approval_status
+from background_jobs import background_job_options, wait_with_progress
 from utils.modify_column_if_other_column_changed import modify_column_if_other_column_changed
 from utils.user_has_permission_to_edit import user_has_permission_to_edit
 from static_data.helper_text import helper_text
@@ -70,9 +70,9 @@ helper_button = html.Div(
 )
 
 
-def get_layout(pathname, user_data):
+def get_layout(pathname, user_data, approval_tab=None):
     cpc = user_data.get('cpc1_3_6_list')
-    table_data = get_requests_for_approval(table="delta") if pathname == "/approval" else get_delta_data(cpc)
+    table_data = get_approval_requests("delta", approval_tab) if pathname == "/approval" else get_delta_data(cpc)
 
     table = handle_no_data_to_show(table_data.get("error")) if table_data.get("error") else dag.AgGrid(
         id='table-delta',
@@ -150,15 +150,16 @@ delta_page = html.Div([
         Input("url", "pathname"),
         Input("store-token", "data"),
         Input("store-language", "data"),
+        Input("approval-tab-store", "data"),
     ],
 )
-def update_delta_content(pathname, user_data, language):
+def update_delta_content(pathname, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
-    if pathname in ["/delta", "/approval"]:
-        return get_layout(pathname, user_data)
+    if pathname == "/delta" or (pathname == "/approval" and render_approval_tab(approval_tab, "delta")):
+        return get_layout(pathname, user_data, approval_tab=approval_tab)
     return no_update
 
 @callback(
@@ -195,17 +196,20 @@ def open_confirm_approval_modal(n_clicks):
 @callback(
     Output("modal-confirm-approval-delta", "is_open", allow_duplicate=True),
     Output("toast-approval-delta", "is_open", allow_duplicate=True),
+    Output("toast-approval-delta", "header", allow_duplicate=True),
+    Output("toast-approval-delta", "children", allow_duplicate=True),
     Input("btn-confirm-approval","n_clicks"),
     Input("btn-cancel-approval","n_clicks"),
     State("table-delta", "rowData"),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-delta", running=[(Output("modal-confirm-approval-delta", "is_open"), False, False)]),
 )
-def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
+def handle_send_approval(set_progress, confirm_clicks, cancel_clicks, table_data, user_data):
     triggered_id = ctx.triggered_id
 
     if triggered_id == "btn-cancel-approval" and cancel_clicks:
-        return False, False
+        return False, False, no_update, no_update
 
     if triggered_id == "btn-confirm-approval" and confirm_clicks:
 
@@ -217,10 +221,14 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
             "table_data": filtered_df,
         }
 
-        send_to_approval("delta", variables_to_send)
+        job_run = send_to_approval("delta", variables_to_send, wait=False)
+        success = wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data)
 
-        return False, True
-    return False, False
+        if not success:
+            return False, True, _("Erro"), _("Erro ao enviar para aprovação")
+
+        return False, True, _("Aprovação"), _("Enviado para aprovação")
+    return False, False, no_update, no_update
 
 @callback(
     Output("toast-approval-reject-delta", "is_open"),
@@ -230,9 +238,10 @@ def handle_send_approval(confirm_clicks, cancel_clicks, table_data, user_data):
     Input("button-approval-reject-delta", "n_clicks"),
     State("table-delta", "rowData"),
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-reject-delta"),
 )
-def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
+def handle_approval(set_progress, accept_clicks, reject_clicks, table_data, user_data):
     if not ctx.triggered_id:
         return no_update
 
@@ -253,7 +262,10 @@ def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
             "target_table": "delta",
         }
 
-        update_approval_status(variables_to_send)
+        job_run = update_approval_status(variables_to_send, wait=False)
+        if not wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data):
+            return True, _("Erro"), _("Erro ao processar aprovação")
+
         return True, status_text, _("Status alterado para {}").format(status_text)
 
     except Exception as e:
@@ -6,20 +6,22 @@ import pandas as pd
 import time
 import base64
 import io
-from dash import html, dcc, Input, Output, State, callback, no_update, callback_context, ctx
+from dash import html, dcc, Input, Output, State, callback, clientside_callback, no_update, callback_context, ctx
 from components.Card import Card
 from components.Helper_button_with_modal import create_help_button_with_modal
 from components.Toast import Toast
 from components.Modal import create_modal
 from components.Upload_file import create_upload_file
-from pages.approvals.approval_utils import container_approval_reject_buttons
-from api.api_get_optimization import get_optimization
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
+from pages.optimization.optimization_utils import apply_price_changes, calculate_filtered_totals, complete_changed_rows
+from api.api_get_optimization import get_optimization, get_optimization_rows
 from api.update_optimization import update_optimization
-from api.get_requests_for_approval import get_requests_for_approval
 from api.send_to_approval import send_to_approval
 from api.update_approval_status import update_approval_status
-from utils.calculation_division import calculation_division
-from utils.sum_df_col import sum_df_col
+from background_jobs import background_job_options, wait_with_progress
+from session_store import session_store
+from utils.apply_grid_request import apply_grid_request
+from utils.get_column_fields import get_column_fields
 from utils.user_has_permission_to_edit import user_has_permission_to_edit
 from utils.handle_nothing_to_approve import handle_nothing_to_approve
 from static_data.helper_text import helper_text
@@ -62,6 +64,30 @@ def create_columns(pathname, user_data):
         ]},
     ]
 
+# Colunas usadas fora da tabela: no recálculo da linha e na exportação para Excel
+OPTIMIZATION_EXTRA_FIELDS = [
+    "imp_icms",
+    "desconto",
+    "imp",
+    "e",
+    "costs_factor_medio",
+    "custo_medio_unit",
+    "preco_imp_final",
+    "preco_venda_final",
+    "preco_net_final",
+    "vol_novo_final",
+    "estrategia_utilizada",
+    "var_elasticidade",
+    "var_aplicacoes",
+    "var_frota",
+    "var_estoquegm",
+    "var_anofrota",
+]
+
+def optimization_fields(pathname, user_data):
+    """Colunas de d_otimizacao trazidas do banco para a página (tabela + recálculo + exportação)"""
+    return get_column_fields(create_columns(pathname, user_data), OPTIMIZATION_EXTRA_FIELDS)
+
 def columns_approval():
     return [
         {"headerName": _("Peça"), "field": "peca"},
@@ -140,53 +166,17 @@ def button_download_excel():
             dcc.Download(id="download-excel-optimization"),
     ])
 
-def calculate_totals(df):
-    try:
-        # Cálculo do preço médio
-        price_as_is = calculation_division(df=df, column1="preco_venda_baseline", column2="qtd_volume")
-        price_to_be = calculation_division(df=df, column1="gross_final", column2="vol_novo2_final")
-
-        # Cálculo do volume total
-        volume_as_is = sum_df_col(df=df, column="qtd_volume")
-        volume_to_be = sum_df_col(df=df, column="vol_novo2_final")
-
-        # Cálculo do faturamento bruto total
-        gross_as_is = sum_df_col(df=df, column="preco_venda_baseline")
-        gross_to_be = sum_df_col(df=df, column="gross_final")
-
-        # Cálculo da margem total
-        margin_as_is = sum_df_col(df=df, column="margem_contribuicao_baseline")
-        margin_to_be = sum_df_col(df=df, column="mc_final")
-
-        return {
-            'price': (price_as_is, price_to_be),
-            'volume': (volume_as_is, volume_to_be),
-            'gross': (gross_as_is, gross_to_be),
-            'margin': (margin_as_is, margin_to_be)
-        }
-    except Exception as e:
-        print(f"Erro no cálculo dos totalizadores: {e}")
-        return None
-
-def create_cards(df, _):
+def create_cards(totals, _):
     """
     Cria cards com os totais calculados.
 
     Args:
-        df (polars.DataFrame): DataFrame contendo os dados para calcular os totais.
+        totals (dict): Totais retornados por `calculate_totals` / `calculate_filtered_totals`.
         _ (gettext.GNUTranslations): Objeto de tradução para o idioma atual.
 
     Returns:
         dash.html.Div: Componente Dash contendo os cards com os totais calculados.
     """
-    if isinstance(df, list):
-        df = pl.DataFrame(df)
-
-    print("df['preco_sap_novo'].sum()", df["preco_sap_novo"].sum())
-
-    totals = calculate_totals(df)
-    print("totals", totals)
-
     if not totals:
         return html.Div("Erro ao calcular totalizadores")
 
@@ -339,104 +329,48 @@ def action_buttons(_, pathname, user_data):
         ),
     ], style=CONTAINER_BUTTONS_STYLE)
 
-def recalculate_row(
-    df,
-    current_data=None,
-    peca=None,
-    novo_valor=None
-):
+def recalculate_row(df, current_data):
     """
-    Recalcula a linha
+    Recalcula a linha alterada na edição de uma célula de preço SAP novo
     """
 
     print("recalculate_row")
 
-    if current_data is not None:
-        coluna = current_data.get('colId')
-        print("coluna", coluna)
+    coluna = current_data.get('colId')
+    print("coluna", coluna)
 
-        if coluna != 'preco_sap_novo':
-            raise dash.exceptions.PreventUpdate
+    if coluna != 'preco_sap_novo':
+        raise dash.exceptions.PreventUpdate
 
-        peca = current_data['data']['peca']
-        novo_valor = float(current_data['value'] or 0)
+    peca = current_data['data']['peca']
+    novo_valor = float(current_data['value'] or 0)
 
     print("peca", peca)
     print("novo_valor", novo_valor)
 
-    print("df['peca'] == peca", df['peca'] == peca)
+    df, updated_rows = apply_price_changes(df, {peca: novo_valor})
 
-    row_idx = df['peca'] == peca
-    print("row_idx", row_idx)
-
-    if not row_idx.any():
+    if not updated_rows:
         raise dash.exceptions.PreventUpdate
 
-    row = df.filter(row_idx)
-
-    print("row", row)
-
-    # Extrai valores com vetorização
-
-    print("Extrai valores com vetorização")
-
-    calcs = {
-        'imp_icms': float(row['imp_icms'][0]),
-        'desconto': float(row['desconto'][0]),
-        'imp': float(row['imp'][0]),
-        'preco_sap_atual': float(row['preco_sap_atual'][0] or 1.0),
-        'qtd_volume': float(row['qtd_volume'][0]),
-        'e': float(row['e'][0]),
-        'costs_factor_medio': float(row['costs_factor_medio'][0]),
-        'custo_medio_unit': float(row['custo_medio_unit'][0]),
-        'preco_venda_baseline': float(row['preco_venda_baseline'][0] or 1.0),
-        'preco_net_baseline': float(row['preco_net_baseline'][0] or 1.0),
-        'margem_contribuicao_baseline': float(row['margem_contribuicao_baseline'][0] or 1.0)
-    }
+    return df
 
-    print("calcs", calcs)
+# Campos que handle_approval usa, mesmo que as colunas de status/UUID deixem a tabela
+APPROVAL_EXTRA_FIELDS = ["status", "uuid_alteracoes"]
 
-    # Cálculos vetorizados
-    updates = {
-        'preco_sap_novo': novo_valor,
-        'preco_imp_final': round(novo_valor * calcs['imp_icms'], 2),
-        'preco_venda_final': round(novo_valor * calcs['imp_icms'] * (1 - calcs['desconto']), 2)
-    }
-
-    updates['preco_net_final'] = round(updates['preco_venda_final'] * calcs['imp'], 2)
-    updates['dp_final'] = round((novo_valor / calcs['preco_sap_atual'] - 1) * 100, 1)
-    updates['vol_novo_final'] = round(calcs['qtd_volume'] * (1 + updates['dp_final'] / 100) ** calcs['e'], 2)
-    updates['vol_novo2_final'] = min(updates['vol_novo_final'], round(calcs['qtd_volume'] * 1.5, 2)) if updates['dp_final'] > 50 else updates['vol_novo_final']
-
-    updates['gross_final'] = round(updates['vol_novo2_final'] * updates['preco_venda_final'], 2)
-    updates['net_final'] = round(updates['vol_novo2_final'] * updates['preco_net_final'], 2)
-    updates['mc_final'] = round((updates['preco_net_final'] + (updates['preco_venda_final'] * calcs['costs_factor_medio'] - calcs['custo_medio_unit'])) * updates['vol_novo2_final'], 2)
-
-    updates['delta_volume_final'] = round((updates['vol_novo2_final'] / calcs['qtd_volume'] - 1) * 100, 1)
-    updates['delta_gross_final'] = round((updates['gross_final'] / calcs['preco_venda_baseline'] - 1) * 100, 1)
-    updates['delta_net_final'] = round((updates['net_final'] / calcs['preco_net_baseline'] - 1) * 100, 1)
-    updates['delta_mc_final'] = round((updates['mc_final'] / calcs['margem_contribuicao_baseline'] - 1) * 100, 1)
-    updates['status'] = 'manual'
-    updates['new_alteration'] = 'sim'
-
-    print("updates", updates)
-    print("updates['dp_final']", updates['dp_final'])
-
-    for col, value in updates.items():
-        df = df.with_columns(
-            pl.when(row_idx)
-            .then(pl.lit(value))
-            .otherwise(pl.col(col))
-            .alias(col)
-        )
+def approval_fields():
+    """Colunas trazidas na aba de aprovação (também usadas na pré-busca da aba)"""
+    return get_column_fields(columns_approval(), extra_fields=APPROVAL_EXTRA_FIELDS)
 
-    return df.to_dicts()
-
-def get_layout(pathname, user_data):
+def get_layout(pathname, user_data, approval_tab=None):
     """Gera o layout da página de otimização de preços"""
 
     cpc = user_data.get('cpc1_3_6_list')
-    table_data = get_requests_for_approval(table="optimization") if pathname == "/approval" else get_optimization(cpc)
+    table_data = (
+        get_approval_requests("optimization", approval_tab, columns=approval_fields())
+        if pathname == "/approval"
+        else get_optimization(cpc, columns=optimization_fields(pathname, user_data))
+    )
     table_data = table_data if pathname == "/approval" else handle_new_alteration(table_data)
 
     if table_data is None:
@@ -463,20 +397,33 @@ def get_layout(pathname, user_data):
         else action_buttons(_, pathname, user_data)
     )
 
+    # Na otimização a tabela fica no servidor: o navegador recebe apenas o handle
+    # e busca as linhas da página visível (filtro, ordenação e paginação no servidor)
+    server_side = pathname != "/approval"
+    table_ref = session_store.put(table_data) if server_side else None
+
     cards = html.Div(
         id="optimization-cards",
-        children=create_cards(table_data, _),
+        children=create_cards(calculate_filtered_totals(table_data, table_handle=table_ref), _),
         className="configs-space-cards"
     )
 
+    table_handle = dcc.Store(
+        id="optimization-table-handle",
+        data=table_ref,
+    )
+
     table_container = html.Div([
         html.P(
             _("Volume dos últimos 12 meses com preços e custos vigentes"),
             className="description-message"
         ),
+        table_handle,
         dag.AgGrid(
             id='optimization-table',
-            rowData=table_data.to_dict("records") if pathname == "/approval" else table_data.to_dicts(),
+            rowModelType="infinite" if server_side else "clientSide",
+            rowData=None if server_side else table_data.to_dict("records"),
+            getRowId="params.data.peca" if server_side else None,
             columnDefs=columns_approval() if pathname == "/approval" else create_columns(pathname, user_data),
             defaultColDef={
                 "sortable": True,
@@ -491,6 +438,8 @@ def get_layout(pathname, user_data):
             dashGridOptions={
                 "pagination": True,
                 "paginationPageSize": 20,
+                "cacheBlockSize": 20,
+                "maxBlocksInCache": 10,
                 "enableRangeSelection": True,
                 "enableFilter": True,
                 "domLayout": 'autoHeight',
@@ -594,112 +543,95 @@ optimization_page = html.Div([
     Input("url", "pathname"),
     State("store-token", "data"),
     Input("store-language", "data"),
+    Input("approval-tab-store", "data"),
 )
-def update_optimization_content(pathname, user_data, language):
+def update_optimization_content(pathname, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
-    if pathname in ["/optimization", "/approval"]:
-        return get_layout(pathname, user_data)
+    if pathname == "/optimization" or (pathname == "/approval" and render_approval_tab(approval_tab, "optimization")):
+        return get_layout(pathname, user_data, approval_tab=approval_tab)
     return no_update
 
-# Callback unificado para atualizar dados e cards
+# Callback que entrega à tabela apenas o bloco de linhas pedido
 @callback(
-    Output('optimization-table', 'rowData', allow_duplicate=True),
-    Output('optimization-cards', 'children'),
-    Input("url", "pathname"),
-    State('optimization-table', 'rowData'),
-    Input('optimization-table', 'virtualRowData'),
-    Input('optimization-table', 'filterModel'),
-    Input('optimization-table', 'cellValueChanged'),
+    Output('optimization-table', 'getRowsResponse'),
+    Input('optimization-table', 'getRowsRequest'),
+    State('optimization-table-handle', 'data'),
     prevent_initial_call=True
 )
-def update_table_and_cards(pathname, row_data, virtual_data, filter_model, current_data):
-    """Atualiza tabela e cards quando houver alterações ou filtros"""
-
-    print("---update_table_and_cards---")
-
-    # print("pathname", pathname)
-    # print("row_data", row_data)
-    print("virtual_data", virtual_data is not None)
-    print("filter_model", filter_model)
-    print("current_data", current_data)
-
-    teste_df = pl.DataFrame(row_data)
-    # print("colunas", teste_df.columns)
-    print("qtd_volume", teste_df['qtd_volume'].sum())
-    print("vol_novo", teste_df['vol_novo'].sum())
-    print("vol_novo2", teste_df['vol_novo2'].sum())
-    
-    print("gross", teste_df['gross'].sum())
-    print("gross_cap", teste_df['gross_cap'].sum())
-    print("gross_mc", teste_df['gross_mc'].sum())
-    print("gross_cap_mc", teste_df['gross_cap_mc'].sum())
-    print("gross_final", teste_df['gross_final'].sum())
-
-    print("preco_sap_atual", teste_df['preco_sap_atual'].sum())
-    print("preco_sap_atual_baseline", teste_df['preco_sap_atual_baseline'].sum())
-    print("preco_sap_novo", teste_df['preco_sap_novo'].sum())
-    print("preco_sap_novo_fat", teste_df['preco_sap_novo_fat'].sum())
-
-    if not virtual_data:
-        return no_update, None
-
-    ctx = callback_context
-
-    print("---ctx---")
-    print(ctx)
+def get_optimization_rows(request, table_handle):
+    """Filtra, ordena e pagina a tabela no servidor"""
 
-    if not ctx.triggered:
+    df = session_store.get(table_handle)
+    if request is None or df is None:
         raise dash.exceptions.PreventUpdate
 
-    trigger_id = ctx.triggered[0]['prop_id']
+    return apply_grid_request(df, request)
 
-    print("---trigger_id---")
-    print(trigger_id)
-    print('cellValueChanged' in trigger_id)
-
-    # Se for alteração de célula
-    if 'cellValueChanged' in trigger_id and row_data:
-        try:
-            if isinstance(current_data, list):
-                if not current_data:
-                    raise dash.exceptions.PreventUpdate
-                current_data = current_data[0]
-
-            df = pl.DataFrame(row_data)
-            print("df", df)
+# Callback para atualizar os cards conforme os filtros da tabela
+@callback(
+    Output('optimization-cards', 'children'),
+    Input('optimization-table', 'filterModel'),
+    State('optimization-table-handle', 'data'),
+    prevent_initial_call=True
+)
+def update_cards(filter_model, table_handle):
+    """Recalcula os cards com as linhas filtradas"""
 
-            updated_data = recalculate_row(
-                current_data=current_data,
-                df=df
-            )
+    df = session_store.get(table_handle)
+    if df is None:
+        raise dash.exceptions.PreventUpdate
 
-            print("updated_data[0]", updated_data[0])
+    try:
+        return create_cards(calculate_filtered_totals(df, filter_model, table_handle), _)
+    except Exception as e:
+        print(f"Erro ao atualizar cards: {e}")
+        return html.Div("Erro ao atualizar totalizadores")
 
-            updated_cards = no_update if pathname == "/approval" else create_cards(updated_data, _)
+# Callback para recalcular a linha quando o preço estimado é alterado
+@callback(
+    Output('optimization-table-handle', 'data', allow_duplicate=True),
+    Output('optimization-cards', 'children', allow_duplicate=True),
+    Input('optimization-table', 'cellValueChanged'),
+    State('optimization-table-handle', 'data'),
+    State('optimization-table', 'filterModel'),
+    prevent_initial_call=True
+)
+def update_table_and_cards(current_data, table_handle, filter_model):
+    """Aplica a alteração na tabela do servidor e atualiza os cards"""
 
-            return updated_data, updated_cards
+    df = session_store.get(table_handle)
+    if not current_data or df is None:
+        raise dash.exceptions.PreventUpdate
 
-        except Exception as e:
-            print(f"Erro ao processar alteração de célula: {str(e)}")
-            raise dash.exceptions.PreventUpdate
+    if isinstance(current_data, list):
+        current_data = current_data[0]
 
-    # Se for filtro ou atualização virtual
-    else:
+    try:
+        df = recalculate_row(current_data=current_data, df=df)
+    except dash.exceptions.PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Erro ao processar alteração de célula: {str(e)}")
+        raise dash.exceptions.PreventUpdate
 
-        print("---else---")
+    table_handle = session_store.put(df, handle=table_handle["handle"])
 
-        try:
-            filtered_df = pl.DataFrame(virtual_data)
-            cards = create_cards(filtered_df, _)
-            return no_update, no_update if pathname == "/approval" else cards
-        except Exception as e:
-            print(f"Erro ao atualizar cards: {e}")
-            return no_update, html.Div("Erro ao atualizar totalizadores")
+    return table_handle, create_cards(calculate_filtered_totals(df, filter_model, table_handle), _)
 
-    raise dash.exceptions.PreventUpdate
+# Recarrega as linhas visíveis quando a tabela do servidor muda de versão
+clientside_callback(
+    """
+    function(tableHandle) {
+        dash_ag_grid.getApiAsync("optimization-table").then((api) => api.refreshInfiniteCache());
+        return window.dash_clientside.no_update;
+    }
+    """,
+    Input('optimization-table-handle', 'data'),
+    prevent_initial_call=True
+)
 
 # Callback para abrir o modal de confirmação de atualização
 @callback(
@@ -853,7 +785,7 @@ def show_loading_on_import(n_clicks):
     return no_update, no_update
 
 @callback(
-    Output("optimization-table", "rowData", allow_duplicate=True),
+    Output("optimization-table-handle", "data", allow_duplicate=True),
     Output("modal-import-excel", "is_open", allow_duplicate=True),
     Output("toast-approval-optimization", "is_open", allow_duplicate=True),
     Output("toast-approval-optimization", "header", allow_duplicate=True),
@@ -862,10 +794,10 @@ def show_loading_on_import(n_clicks):
     Output("modal-import-excel-footer", "children", allow_duplicate=True),
     Input("btn-confirm-import", "n_clicks"),
     State("excel-data-store", "data"),
-    State("optimization-table", "rowData"),
+    State("optimization-table-handle", "data"),
     prevent_initial_call=True
 )
-def process_excel_import(n_clicks, excel_data, current_table_data):
+def process_excel_import(n_clicks, excel_data, table_handle):
     print("process_excel_import")
 
     if n_clicks is None or excel_data is None:
@@ -901,14 +833,11 @@ def process_excel_import(n_clicks, excel_data, current_table_data):
             return no_update, False, True, "Erro", f"Colunas obrigatórias não encontradas após mapeamento. {debug_info}", original_body, original_footer
 
         # Verificar se há dados na tabela atual
-        if not current_table_data or len(current_table_data) == 0:
+        current_table_data = session_store.get(table_handle)
+        if current_table_data is None or current_table_data.is_empty():
             print("Tabela atual está vazia")            
             return no_update, False, True, "Erro", "Não há dados na tabela para atualizar.", original_body, original_footer
 
-        # Criar uma cópia dos dados da tabela para modificação
-        updated_data = current_table_data.copy()
-        print(f"Dados atuais copiados: {len(updated_data)} linhas")
-
         # Criar um dicionário para facilitar a busca
         import_dict = {}
         for _, row in imported_df.iterrows():
@@ -926,28 +855,8 @@ def process_excel_import(n_clicks, excel_data, current_table_data):
         if len(import_dict) > 0:
             print(f"Exemplo de item: {list(import_dict.items())[0]}")
 
-        # Atualizar os valores na tabela atual
-        updated_rows = 0
-        for i, row in enumerate(updated_data):
-            try:
-                peca = str(row.get("peca", "")).strip()
-                if peca and peca in import_dict:
-                    print(f"Atualizando peça {peca} com preço {import_dict[peca]}")
-                    # updated_data[i]["preco_sap_novo"] = import_dict[peca]
-
-                    updated_data = recalculate_row(
-                        df=pl.DataFrame(updated_data),
-                        peca=peca,
-                        novo_valor=import_dict[peca]
-                    )
-
-                    # updated_data[i]["new_alteration"] = "sim"
-                    # updated_data[i]["status"] = "manual"
-
-                    updated_rows += 1
-            except Exception as e:
-                print(f"Erro ao atualizar linha {i}: {str(e)}")
-                continue
+        # Atualizar os valores na tabela atual (todas as peças de uma vez)
+        updated_df, updated_rows = apply_price_changes(current_table_data, import_dict)
 
         if updated_rows == 0:
             print("Nenhuma peça correspondente encontrada")
@@ -955,7 +864,9 @@ def process_excel_import(n_clicks, excel_data, current_table_data):
 
         print(f"Atualização concluída: {updated_rows} peças atualizadas")
 
-        return updated_data, False, True, "Importação Concluída", f"{updated_rows} peças foram atualizadas com sucesso!", original_body, original_footer
+        table_handle = session_store.put(updated_df, handle=table_handle["handle"])
+
+        return table_handle, False, True, "Importação Concluída", f"{updated_rows} peças foram atualizadas com sucesso!", original_body, original_footer
     
     except Exception as e:
         import traceback
@@ -969,11 +880,12 @@ def process_excel_import(n_clicks, excel_data, current_table_data):
 @callback(
     Output("download-excel-optimization", "data"),
     Input("btn-download-excel-optimization", "n_clicks"),
-    State("optimization-table", "rowData"),
+    State("optimization-table-handle", "data"),
     prevent_initial_call=True
 )
-def handle_excel_download_optimization(n_clicks, row_data):
-    if n_clicks is None or not row_data:
+def handle_excel_download_optimization(n_clicks, table_handle):
+    row_data = session_store.get(table_handle)
+    if n_clicks is None or row_data is None or row_data.is_empty():
         return None
 
     col_to_export = {
@@ -995,7 +907,7 @@ def handle_excel_download_optimization(n_clicks, row_data):
         # 'gross_final': _('Gross Final') # temporário para testar a importação
     }
 
-    df = pd.DataFrame(row_data)
+    df = row_data.to_pandas()
 
     print("preco_sap_atual", df["preco_sap_atual"].sum())
     print("preco_sap_novo", df["preco_sap_novo"].sum())
@@ -1023,37 +935,47 @@ def open_confirm_approval_modal(n_clicks):
     Output("toast-approval-optimization", "children", allow_duplicate=True),
     Input("btn-confirm-approval", "n_clicks"),
     Input("btn-cancel-approval", "n_clicks"),
-    State('optimization-table', 'rowData'),
+    State('optimization-table-handle', 'data'),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-optimization", running=[(Output("modal-confirm-approval", "is_open"), False, False)]),
 )
-def handle_to_approval(confirm_clicks, cancel_clicks, table_data, user_data):
+def handle_to_approval(set_progress, confirm_clicks, cancel_clicks, table_handle, user_data):
     triggered_id = ctx.triggered_id
     
     # Fechar o modal em ambos os casos
     if triggered_id == "btn-cancel-approval" and cancel_clicks:
-        return no_update, False, False, ""
+        return False, False, no_update, no_update
     
     if triggered_id == "btn-confirm-approval" and confirm_clicks:
         try:
-            df = pd.DataFrame(table_data)
-            filtered_df = df.loc[df["new_alteration"] == "sim"]
-            
-            if filtered_df.empty:
-                return no_update, False, True, "Aviso", "Não há alterações para enviar para aprovação."
+            table_data = session_store.get(table_handle)
+            if table_data is None:
+                return False, True, "Erro", "Os dados da tabela não estão mais disponíveis. Recarregue a página."
+
+            changed = table_data.filter(pl.col("new_alteration") == "sim")
+
+            if changed.is_empty():
+                return False, True, "Aviso", "Não há alterações para enviar para aprovação."
+
+            # A página só tem as colunas da tabela: relê as linhas alteradas com todas as colunas do notebook
+            full_rows = get_optimization_rows(changed["peca"].to_list(), user_data.get('cpc1_3_6_list'))
+            df = complete_changed_rows(changed, full_rows).to_pandas()
 
             variables_to_send = {
                 "user_token": user_data["access_token"],
-                "table_data": filtered_df,
+                "table_data": df,
             }
 
-            send_to_approval("optimization", variables_to_send)
+            job_run = send_to_approval("optimization", variables_to_send, wait=False)
+            if not wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data):
+                return False, True, "Erro", "Erro ao enviar para aprovação."
 
             return False, True, "Sucesso", "Dados enviados para aprovação com sucesso!"
         except Exception as e:
             return False, True, "Erro", f"Erro ao enviar para aprovação: {str(e)}"
     
-    return no_update, False, False, "", ""
+    return no_update, False, no_update, no_update
 
 # Callback para aprovação/rejeição
 @callback(
@@ -1064,9 +986,10 @@ def handle_to_approval(confirm_clicks, cancel_clicks, table_data, user_data):
     Input("button-approval-reject-optimization", "n_clicks"),
     State("optimization-table", "rowData"),
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-approval-reject-optimization"),
 )
-def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
+def handle_approval(set_progress, accept_clicks, reject_clicks, table_data, user_data):
     if not ctx.triggered_id:
         return no_update
 
@@ -1087,7 +1010,10 @@ def handle_approval(accept_clicks, reject_clicks, table_data, user_data):
             "target_table": "optimization",
         }
 
-        update_approval_status(variables_to_send)
+        job_run = update_approval_status(variables_to_send, wait=False)
+        if not wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data):
+            return True, _("Erro"), _("Erro ao processar aprovação")
+
         return True, f"{status_text}", f"Status alterado para {status_text}"
 
     except Exception as e:
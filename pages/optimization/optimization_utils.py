@@ -0,0 +1,229 @@
+import pandas as pd
+import polars as pl
+from api.query_cache import QueryCache
+from utils.apply_grid_request import filter_frame
+
+# Colunas de entrada obrigatórias: linhas com algum valor nulo não são recalculadas
+REQUIRED_FIELDS = [
+    "imp_icms",
+    "desconto",
+    "imp",
+    "qtd_volume",
+    "e",
+    "costs_factor_medio",
+    "custo_medio_unit",
+]
+
+# Colunas somadas nos cards
+TOTAL_COLUMNS = [
+    "qtd_volume",
+    "vol_novo2_final",
+    "preco_venda_baseline",
+    "gross_final",
+    "margem_contribuicao_baseline",
+    "mc_final",
+]
+
+# Totais dos cards por (handle da tabela, versão, filterModel); só memória
+_totals_cache = QueryCache(max_entries=256, cache_dir=None)
+
+_KEY = "__peca_key"
+_NEW_PRICE = "__preco_sap_novo"
+
+def _float(column):
+    return pl.col(column).cast(pl.Float64)
+
+def _default_one(column):
+    value = _float(column)
+    return pl.when(value.is_null() | (value == 0)).then(pl.lit(1.0)).otherwise(value)
+
+def price_change_expressions():
+    """
+    Expressões do recálculo de uma linha da otimização a partir do novo preço SAP.
+
+    As expressões intermediárias são reaproveitadas umas dentro das outras (e não
+    como colunas), então todas podem ser aplicadas em um único `with_columns`.
+
+    Returns:
+        dict: nome da coluna -> expressão Polars com o novo valor.
+    """
+    novo_valor = pl.col(_NEW_PRICE)
+    qtd_volume = _float("qtd_volume")
+
+    preco_imp_final = (novo_valor * _float("imp_icms")).round(2)
+    preco_venda_final = (novo_valor * _float("imp_icms") * (1 - _float("desconto"))).round(2)
+    preco_net_final = (preco_venda_final * _float("imp")).round(2)
+    dp_final = ((novo_valor / _default_one("preco_sap_atual") - 1) * 100).round(1)
+    vol_novo_final = (qtd_volume * (1 + dp_final / 100).pow(_float("e"))).round(2)
+
+    # Aumentos acima de 50% limitam o volume estimado a 1,5x o volume atual
+    vol_novo2_final = (
+        pl.when(dp_final > 50)
+        .then(pl.min_horizontal(vol_novo_final, (qtd_volume * 1.5).round(2)))
+        .otherwise(vol_novo_final)
+    )
+
+    gross_final = (vol_novo2_final * preco_venda_final).round(2)
+    net_final = (vol_novo2_final * preco_net_final).round(2)
+    mc_final = ((preco_net_final + (preco_venda_final * _float("costs_factor_medio") - _float("custo_medio_unit"))) * vol_novo2_final).round(2)
+
+    return {
+        "preco_sap_novo": novo_valor,
+        "preco_imp_final": preco_imp_final,
+        "preco_venda_final": preco_venda_final,
+        "preco_net_final": preco_net_final,
+        "dp_final": dp_final,
+        "vol_novo_final": vol_novo_final,
+        "vol_novo2_final": vol_novo2_final,
+        "gross_final": gross_final,
+        "net_final": net_final,
+        "mc_final": mc_final,
+        "delta_volume_final": ((vol_novo2_final / qtd_volume - 1) * 100).round(1),
+        "delta_gross_final": ((gross_final / _default_one("preco_venda_baseline") - 1) * 100).round(1),
+        "delta_net_final": ((net_final / _default_one("preco_net_baseline") - 1) * 100).round(1),
+        "delta_mc_final": ((mc_final / _default_one("margem_contribuicao_baseline") - 1) * 100).round(1),
+        "status": pl.lit("manual"),
+        "new_alteration": pl.lit("sim"),
+    }
+
+def apply_price_changes(df, changes):
+    """
+    Aplica um conjunto de novos preços SAP na tabela da otimização e recalcula as linhas alteradas.
+
+    Todas as alterações são aplicadas de uma vez: um join com as peças alteradas e
+    um único `with_columns`, em vez de recalcular e reescrever a tabela peça a peça.
+    Usado tanto na edição de uma célula quanto na importação do Excel.
+
+    Args:
+        df (polars.DataFrame): Dados da tabela da otimização.
+        changes (dict): peça -> novo preço SAP.
+
+    Returns:
+        tuple: (polars.DataFrame com as linhas recalculadas, quantidade de linhas alteradas).
+    """
+    if not changes or df.is_empty() or "peca" not in df.columns:
+        return df, 0
+
+    changes_df = pl.DataFrame(
+        {
+            _KEY: [str(peca).strip() for peca in changes],
+            _NEW_PRICE: [float(preco) for preco in changes.values()],
+        },
+        schema={_KEY: pl.Utf8, _NEW_PRICE: pl.Float64},
+    )
+
+    changed = pl.col(_NEW_PRICE).is_not_null()
+    for column in REQUIRED_FIELDS:
+        changed = changed & pl.col(column).is_not_null()
+
+    updates = [
+        pl.when(pl.col("__changed")).then(expression).otherwise(pl.col(column)).alias(column)
+        for column, expression in price_change_expressions().items()
+    ]
+
+    result = (
+        df.lazy()
+        .with_columns(pl.col("peca").cast(pl.Utf8).str.strip_chars().alias(_KEY))
+        .join(changes_df.lazy(), on=_KEY, how="left", maintain_order="left")
+        .with_columns(changed.alias("__changed"))
+        .with_columns(updates)
+        .collect()
+    )
+
+    updated_rows = int(result["__changed"].sum())
+
+    return result.drop(_KEY, _NEW_PRICE, "__changed"), updated_rows
+
+def complete_changed_rows(changed, full_rows):
+    """Linhas completas de d_otimizacao com os valores editados na página.
+
+    Args:
+        changed (polars.DataFrame): Linhas alteradas, apenas com as colunas trazidas para a página.
+        full_rows (polars.DataFrame): As mesmas peças com todas as colunas (get_optimization_rows).
+
+    Returns:
+        polars.DataFrame: Todas as colunas de `full_rows`, com as colunas da página substituídas
+        pelos valores editados, mais as colunas criadas pela página (ex.: new_alteration).
+    """
+    page_columns = [column for column in changed.columns if column != "peca"]
+    base = full_rows.drop([column for column in page_columns if column in full_rows.columns])
+
+    result = base.join(changed, on="peca", how="inner")
+    ordered = [column for column in full_rows.columns if column in result.columns]
+    return result.select(ordered + [column for column in result.columns if column not in ordered])
+
+def _division(sums, column1, column2):
+    if column1 not in sums or column2 not in sums:
+        return None
+    value1 = round(float(sums[column1] or 0), 2)
+    value2 = round(float(sums[column2] or 0), 2)
+    return round(value1 / value2, 2) if value2 != 0 else None
+
+def _formatted_sum(sums, column):
+    if column not in sums:
+        return None
+    return f"{sums[column] or 0:.2f}"
+
+def calculate_totals(df):
+    """
+    Totais dos cards da otimização (preço médio, volume, faturamento bruto e margem).
+
+    Todas as somas saem de um único `select`, mesmo formato de
+    calculation_division/sum_df_col usado antes.
+
+    Args:
+        df (polars.DataFrame | pandas.DataFrame | list): Linhas consideradas nos totais.
+
+    Returns:
+        dict: {'price' | 'volume' | 'gross' | 'margin': (baseline, estimado)} ou None em caso de erro.
+    """
+    if isinstance(df, list):
+        df = pl.DataFrame(df)
+    elif isinstance(df, pd.DataFrame):
+        df = pl.from_pandas(df)
+
+    try:
+        present = [column for column in TOTAL_COLUMNS if column in df.columns]
+        sums = df.select([pl.col(column).sum() for column in present]).row(0, named=True) if present else {}
+    except Exception as e:
+        print(f"Erro no cálculo dos totalizadores: {e}")
+        return None
+
+    return {
+        'price': (_division(sums, "preco_venda_baseline", "qtd_volume"), _division(sums, "gross_final", "vol_novo2_final")),
+        'volume': (_formatted_sum(sums, "qtd_volume"), _formatted_sum(sums, "vol_novo2_final")),
+        'gross': (_formatted_sum(sums, "preco_venda_baseline"), _formatted_sum(sums, "gross_final")),
+        'margin': (_formatted_sum(sums, "margem_contribuicao_baseline"), _formatted_sum(sums, "mc_final")),
+    }
+
+def calculate_filtered_totals(df, filter_model=None, table_handle=None):
+    """
+    Totais dos cards para as linhas que passam no filterModel da tabela.
+
+    O resultado fica em cache por handle, versão da tabela e filterModel: voltar
+    para um filtro já aplicado não percorre a tabela de novo, e qualquer edição
+    (nova versão) usa entradas novas.
+
+    Args:
+        df (polars.DataFrame): Tabela completa guardada no servidor.
+        filter_model (dict, optional): filterModel do AG Grid.
+        table_handle (dict, optional): {"handle", "version"} da tabela. Sem ele, não usa cache.
+
+    Returns:
+        dict: Mesmo formato de `calculate_totals`.
+    """
+    filter_model = filter_model or {}
+
+    def load():
+        return calculate_totals(filter_frame(df, filter_model))
+
+    if not table_handle:
+        return load()
+
+    return _totals_cache.get_or_load(
+        table_handle["handle"],
+        load,
+        filters=filter_model,
+        scope=table_handle.get("version"),
+        persist=False,
+    )
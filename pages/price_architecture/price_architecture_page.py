@@ -4,8 +4,11 @@ from dash.dash_table.Format import Format, Group
 import pandas as pd
 import json
 from api.api_get_var_arq_price import get_var_arq_price
+from api.query_executor import query_executor
 from api.send_variables_to_price_simulation import send_variables_to_price_simulation
+from background_jobs import background_job_options, wait_with_progress
 from components.Modal import create_modal
+from components.Toast import Toast
 from utils.deserialize_json import deserialize_json
 from static_data.helper_text import helper_text
 from components.Helper_button_with_modal import create_help_button_with_modal
@@ -160,6 +163,7 @@ def get_layout(pathname, user_data):
 
     location_and_stores = [
         dcc.Location(id="url-simulation", refresh=True),
+        Toast(id="toast-price-simulation", header=_("Simulação")),
         dcc.Store(id='stored-variables', storage_type="session"),
         dcc.Store(id='stored-category-states', storage_type="session")
     ]
@@ -227,6 +231,13 @@ def toggle_cards(*args):
                 return new_states
     return states
 
+def load_category(cat_id):
+    try:
+        return get_var_arq_price(cat_id.lower())
+    except Exception as e:
+        print(f"Erro ao carregar dados para {cat_id}: {e}")
+        return None
+
 # Callback para lidar com os dados das tabelas
 @callback(
     [Output(f"table-price-architecture-{cat_id}", "data") for cat_id in VARIABLES_CATEGORIES.keys()],
@@ -250,14 +261,11 @@ def update_tables(*args):
         
         # Se não houver dados armazenados, carrega dados para cada categoria expandida
         if not stored_data:
-            for cat_id, is_open in zip(VARIABLES_CATEGORIES.keys(), collapse_states):
-                if is_open:
-                    try:
-                        df = get_var_arq_price(cat_id.lower())
-                        if not df.empty:
-                            categorized_data[cat_id] = df.to_dict("records")
-                    except Exception as e:
-                        print(f"Erro ao carregar dados para {cat_id}: {e}")
+            open_categories = [cat_id for cat_id, is_open in zip(VARIABLES_CATEGORIES.keys(), collapse_states) if is_open]
+            # As categorias abertas são consultadas em paralelo no executor compartilhado
+            for cat_id, df in zip(open_categories, query_executor.map(load_category, open_categories, label="arquitetura de preços")):
+                if df is not None and not df.empty:
+                    categorized_data[cat_id] = df.to_dict("records")
         else:
             # Se houver dados armazenados, usa eles
             stored_dict = deserialize_json(stored_data)
@@ -350,17 +358,22 @@ def handle_modal_simulation(click_simulation, click_confirm, click_cancel, is_op
     
     return False, None, default_buttons
 
-# Callback para lidar com os dados de simulação
+# Callback para lidar com os dados de simulação (executa o job em segundo plano)
 @callback(
     Output("url-simulation", "pathname"),
+    Output("modal-price-architecture", "is_open", allow_duplicate=True),
+    Output("toast-price-simulation", "is_open"),
+    Output("toast-price-simulation", "header"),
+    Output("toast-price-simulation", "children"),
     Input("button-confirm-simulation", "n_clicks"),
     [State(f"table-price-architecture-{cat_id}", "data") for cat_id in VARIABLES_CATEGORIES.keys()],
     State("store-token", "data"),
-    prevent_initial_call=True
+    prevent_initial_call=True,
+    **background_job_options("toast-price-simulation"),
 )
-def handle_simulation_data(n_clicks, *args):
+def handle_simulation_data(set_progress, n_clicks, *args):
     if not n_clicks:
-        return no_update
+        return no_update, no_update, no_update, no_update, no_update
         
     # Extract data from args
     table_data = args[:-1]  # All but the last argument
@@ -390,9 +403,10 @@ def handle_simulation_data(n_clicks, *args):
         "table_data": table_values
     }
 
-    response = send_variables_to_price_simulation(variables_to_send)
+    job_run = send_variables_to_price_simulation(variables_to_send, wait=False)
+    response = wait_with_progress(job_run, set_progress, _("Simulação"), _("Executando simulação..."), user_data)
 
     if response is True:
-        return "/price-simulation"
+        return "/price-simulation", no_update, no_update, no_update, no_update
     
-    return no_update
+    return no_update, False, True, _("Erro"), _("Erro ao executar a simulação")
@@ -4,15 +4,15 @@ from dash.dash_table import FormatTemplate
 from dash.dash_table.Format import Format
 import polars as pl
 import pandas as pd
-from pages.approvals.approval_utils import container_approval_reject_buttons
+from pages.approvals.approval_utils import container_approval_reject_buttons, get_approval_requests, render_approval_tab
 from components.Card import Card
 from components.Toast import Toast
 from components.Helper_button_with_modal import create_help_button_with_modal
 from components.Modal import create_modal
 from api.api_get_last_sim_user import get_last_sim_user
-from api.get_requests_for_approval import get_requests_for_approval
 from api.send_to_approval import send_to_approval
 from api.update_approval_status import update_approval_status
+from background_jobs import background_job_options, wait_with_progress
 from utils.sum_df_col import sum_df_col
 from utils.calculation_division import calculation_division
 from utils.handle_nothing_to_approve import handle_nothing_to_approve
@@ -266,8 +266,8 @@ helper_button = html.Div(
     ), style=CONTAINER_HELPER_BUTTON_STYLE,
 )
 
-def get_layout(pathname):
-    table_data = get_requests_for_approval(table="price") if pathname == "/approval" else get_last_sim_user()
+def get_layout(pathname, approval_tab=None):
+    table_data = get_approval_requests("price", approval_tab) if pathname == "/approval" else get_last_sim_user()
 
     if table_data is None:
         return handle_nothing_to_approve()
@@ -329,14 +329,15 @@ price_sim_architecture_page = html.Div([
     Input("url", "pathname"),
     State("store-token", "data"),
     Input("store-language", "data"),
+    Input("approval-tab-store", "data"),
 )
-def update_price_simulation_content(pathname, user_data, language):
+def update_price_simulation_content(pathname, user_data, language, approval_tab):
 
     global _
     _ = setup_translations(language)
 
-    if pathname in ["/price-simulation", "/approval"]:
-        return get_layout(pathname)
+    if pathname == "/price-simulation" or (pathname == "/approval" and render_approval_tab(approval_tab, "price")):
+        return get_layout(pathname, approval_tab=approval_tab)
     return no_update
 
 # Callback para baixar a tabela em Excel
@@ -366,33 +367,71 @@ def handle_excel_download(n_clicks, row_data):
 
     return dcc.send_data_frame(df_export.to_excel, "price_simulation_data.xlsx", index=False)
 
-# Callback para controlar todas as operações de modal e aprovação
+# Callback para abrir/fechar o modal de confirmação
 @callback(
-    Output('table-price-simulation', 'data'),
     Output("modal-confirm-approval-price", "is_open"),
+    Input("button-approval-price-simulation", "n_clicks"),
+    Input("btn-cancel-approval", "n_clicks"),
+    prevent_initial_call=True,
+)
+def toggle_approval_modal(open_clicks, cancel_clicks):
+    return ctx.triggered_id == "button-approval-price-simulation" and bool(open_clicks)
+
+# Callback para envio para aprovação e aprovação/rejeição (executa o notebook em segundo plano)
+@callback(
+    Output("modal-confirm-approval-price", "is_open", allow_duplicate=True),
     Output("toast-approval-price", "is_open"),
     Output("toast-approval-price", "header"),
     Output("toast-approval-price", "children"),
-    Input("button-approval-price-simulation", "n_clicks"),
     Input("btn-confirm-approval", "n_clicks"),
-    Input("btn-cancel-approval", "n_clicks"),
     Input("button-approval-accept-price", "n_clicks"),
     Input("button-approval-reject-price", "n_clicks"),
     State('table-price-simulation', 'data'),
     State("store-token", "data"),
     prevent_initial_call=True,
+    **background_job_options("toast-approval-price", running=[(Output("modal-confirm-approval-price", "is_open"), False, False)]),
 )
-def handle_all_modal_and_approval(open_clicks, confirm_clicks, cancel_clicks, 
-                                accept_clicks, reject_clicks, table_data, user_data):
+def handle_all_modal_and_approval(set_progress, confirm_clicks, accept_clicks, reject_clicks, table_data, user_data):
     triggered_id = ctx.triggered_id
     
-    # Abrir o modal
-    if triggered_id == "button-approval-price-simulation":
-        return no_update, True, False, "", ""
+    # Confirmar envio para aprovação
+    if triggered_id == "btn-confirm-approval" and confirm_clicks:
+        try:
+            uuid_alteracoes = table_data[0]["uuid_alteracoes"]
+            variables_to_send = {
+                "user_token": user_data["access_token"],
+                "uuid_alteracoes": uuid_alteracoes,
+            }
+            job_run = send_to_approval("price_simulation", variables_to_send, wait=False)
+            if not wait_with_progress(job_run, set_progress, _("Aprovação"), _("Enviando para aprovação..."), user_data):
+                return False, True, "Erro", "Erro ao enviar para aprovação."
+            return False, True, "Sucesso", "Dados enviados para aprovação com sucesso!"
+        except Exception as e:
+            return False, True, "Erro", f"Erro ao enviar para aprovação: {str(e)}"
+    
+    # Aprovar/Rejeitar
+    if triggered_id in ["button-approval-accept-price", "button-approval-reject-price"]:
+        try:
+            status = "1" if triggered_id == "button-approval-accept-price" else "2"
+            status_text = "aprovado" if status == "1" else "recusado"
+            
+            uuid_alteracoes = table_data[0]["hash_simulacao"]
+            variables_to_send = {
+                "uuid_alteracoes": uuid_alteracoes,
+                "status": status,
+                "user_token": user_data["access_token"],
+                "target_table": "price",
+            }
+            
+            job_run = update_approval_status(variables_to_send, wait=False)
+            if not wait_with_progress(job_run, set_progress, status_text, _("Atualizando status..."), user_data):
+                return False, True, "Erro", "Erro ao processar aprovação."
+            return False, True, f"{status_text}", f"Status alterado para {status_text}"
+        except Exception as e:
+            print(f"Erro ao processar aprovação: {str(e)}")
+            return False, True, "Erro", f"Erro ao processar aprovação: {str(e)}"
     
-    # Cancelar
-    if triggered_id == "btn-cancel-approval" and cancel_clicks:
-        return no_update, False, False, "", ""
+    return no_update, False, "", ""
     
     # Confirmar envio para aprovação
     if triggered_id == "btn-confirm-approval" and confirm_clicks:
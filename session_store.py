@@ -0,0 +1,427 @@
+"""Armazenamento no servidor dos dados de trabalho de cada sessão (tabelas e variáveis das páginas).
+
+Em vez de enviar os dados para o navegador (rowData, dcc.Store com JSON) e
+recebê-los de volta em todo callback, a página guarda o valor aqui e entrega ao
+cliente apenas um identificador opaco (`handle`) e a versão atual dos dados.
+
+Os valores ficam em memória (LRU limitado por quantidade e por bytes) e são
+gravados em arquivos Arrow IPC na pasta de cache. Assim, uma entrada retirada
+da memória continua disponível no disco, e outros processos (workers do
+gunicorn, callbacks em segundo plano) enxergam os mesmos dados. Entradas sem
+acesso por mais de `ttl` segundos são descartadas.
+
+A gravação no disco e a limpeza das entradas expiradas rodam em uma thread do
+processo, fora do callback: `put` (chamado a cada edição de célula) apenas
+atualiza a memória e agenda a gravação da versão mais recente.
+
+Os valores retornados por `get` são os próprios objetos guardados: os callbacks
+não devem alterá-los, e sim montar um novo valor e gravá-lo com `put`.
+"""
+
+import json
+import os
+import pathlib
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SESSION_STORE_TTL = float(os.getenv('SESSION_STORE_TTL', '28800'))
+SESSION_STORE_MAX_ENTRIES = int(os.getenv('SESSION_STORE_MAX_ENTRIES', '64'))
+SESSION_STORE_MAX_BYTES = int(os.getenv('SESSION_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+SESSION_STORE_DIR = os.getenv('SESSION_STORE_DIR') or str(pathlib.Path(__file__).parent / "cache" / "session")
+SESSION_STORE_PURGE_INTERVAL = float(os.getenv('SESSION_STORE_PURGE_INTERVAL', '600'))
+
+# Tempo máximo que `get` espera pela gravação de uma versão feita por outro processo
+DISK_VERSION_WAIT = 2.0
+
+KIND_KEY = b"session_store_kind"
+VERSION_KEY = b"session_store_version"
+
+def _handle(ref):
+    return ref.get("handle") if isinstance(ref, dict) else ref
+
+def _version(ref):
+    return ref.get("version") if isinstance(ref, dict) else None
+
+def to_arrow(value):
+    """Converte o valor em uma tabela Arrow e retorna (tabela, tipo original)"""
+
+    if isinstance(value, pl.DataFrame):
+        return value.to_arrow(), "polars"
+    if isinstance(value, pd.DataFrame):
+        return pa.Table.from_pandas(value, preserve_index=False), "pandas"
+    try:
+        if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+            return pa.Table.from_pylist(value), "records"
+        if isinstance(value, dict):
+            return pa.Table.from_pylist([value]), "dict"
+    except (pa.ArrowException, TypeError, ValueError):
+        # Tipos misturados na mesma coluna: guarda como JSON
+        pass
+    return pa.table({"json": [json.dumps(value, default=str)]}), "json"
+
+def from_arrow(table, kind):
+    """Reconstrói o valor original a partir da tabela Arrow"""
+
+    if kind == "polars":
+        return pl.from_arrow(table)
+    if kind == "pandas":
+        return table.to_pandas()
+    if kind == "records":
+        return table.to_pylist()
+    if kind == "dict":
+        return table.to_pylist()[0]
+    return json.loads(table.column("json")[0].as_py())
+
+def estimate_size(value, table=None):
+    """Tamanho aproximado do valor em memória, em bytes"""
+
+    if isinstance(value, pl.DataFrame):
+        return int(value.estimated_size())
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if table is not None:
+        return int(table.nbytes)
+    return len(json.dumps(value, default=str))
+
+class SessionStore:
+    """Dados de trabalho das sessões, identificados por handle, em memória e em Arrow IPC no disco.
+
+    Args:
+        ttl (float): Tempo sem acesso após o qual a entrada é descartada, em segundos.
+        max_entries (int): Quantidade máxima de entradas mantidas em memória.
+        max_bytes (int): Memória máxima (aproximada) ocupada pelas entradas.
+        cache_dir (str, optional): Pasta dos arquivos Arrow IPC. Se None, só memória.
+        purge_interval (float): Intervalo entre as limpezas das entradas expiradas, em segundos.
+    """
+
+    def __init__(self, ttl=SESSION_STORE_TTL, max_entries=SESSION_STORE_MAX_ENTRIES, max_bytes=SESSION_STORE_MAX_BYTES, cache_dir=SESSION_STORE_DIR, clock=time.time, purge_interval=SESSION_STORE_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else None
+        self.purge_interval = purge_interval
+        self._clock = clock
+
+        self._entries = OrderedDict()  # handle -> (valor, versão, bytes, último acesso)
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        # Gravações pendentes (handle -> (valor, versão)): só a versão mais recente de cada handle é gravada
+        self._pending = {}
+        self._pending_changed = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._writer_pid = None
+        self._purged_at = self._clock()
+
+    def put(self, value, handle=None):
+        """Guarda `value` e retorna {"handle": ..., "version": ...} para o dcc.Store da página.
+
+        Se `handle` for informado, substitui os dados dele e incrementa a versão.
+        O valor não deve ser alterado depois de guardado. A primeira versão é
+        gravada no disco na hora (os outros processos passam a enxergar o handle);
+        as seguintes, feitas a cada edição, em segundo plano (ver `flush`).
+        """
+
+        now = self._clock()
+        new_handle = handle is None
+
+        with self._lock:
+            if new_handle:
+                handle = secrets.token_urlsafe(16)
+                version = 0
+            else:
+                entry = self._entries.get(handle)
+                pending = self._pending.get(handle)
+                version = max(
+                    entry[1] if entry else -1,
+                    pending[1] if pending else -1,
+                    -1 if entry else self._disk_version(handle),
+                ) + 1
+
+            self._set_entry(handle, value, version, estimate_size(value), now)
+
+            if self.cache_dir is not None:
+                self._pending[handle] = (value, version)
+                self._pending_changed.notify()
+
+        if new_handle and self.cache_dir is not None:
+            self._write_pending(handle, value, version)
+        else:
+            self._start_writer()
+
+        return {"handle": handle, "version": version}
+
+    def flush(self):
+        """Grava no disco as versões pendentes, na thread atual"""
+
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                handle = next(iter(self._pending))
+                value, version = self._pending[handle]
+            self._write_pending(handle, value, version)
+
+    def get(self, ref):
+        """Retorna os dados do handle ou None se não existir ou tiver expirado.
+
+        Args:
+            ref (dict | str): {"handle": ..., "version": ...} retornado por `put` ou o próprio handle.
+                Se a versão em memória for mais antiga que a pedida (gravada por
+                outro processo), os dados são relidos do disco.
+        """
+
+        handle = _handle(ref)
+        if not handle:
+            return None
+
+        version = _version(ref)
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None:
+                value, entry_version, size, accessed_at = entry
+                if now - accessed_at < self.ttl and (version is None or entry_version >= version):
+                    self._entries[handle] = (value, entry_version, size, now)
+                    self._entries.move_to_end(handle)
+                    if now - accessed_at >= 60:
+                        # Renova o prazo do arquivo, usado pelos outros processos
+                        self._touch(handle)
+                    return value
+                self._pop_entry(handle)
+
+            # Retirada da memória, mas ainda não gravada no disco
+            pending = self._pending.get(handle)
+            if pending is not None and (version is None or pending[1] >= version):
+                value, pending_version = pending
+                self._set_entry(handle, value, pending_version, estimate_size(value), now)
+                return value
+
+        loaded = self._read_disk(handle, now)
+        deadline = time.monotonic() + DISK_VERSION_WAIT
+        while version is not None and loaded is not None and loaded[1] < version and time.monotonic() < deadline:
+            # Versão gravada por outro processo, cuja gravação em segundo plano ainda não terminou
+            time.sleep(0.05)
+            loaded = self._read_disk(handle, now)
+
+        if loaded is None:
+            return None
+
+        value, disk_version, size = loaded
+        with self._lock:
+            self._set_entry(handle, value, disk_version, size, now)
+
+        return value
+
+    def delete(self, ref):
+        """Remove os dados do handle (memória e disco)"""
+
+        handle = _handle(ref)
+        with self._lock:
+            self._pop_entry(handle)
+            self._pending.pop(handle, None)
+        if self.cache_dir is not None and handle:
+            # Espera uma gravação em andamento do mesmo handle antes de remover o arquivo
+            with self._write_lock:
+                self._remove(self._path(handle))
+
+    def purge_expired(self, now=None):
+        """Descarta as entradas sem acesso há mais de `ttl` segundos (memória e disco)"""
+
+        now = self._clock() if now is None else now
+        self._purged_at = now
+
+        with self._lock:
+            for handle in [handle for handle, entry in self._entries.items() if now - entry[3] >= self.ttl]:
+                self._pop_entry(handle)
+
+        with self._lock:
+            in_memory = set(self._entries) | set(self._pending)
+
+        for path in self._disk_files():
+            try:
+                if path.stem not in in_memory and now - path.stat().st_mtime >= self.ttl:
+                    self._remove(path)
+            except OSError:
+                continue
+
+    def stats(self):
+        """Uso atual do armazenamento (para logs e monitoramento)"""
+
+        disk_files = self._disk_files()
+        disk_bytes = 0
+        for path in disk_files:
+            try:
+                disk_bytes += path.stat().st_size
+            except OSError:
+                continue
+
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(disk_files),
+                "disk_bytes": disk_bytes,
+            }
+
+    def _start_writer(self):
+        # Threads não sobrevivem a um fork: cada processo inicia a sua
+        if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+
+        with self._lock:
+            if self._writer is not None and self._writer_pid == os.getpid() and self._writer.is_alive():
+                return
+
+            self._writer = threading.Thread(target=self._run_writer, name="session-store-writer", daemon=True)
+            self._writer_pid = os.getpid()
+            self._writer.start()
+
+    def _run_writer(self):
+        """Grava as versões pendentes e, a cada `purge_interval`, descarta as entradas expiradas"""
+
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._pending_changed.wait(timeout=self.purge_interval)
+
+            self.flush()
+
+            if self._clock() - self._purged_at >= self.purge_interval:
+                try:
+                    self.purge_expired()
+                except Exception as e:
+                    print(f"Erro ao limpar dados da sessão: {e}")
+
+    def _write_pending(self, handle, value, version):
+        with self._write_lock:
+            with self._lock:
+                # Substituída por uma versão mais nova ou removida enquanto esperava
+                if self._pending.get(handle, (None, None))[1] != version:
+                    return
+            try:
+                table, kind = to_arrow(value)
+                self._write_disk(handle, table, kind, version)
+            finally:
+                with self._lock:
+                    if self._pending.get(handle, (None, None))[1] == version:
+                        del self._pending[handle]
+
+    def _touch(self, handle):
+        if self.cache_dir is None:
+            return
+        try:
+            os.utime(self._path(handle))
+        except OSError:
+            pass
+
+    def _set_entry(self, handle, value, version, size, accessed_at):
+        self._pop_entry(handle)
+        self._entries[handle] = (value, version, size, accessed_at)
+        self._bytes += size
+
+        # Retira da memória as entradas menos usadas; com disco elas continuam disponíveis
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._pop_entry(next(iter(self._entries)))
+
+    def _pop_entry(self, handle):
+        entry = self._entries.pop(handle, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _path(self, handle):
+        return self.cache_dir / f"{handle}.arrow"
+
+    def _disk_files(self):
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return []
+        return [path for path in self.cache_dir.iterdir() if path.suffix == ".arrow"]
+
+    def _disk_version(self, handle):
+        if self.cache_dir is None:
+            return -1
+        try:
+            with pa.OSFile(str(self._path(handle)), "rb") as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+            return int(metadata.get(VERSION_KEY, -1))
+        except (OSError, pa.ArrowException, ValueError):
+            return -1
+
+    def _read_disk(self, handle, now):
+        if self.cache_dir is None:
+            return None
+
+        path = self._path(handle)
+        try:
+            if now - path.stat().st_mtime >= self.ttl:
+                self._remove(path)
+                return None
+
+            with pa.OSFile(str(path), "rb") as source:
+                table = pa.ipc.open_file(source).read_all()
+
+            # O acesso renova o prazo de expiração
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, pa.ArrowException) as e:
+            print(f"Erro ao ler dados da sessão: {e}")
+            self._remove(path)
+            return None
+
+        metadata = table.schema.metadata or {}
+        kind = metadata.get(KIND_KEY, b"json").decode()
+        version = int(metadata.get(VERSION_KEY, 0))
+        value = from_arrow(table, kind)
+
+        return value, version, estimate_size(value, table)
+
+    def _write_disk(self, handle, table, kind, version):
+        metadata = {**(table.schema.metadata or {}), KIND_KEY: kind.encode(), VERSION_KEY: str(version).encode()}
+        table = table.replace_schema_metadata(metadata)
+
+        def writer(tmp_path):
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as ipc_writer:
+                    ipc_writer.write_table(table)
+
+        try:
+            self._atomic_write(self._path(handle), writer)
+        except Exception as e:
+            # Mesmo se falhar ao gravar, o valor continua disponível em memória neste processo
+            print(f"Erro ao salvar dados da sessão: {e}")
+
+    def _atomic_write(self, path, writer):
+        """Escreve em um arquivo temporário na mesma pasta e o renomeia para o destino"""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(pathlib.Path(tmp_path))
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+session_store = SessionStore()
@@ -223,4 +223,15 @@ TOAST_STYLE = {
     "right": 40,
     "width": 350,
     "backgroundColor": "white",
-}
\ No newline at end of file
+}
+BACKGROUND_JOB_CANCEL_STYLE = {
+    "position": "fixed",
+    "bottom": 40,
+    "right": 40,
+    "zIndex": 1100,
+}
+
+BACKGROUND_JOB_CANCEL_HIDDEN_STYLE = {
+    **BACKGROUND_JOB_CANCEL_STYLE,
+    "display": "none",
+}
@@ -0,0 +1,20 @@
+"""
+Shared helpers for the tests.
+
+This module contains test doubles used by more than one test module.
+"""
+
+
+class FakeClock:
+    """Clock controlled by the tests, advanced by hand or by the fake sleep."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
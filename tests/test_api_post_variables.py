@@ -0,0 +1,57 @@
+"""
+Tests for the api.api_post_variables module.
+
+This module contains tests for the batched submission of the price-architecture
+variables, with the Databricks job runner replaced by a mock.
+"""
+
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from api.api_post_variables import post_variables
+from api.job_runner import JobRun
+
+
+@patch.dict(os.environ, {'DB_SERVER': 'https://databricks', 'DB_TOKEN': 'token', 'DB_CLUSTER_ID': 'cluster', 'BASE_NOTEBOOK_PATH': '/notebooks'})
+class TestPostVariables(unittest.TestCase):
+    """Tests for the post_variables function."""
+
+    def test_submits_every_variable_in_one_batch(self):
+        """Test that all variables go in a single submit_notebooks call and each gets a status."""
+        runner = MagicMock()
+        runner.submit_notebooks.side_effect = lambda submissions: {
+            key: JobRun(runner, run_id) if key != 'frota' else ConnectionError('403')
+            for run_id, key in enumerate(submissions, start=1)
+        }
+
+        with patch('api.api_post_variables.job_runner', runner):
+            status = post_variables(json.dumps({'marca': [{'id': 1}], 'frota': [{'id': 2}], 'estoque': [{'id': 3}]}))
+
+        submissions = runner.submit_notebooks.call_args.args[0]
+        self.assertEqual(set(submissions), {'marca', 'frota', 'estoque'})
+        self.assertTrue(submissions['marca']['notebook_path'].endswith('proc_atualizar_porcentagens_marca_elasticidade'))
+        self.assertTrue(submissions['estoque']['notebook_path'].endswith('proc_atualizar_porcentagens'))
+        self.assertEqual(status['marca']['life_cycle_state'], 'SUBMITTED')
+        self.assertEqual(status['frota']['life_cycle_state'], 'SUBMIT_FAILED')
+        self.assertEqual(status['frota']['error'], '403')
+        runner.wait_all.assert_not_called()
+
+    def test_wait_waits_for_all_runs_together(self):
+        """Test that wait=True waits for the submitted runs in a single wait_all call."""
+        runner = MagicMock()
+        runner.submit_notebooks.side_effect = lambda submissions: {
+            key: JobRun(runner, run_id) for run_id, key in enumerate(submissions, start=1)
+        }
+
+        with patch('api.api_post_variables.job_runner', runner):
+            post_variables(json.dumps({'marca': [], 'elasticidade': []}), wait=True, timeout=60)
+
+        job_runs = runner.wait_all.call_args.args[0]
+        self.assertEqual([job_run.run_id for job_run in job_runs], [1, 2])
+        self.assertEqual(runner.wait_all.call_args.kwargs['timeout'], 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the utils.apply_grid_request module.
+
+This module contains tests for the server-side filtering, sorting and
+pagination used by the AG Grid infinite row model.
+"""
+
+import unittest
+
+import polars as pl
+
+from utils.apply_grid_request import apply_grid_request, filter_frame, sort_frame
+
+
+def make_frame():
+    """Create a small optimization-like table."""
+    return pl.DataFrame({
+        "peca": ["A1", "B2", "C3", "a4", None],
+        "status": ["manual", "otimizado", "manual", "otimizado", "manual"],
+        "dp_final": [10.0, -5.0, 0.0, 30.0, None],
+    })
+
+
+class TestApplyGridRequest(unittest.TestCase):
+    """Tests for apply_grid_request, filter_frame and sort_frame."""
+
+    def test_returns_only_requested_block_and_total_count(self):
+        """Test that only the rows between startRow and endRow are sent, with the filtered count."""
+        response = apply_grid_request(make_frame(), {"startRow": 1, "endRow": 3})
+
+        self.assertEqual([row["peca"] for row in response["rowData"]], ["B2", "C3"])
+        self.assertEqual(response["rowCount"], 5)
+
+    def test_text_filter_is_case_insensitive(self):
+        """Test that text filters match regardless of case, like the client-side grid."""
+        df = filter_frame(make_frame(), {"peca": {"filterType": "text", "type": "startsWith", "filter": "A"}})
+
+        self.assertEqual(df["peca"].to_list(), ["A1", "a4"])
+
+    def test_combined_conditions(self):
+        """Test that OR conditions of a column and filters on several columns are applied."""
+        filter_model = {
+            "status": {"filterType": "text", "type": "equals", "filter": "manual"},
+            "peca": {
+                "filterType": "text",
+                "operator": "OR",
+                "conditions": [
+                    {"filterType": "text", "type": "equals", "filter": "a1"},
+                    {"filterType": "text", "type": "equals", "filter": "c3"},
+                ],
+            },
+        }
+
+        self.assertEqual(filter_frame(make_frame(), filter_model)["peca"].to_list(), ["A1", "C3"])
+
+    def test_number_filter(self):
+        """Test numeric comparisons, with null values excluded."""
+        df = filter_frame(make_frame(), {"dp_final": {"filterType": "number", "type": "greaterThanOrEqual", "filter": 0}})
+
+        self.assertEqual(df["peca"].to_list(), ["A1", "C3", "a4"])
+
+    def test_sort_model_with_nulls_last(self):
+        """Test that sorting follows the sortModel and keeps nulls at the end."""
+        df = sort_frame(make_frame(), [{"colId": "dp_final", "sort": "desc"}])
+
+        self.assertEqual(df["peca"].to_list(), ["a4", "A1", "C3", "B2", None])
+
+    def test_unknown_columns_are_ignored(self):
+        """Test that filters and sorts on columns missing from the frame do not fail."""
+        request = {
+            "startRow": 0,
+            "endRow": 10,
+            "filterModel": {"missing": {"filterType": "text", "type": "contains", "filter": "x"}},
+            "sortModel": [{"colId": "missing", "sort": "asc"}],
+        }
+
+        self.assertEqual(apply_grid_request(make_frame(), request)["rowCount"], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
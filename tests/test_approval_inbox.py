@@ -0,0 +1,101 @@
+"""
+Tests for the api.approval_inbox module.
+
+This module contains tests for the approval inbox: the single aggregated query
+with the pending counts of every process, the paginated list of requests and
+the dump rows fetched only for the opened request.
+"""
+
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from api.approval_inbox import (
+    build_pending_counts_query,
+    build_pending_requests_query,
+    get_pending_counts,
+    get_pending_requests,
+)
+from api.approval_tables import APPROVAL_TABLE
+from api.get_requests_for_approval import get_requests_for_approval
+from api.query_cache import QueryCache
+from pages.approvals.approval_utils import selected_request
+
+
+class TestApprovalInboxQueries(unittest.TestCase):
+    """Tests for the inbox query builders."""
+
+    def test_counts_for_all_processes_in_one_query(self):
+        """Test that the counts query reads every historic table once and aggregates by process."""
+        query = build_pending_counts_query()
+
+        self.assertEqual(query.count("UNION ALL"), len(APPROVAL_TABLE) - 1)
+        for config in APPROVAL_TABLE.values():
+            self.assertEqual(query.count(f"FROM {config['historic_table']} "), 1)
+        self.assertIn("COUNT(DISTINCT request_id) AS pending", query)
+        self.assertTrue(query.endswith("GROUP BY source_table"))
+        self.assertNotIn("dump_", query)
+
+    def test_requests_are_paginated_newest_first(self):
+        """Test that a page of requests is ordered by date and limited with LIMIT/OFFSET."""
+        query = build_pending_requests_query("price", page=2, page_size=20)
+
+        self.assertIn("hash_simulacao AS uuid_alteracoes", query)
+        self.assertIn("FROM maxis_sandbox.pricing_db.historico_simulacoes WHERE status = 3", query)
+        self.assertIn("ORDER BY data_simulacao DESC", query)
+        self.assertTrue(query.endswith("LIMIT 20 OFFSET 40"))
+
+
+class TestApprovalInbox(unittest.TestCase):
+    """Tests for the cached inbox functions."""
+
+    @patch('api.approval_inbox.fetch_pending_counts')
+    def test_processes_without_requests_count_zero(self, mock_fetch):
+        """Test that every process is present in the counts, with zero when nothing is pending."""
+        mock_fetch.return_value = pd.DataFrame({
+            "source_table": ["delta", "buildup"],
+            "pending": [3, 1],
+            "last_request": ["2025-01-02", "2025-01-01"],
+        })
+
+        with patch('api.approval_inbox.query_cache', QueryCache(cache_dir=None)):
+            counts = get_pending_counts()
+            get_pending_counts()
+
+        mock_fetch.assert_called_once()
+        self.assertEqual(counts["delta"], {"pending": 3, "last_request": "2025-01-02"})
+        self.assertEqual(counts["catlote"]["pending"], 0)
+        self.assertEqual(set(counts), set(APPROVAL_TABLE))
+
+    @patch('api.approval_inbox.fetch_pending_requests')
+    def test_pages_are_cached_separately(self, mock_fetch):
+        """Test that each page of the inbox is cached under its own key."""
+        mock_fetch.return_value = pd.DataFrame({"uuid_alteracoes": ["a"], "usuario_id": ["u"], "data_alteracoes": ["d"]})
+
+        with patch('api.approval_inbox.query_cache', QueryCache(cache_dir=None)):
+            get_pending_requests("delta", page=0)
+            get_pending_requests("delta", page=0)
+            get_pending_requests("delta", page=1)
+
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertIsNone(get_pending_requests("unknown"))
+
+    @patch('api.get_requests_for_approval.fetch_requests_for_approval')
+    @patch('pages.approvals.approval_utils.newest_pending_request')
+    def test_only_the_opened_request_is_fetched(self, mock_newest, mock_fetch):
+        """Test that the tab opens the newest request by default, or the one chosen in the inbox."""
+        mock_newest.return_value = "newest"
+        mock_fetch.return_value = pd.DataFrame({"uuid_alteracoes": ["newest"]})
+
+        self.assertEqual(selected_request(None, "delta"), "newest")
+        self.assertEqual(selected_request({"requests": {"delta": "older"}}, "delta"), "older")
+
+        with patch('api.get_requests_for_approval.query_cache', QueryCache(cache_dir=None)):
+            get_requests_for_approval("delta", request_id="older")
+
+        mock_fetch.assert_called_once_with("delta", None, "older")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the api.approval_payload module.
+
+This module contains tests for the payload of send_to_approval: the rows sent
+by the page are encoded as they are, with their size and encode time reported,
+and partial tables carry the change-set marker and the base they came from.
+"""
+
+import json
+import unittest
+
+import pandas as pd
+
+from api.approval_payload import build_approval_payload
+
+
+def make_table():
+    return pd.DataFrame({
+        "part_number": ["B", "D"],
+        "preco": [20.0, 40.0],
+        "manual": ["1", "1"],
+    })
+
+
+class TestApprovalPayload(unittest.TestCase):
+    """Tests for the build_approval_payload function."""
+
+    def test_rows_sent_by_the_page_are_encoded(self):
+        """Test that the payload carries the rows given by the page and reports its size."""
+        parameters, metrics = build_approval_payload("delta", make_table())
+
+        rows = json.loads(parameters["payload"])
+        self.assertEqual([row["part_number"] for row in rows], ["B", "D"])
+        self.assertEqual(set(parameters), {"payload"})
+        self.assertEqual(metrics["rows"], 2)
+        self.assertEqual(metrics["bytes"], len(parameters["payload"].encode("utf-8")))
+        self.assertFalse(metrics["staged"])
+        self.assertGreaterEqual(metrics["encode_seconds"], 0)
+
+    def test_rows_are_not_filtered_again(self):
+        """Test that the payload does not drop rows by change flag: the page already filtered them."""
+        table = pd.DataFrame({"cpc1_3_6": ["x", "y"], "new_alteration": ["sim", "não"]})
+
+        parameters, _ = build_approval_payload("optimization", table)
+
+        self.assertEqual([row["cpc1_3_6"] for row in json.loads(parameters["payload"])], ["x", "y"])
+
+    def test_process_specific_payloads_keep_their_format(self):
+        """Test that record lists and the captain payload are encoded unchanged."""
+        rows = [{"part_number": "A"}, {"part_number": "B"}]
+        captain = ["uuid-1", [{"part_number": "A", "novo_capitao": "X"}]]
+
+        catlote_parameters, catlote_metrics = build_approval_payload("catlote", rows)
+        captain_parameters, _ = build_approval_payload("captain", captain)
+
+        self.assertEqual(json.loads(catlote_parameters["payload"]), rows)
+        self.assertEqual(catlote_metrics["rows"], 2)
+        self.assertEqual(json.loads(captain_parameters["payload"]), captain)
+
+    def test_change_set_is_marked_with_its_base(self):
+        """Test that a partial table carries changeSet, baseVersion, baseFilter and totalRows."""
+        change_set = {"base_version": "2026-10-18T12:00:00+00:00", "base_filter": {"CATLOTE_1": ["C1", "C2"]}, "total_rows": 30}
+
+        parameters, metrics = build_approval_payload("catlote", make_table(), "outputCatlote", change_set=change_set)
+
+        self.assertEqual(parameters["changeSet"], "true")
+        self.assertEqual(parameters["baseVersion"], "2026-10-18T12:00:00+00:00")
+        self.assertEqual(json.loads(parameters["baseFilter"]), {"CATLOTE_1": ["C1", "C2"]})
+        self.assertEqual(parameters["totalRows"], "30")
+        self.assertEqual(len(json.loads(parameters["outputCatlote"])), 2)
+        self.assertEqual(metrics["bytes"], len(parameters["outputCatlote"].encode("utf-8")))
+
+    def test_full_tables_have_no_change_set_marker(self):
+        """Test that payloads without change_set keep the previous parameters."""
+        parameters, _ = build_approval_payload("catlote", make_table(), "outputCatlote")
+
+        self.assertEqual(set(parameters), {"outputCatlote"})
+
+
+if __name__ == '__main__':
+    unittest.main()
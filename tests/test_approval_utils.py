@@ -0,0 +1,75 @@
+"""
+Tests for the lazy approval tabs.
+
+This module contains tests for render_approval_tab, which decides which tab of
+the approvals screen is built, and for the cached get_requests_for_approval
+used to prefetch the next tab.
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+from api.query_cache import QueryCache
+from api.get_requests_for_approval import get_requests_for_approval
+from pages.approvals.approval_utils import render_approval_tab
+
+
+class TestRenderApprovalTab(unittest.TestCase):
+    """Tests for the render_approval_tab function."""
+
+    def render(self, triggered_id, approval_tab, tab_id):
+        with patch('pages.approvals.approval_utils.ctx', SimpleNamespace(triggered_id=triggered_id)):
+            return render_approval_tab(approval_tab, tab_id)
+
+    def test_only_the_selected_tab_is_built(self):
+        """Test that a tab selection builds only the requested tab."""
+        approval_tab = {"load": "delta", "loaded": ["catlote", "delta"]}
+
+        self.assertTrue(self.render("approval-tab-store", approval_tab, "delta"))
+        self.assertFalse(self.render("approval-tab-store", approval_tab, "catlote"))
+        self.assertFalse(self.render("approval-tab-store", approval_tab, "strategy"))
+
+    def test_navigation_does_not_build_tabs(self):
+        """Test that opening /approval leaves the first build to the tabs callback."""
+        approval_tab = {"load": None, "loaded": ["catlote"]}
+
+        self.assertFalse(self.render("url", approval_tab, "catlote"))
+        self.assertFalse(self.render(None, None, "catlote"))
+
+    def test_language_change_rebuilds_open_tabs(self):
+        """Test that a language change rebuilds only the tabs already opened."""
+        approval_tab = {"load": None, "loaded": ["catlote", "delta"]}
+
+        self.assertTrue(self.render("store-language", approval_tab, "delta"))
+        self.assertFalse(self.render("store-language", approval_tab, "buildup"))
+
+
+class TestGetRequestsForApproval(unittest.TestCase):
+    """Tests for the cached get_requests_for_approval function."""
+
+    @patch('api.get_requests_for_approval.fetch_requests_for_approval')
+    def test_prefetched_queue_is_reused(self, mock_fetch):
+        """Test that a second call for the same process and columns does not query again."""
+        mock_fetch.return_value = pd.DataFrame({"uuid_alteracoes": ["a"]})
+
+        with patch('api.get_requests_for_approval.query_cache', QueryCache(cache_dir=None)):
+            first = get_requests_for_approval("delta")
+            first["manual"] = ""
+            second = get_requests_for_approval("delta")
+            get_requests_for_approval("delta", columns=["uuid_alteracoes"])
+
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(list(second.columns), ["uuid_alteracoes"])
+
+    @patch('api.get_requests_for_approval.fetch_requests_for_approval')
+    def test_unknown_process_returns_none(self, mock_fetch):
+        """Test that an unknown process is rejected without a query."""
+        self.assertIsNone(get_requests_for_approval("unknown"))
+        mock_fetch.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
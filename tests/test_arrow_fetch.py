@@ -0,0 +1,82 @@
+"""
+Tests for the api.arrow_fetch module.
+
+This module contains tests for the Arrow fetch helpers, using a fake cursor
+that serves pyarrow tables in batches.
+"""
+
+import unittest
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from api.arrow_fetch import fetch_arrow, fetch_pandas, fetch_polars
+
+
+class FakeArrowCursor:
+    """Cursor that mimics fetchmany_arrow/fetchall_arrow of the Databricks connector."""
+
+    def __init__(self, table):
+        self.table = table
+        self.offset = 0
+
+    def fetchmany_arrow(self, size):
+        batch = self.table.slice(self.offset, size)
+        self.offset += batch.num_rows
+        return batch
+
+    def fetchall_arrow(self):
+        batch = self.table.slice(self.offset)
+        self.offset = self.table.num_rows
+        return batch
+
+
+def make_table(rows):
+    return pa.table({
+        "peca": [str(i) for i in range(rows)],
+        "preco_sap_atual": [float(i) for i in range(rows)],
+    })
+
+
+class TestFetchArrow(unittest.TestCase):
+    """Tests for the fetch helpers."""
+
+    def test_fetch_arrow_concatenates_batches(self):
+        """Test that every batch is read and joined in order."""
+        cursor = FakeArrowCursor(make_table(25))
+
+        table = fetch_arrow(cursor, batch_size=10)
+
+        self.assertEqual(table.num_rows, 25)
+        self.assertEqual(table.column("peca").to_pylist()[-1], "24")
+
+    def test_fetch_arrow_without_batch_size_uses_fetchall(self):
+        """Test that batch_size=None reads the whole result at once."""
+        cursor = FakeArrowCursor(make_table(5))
+
+        table = fetch_arrow(cursor, batch_size=None)
+
+        self.assertEqual(table.num_rows, 5)
+
+    def test_fetch_arrow_empty_result_keeps_schema(self):
+        """Test that an empty result still carries the column names."""
+        cursor = FakeArrowCursor(make_table(0))
+
+        table = fetch_arrow(cursor, batch_size=10)
+
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.column_names, ["peca", "preco_sap_atual"])
+
+    def test_fetch_polars_and_pandas(self):
+        """Test conversion to Polars and Pandas DataFrames."""
+        df_polars = fetch_polars(FakeArrowCursor(make_table(3)), batch_size=2)
+        df_pandas = fetch_pandas(FakeArrowCursor(make_table(3)), batch_size=2)
+
+        self.assertIsInstance(df_polars, pl.DataFrame)
+        self.assertIsInstance(df_pandas, pd.DataFrame)
+        self.assertEqual(df_polars["preco_sap_atual"].sum(), 3.0)
+        self.assertEqual(list(df_pandas.columns), ["peca", "preco_sap_atual"])
+
+
+if __name__ == '__main__':
+    unittest.main()
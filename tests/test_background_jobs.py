@@ -0,0 +1,106 @@
+"""
+Tests for the background_jobs module.
+
+This module contains tests for the progress reporting and cancellation helpers
+used by the background callbacks, with a temporary diskcache and fake job runs.
+"""
+
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import diskcache
+
+import background_jobs
+from background_jobs import background_job_options, cancel_user_runs, wait_with_progress
+
+
+class FakeJobRun:
+    """Job run that finishes after a fixed number of polls."""
+
+    def __init__(self, run_id=7, polls=2, success=True):
+        self.run_id = run_id
+        self.polls = polls
+        self.success = False
+        self._final = success
+
+    def wait(self, on_poll=None):
+        for _ in range(self.polls):
+            on_poll(self)
+        self.success = self._final
+        return self
+
+
+class TestBackgroundJobs(unittest.TestCase):
+    """Tests for wait_with_progress, cancel_user_runs and background_job_options."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = diskcache.Cache(self.tmp_dir.name)
+        patcher = patch.object(background_jobs, "background_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(self.cache.close)
+
+    def test_wait_with_progress_reports_to_toast(self):
+        """Test that every poll updates the toast and the result reflects the run."""
+        set_progress = MagicMock()
+
+        success = wait_with_progress(FakeJobRun(polls=2), set_progress, "Aprovação", "Enviando...", {"access_token": "abc"})
+
+        self.assertTrue(success)
+        self.assertEqual(set_progress.call_count, 3)
+        is_open, header, message, duration = set_progress.call_args.args[0]
+        self.assertTrue(is_open)
+        self.assertEqual(header, "Aprovação")
+        self.assertTrue(message.startswith("Enviando..."))
+        self.assertIsNone(duration)
+
+    def test_failed_submission_returns_false(self):
+        """Test that a failed submission (False instead of a run) does not report progress."""
+        set_progress = MagicMock()
+
+        self.assertFalse(wait_with_progress(False, set_progress, "Aprovação", "Enviando..."))
+        set_progress.assert_not_called()
+
+    def test_run_is_registered_only_while_running(self):
+        """Test that the run id can be cancelled during the wait and is removed afterwards."""
+        user_data = {"access_token": "abc"}
+        seen = []
+
+        class InspectingRun(FakeJobRun):
+            def wait(inner_self, on_poll=None):
+                seen.append(self.cache.get(background_jobs._runs_key(user_data)))
+                return super().wait(on_poll)
+
+        wait_with_progress(InspectingRun(run_id=11), MagicMock(), "h", "m", user_data)
+
+        self.assertEqual(seen, [[11]])
+        self.assertIsNone(self.cache.get(background_jobs._runs_key(user_data)))
+
+    def test_cancel_user_runs_cancels_registered_runs(self):
+        """Test that the cancel button cancels the user's Databricks runs."""
+        user_data = {"access_token": "abc"}
+        background_jobs._register_run(user_data, 11)
+        background_jobs._register_run(user_data, 12)
+
+        with patch.object(background_jobs.job_runner, "cancel_run") as cancel_run:
+            cancelled = cancel_user_runs(user_data)
+
+        self.assertEqual(cancelled, [11, 12])
+        self.assertEqual([call.args[0] for call in cancel_run.call_args_list], [11, 12])
+        self.assertEqual(cancel_user_runs(user_data), [])
+
+    def test_background_job_options_targets_toast(self):
+        """Test that progress goes to the given toast and the global cancel button is wired."""
+        options = background_job_options("toast-approval-delta")
+
+        self.assertTrue(options["background"])
+        self.assertEqual({output.component_id for output in options["progress"]}, {"toast-approval-delta"})
+        self.assertEqual(len(options["progress"]), len(options["progress_default"]))
+        self.assertEqual(options["cancel"][0].component_id, "background-job-cancel")
+
+
+if __name__ == '__main__':
+    unittest.main()
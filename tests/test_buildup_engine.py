@@ -0,0 +1,138 @@
+"""
+Tests for the pages.buildup.buildup_engine module.
+
+This module contains tests for the vectorized Build Up waterfall, comparing it
+with the scalar formulas previously computed inside handle_change_buildup.
+"""
+
+import random
+import unittest
+
+import polars as pl
+
+from pages.buildup.buildup_engine import FACTOR_NAMES, WATERFALL_FIELDS, calculate_buildup, factor_matrix, simulation_rows
+
+CODES = ["ACC CLC", "BAT DSO", "GEN MANUF"]
+
+
+def make_buildup_table(seed=0):
+    """Create a table in the handle_raw_dataframe layout (one column per buildup code)."""
+    rng = random.Random(seed)
+    rows = []
+    for factor in FACTOR_NAMES + ["quarter_label"]:
+        rows.append({"buildup_factors": factor, "quarter": "Q1", "formatted_year": "2025",
+                     **{code: round(rng.uniform(-0.2, 0.2), 4) for code in CODES}})
+    # Repeated factor for another quarter: the first row wins
+    rows.append({"buildup_factors": "icms_avg", "quarter": "Q2", "formatted_year": "2025", **{code: 99.0 for code in CODES}})
+    rows[0]["GEN MANUF"] = None
+    return pl.DataFrame(rows)
+
+
+def reference_waterfall(factors, inputs):
+    """Scalar waterfall, as previously computed by handle_change_buildup."""
+    f = lambda name: factors.get(name) or 0.0
+    price = inputs["price_zrsd026"] * inputs["currency_rate"]
+    dealer, icms_st_pct, mva_pct, ipi_pct = (inputs[key] / 100 for key in ("dealer_code", "icms_st", "mva_price", "ipi"))
+
+    price_ipi = price * (1 + ipi_pct)
+    public_price = price / (1 - dealer)
+    icms_st_gm_manufacturer = price * icms_st_pct
+    mva_price = price_ipi * (1 + mva_pct)
+    icms_st = mva_price * icms_st_pct
+    icms_st_charge_dealer = icms_st - icms_st_gm_manufacturer
+    total_ticket_manufacturer = price_ipi + icms_st_charge_dealer
+    values = {name: price * f(name) for name in FACTOR_NAMES}
+    net_sales = price + sum(values[name] for name in FACTOR_NAMES[:10])
+
+    product_price = inputs["product_price_pis_cofins"] * inputs["currency_rate"]
+    base_price_net_cost = product_price - product_price * f("pis") - product_price * f("cofins")
+    price_without_ipi = base_price_net_cost / (1 - inputs["icms_material_cost"] / 100)
+    material_cost_avg_mt_cost = -(base_price_net_cost + price_without_ipi * inputs["ipi_material_cost"] / 100)
+    total_costs = material_cost_avg_mt_cost + sum(values[name] for name in FACTOR_NAMES[10:17])
+    contribution_margin = net_sales + total_costs
+    total_expenses = values["structural_expenses"] + values["other"]
+    ebit = contribution_margin - total_expenses
+
+    return {
+        "public_price": public_price,
+        "dealer_code_value": public_price - total_ticket_manufacturer,
+        "total_ticket_manufacturer": total_ticket_manufacturer,
+        "icms_st_value": icms_st,
+        "icms_st_charge_dealer": icms_st_charge_dealer,
+        "ipi_value": price * ipi_pct,
+        "net_sales": net_sales,
+        "percentage_of_gs": net_sales / price,
+        "material_cost_avg_mt_cost": material_cost_avg_mt_cost,
+        "total_costs": total_costs,
+        "contribution_margin": contribution_margin,
+        "percentage_of_ns": contribution_margin / net_sales,
+        "ebit": ebit,
+        "percentage_of_ns_ebit": ebit / net_sales,
+        **{f"{name}_value": value for name, value in values.items()},
+    }
+
+
+def make_scenarios(count, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "buildup_code": CODES[i % len(CODES)],
+        "price_zrsd026": round(rng.uniform(10, 1000), 2),
+        "currency_rate": rng.choice([1.0, 5.4, 0.035]),
+        "product_price_pis_cofins": round(rng.uniform(5, 800), 2),
+        "dealer_code": round(rng.uniform(0, 40), 1),
+        "icms_st": round(rng.uniform(0, 20), 1),
+        "mva_price": round(rng.uniform(0, 80), 1),
+        "ipi": round(rng.uniform(0, 15), 1),
+        "ipi_material_cost": round(rng.uniform(0, 15), 1),
+        "icms_material_cost": round(rng.uniform(0, 18), 1),
+    } for i in range(count)]
+
+
+class TestBuildupEngine(unittest.TestCase):
+    """Tests for factor_matrix and calculate_buildup."""
+
+    def setUp(self):
+        self.table = make_buildup_table()
+        self.factors = factor_matrix(self.table)
+
+    def test_factor_matrix_has_one_row_per_code(self):
+        """Test that factors are read from the first row of each factor and nulls become 0."""
+        self.assertEqual(self.factors["buildup_code"].to_list(), CODES)
+        first_icms = self.table.row(0, named=True)
+        by_code = {row["buildup_code"]: row for row in self.factors.to_dicts()}
+
+        self.assertEqual(by_code["ACC CLC"]["icms_avg"], first_icms["ACC CLC"])
+        self.assertEqual(by_code["GEN MANUF"]["icms_avg"], 0.0)
+
+    def test_matches_scalar_waterfall_for_every_scenario(self):
+        """Test that a batch over every buildup code matches the per-scenario formulas."""
+        scenarios = make_scenarios(60)
+        by_code = {row["buildup_code"]: row for row in self.factors.to_dicts()}
+
+        result = calculate_buildup(self.factors, scenarios)
+
+        self.assertEqual(result.height, len(scenarios))
+        for actual, scenario in zip(result.to_dicts(), scenarios):
+            expected = reference_waterfall(by_code[scenario["buildup_code"]], scenario)
+            for column, value in expected.items():
+                self.assertAlmostEqual(actual[column], value, places=6, msg=column)
+
+    def test_zero_price_does_not_divide_by_zero(self):
+        """Test that an empty scenario (initial inputs) yields zeros instead of an error."""
+        result = calculate_buildup(self.factors, [{"buildup_code": "ACC CLC"}])
+
+        rows = simulation_rows(result.row(0, named=True))
+
+        self.assertEqual([row["field"] for row in rows], [field for field, _ in WATERFALL_FIELDS])
+        self.assertTrue(all(row["value"] == 0 for row in rows))
+
+    def test_unknown_code_uses_zero_factors(self):
+        """Test that a code missing from the factor table is calculated with zero factors."""
+        result = calculate_buildup(self.factors, [{"buildup_code": "UNKNOWN", "price_zrsd026": 100}])
+
+        self.assertEqual(result["net_sales"][0], 100.0)
+        self.assertEqual(result["public_price"][0], 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests for the pages.buildup.buildup_reference_data module.
+
+This module contains tests for the deferred, refreshable reference data used by
+the Build Up page (factors and exchange rates).
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import polars as pl
+
+from pages.buildup import buildup_reference_data
+from pages.buildup.buildup_reference_data import ReferenceData, get_buildup_table
+from tests.helpers import FakeClock
+
+
+class TestReferenceData(unittest.TestCase):
+    """Tests for the ReferenceData class."""
+
+    def test_loaded_on_first_use_only(self):
+        """Test that nothing is queried until get() and later calls reuse the value."""
+        loader = MagicMock(return_value="factors")
+        data = ReferenceData("buildup", loader, refresh_interval=0)
+
+        loader.assert_not_called()
+        self.assertEqual(data.get(), "factors")
+        self.assertEqual(data.get(), "factors")
+        loader.assert_called_once()
+
+    def test_failed_refresh_keeps_last_value(self):
+        """Test that an error during a refresh keeps the previous data."""
+        loader = MagicMock(side_effect=["factors", {"error": "timeout"}, Exception("offline")])
+        data = ReferenceData("buildup", loader, refresh_interval=0)
+        data.get()
+
+        data.refresh()
+        data.refresh()
+
+        self.assertEqual(data.get(), "factors")
+        self.assertEqual(loader.call_count, 3)
+
+    def test_stale_value_is_refreshed(self):
+        """Test that a value older than the refresh interval is reloaded."""
+        clock = FakeClock(now=1000.0)
+        loader = MagicMock(side_effect=["v1", "v2"])
+        data = ReferenceData("buildup_fx", loader, refresh_interval=60, clock=clock)
+        data._start_scheduler = lambda: None
+        data.get()
+
+        clock.now += 61
+        data.get()
+        data._refreshing.acquire()
+        data._refreshing.release()
+
+        self.assertEqual(data.get(), "v2")
+
+    def test_initial_failure_returns_none(self):
+        """Test that get() returns None when the data could never be loaded."""
+        data = ReferenceData("buildup", MagicMock(return_value=None), refresh_interval=0)
+
+        self.assertIsNone(data.get())
+
+    def test_initial_failure_is_retried_after_backoff(self):
+        """Test that a failed first load is retried after retry_interval, not after the refresh interval."""
+        clock = FakeClock(now=1000.0)
+        loader = MagicMock(side_effect=[Exception("offline"), "factors"])
+        data = ReferenceData("buildup", loader, refresh_interval=3600, clock=clock, retry_interval=30)
+        data._start_scheduler = lambda: None
+
+        self.assertIsNone(data.get())
+        clock.now += 10
+        self.assertIsNone(data.get())
+        loader.assert_called_once()
+
+        clock.now += 20
+        self.assertEqual(data.get(), "factors")
+        self.assertEqual(loader.call_count, 2)
+
+
+def make_raw_table(markup):
+    return pl.DataFrame({
+        "buildup": ["bu_a", "bu_b"],
+        "quarter": ["1", "1"],
+        "formatted_year": ["2026", "2026"],
+        "markup": [markup, markup * 2],
+    })
+
+
+def markup(table):
+    return table.filter(pl.col("buildup_factors") == "markup")["BU_B"].item()
+
+
+class TestGetBuildupTable(unittest.TestCase):
+    """Tests for the get_buildup_table function."""
+
+    def test_page_table_follows_the_shared_load(self):
+        """Test that the pivoted table is rebuilt only when buildup_factors loads new data."""
+        loader = MagicMock(side_effect=[make_raw_table(1.0), make_raw_table(5.0)])
+        data = ReferenceData("buildup", loader, refresh_interval=0)
+
+        with patch.object(buildup_reference_data, "buildup_factors", data):
+            first = get_buildup_table()
+            self.assertIs(get_buildup_table(), first)
+            self.assertEqual(markup(first), "2.0")
+
+            data.refresh()
+
+            self.assertEqual(markup(get_buildup_table()), "10.0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests for the pages.buildup.buildup_sweep module.
+
+This module contains tests for the Build Up sensitivity grid: building the
+scenario grid, evaluating it in chunks and shaping it for the heatmap.
+"""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from pages.buildup.buildup_engine import calculate_buildup, factor_matrix
+from pages.buildup.buildup_sweep import check_grid_size, heatmap_matrix, range_size, run_sweep, sweep_scenarios, sweep_table, value_range
+from tests.test_buildup_engine import CODES, make_buildup_table
+
+
+class TestSweepScenarios(unittest.TestCase):
+    """Tests for value_range and sweep_scenarios."""
+
+    def test_value_range_includes_both_ends(self):
+        """Test that the range has the requested number of points, ending exactly at stop."""
+        self.assertEqual(value_range(0, 20, 5), [0.0, 5.0, 10.0, 15.0, 20.0])
+        self.assertEqual(value_range(10, 10, 4), [10.0])
+        self.assertEqual(value_range(3, None, None), [3.0])
+
+    def test_grid_is_the_cartesian_product(self):
+        """Test that every code is combined with every axis value, keeping linked columns together."""
+        scenarios = sweep_scenarios(
+            CODES[:2],
+            axes=[{"price_zrsd026": [100, 200, 300]}, {"currency": ["BRL", "USD"], "currency_rate": [1.0, 5.0]}],
+            base={"icms_st": 18.0},
+        )
+
+        self.assertEqual(scenarios.height, 2 * 3 * 2)
+        self.assertEqual(set(scenarios.filter(scenarios["currency"] == "USD")["currency_rate"]), {5.0})
+        self.assertEqual(set(scenarios["icms_st"]), {18.0})
+        self.assertEqual(set(scenarios["mva_price"]), {0.0})
+
+    def test_grid_above_limit_is_rejected(self):
+        """Test that a grid larger than max_scenarios raises ValueError before being built."""
+        with self.assertRaises(ValueError):
+            sweep_scenarios(CODES, axes=[{"price_zrsd026": list(range(100))}], max_scenarios=50)
+
+    def test_range_size_matches_value_range(self):
+        """Test that range_size counts the points value_range would build."""
+        for start, stop, steps in [(0, 20, 5), (10, 10, 4), (3, None, None), (0, 1, 0)]:
+            self.assertEqual(range_size(start, stop, steps), len(value_range(start, stop, steps)))
+
+    def test_huge_steps_are_rejected_without_building_ranges(self):
+        """Test that the grid size is checked from the step counts alone, so 10**9 points never become a list."""
+        sizes = [range_size(0, 100, 10**9), range_size(0, 18, 10**9), 2]
+
+        with self.assertRaises(ValueError):
+            check_grid_size(CODES, sizes, max_scenarios=1000)
+
+        self.assertEqual(check_grid_size(CODES[:2], [range_size(0, 100, 5), 3], max_scenarios=1000), 2 * 5 * 3)
+
+
+class TestRunSweep(unittest.TestCase):
+    """Tests for run_sweep and heatmap_matrix."""
+
+    def setUp(self):
+        self.factors = factor_matrix(make_buildup_table())
+        self.scenarios = sweep_scenarios(
+            CODES,
+            axes=[{"price_zrsd026": value_range(100, 500, 9)}, {"icms_st": value_range(0, 20, 5)}],
+            base={"dealer_code": 40.0, "product_price_pis_cofins": 80.0},
+        )
+
+    def test_chunked_sweep_matches_single_batch(self):
+        """Test that chunks evaluated in the pool give the same rows, in order, as one batch."""
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            chunked = run_sweep(self.factors, self.scenarios, chunk_size=7, executor=executor)
+
+        self.assertTrue(chunked.equals(calculate_buildup(self.factors, self.scenarios)))
+
+    def test_heatmap_matrix_for_one_code(self):
+        """Test that the heatmap has one row per y value and one column per x value."""
+        result = sweep_table(run_sweep(self.factors, self.scenarios), ["price_zrsd026", "icms_st"])
+
+        x_values, y_values, matrix = heatmap_matrix(result, "price_zrsd026", "icms_st", "percentage_of_ns", filters={"buildup_code": "BAT DSO"})
+
+        self.assertEqual(len(x_values), 9)
+        self.assertEqual(y_values, [0.0, 5.0, 10.0, 15.0, 20.0])
+        expected = result.filter(
+            (result["buildup_code"] == "BAT DSO") & (result["price_zrsd026"] == 100.0) & (result["icms_st"] == 5.0)
+        )["percentage_of_ns"][0]
+        self.assertAlmostEqual(matrix[1][0], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
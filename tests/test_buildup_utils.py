@@ -0,0 +1,76 @@
+"""
+Tests for the pages.buildup.buildup_utils module.
+
+This module contains tests for the indexed FX-rate lookup (FxRates) and the
+currency conversion used by the Build Up simulation.
+"""
+
+import unittest
+
+import pandas as pd
+
+from pages.buildup.buildup_utils import FxRates, get_tax_rates
+
+
+def make_fx_table():
+    """Create an mpg_fx_actuals-like table (USD -> TOCURRENCY), with raw string types."""
+    return pd.DataFrame({
+        "TOCURRENCY": [" BRL", "JPY ", "USD", "BRL", "JPY", "USD", "BRL"],
+        "RATEYEAR": ["2024", "2024", "2024", "2025", "2025", "2025", "2025"],
+        "RATEMONTH": ["10", "10", "10", "1", "1", "1", "1"],
+        "RATE": [5.0, 150.0, 1.0, 6.0, 156.0, 1.0, 9.9],
+    })
+
+
+class TestFxRates(unittest.TestCase):
+    """Tests for the FxRates class."""
+
+    def setUp(self):
+        self.fx = FxRates(make_fx_table())
+
+    def test_rate_uses_normalized_keys(self):
+        """Test that codes are stripped, periods cast to int and the first row of a period wins."""
+        self.assertEqual(self.fx.rate("BRL", 10, 2024), 5.0)
+        self.assertEqual(self.fx.rate("JPY", "1", "2025"), 156.0)
+        self.assertEqual(self.fx.rate("BRL", 1, 2025), 6.0)
+
+    def test_missing_period_raises_without_fallback(self):
+        """Test that a missing period raises the same error as the previous filter."""
+        with self.assertRaises(ValueError):
+            self.fx.rate("BRL", 4, 2025)
+
+    def test_fallback_to_latest_month(self):
+        """Test that the fallback uses the latest month up to the requested period."""
+        self.assertEqual(self.fx.rate("BRL", 4, 2025, fallback_to_latest=True), 6.0)
+        self.assertEqual(self.fx.rate("BRL", 12, 2024, fallback_to_latest=True), 5.0)
+        self.assertEqual(self.fx.rate("BRL", 1, 2020, fallback_to_latest=True), 6.0)
+        self.assertEqual(self.fx.latest_period("JPY"), (2025, 1))
+
+    def test_cross_rate_via_usd(self):
+        """Test that BRL -> JPY is derived from the USD rates."""
+        self.assertAlmostEqual(self.fx.cross_rate("BRL", "JPY", 1, 2025), 156.0 / 6.0)
+        self.assertAlmostEqual(self.fx.cross_rate("JPY", "BRL", 10, 2024), 5.0 / 150.0)
+
+    def test_years(self):
+        """Test that the available years are listed once."""
+        self.assertEqual(self.fx.years(), [2024, 2025])
+
+
+class TestGetTaxRates(unittest.TestCase):
+    """Tests for the get_tax_rates function."""
+
+    def test_same_results_with_table_or_index(self):
+        """Test that the index gives the same rates as passing the raw table."""
+        table = make_fx_table()
+        fx = FxRates(table)
+
+        for currency in ("BRL", "USD", "JPY"):
+            self.assertEqual(get_tax_rates(fx, currency, 1, 2025), get_tax_rates(table, currency, 1, 2025))
+
+        self.assertEqual(get_tax_rates(fx, "BRL", 1, 2025), 1.0)
+        self.assertEqual(get_tax_rates(fx, "USD", 1, 2025), 6.0)
+        self.assertAlmostEqual(get_tax_rates(fx, "JPY", 1, 2025), 26.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+"""
+Tests for the pages.catlote.catlote_utils module.
+
+This module contains tests for the vectorized catlote simulation, comparing it
+with the row-by-row formulas it replaced.
+"""
+
+import random
+import unittest
+
+import pandas as pd
+
+from pages.catlote.catlote_utils import (
+    calculate_catlote,
+    calculate_catlote_slice,
+    calculate_totals_by_catlote,
+    catlote_change_base,
+    changed_catlote_rows,
+    combine_totals,
+    update_property,
+)
+
+
+def reference_row(row, catlote, new_values=None):
+    """Row-by-row calculation, as previously done by catlote_utils.calculate_row (before df.round(2))."""
+    row = dict(row)
+    custo_medio_unit = row['custo_medio_unit']
+    price_sap_new = row['preco_sap_atual']
+    price_sap_old = price_sap_new
+    if new_values and new_values['changed_col_name'] == 'custo_medio_unit':
+        custo_medio_unit = row['custo_medio_unit'] = float(new_values['new_value'])
+    if new_values and new_values['changed_col_name'] == 'preco_sap_atual':
+        price_sap_new = row['preco_sap_atual'] = float(new_values['new_value'])
+        price_sap_old = new_values['old_value']
+
+    new_price_with_taxes = round(price_sap_new * row['imp_icms'], 2)
+    delta_price = round(price_sap_new / price_sap_old - 1, 4) if price_sap_old != 0 else 0
+    media_regular, media_promo = row['media_regular'], row['media_promo']
+    new_avg_regular = 0 if media_regular == 0 else media_regular * (1 + delta_price) ** row['e']
+    new_avg_promo = 0 if media_promo == 0 else media_promo * (1 + delta_price) ** row['e']
+    avg_regular = int(round(new_avg_regular, 0))
+    avg_promo = int(round(new_avg_promo, 0))
+
+    row['media_regular'] = avg_regular
+    row['delta_volume_regular'] = 0 if media_regular == 0 else (new_avg_regular / media_regular - 1)
+    row['media_promo'] = avg_promo
+    row['preco_com_impostos'] = new_price_with_taxes
+
+    price_sc = new_price_with_taxes * (1 - row['desconto'])
+    for i in range(1, 5):
+        price_cc = new_price_with_taxes * (1 + catlote[f'D{i}'])
+        row[f'faturamento_l{i}_sc'] = price_sc * catlote[f'P{i}'] * avg_regular
+        row[f'faturamento_liq_l{i}_sc'] = price_sc * row['imp'] * catlote[f'P{i}'] * avg_regular
+        row[f'margem_l{i}_sc'] = (price_sc * row['imp'] - custo_medio_unit) * catlote[f'P{i}'] * avg_regular
+        row[f'faturamento_l{i}_cc'] = price_cc * catlote[f'E{i}'] * avg_promo
+        row[f'faturamento_liq_l{i}_cc'] = price_cc * row['imp'] * catlote[f'E{i}'] * avg_promo
+        row[f'margem_l{i}_cc'] = (price_cc * row['imp'] - custo_medio_unit) * catlote[f'E{i}'] * avg_promo
+        denominator = price_cc * row['imp']
+        row[f'margem_rel_l{i}_cc'] = 0 if denominator == 0 else (denominator - custo_medio_unit) / denominator
+    return row
+
+
+def make_catlotes(count, seed=0):
+    """Create catlote inputs with random participations and discounts."""
+    rng = random.Random(seed)
+    catlotes = []
+    for c in range(count):
+        catlote = {'CATLOT1': f"C{c}"}
+        for i in range(1, 5):
+            catlote[f'P{i}'] = round(rng.uniform(0, 0.5), 2)
+            catlote[f'D{i}'] = round(rng.uniform(-0.3, 0), 2)
+            catlote[f'E{i}'] = round(rng.uniform(0, 0.5), 2)
+        catlotes.append(catlote)
+    return catlotes
+
+
+def make_products(count, catlotes, seed=0):
+    """Create products spread over the given catlotes."""
+    rng = random.Random(seed)
+    return [{
+        'CATLOTE_1': catlotes[i % len(catlotes)]['CATLOT1'],
+        'peca': f"P{i:05d}",
+        'desconto': round(rng.uniform(0, 0.3), 4),
+        'media_promo': rng.choice([0, rng.randint(1, 500)]),
+        'imp': round(rng.uniform(0.6, 0.9), 4),
+        'imp_icms': round(rng.uniform(1.0, 1.3), 4),
+        'custo_medio_unit': round(rng.uniform(1, 200), 2),
+        'preco_sap_atual': round(rng.uniform(10, 500), 2),
+        'media_regular': rng.randint(0, 1000),
+        'e': round(rng.uniform(-2.5, -0.1), 3),
+    } for i in range(count)]
+
+
+class TestCalculateCatlote(unittest.TestCase):
+    """Tests for the calculate_catlote function."""
+
+    def assertRowMatches(self, actual, expected):
+        for key, value in expected.items():
+            if isinstance(value, (int, float)):
+                self.assertAlmostEqual(actual[key], round(value, 2), delta=0.011, msg=key)
+            else:
+                self.assertEqual(actual[key], value, msg=key)
+
+    def test_full_calculation_matches_row_by_row_formulas(self):
+        """Test that every product matches the previous per-row formulas."""
+        catlotes = make_catlotes(3)
+        products = make_products(300, catlotes)
+        by_id = {catlote['CATLOT1']: catlote for catlote in catlotes}
+
+        result = calculate_catlote(catlotes, products)
+
+        for actual, product in zip(result['table'].to_dict('records'), products):
+            self.assertRowMatches(actual, reference_row(product, by_id[product['CATLOTE_1']]))
+
+    def test_totals_match_table(self):
+        """Test that the totals are the sums of the calculated columns."""
+        catlotes = make_catlotes(2)
+        result = calculate_catlote(catlotes, make_products(50, catlotes))
+        table, totals = result['table'], result['totals']
+
+        self.assertAlmostEqual(totals['total_faturamento_sc'], sum(table[f'faturamento_l{i}_sc'].sum() for i in range(1, 5)))
+        self.assertAlmostEqual(totals['total_margem_cc'], sum(table[f'margem_l{i}_cc'].sum() for i in range(1, 5)))
+        self.assertEqual(totals['total_volume_sc'], int(table['media_regular'].sum()))
+
+    def test_cell_change_recalculates_only_that_row(self):
+        """Test that a price edit uses the old price for the volume and leaves the other rows alone."""
+        catlotes = make_catlotes(2)
+        table = calculate_catlote(catlotes, make_products(10, catlotes))['table'].to_dict('records')
+        old_price = table[4]['preco_sap_atual']
+        new_values = {'new_value': old_price * 1.2, 'old_value': old_price, 'changed_col_name': 'preco_sap_atual', 'row_index': 4}
+
+        result = calculate_catlote(catlotes, table, new_values)['table'].to_dict('records')
+
+        self.assertRowMatches(result[4], reference_row(table[4], catlotes[0], new_values))
+        for i in (0, 1, 2, 3, 5, 9):
+            self.assertEqual(result[i], table[i])
+
+    def test_products_without_catlote_are_not_calculated(self):
+        """Test that products whose catlote is not in the inputs keep their values."""
+        catlotes = make_catlotes(2)
+        products = make_products(4, catlotes)
+
+        table = calculate_catlote(catlotes[:1], products)['table']
+
+        self.assertTrue(table.loc[table['CATLOTE_1'] == 'C0', 'faturamento_l1_sc'].notna().all())
+        self.assertTrue(table.loc[table['CATLOTE_1'] == 'C1', 'faturamento_l1_sc'].isna().all())
+
+
+class TestCatlotePartialTotals(unittest.TestCase):
+    """Tests for the per-catlote partial totals and the slice recalculation."""
+
+    def assertTotalsEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, value in expected.items():
+            self.assertAlmostEqual(actual[key], value, places=4, msg=key)
+
+    def test_combined_partials_match_full_totals(self):
+        """Test that combining the per-catlote partials gives the totals of the whole table."""
+        catlotes = make_catlotes(4)
+        result = calculate_catlote(catlotes, make_products(120, catlotes))
+
+        totals_by_catlote = calculate_totals_by_catlote(result['table'])
+
+        self.assertEqual(set(totals_by_catlote), {'C0', 'C1', 'C2', 'C3'})
+        self.assertTotalsEqual(combine_totals(totals_by_catlote), result['totals'])
+
+    def test_slice_recalculates_only_the_changed_catlote(self):
+        """Test that a discount change returns only that catlote's rows and patches the totals."""
+        catlotes = make_catlotes(3)
+        table = calculate_catlote(catlotes, make_products(90, catlotes))['table'].to_dict('records')
+        totals_by_catlote = calculate_totals_by_catlote(table)
+
+        catlotes = update_property(catlotes, 'D2', 25, catlote_id='C1')
+        result = calculate_catlote_slice(catlotes, table, 'C1', totals_by_catlote)
+
+        self.assertEqual(catlotes[1]['D2'], 0.25)
+        self.assertEqual(len(result['rows']), 30)
+        self.assertTrue(all(row['CATLOTE_1'] == 'C1' for row in result['rows']))
+        self.assertEqual(result['totals_by_catlote']['C0'], totals_by_catlote['C0'])
+        patched_table = [row for row in table if row['CATLOTE_1'] != 'C1'] + result['rows']
+        self.assertTotalsEqual(result['totals'], combine_totals(calculate_totals_by_catlote(patched_table)))
+
+    def test_update_property_without_catlote_changes_first(self):
+        """Test that update_property keeps changing the first catlote when none is given."""
+        catlotes = make_catlotes(2)
+
+        updated = update_property(catlotes, 'E1', 40)
+
+        self.assertEqual(updated[0]['E1'], 0.4)
+        self.assertNotEqual(updated[1]['E1'], 0.4)
+
+    def test_update_property_does_not_mutate_its_input(self):
+        """Test that update_property returns a new list and leaves the stored catlotes untouched."""
+        catlotes = make_catlotes(2)
+        original = [dict(catlote) for catlote in catlotes]
+
+        updated = update_property(catlotes, 'D1', 30, catlote_id='C1')
+
+        self.assertEqual(catlotes, original)
+        self.assertEqual(updated[1]['D1'], 0.3)
+        self.assertIs(updated[0], catlotes[0])
+
+
+
+class TestChangedCatloteRows(unittest.TestCase):
+    """Tests for the catlote change set sent for approval."""
+
+    def test_only_changed_products_are_sent(self):
+        """Test that products with an edited value or whose catlote inputs changed are the only ones returned."""
+        catlotes = make_catlotes(3)
+        table = calculate_catlote(catlotes, make_products(30, catlotes))['table'].rename(columns={'peca': 'PECA'})
+        base = catlote_change_base(table, catlotes)
+
+        self.assertTrue(changed_catlote_rows(table, catlotes, base).empty)
+
+        edited = table.copy()
+        edited.loc[0, 'preco_sap_atual'] = edited.loc[0, 'preco_sap_atual'] + 1
+        catlotes = update_property(catlotes, 'D2', 25, catlote_id='C2')
+
+        changed = changed_catlote_rows(edited, catlotes, base)
+
+        expected = (table['CATLOTE_1'] == 'C2') | (table.index == 0)
+        self.assertEqual(changed['PECA'].tolist(), table.loc[expected, 'PECA'].tolist())
+
+    def test_products_missing_from_the_base_are_sent(self):
+        """Test that a product not present when the simulation was opened counts as changed, and NaN equals NaN."""
+        catlotes = make_catlotes(1)
+        table = pd.DataFrame({'CATLOTE_1': ['C0', 'C0'], 'PECA': ['A', 'B'], 'custo_medio_unit': [None, 1.0], 'preco_sap_atual': [2.0, 3.0]})
+        base = catlote_change_base(table.iloc[[0]], catlotes)
+
+        self.assertEqual(changed_catlote_rows(table, catlotes, base)['PECA'].tolist(), ['B'])
+
+
+if __name__ == '__main__':
+    unittest.main()
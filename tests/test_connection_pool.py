@@ -0,0 +1,116 @@
+"""
+Tests for the api.connection_pool module.
+
+This module contains tests for the ConnectionPool class, using fake connections
+instead of a real Databricks SQL warehouse.
+"""
+
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from api.connection_pool import ConnectionPool
+
+
+def make_connection(healthy=True):
+    """Create a fake connection whose health check succeeds or fails."""
+    connection = MagicMock()
+    connection.open = True
+    cursor = connection.cursor.return_value.__enter__.return_value
+    if not healthy:
+        cursor.execute.side_effect = Exception("session expired")
+    return connection
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Tests for the ConnectionPool class."""
+
+    def test_connection_is_reused_between_checkouts(self):
+        """Test that a returned connection is handed out again instead of opening a new one."""
+        connect = MagicMock(side_effect=lambda: make_connection())
+        pool = ConnectionPool(connect=connect, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(pool.idle_count, 1)
+
+    def test_nested_checkout_in_same_thread_shares_connection(self):
+        """Test that nested blocks in the same thread reuse the checked-out connection."""
+        connect = MagicMock(side_effect=lambda: make_connection())
+        pool = ConnectionPool(connect=connect, max_size=1, checkout_timeout=0.1)
+
+        with pool.connection() as outer:
+            with pool.connection() as inner:
+                self.assertIs(outer, inner)
+
+        self.assertEqual(connect.call_count, 1)
+
+    def test_checkout_times_out_when_pool_is_exhausted(self):
+        """Test that a thread waiting for a connection gives up after the checkout timeout."""
+        pool = ConnectionPool(connect=make_connection, max_size=1, checkout_timeout=0.05)
+        errors = []
+
+        def worker():
+            try:
+                with pool.connection():
+                    pass
+            except TimeoutError as e:
+                errors.append(e)
+
+        with pool.connection():
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(pool.size, 1)
+
+    def test_idle_connections_are_evicted(self):
+        """Test that connections idle for longer than the idle timeout are closed."""
+        connection = make_connection()
+        pool = ConnectionPool(connect=lambda: connection, max_size=1, idle_timeout=0)
+
+        with pool.connection():
+            pass
+        with pool.connection():
+            pass
+
+        connection.close.assert_called()
+
+    def test_unhealthy_connection_is_discarded_after_error(self):
+        """Test that a connection which fails its health check after an error is not reused."""
+        broken = make_connection(healthy=False)
+        fresh = make_connection()
+        pool = ConnectionPool(connect=MagicMock(side_effect=[broken, fresh]), max_size=1)
+
+        with self.assertRaises(RuntimeError):
+            with pool.connection():
+                raise RuntimeError("query failed")
+
+        broken.close.assert_called_once()
+        self.assertEqual(pool.size, 0)
+
+        with pool.connection() as connection:
+            self.assertIs(connection, fresh)
+
+    def test_stale_idle_connection_is_health_checked(self):
+        """Test that a connection idle past the health check interval is pinged before reuse."""
+        broken = make_connection(healthy=False)
+        fresh = make_connection()
+        pool = ConnectionPool(connect=MagicMock(side_effect=[broken, fresh]), max_size=1, health_check_interval=0)
+
+        with pool.connection():
+            pass
+        with pool.connection() as connection:
+            self.assertIs(connection, fresh)
+
+        broken.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+"""
+Tests for the api.job_runner module.
+
+This module contains tests for the JobRunner class and the JobRun handle, using
+a fake HTTP session instead of the Databricks Jobs API.
+"""
+
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from api.job_runner import JobRunner
+from tests.helpers import FakeClock
+
+
+def make_response(payload, status_code=200):
+    """Create a fake requests response."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    response.text = str(payload)
+    return response
+
+
+def make_session(states, output=None):
+    """Create a fake session that answers runs/submit, runs/get (one state per call) and runs/get-output."""
+    session = MagicMock()
+    states = list(states)
+
+    def request(method, url, **kwargs):
+        if url.endswith('runs/submit') or url.endswith('run-now'):
+            return make_response({'run_id': 42})
+        if url.endswith('runs/get'):
+            life_cycle_state, result_state = states.pop(0) if len(states) > 1 else states[0]
+            return make_response({'state': {'life_cycle_state': life_cycle_state, 'result_state': result_state}})
+        if url.endswith('runs/get-output'):
+            return make_response({'notebook_output': {'result': output}})
+        return make_response({})
+
+    session.request.side_effect = request
+    return session
+
+
+@patch.dict(os.environ, {'DB_SERVER': 'https://databricks', 'DB_TOKEN': 'token', 'DB_CLUSTER_ID': 'cluster'})
+class TestJobRunner(unittest.TestCase):
+    """Tests for the JobRunner class."""
+
+    def make_runner(self, session, clock, **kwargs):
+        options = {'initial_interval': 1, 'max_interval': 4, 'backoff': 2, 'timeout': 100}
+        options.update(kwargs)
+        return JobRunner(session=session, sleep=clock.sleep, clock=clock, **options)
+
+    def test_wait_polls_with_capped_exponential_backoff(self):
+        """Test that the interval between runs/get calls doubles up to the maximum."""
+        running = ('RUNNING', None)
+        session = make_session([running] * 5 + [('TERMINATED', 'SUCCESS')])
+        clock = FakeClock()
+        runner = self.make_runner(session, clock)
+
+        job_run = runner.submit_notebook('/notebook').wait()
+
+        self.assertTrue(job_run.success)
+        self.assertEqual(len(clock.sleeps), 5)
+        for sleep, expected in zip(clock.sleeps, [1, 2, 4, 4, 4]):
+            self.assertAlmostEqual(sleep, expected, delta=expected * 0.1 + 1e-9)
+
+    def test_network_error_while_polling_is_retried(self):
+        """Test that a requests timeout during runs/get is retried in the next round instead of aborting the wait."""
+        session = make_session([('RUNNING', None), ('TERMINATED', 'SUCCESS')])
+        request = session.request.side_effect
+        failures = [requests.exceptions.Timeout("read timed out")]
+
+        def flaky_request(method, url, **kwargs):
+            if url.endswith('runs/get') and failures:
+                raise failures.pop()
+            return request(method, url, **kwargs)
+
+        session.request.side_effect = flaky_request
+        runner = self.make_runner(session, FakeClock())
+
+        job_run = runner.submit_notebook('/notebook').wait()
+
+        self.assertTrue(job_run.success)
+        self.assertEqual(failures, [])
+
+    def test_wait_stops_at_deadline(self):
+        """Test that a run that never finishes is reported as timed out instead of looping forever."""
+        session = make_session([('RUNNING', None)])
+        clock = FakeClock()
+        runner = self.make_runner(session, clock, timeout=10)
+
+        job_run = runner.submit_notebook('/notebook').wait()
+
+        self.assertTrue(job_run.timed_out)
+        self.assertFalse(job_run.success)
+        self.assertLessEqual(clock.now, 10)
+
+    def test_submit_returns_handle_without_polling(self):
+        """Test that the asynchronous mode returns the run handle right after the submission."""
+        session = make_session([('RUNNING', None)])
+        runner = self.make_runner(session, FakeClock())
+
+        job_run = runner.submit_notebook('/notebook', {'param': 'value'})
+
+        self.assertEqual(job_run.run_id, 42)
+        self.assertEqual(session.request.call_count, 1)
+        self.assertEqual(session.request.call_args.kwargs['json']['notebook_task']['base_parameters'], {'param': 'value'})
+
+    def test_on_success_runs_once(self):
+        """Test that success callbacks run a single time, even if the run is polled again."""
+        session = make_session([('TERMINATED', 'SUCCESS')])
+        callback = MagicMock()
+        runner = self.make_runner(session, FakeClock())
+
+        job_run = runner.submit_notebook('/notebook', on_success=[callback])
+        job_run.poll()
+        job_run.poll()
+
+        callback.assert_called_once()
+
+    def test_failed_run_does_not_call_on_success(self):
+        """Test that a failed run is reported as unsuccessful and skips the callbacks."""
+        session = make_session([('TERMINATED', 'FAILED')])
+        callback = MagicMock()
+        runner = self.make_runner(session, FakeClock())
+
+        job_run = runner.submit_notebook('/notebook', on_success=[callback]).wait()
+
+        self.assertTrue(job_run.done)
+        self.assertFalse(job_run.success)
+        callback.assert_not_called()
+
+    def test_output_returns_notebook_result(self):
+        """Test that the notebook exit value is read from runs/get-output."""
+        session = make_session([('TERMINATED', 'SUCCESS')], output='{"status": "success"}')
+        runner = self.make_runner(session, FakeClock())
+
+        job_run = runner.submit_notebook('/notebook').wait()
+
+        self.assertEqual(job_run.output(), '{"status": "success"}')
+
+    def test_output_with_tasks_is_a_single_result(self):
+        """Test that output() returns one string when runs/get lists tasks, and task_outputs() lists every task."""
+        outputs = {7: '{"status": "success"}', 8: '"second"', 42: '"parent"'}
+        tasks = [{'run_id': 7}]
+        session = MagicMock()
+
+        def request(method, url, **kwargs):
+            if url.endswith('runs/submit'):
+                return make_response({'run_id': 42})
+            if url.endswith('runs/get'):
+                return make_response({'state': {'life_cycle_state': 'TERMINATED', 'result_state': 'SUCCESS'}, 'tasks': tasks})
+            return make_response({'notebook_output': {'result': outputs[kwargs['params']['run_id']]}})
+
+        session.request.side_effect = request
+        runner = self.make_runner(session, FakeClock())
+        job_run = runner.submit_notebook('/notebook').wait()
+
+        self.assertEqual(json.loads(job_run.output()), {"status": "success"})
+
+        tasks.append({'run_id': 8})
+        job_run.poll()
+
+        self.assertEqual(job_run.output(), '"parent"')
+        self.assertEqual(job_run.task_outputs(), ['{"status": "success"}', '"second"'])
+
+    def test_rejected_submission_raises_connection_error(self):
+        """Test that a non-200 answer from the Jobs API is raised as ConnectionError."""
+        session = MagicMock()
+        session.request.return_value = make_response({'error_code': 'PERMISSION_DENIED'}, status_code=403)
+        runner = self.make_runner(session, FakeClock())
+
+        with self.assertRaises(ConnectionError):
+            runner.submit_notebook('/notebook')
+
+    def test_wait_all_uses_one_deadline_for_all_runs(self):
+        """Test that runs are awaited together: total time is the slowest run, capped by the deadline."""
+        states = {1: ['RUNNING', 'TERMINATED'], 2: ['RUNNING', 'RUNNING', 'RUNNING', 'TERMINATED'], 3: ['RUNNING']}
+        session = MagicMock()
+
+        def request(method, url, **kwargs):
+            if url.endswith('runs/submit'):
+                return make_response({'run_id': kwargs['json']['run_name']})
+            run_states = states[kwargs['params']['run_id']]
+            state = run_states.pop(0) if len(run_states) > 1 else run_states[0]
+            return make_response({'state': {'life_cycle_state': state, 'result_state': 'SUCCESS'}})
+
+        session.request.side_effect = request
+        clock = FakeClock()
+        runner = self.make_runner(session, clock, timeout=20)
+
+        job_runs = runner.submit_notebooks({key: {'notebook_path': '/notebook', 'run_name': key} for key in states})
+        runner.wait_all(list(job_runs.values()))
+
+        self.assertTrue(job_runs[1].success)
+        self.assertTrue(job_runs[2].success)
+        self.assertTrue(job_runs[3].timed_out)
+        self.assertLessEqual(clock.now, 20)
+
+    def test_wait_any_returns_when_the_first_run_finishes(self):
+        """Test that wait_any stops at the first finished run and leaves the others pending without timing out."""
+        states = {1: ['RUNNING', 'RUNNING', 'RUNNING', 'TERMINATED'], 2: ['RUNNING', 'TERMINATED']}
+        session = MagicMock()
+
+        def request(method, url, **kwargs):
+            if url.endswith('runs/submit'):
+                return make_response({'run_id': kwargs['json']['run_name']})
+            run_states = states[kwargs['params']['run_id']]
+            state = run_states.pop(0) if len(run_states) > 1 else run_states[0]
+            return make_response({'state': {'life_cycle_state': state, 'result_state': 'SUCCESS'}})
+
+        session.request.side_effect = request
+        clock = FakeClock()
+        runner = self.make_runner(session, clock, timeout=20)
+
+        job_runs = runner.submit_notebooks({key: {'notebook_path': '/notebook', 'run_name': key} for key in states})
+        finished = runner.wait_any(list(job_runs.values()))
+
+        self.assertEqual(finished, [job_runs[2]])
+        self.assertFalse(job_runs[1].done)
+        self.assertFalse(job_runs[1].timed_out)
+        self.assertEqual(len(clock.sleeps), 1)
+
+    def test_submit_notebooks_reports_failed_submission(self):
+        """Test that a rejected submission is returned as an exception without affecting the others."""
+        session = MagicMock()
+
+        def request(method, url, **kwargs):
+            if kwargs['json']['run_name'] == 'bad':
+                return make_response({'error_code': 'INVALID_PARAMETER_VALUE'}, status_code=400)
+            return make_response({'run_id': 1})
+
+        session.request.side_effect = request
+        runner = self.make_runner(session, FakeClock())
+
+        job_runs = runner.submit_notebooks({
+            'good': {'notebook_path': '/notebook', 'run_name': 'good'},
+            'bad': {'notebook_path': '/notebook', 'run_name': 'bad'},
+        })
+
+        self.assertEqual(job_runs['good'].run_id, 1)
+        self.assertIsInstance(job_runs['bad'], ConnectionError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Tests for the pages.optimization.optimization_utils module.
+
+This module contains tests for the vectorized recalculation of the optimization
+table, comparing it with the row-by-row formulas it replaced, and for the
+card totals computed from the server-side table.
+"""
+
+import random
+import unittest
+
+import polars as pl
+
+from pages.optimization.optimization_utils import apply_price_changes, calculate_filtered_totals, calculate_totals, complete_changed_rows
+from utils.calculation_division import calculation_division
+from utils.sum_df_col import sum_df_col
+
+
+def reference_row(row, novo_valor):
+    """Row-by-row recalculation, as previously done by optimization_page.recalculate_row."""
+    preco_sap_atual = row['preco_sap_atual'] or 1.0
+    preco_venda_baseline = row['preco_venda_baseline'] or 1.0
+    preco_net_baseline = row['preco_net_baseline'] or 1.0
+    margem_contribuicao_baseline = row['margem_contribuicao_baseline'] or 1.0
+
+    updates = {
+        'preco_sap_novo': novo_valor,
+        'preco_imp_final': round(novo_valor * row['imp_icms'], 2),
+        'preco_venda_final': round(novo_valor * row['imp_icms'] * (1 - row['desconto']), 2),
+    }
+    updates['preco_net_final'] = round(updates['preco_venda_final'] * row['imp'], 2)
+    updates['dp_final'] = round((novo_valor / preco_sap_atual - 1) * 100, 1)
+    updates['vol_novo_final'] = round(row['qtd_volume'] * (1 + updates['dp_final'] / 100) ** row['e'], 2)
+    updates['vol_novo2_final'] = min(updates['vol_novo_final'], round(row['qtd_volume'] * 1.5, 2)) if updates['dp_final'] > 50 else updates['vol_novo_final']
+    updates['gross_final'] = round(updates['vol_novo2_final'] * updates['preco_venda_final'], 2)
+    updates['net_final'] = round(updates['vol_novo2_final'] * updates['preco_net_final'], 2)
+    updates['mc_final'] = round((updates['preco_net_final'] + (updates['preco_venda_final'] * row['costs_factor_medio'] - row['custo_medio_unit'])) * updates['vol_novo2_final'], 2)
+    updates['delta_volume_final'] = round((updates['vol_novo2_final'] / row['qtd_volume'] - 1) * 100, 1)
+    updates['delta_gross_final'] = round((updates['gross_final'] / preco_venda_baseline - 1) * 100, 1)
+    updates['delta_net_final'] = round((updates['net_final'] / preco_net_baseline - 1) * 100, 1)
+    updates['delta_mc_final'] = round((updates['mc_final'] / margem_contribuicao_baseline - 1) * 100, 1)
+    updates['status'] = 'manual'
+    updates['new_alteration'] = 'sim'
+    return {**row, **updates}
+
+
+def make_rows(count, seed=0):
+    """Create optimization table rows with random values."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'peca': f"P{i:05d}",
+            'preco_sap_atual': round(rng.uniform(10, 500), 2),
+            'preco_sap_novo': None,
+            'imp_icms': round(rng.uniform(1.0, 1.3), 4),
+            'desconto': round(rng.uniform(0, 0.3), 4),
+            'imp': round(rng.uniform(0.6, 0.9), 4),
+            'qtd_volume': float(rng.randint(1, 1000)),
+            'e': round(rng.uniform(-2.5, -0.1), 3),
+            'costs_factor_medio': round(rng.uniform(0, 0.1), 4),
+            'custo_medio_unit': round(rng.uniform(1, 200), 2),
+            'preco_venda_baseline': round(rng.uniform(100, 100000), 2),
+            'preco_net_baseline': round(rng.uniform(100, 80000), 2),
+            'margem_contribuicao_baseline': round(rng.uniform(10, 40000), 2),
+            'preco_imp_final': None,
+            'preco_venda_final': None,
+            'preco_net_final': None,
+            'dp_final': 0.0,
+            'vol_novo_final': None,
+            'vol_novo2_final': None,
+            'gross_final': None,
+            'net_final': None,
+            'mc_final': None,
+            'delta_volume_final': 0.0,
+            'delta_gross_final': 0.0,
+            'delta_net_final': 0.0,
+            'delta_mc_final': 0.0,
+            'status': 'otimizado',
+            'new_alteration': None,
+        })
+    return rows
+
+
+class TestApplyPriceChanges(unittest.TestCase):
+    """Tests for the apply_price_changes function."""
+
+    def assertRowsEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, value in expected.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(actual[key], value, delta=0.011, msg=key)
+            else:
+                self.assertEqual(actual[key], value, msg=key)
+
+    def test_matches_row_by_row_formulas(self):
+        """Test that every changed row matches the previous formulas and the others stay untouched."""
+        rows = make_rows(200)
+        rng = random.Random(1)
+        changes = {row['peca']: round(row['preco_sap_atual'] * rng.uniform(0.5, 2.0), 2) for row in rows[::3]}
+
+        df, updated_rows = apply_price_changes(pl.DataFrame(rows), changes)
+
+        self.assertEqual(updated_rows, len(changes))
+        for actual, row in zip(df.to_dicts(), rows):
+            expected = reference_row(row, changes[row['peca']]) if row['peca'] in changes else row
+            self.assertRowsEqual(actual, expected)
+
+    def test_large_increase_caps_volume(self):
+        """Test that price increases above 50% cap the estimated volume at 1.5x the current volume."""
+        row = {**make_rows(1)[0], 'preco_sap_atual': 100.0, 'qtd_volume': 100.0, 'e': 1.5}
+
+        df, _ = apply_price_changes(pl.DataFrame([row]), {row['peca']: 200.0})
+
+        self.assertEqual(df['vol_novo2_final'][0], 150.0)
+        self.assertRowsEqual(df.to_dicts()[0], reference_row(row, 200.0))
+
+    def test_keys_are_matched_as_stripped_strings(self):
+        """Test that imported parts match the table even with surrounding spaces."""
+        rows = make_rows(3)
+
+        df, updated_rows = apply_price_changes(pl.DataFrame(rows), {f" {rows[1]['peca']} ": 42.0, 'UNKNOWN': 1.0})
+
+        self.assertEqual(updated_rows, 1)
+        self.assertEqual(df['preco_sap_novo'].to_list(), [None, 42.0, None])
+        self.assertEqual(df['new_alteration'].to_list(), [None, 'sim', None])
+        self.assertEqual(df.columns, list(rows[0].keys()))
+
+    def test_rows_with_missing_inputs_are_skipped(self):
+        """Test that rows missing required inputs are not recalculated."""
+        rows = make_rows(2)
+        rows[0]['imp'] = None
+
+        df, updated_rows = apply_price_changes(pl.DataFrame(rows), {row['peca']: 10.0 for row in rows})
+
+        self.assertEqual(updated_rows, 1)
+        self.assertEqual(df['status'].to_list(), ['otimizado', 'manual'])
+
+    def test_no_changes_returns_frame_unchanged(self):
+        """Test that an empty change set does not touch the table."""
+        df = pl.DataFrame(make_rows(2))
+
+        result, updated_rows = apply_price_changes(df, {})
+
+        self.assertEqual(updated_rows, 0)
+        self.assertTrue(result.equals(df))
+
+
+class TestCardTotals(unittest.TestCase):
+    """Tests for the calculate_totals and calculate_filtered_totals functions."""
+
+    def setUp(self):
+        rows = make_rows(60)
+        changes = {row['peca']: row['preco_sap_atual'] * 1.1 for row in rows[::2]}
+        self.df, _ = apply_price_changes(pl.DataFrame(rows), changes)
+
+    def test_matches_previous_helpers(self):
+        """Test that the single-pass totals match calculation_division and sum_df_col."""
+        df = self.df
+
+        self.assertEqual(calculate_totals(df), {
+            'price': (calculation_division(df, "preco_venda_baseline", "qtd_volume"), calculation_division(df, "gross_final", "vol_novo2_final")),
+            'volume': (sum_df_col(df, "qtd_volume"), sum_df_col(df, "vol_novo2_final")),
+            'gross': (sum_df_col(df, "preco_venda_baseline"), sum_df_col(df, "gross_final")),
+            'margin': (sum_df_col(df, "margem_contribuicao_baseline"), sum_df_col(df, "mc_final")),
+        })
+
+    def test_filtered_totals_use_only_matching_rows(self):
+        """Test that the filter model restricts the rows in the totals."""
+        filter_model = {"status": {"filterType": "text", "type": "equals", "filter": "manual"}}
+
+        totals = calculate_filtered_totals(self.df, filter_model)
+
+        self.assertEqual(totals, calculate_totals(self.df.filter(pl.col("status") == "manual")))
+
+    def test_totals_are_cached_per_version_and_filter(self):
+        """Test that the same handle, version and filter reuse the totals and a new version recalculates."""
+        ref = {"handle": "test-cached-totals", "version": 0}
+        filter_model = {"status": {"filterType": "text", "type": "equals", "filter": "manual"}}
+        first = calculate_filtered_totals(self.df, filter_model, ref)
+
+        cached = calculate_filtered_totals(self.df.head(1), filter_model, ref)
+        recalculated = calculate_filtered_totals(self.df.head(1), filter_model, {**ref, "version": 1})
+
+        self.assertEqual(cached, first)
+        self.assertNotEqual(recalculated, first)
+
+
+class TestCompleteChangedRows(unittest.TestCase):
+    """Tests for the complete_changed_rows function."""
+
+    def test_edited_values_are_applied_to_the_full_rows(self):
+        """Test that the sent rows keep every d_otimizacao column, with the page's edited values."""
+        changed = pl.DataFrame({"peca": ["2"], "preco_sap_novo": [99.0], "new_alteration": ["sim"]})
+        full_rows = pl.DataFrame({
+            "peca": ["2"],
+            "preco_sap_novo": [10.0],
+            "vol_novo": [5.0],
+            "preco_sap_atual_baseline": [8.0],
+        })
+
+        result = complete_changed_rows(changed, full_rows)
+
+        self.assertEqual(result.columns, ["peca", "preco_sap_novo", "vol_novo", "preco_sap_atual_baseline", "new_alteration"])
+        self.assertEqual(result.row(0), ("2", 99.0, 5.0, 8.0, "sim"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Tests for the api.payload_staging module.
+
+This module contains tests for the staged payload transport: large tabular
+payloads are written as zstd Parquet to a local directory standing in for the
+Databricks volume, and only the path and checksum go in the job parameters.
+"""
+
+import hashlib
+import io
+import json
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import polars as pl
+import pyarrow.parquet as pq
+
+from api.approval_payload import build_approval_payload
+from api.payload_staging import LocalStagingStore, PayloadStager, VolumeStagingStore, encode_parameter
+
+
+class TestPayloadStaging(unittest.TestCase):
+    """Tests for PayloadStager and encode_parameter."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = LocalStagingStore(self.directory.name)
+        self.stager = PayloadStager(self.store, min_rows=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_large_payload_is_staged_as_parquet(self):
+        """Test that only the path and checksum go in the parameters and the file holds the rows."""
+        rows = [{"id": index, "porcentagem": index / 10} for index in range(5)]
+
+        parameters = encode_parameter("updateValues", rows, "variables_marca", self.stager)
+
+        self.assertEqual(set(parameters), {"updateValues_path", "updateValues_sha256"})
+        content = self.store.read(parameters["updateValues_path"])
+        self.assertEqual(hashlib.sha256(content).hexdigest(), parameters["updateValues_sha256"])
+        parquet = pq.ParquetFile(io.BytesIO(content))
+        self.assertEqual(parquet.metadata.row_group(0).column(0).compression, "ZSTD")
+        self.assertEqual(pl.read_parquet(io.BytesIO(content)).to_dicts(), rows)
+
+    def test_small_or_non_tabular_payloads_stay_inline(self):
+        """Test that payloads below min_rows, empty values and non-tabular lists keep the JSON format."""
+        self.assertEqual(encode_parameter("updateValues", [{"id": 1}], "captain", self.stager), {"updateValues": '[{"id": 1}]'})
+        self.assertEqual(encode_parameter("alteracoes_marca", "", "price_simulation", self.stager), {"alteracoes_marca": ""})
+
+        captain = ["uuid-1", [{"part_number": "A"}], [{"part_number": "B"}]]
+        self.assertEqual(json.loads(encode_parameter("simulationOutput", captain, "captain", self.stager)["simulationOutput"]), captain)
+
+    def test_without_stager_everything_is_inline(self):
+        """Test that without PAYLOAD_STAGING_PATH the parameters are the same JSON as before."""
+        rows = [{"id": index} for index in range(5)]
+
+        with patch('api.payload_staging.payload_stager', None):
+            self.assertEqual(encode_parameter("updateValues", rows, "variables_marca"), {"updateValues": json.dumps(rows)})
+
+    def test_approval_payload_is_staged(self):
+        """Test that send_to_approval payloads stage the rows sent by the page."""
+        table = pd.DataFrame({"part_number": ["A", "B", "C"], "manual": ["1", "1", "1"]})
+
+        parameters, metrics = build_approval_payload("delta", table, "outputDeltaPreco", self.stager)
+
+        self.assertTrue(metrics["staged"])
+        self.assertEqual(set(parameters), {"outputDeltaPreco_path", "outputDeltaPreco_sha256"})
+        staged = pl.read_parquet(io.BytesIO(self.store.read(parameters["outputDeltaPreco_path"])))
+        self.assertEqual(staged["part_number"].to_list(), ["A", "B", "C"])
+
+    @patch.dict('os.environ', {'DB_SERVER': 'https://databricks', 'DB_TOKEN': 'token'})
+    def test_volume_store_uploads_with_the_files_api(self):
+        """Test that the volume store writes through PUT /api/2.0/fs/files on the shared session."""
+        runner = MagicMock(http_timeout=30)
+        runner.session.put.return_value = MagicMock(status_code=204)
+
+        path = VolumeStagingStore("/Volumes/catalog/schema/staging/", runner=runner).write("delta/file.parquet", b"data")
+
+        self.assertEqual(path, "/Volumes/catalog/schema/staging/delta/file.parquet")
+        self.assertEqual(runner.session.put.call_args.args[0], "https://databricks/api/2.0/fs/files/Volumes/catalog/schema/staging/delta/file.parquet")
+        self.assertEqual(runner.session.put.call_args.kwargs["data"], b"data")
+
+
+if __name__ == '__main__':
+    unittest.main()
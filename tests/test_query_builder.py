@@ -0,0 +1,68 @@
+"""
+Tests for the api.query_builder module.
+
+This module contains tests for the SELECT builder used by the loaders.
+"""
+
+import unittest
+
+from api.query_builder import build_select_query, quote_identifier
+
+
+class TestBuildSelectQuery(unittest.TestCase):
+    """Tests for the build_select_query function."""
+
+    def test_select_all_without_filters(self):
+        """Test that no columns and no filters produce a plain SELECT *."""
+        query, params = build_select_query("pricing_db.d_mercado")
+
+        self.assertEqual(query, "SELECT * FROM pricing_db.d_mercado")
+        self.assertEqual(params, [])
+
+    def test_columns_and_bound_filters(self):
+        """Test that columns are projected and filter values are bound, not inlined."""
+        query, params = build_select_query(
+            "pricing_db.d_otimizacao",
+            columns=["peca", "preco_sap_novo"],
+            filters={"cpc1_3_6": ["A'; DROP TABLE x; --", "B"], "quarter": "Q1"},
+            conditions=["record_sales = 'yes'"],
+        )
+
+        self.assertEqual(
+            query,
+            "SELECT `peca`, `preco_sap_novo` FROM pricing_db.d_otimizacao "
+            "WHERE record_sales = 'yes' AND `cpc1_3_6` IN (?, ?) AND `quarter` = ?",
+        )
+        self.assertEqual(params, ["A'; DROP TABLE x; --", "B", "Q1"])
+
+    def test_empty_filters_are_ignored(self):
+        """Test that None values and empty lists do not add conditions."""
+        query, params = build_select_query("t", filters={"cpc1_3_6": [], "quarter": None})
+
+        self.assertEqual(query, "SELECT * FROM t")
+        self.assertEqual(params, [])
+
+    def test_column_prefix_and_order_by(self):
+        """Test the table alias used by the approval JOIN queries."""
+        query, _ = build_select_query(
+            "dump a LEFT JOIN historico b ON a.uuid_alteracoes = b.uuid_alteracoes",
+            columns=["peca"],
+            conditions=["b.status = 3"],
+            column_prefix="a",
+            order_by=["peca"],
+        )
+
+        self.assertEqual(
+            query,
+            "SELECT a.`peca` FROM dump a LEFT JOIN historico b ON a.uuid_alteracoes = b.uuid_alteracoes "
+            "WHERE b.status = 3 ORDER BY a.`peca`",
+        )
+
+    def test_quote_identifier_escapes_backticks(self):
+        """Test that column names with spaces or backticks are quoted safely."""
+        self.assertEqual(quote_identifier("mg_min Genuine"), "`mg_min Genuine`")
+        self.assertEqual(quote_identifier("a`b"), "`a``b`")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests for the api.query_cache module.
+
+This module contains tests for the QueryCache class: keys, TTL, LRU eviction,
+disk persistence and invalidation.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import polars as pl
+
+from api.query_cache import QueryCache, make_cache_key
+
+
+class TestMakeCacheKey(unittest.TestCase):
+    """Tests for the make_cache_key function."""
+
+    def test_filter_order_does_not_change_key(self):
+        """Test that the same filters in a different order produce the same key."""
+        self.assertEqual(
+            make_cache_key("optimization", {"cpc": ["A", "B"]}),
+            make_cache_key("optimization", {"cpc": ["B", "A"]}),
+        )
+
+    def test_different_filters_produce_different_keys(self):
+        """Test that a filtered query does not share a key with the unfiltered one."""
+        self.assertNotEqual(
+            make_cache_key("optimization", {"cpc": []}),
+            make_cache_key("optimization", {"cpc": ["A"]}),
+        )
+        self.assertNotEqual(
+            make_cache_key("optimization", scope="user1"),
+            make_cache_key("optimization", scope="user2"),
+        )
+
+
+class TestQueryCache(unittest.TestCase):
+    """Tests for the QueryCache class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_get_or_load_calls_loader_once_per_key(self):
+        """Test that the loader runs once and is keyed by the filters."""
+        cache = QueryCache(cache_dir=None)
+        loader = MagicMock(return_value="data")
+
+        cache.get_or_load("optimization", loader, filters={"cpc": ["A"]})
+        cache.get_or_load("optimization", loader, filters={"cpc": ["A"]})
+        cache.get_or_load("optimization", loader, filters={"cpc": ["B"]})
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_expired_entries_are_reloaded(self):
+        """Test that an entry past its TTL is not returned."""
+        cache = QueryCache(cache_dir=None)
+        cache.set("command_center", "old", ttl=0)
+
+        self.assertIsNone(cache.get("command_center"))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is dropped when the cache is full."""
+        cache = QueryCache(max_entries=2, cache_dir=None)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_dataframes_are_persisted_to_disk(self):
+        """Test that a second cache instance (another process) reads the parquet file."""
+        df = pl.DataFrame({"peca": ["1", "2"], "preco_sap_novo": [1.0, 2.0]})
+        QueryCache(cache_dir=self.tmp_dir.name).set("optimization", df, filters={"cpc": ["A"]})
+
+        cached = QueryCache(cache_dir=self.tmp_dir.name).get("optimization", filters={"cpc": ["A"]})
+
+        self.assertTrue(cached.equals(df))
+
+    def test_invalidate_only_affects_given_table(self):
+        """Test that invalidation removes the table entries in memory and on disk."""
+        df = pl.DataFrame({"a": [1]})
+        cache = QueryCache(cache_dir=self.tmp_dir.name)
+        cache.set("optimization", df)
+        cache.set("catlote", df)
+
+        cache.invalidate("optimization")
+
+        self.assertIsNone(cache.get("optimization"))
+        self.assertIsNone(QueryCache(cache_dir=self.tmp_dir.name).get("optimization"))
+        self.assertIsNotNone(cache.get("catlote"))
+
+    def test_invalidation_is_seen_by_other_instances(self):
+        """Test that an invalidation in one process discards memory entries in another."""
+        other_process = QueryCache(cache_dir=self.tmp_dir.name)
+        other_process.set("captain", "in memory", persist=False)
+
+        QueryCache(cache_dir=self.tmp_dir.name).invalidate("captain")
+
+        self.assertIsNone(other_process.get("captain"))
+
+    def test_load_locks_are_released(self):
+        """Test that the per-key load locks do not accumulate after the loads finish."""
+        cache = QueryCache(cache_dir=None)
+
+        for index in range(5):
+            cache.get_or_load("optimization", lambda: "data", filters={"cpc": [str(index)]})
+        cache.get_or_load("optimization", lambda: None, filters={"cpc": ["x"]})
+        with self.assertRaises(RuntimeError):
+            cache.get_or_load("optimization", MagicMock(side_effect=RuntimeError("warehouse error")), filters={"cpc": ["y"]})
+
+        self.assertEqual(cache._load_locks, {})
+
+    def test_invalidation_marker_is_checked_at_most_once_per_second(self):
+        """Test that repeated gets do not read the invalidation marker on every call."""
+        cache = QueryCache(cache_dir=self.tmp_dir.name)
+        cache.set("captain", "in memory", persist=False)
+
+        with patch('api.query_cache.os.stat', wraps=os.stat) as mock_stat:
+            for _ in range(10):
+                cache.get("captain")
+
+        marker_stats = [call for call in mock_stat.call_args_list if str(call.args[0]).endswith("captain.invalidated")]
+        self.assertLessEqual(len(marker_stats), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
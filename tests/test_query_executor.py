@@ -0,0 +1,106 @@
+"""
+Tests for the api.query_executor module.
+
+This module contains tests for the shared QueryExecutor: bounded concurrency,
+ordered results, nested submissions and the queue/wait metrics.
+"""
+
+import threading
+import time
+import unittest
+
+from api.query_executor import QueryExecutor
+
+
+class TestQueryExecutor(unittest.TestCase):
+    """Tests for the QueryExecutor class."""
+
+    def test_concurrency_never_exceeds_max_workers(self):
+        """Test that at most max_workers tasks run at the same time and results keep their order."""
+        executor = QueryExecutor(max_workers=2, max_queued=10)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def query(item):
+            with lock:
+                running.append(item)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(item)
+            return item * 10
+
+        results = executor.map(query, range(6))
+
+        self.assertEqual(results, [0, 10, 20, 30, 40, 50])
+        self.assertLessEqual(max(peak), 2)
+
+    def test_metrics_track_queue_and_wait(self):
+        """Test that tasks waiting for a worker are counted in the queue and wait-time metrics."""
+        executor = QueryExecutor(max_workers=1, max_queued=10)
+
+        executor.map(lambda _: time.sleep(0.02), range(3))
+        stats = executor.stats()
+
+        self.assertEqual(stats["completed"], 3)
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["active"], 0)
+        self.assertGreaterEqual(stats["max_queued"], 2)
+        self.assertGreater(stats["wait_seconds_max"], 0.01)
+
+    def test_submit_blocks_when_the_queue_is_full(self):
+        """Test that submissions beyond max_workers + max_queued wait for a free slot."""
+        executor = QueryExecutor(max_workers=1, max_queued=1)
+        release = threading.Event()
+        executor.submit(release.wait)
+        executor.submit(release.wait)
+
+        third = []
+        submitter = threading.Thread(target=lambda: third.append(executor.submit(lambda: "ok")))
+        submitter.start()
+        submitter.join(0.1)
+        self.assertEqual(third, [])
+
+        release.set()
+        submitter.join(1)
+        self.assertEqual(third[0].result(timeout=1), "ok")
+
+    def test_try_submit_never_waits(self):
+        """Test that try_submit returns None when the queue is full or when called from a task."""
+        executor = QueryExecutor(max_workers=1, max_queued=1)
+        release = threading.Event()
+        executor.submit(release.wait)
+        executor.submit(release.wait)
+
+        self.assertIsNone(executor.try_submit(lambda: "ok"))
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+        release.set()
+        self.assertIsNone(executor.submit(lambda: executor.try_submit(lambda: "ok")).result(timeout=1))
+        self.assertEqual(executor.try_submit(lambda: "ok").result(timeout=1), "ok")
+
+    def test_nested_submissions_run_inline(self):
+        """Test that a task fanning out again does not deadlock a single-worker executor."""
+        executor = QueryExecutor(max_workers=1, max_queued=1)
+
+        result = executor.submit(lambda: executor.map(lambda item: item + 1, [1, 2])).result(timeout=1)
+
+        self.assertEqual(result, [2, 3])
+
+    def test_errors_are_raised_and_counted(self):
+        """Test that a failing task raises from map and is counted as failed."""
+        executor = QueryExecutor(max_workers=2, max_queued=2)
+
+        def query(item):
+            if item == 1:
+                raise RuntimeError("warehouse error")
+            return item
+
+        with self.assertRaises(RuntimeError):
+            executor.map(query, [0, 1, 2])
+        self.assertEqual(executor.stats()["failed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests for the api.request_source_index module.
+
+This module contains tests for the request id -> process index and for
+get_requests_for_approval_by_id, which now needs at most two queries.
+"""
+
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+from api.request_source_index import RequestSourceIndex, build_source_lookup_query, resolve_request_source
+from api.get_requests_for_approval_by_id import get_requests_for_approval_by_id
+
+
+def fake_connection(cursor):
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+
+    @contextmanager
+    def get_connection():
+        yield connection
+
+    return get_connection
+
+
+class TestRequestSourceIndex(unittest.TestCase):
+    """Tests for RequestSourceIndex and resolve_request_source."""
+
+    def test_index_hit_does_not_query(self):
+        """Test that an id listed by get_requests_for_approval_by_user is resolved from memory."""
+        index = RequestSourceIndex()
+        index.remember_many(pd.DataFrame({"uuid_alteracoes": ["a", "b"], "source_table": ["delta", "price"]}))
+        cursor = MagicMock()
+
+        self.assertEqual(resolve_request_source(cursor, "b", index=index), "price")
+        cursor.execute.assert_not_called()
+
+    def test_miss_uses_a_single_union_query(self):
+        """Test that an unknown id is resolved with one query and then remembered."""
+        index = RequestSourceIndex()
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ("catlote",)
+
+        self.assertEqual(resolve_request_source(cursor, "x", index=index), "catlote")
+        self.assertEqual(resolve_request_source(cursor, "x", index=index), "catlote")
+
+        cursor.execute.assert_called_once()
+        query, params = cursor.execute.call_args[0]
+        self.assertEqual(query.count("UNION ALL"), 8)
+        self.assertEqual(params, ["x"] * 9)
+        self.assertIn("hash_simulacao = ?", query)
+
+    def test_index_is_bounded(self):
+        """Test that the oldest ids are dropped beyond max_entries and unknown processes are ignored."""
+        index = RequestSourceIndex(max_entries=2)
+        for request_id in ("a", "b", "c"):
+            index.remember(request_id, "delta")
+        index.remember("d", "unknown")
+
+        self.assertIsNone(index.get("a"))
+        self.assertEqual(index.get("c"), "delta")
+        self.assertIsNone(index.get("d"))
+
+    def test_lookup_query_is_parameterized(self):
+        """Test that the request id never goes into the SQL text."""
+        query, params = build_source_lookup_query("1' OR '1'='1")
+
+        self.assertNotIn("1' OR", query)
+        self.assertTrue(query.endswith("ORDER BY priority LIMIT 1"))
+
+
+class TestGetRequestsForApprovalById(unittest.TestCase):
+    """Tests for the get_requests_for_approval_by_id function."""
+
+    @patch('api.get_requests_for_approval_by_id.fetch_pandas')
+    def test_details_need_lookup_and_one_dump_query(self, mock_fetch):
+        """Test that the details are read with the lookup plus one targeted dump query."""
+        cursor = MagicMock()
+        cursor.fetchone.return_value = ("delta",)
+        mock_fetch.return_value = pd.DataFrame({"uuid_alteracoes": ["u1"], "valor": [1]})
+
+        with patch('api.get_requests_for_approval_by_id.get_connection', fake_connection(cursor)), \
+                patch('api.request_source_index.request_source_index', RequestSourceIndex()):
+            df = get_requests_for_approval_by_id("u1")
+
+        self.assertEqual(cursor.execute.call_count, 2)
+        dump_query, dump_params = cursor.execute.call_args_list[1][0]
+        self.assertIn("dump_delta_preco", dump_query)
+        self.assertEqual(dump_params, ["u1"])
+        self.assertEqual(df["source_table"].tolist(), ["delta"])
+
+    def test_unknown_request_returns_none(self):
+        """Test that an id not found in any historic table returns None after one query."""
+        cursor = MagicMock()
+        cursor.fetchone.return_value = None
+
+        with patch('api.get_requests_for_approval_by_id.get_connection', fake_connection(cursor)), \
+                patch('api.request_source_index.request_source_index', RequestSourceIndex()):
+            self.assertIsNone(get_requests_for_approval_by_id("missing"))
+
+        cursor.execute.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Tests for the session_store module.
+
+This module contains tests for the server-side working-set store that keeps
+page tables on the server and hands out opaque handles to the browser.
+"""
+
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import polars as pl
+
+from session_store import SessionStore
+from tests.helpers import FakeClock
+
+
+class TestSessionStore(unittest.TestCase):
+    """Tests for the SessionStore class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def make_store(self, **kwargs):
+        store = SessionStore(cache_dir=self.tmp_dir.name, **kwargs)
+        # Termina as gravações em segundo plano antes de remover a pasta
+        self.addCleanup(store.flush)
+        return store
+
+    def test_put_returns_handle_and_version(self):
+        """Test that a new table gets an opaque handle and replacing it bumps the version."""
+        store = self.make_store()
+        df = pl.DataFrame({"peca": ["A"]})
+
+        ref = store.put(df)
+        updated_ref = store.put(df.with_columns(pl.lit(1).alias("x")), handle=ref["handle"])
+
+        self.assertEqual(ref["version"], 0)
+        self.assertEqual(updated_ref, {"handle": ref["handle"], "version": 1})
+        self.assertEqual(store.get(updated_ref).columns, ["peca", "x"])
+
+    def test_unknown_handle_returns_none(self):
+        """Test that missing or empty handles return None."""
+        store = self.make_store()
+
+        self.assertIsNone(store.get({"handle": "missing"}))
+        self.assertIsNone(store.get(None))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the store keeps at most max_entries tables in memory, dropping the least recently used."""
+        store = SessionStore(max_entries=2, cache_dir=None)
+        first = store.put(pl.DataFrame({"a": [1]}))
+        second = store.put(pl.DataFrame({"a": [2]}))
+
+        store.get(first)
+        store.put(pl.DataFrame({"a": [3]}))
+
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+
+    def test_evicted_entry_is_reloaded_from_disk(self):
+        """Test that an entry evicted by the byte budget is still available from its Arrow IPC file."""
+        store = self.make_store(max_bytes=1)
+        first = store.put(pl.DataFrame({"a": list(range(100))}))
+        store.put(pl.DataFrame({"a": list(range(100))}))
+
+        self.assertEqual(store.stats()["entries"], 1)
+        self.assertEqual(store.get(first)["a"].to_list(), list(range(100)))
+
+    def test_other_process_sees_newer_version(self):
+        """Test that a store sharing the cache directory reads the latest version written by another one."""
+        writer = self.make_store()
+        reader = self.make_store()
+        ref = writer.put({"fator_gsales": 0.1})
+        self.assertEqual(reader.get(ref), {"fator_gsales": 0.1})
+
+        updated_ref = writer.put({"fator_gsales": 0.2}, handle=ref["handle"])
+
+        self.assertEqual(reader.get(updated_ref), {"fator_gsales": 0.2})
+        self.assertEqual(reader.put({"fator_gsales": 0.3}, handle=ref["handle"])["version"], 2)
+
+    def test_values_keep_their_type(self):
+        """Test that Polars, pandas, records and dicts come back with the same type from disk."""
+        store = self.make_store()
+        values = [
+            pl.DataFrame({"peca": ["A", "B"], "preco": [1.5, None]}),
+            pd.DataFrame({"PECA": ["A"], "CATLOTE_1": ["C1"], "media_regular": [10]}),
+            [{"CATLOT1": "C1", "P1": 0.1}, {"CATLOT1": "C2", "P1": 0.2}],
+            {"fator_gsales": 0.1, "fator_penetracao": 0.3},
+            [{"a": 1}, {"a": "texto"}],
+        ]
+        refs = [store.put(value) for value in values]
+
+        reloaded = self.make_store()
+
+        self.assertTrue(reloaded.get(refs[0]).equals(values[0]))
+        pd.testing.assert_frame_equal(reloaded.get(refs[1]), values[1])
+        for ref, value in zip(refs[2:], values[2:]):
+            self.assertEqual(reloaded.get(ref), value)
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries without access for ttl seconds are dropped from memory and disk."""
+        clock = FakeClock(now=1_000_000.0)
+        store = self.make_store(ttl=100, clock=clock)
+        ref = store.put(pl.DataFrame({"a": [1]}))
+
+        clock.now += 90
+        self.assertIsNotNone(store.get(ref))
+        clock.now += 90
+        self.assertIsNotNone(store.get(ref))
+
+        clock.now += 100
+        store.flush()
+        os.utime(os.path.join(self.tmp_dir.name, f"{ref['handle']}.arrow"), (clock.now - 100, clock.now - 100))
+        self.assertIsNone(store.get(ref))
+        self.assertEqual(store.stats()["disk_entries"], 0)
+
+    def test_delete_removes_memory_and_disk(self):
+        """Test that delete drops the entry everywhere."""
+        store = self.make_store()
+        ref = store.put(pl.DataFrame({"a": [1]}))
+
+        store.delete(ref)
+
+        self.assertIsNone(store.get(ref))
+        self.assertEqual(store.stats()["disk_entries"], 0)
+
+    def test_edits_are_written_in_the_background(self):
+        """Test that put on an existing handle neither purges nor rewrites the IPC file synchronously."""
+        store = self.make_store(max_entries=1)
+        store._start_writer = lambda: None
+        store.purge_expired = lambda now=None: self.fail("purge_expired called by put")
+
+        ref = store.put(pl.DataFrame({"a": [1]}))
+        updated_ref = store.put(pl.DataFrame({"a": [2]}), handle=ref["handle"])
+        store.put(pl.DataFrame({"b": [3]}))
+
+        self.assertEqual(store._disk_version(ref["handle"]), 0)
+        self.assertEqual(store.get(updated_ref)["a"].to_list(), [2])
+
+        store.flush()
+        self.assertEqual(store._disk_version(ref["handle"]), 1)
+        self.assertEqual(self.make_store().get(updated_ref)["a"].to_list(), [2])
+
+    def test_only_the_latest_pending_version_is_written(self):
+        """Test that consecutive edits of the same handle are coalesced into a single write after the first version."""
+        store = self.make_store()
+        store._start_writer = lambda: None
+        writes = []
+        write_disk = store._write_disk
+        store._write_disk = lambda handle, table, kind, version: writes.append(version) or write_disk(handle, table, kind, version)
+
+        ref = store.put({"fator_gsales": 0.1})
+        for value in (0.2, 0.3):
+            ref = store.put({"fator_gsales": value}, handle=ref["handle"])
+        store.flush()
+
+        self.assertEqual(writes, [0, 2])
+        self.assertEqual(self.make_store().get(ref), {"fator_gsales": 0.3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Tests for the api.table_cache module.
+
+This module contains tests for the TableCache class: per-table loading, TTL
+refresh served stale, version checks and snapshots returned to readers.
+"""
+
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from api.query_executor import QueryExecutor
+from api.table_cache import TableCache
+from tests.helpers import FakeClock
+
+
+class ImmediateExecutor:
+    """Runs background tasks right away, so the tests are deterministic."""
+
+    def submit(self, task):
+        task()
+
+
+class TestTableCache(unittest.TestCase):
+    """Tests for the TableCache class."""
+
+    def setUp(self):
+        self.clock = FakeClock(now=1000.0)
+        self.versions = {"a": 1, "b": 1}
+        self.loads = {"a": 0, "b": 0}
+
+        def loader(table):
+            self.loads[table] += 1
+            return pd.DataFrame({"value": [self.loads[table]]}), self.versions[table]
+
+        self.loader = loader
+        self.version_loader = MagicMock(side_effect=lambda table: self.versions[table])
+        self.cache = TableCache(
+            loader=loader,
+            version_loader=self.version_loader,
+            ttl=100,
+            check_interval=10,
+            clock=self.clock,
+            executor=ImmediateExecutor(),
+        )
+
+    def test_missing_tables_are_loaded_together_once(self):
+        """Test that absent tables go through load_many and are then served from memory."""
+        load_many = MagicMock(side_effect=lambda tables: {table: self.loader(table) for table in tables})
+        self.cache.load_many = load_many
+
+        self.cache.get_many(["a", "b"])
+        self.cache.get("a")
+
+        load_many.assert_called_once_with(["a", "b"])
+        self.assertEqual(self.loads, {"a": 1, "b": 1})
+
+    def test_expired_table_is_served_stale_and_refreshed(self):
+        """Test that an expired entry is returned as is while only that table reloads."""
+        self.cache.get_many(["a", "b"])
+        self.clock.now += 100
+
+        stale = self.cache.get("a")
+
+        self.assertEqual(stale["value"][0], 1)
+        self.assertEqual(self.cache.get("a")["value"][0], 2)
+        self.assertEqual(self.loads["b"], 1)
+
+    def test_reload_only_when_the_version_changes(self):
+        """Test that a version check reloads the table only if the source changed."""
+        self.cache.get("a")
+        self.clock.now += 10
+        self.cache.get("a")
+        self.assertEqual(self.loads["a"], 1)
+        self.version_loader.assert_called_once_with("a")
+
+        self.versions["a"] = 2
+        self.clock.now += 10
+        self.cache.get("a")
+        self.assertEqual(self.loads["a"], 2)
+
+    def test_failed_refresh_keeps_last_value(self):
+        """Test that a refresh error keeps serving the old value and waits before retrying."""
+        self.cache.get("a")
+        self.cache.loader = MagicMock(side_effect=RuntimeError("warehouse offline"))
+        self.clock.now += 100
+
+        self.assertEqual(self.cache.get("a")["value"][0], 1)
+        self.assertEqual(self.cache.get("a")["value"][0], 1)
+        self.assertEqual(self.cache.loader.call_count, 1)
+
+        self.clock.now += 10
+        self.cache.get("a")
+        self.assertEqual(self.cache.loader.call_count, 2)
+
+    def test_readers_cannot_change_the_cached_frame(self):
+        """Test that replacing a column in the returned frame does not change the cache."""
+        df = self.cache.get("a")
+        df["value"] = df["value"] * 100
+
+        self.assertEqual(self.cache.get("a")["value"][0], 1)
+
+    def test_readers_never_wait_for_a_full_executor(self):
+        """Test that a refresh is dropped when the query executor is full and scheduled again on a later read."""
+        executor = QueryExecutor(max_workers=1, max_queued=1)
+        release = threading.Event()
+        executor.submit(release.wait)
+        executor.submit(release.wait)
+        self.cache._executor = executor
+        self.cache.get("a")
+        self.clock.now += 100
+
+        reader = threading.Thread(target=self.cache.get, args=("a",))
+        reader.start()
+        reader.join(1)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(self.loads["a"], 1)
+
+        release.set()
+        executor.submit(lambda: None).result(timeout=1)
+        self.cache.get("a")
+        executor.submit(lambda: None).result(timeout=1)
+        self.assertEqual(self.loads["a"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests for the api.update_approval_status module.
+
+This module contains tests for the bulk approval: a sliding window of notebook
+runs, per-request outcomes and a single cache invalidation at the end, with the
+Databricks job runner replaced by a mock.
+"""
+
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from api.job_runner import JobRun
+from api.update_approval_status import update_approval_statuses
+
+
+def make_runner(failed=(), submit_errors=(), interrupt_after=None):
+    """Create a fake runner whose runs succeed unless their request id is in `failed`.
+
+    Runs start RUNNING and each wait_any call finishes the oldest running one.
+    With `interrupt_after`, wait_any raises once that many runs have finished.
+    """
+    runner = MagicMock(timeout=60)
+    run_ids = iter(range(1, 100))
+    runner.results = {}
+    runner.finished = []
+
+    def submit_notebooks(submissions):
+        job_runs = {}
+        for key in submissions:
+            if key in submit_errors:
+                job_runs[key] = ConnectionError('403')
+                continue
+            job_run = JobRun(runner, next(run_ids))
+            job_run.state = {'life_cycle_state': 'RUNNING'}
+            runner.results[job_run.run_id] = 'FAILED' if key in failed else 'SUCCESS'
+            job_runs[key] = job_run
+        return job_runs
+
+    def wait_any(job_runs, timeout=None, on_poll=None):
+        if interrupt_after is not None and len(runner.finished) >= interrupt_after:
+            raise KeyboardInterrupt
+        job_run = next(job_run for job_run in job_runs if not job_run.done)
+        job_run.state = {'life_cycle_state': 'TERMINATED', 'result_state': runner.results[job_run.run_id]}
+        runner.finished.append(job_run.run_id)
+        return [job_run]
+
+    runner.submit_notebooks.side_effect = submit_notebooks
+    runner.wait_any.side_effect = wait_any
+    return runner
+
+
+@patch.dict(os.environ, {'DB_SERVER': 'https://databricks', 'DB_TOKEN': 'token', 'DB_CLUSTER_ID': 'cluster', 'BASE_NOTEBOOK_PATH': '/notebooks'})
+class TestUpdateApprovalStatuses(unittest.TestCase):
+    """Tests for the update_approval_statuses function."""
+
+    @patch('api.update_approval_status.invalidate_cache')
+    def test_next_request_is_submitted_when_a_run_finishes(self, mock_invalidate):
+        """Test that at most max_parallel runs are active and a finished run frees its slot right away."""
+        runner = make_runner()
+        items = [("delta", f"uuid-{index}", "1") for index in range(5)]
+
+        with patch('api.update_approval_status.job_runner', runner):
+            status = update_approval_statuses(items, "user-token", max_parallel=2)
+
+        batches = [call.args[0] for call in runner.submit_notebooks.call_args_list]
+        self.assertEqual([list(batch) for batch in batches], [["uuid-0", "uuid-1"], ["uuid-2"], ["uuid-3"], ["uuid-4"]])
+        self.assertTrue(all(len(call.args[0]) <= 2 for call in runner.wait_any.call_args_list))
+        self.assertEqual(batches[0]["uuid-0"]["base_parameters"]["targetTable"], "maxis_sandbox.pricing_db.historico_delta_preco")
+        self.assertTrue(all(item["success"] for item in status.values()))
+
+    @patch('api.update_approval_status.invalidate_cache')
+    def test_outcomes_are_reported_per_request(self, mock_invalidate):
+        """Test that failed runs, failed submissions and unknown processes are reported individually."""
+        runner = make_runner(failed={"b"}, submit_errors={"c"})
+        items = [("delta", "a", "1"), ("price", "b", "1"), ("delta", "c", "2"), ("unknown", "d", "1")]
+
+        with patch('api.update_approval_status.job_runner', runner):
+            status = update_approval_statuses(items, "user-token", max_parallel=10)
+
+        self.assertTrue(status["a"]["success"])
+        self.assertEqual(status["b"]["result_state"], "FAILED")
+        self.assertEqual(status["c"]["life_cycle_state"], "SUBMIT_FAILED")
+        self.assertEqual(status["c"]["error"], "403")
+        self.assertEqual(status["d"]["life_cycle_state"], "SUBMIT_FAILED")
+        self.assertEqual(status["c"]["status"], "2")
+        submitted = runner.submit_notebooks.call_args.args[0]
+        self.assertTrue(submitted["b"]["notebook_path"].endswith("proc_aprovar_arquitetura"))
+
+    @patch('api.update_approval_status.invalidate_cache')
+    def test_caches_are_invalidated_once(self, mock_invalidate):
+        """Test that the caches of the processes with a finished request are invalidated in a single call."""
+        runner = make_runner(failed={"c"})
+        items = [("delta", "a", "1"), ("buildup", "b", "1"), ("strategy", "c", "1"), ("delta", "d", "2")]
+
+        with patch('api.update_approval_status.job_runner', runner):
+            update_approval_statuses(items, "user-token", max_parallel=1)
+
+        mock_invalidate.assert_called_once_with("buildup", "delta", "approval_buildup", "approval_delta", "approval_inbox")
+
+    @patch('api.update_approval_status.invalidate_cache')
+    def test_caches_are_invalidated_when_interrupted(self, mock_invalidate):
+        """Test that the approvals that succeeded are invalidated even if the wait is interrupted."""
+        runner = make_runner(interrupt_after=1)
+        items = [("delta", "a", "1"), ("buildup", "b", "1"), ("strategy", "c", "1")]
+
+        with patch('api.update_approval_status.job_runner', runner), self.assertRaises(KeyboardInterrupt):
+            update_approval_statuses(items, "user-token", max_parallel=1)
+
+        mock_invalidate.assert_called_once_with("delta", "approval_delta", "approval_inbox")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import polars as pl
+
+def _text_expression(column, condition):
+    """Expressão de um filtro de texto do AG Grid (comparação sem diferenciar maiúsculas)"""
+    value = pl.col(column).cast(pl.Utf8).str.to_lowercase()
+    text = str(condition.get("filter") or "").lower()
+    filter_type = condition.get("type", "contains")
+
+    if filter_type == "blank":
+        return value.is_null() | (value == "")
+    if filter_type == "notBlank":
+        return value.is_not_null() & (value != "")
+    if filter_type == "equals":
+        return value == text
+    if filter_type == "notEqual":
+        return (value != text).fill_null(True)
+    if filter_type == "startsWith":
+        return value.str.starts_with(text)
+    if filter_type == "endsWith":
+        return value.str.ends_with(text)
+    if filter_type == "notContains":
+        return (~value.str.contains(text, literal=True)).fill_null(True)
+    return value.str.contains(text, literal=True)
+
+def _number_expression(column, condition):
+    """Expressão de um filtro numérico do AG Grid"""
+    value = pl.col(column).cast(pl.Float64, strict=False)
+    number = condition.get("filter")
+    filter_type = condition.get("type", "equals")
+
+    if filter_type == "blank":
+        return value.is_null()
+    if filter_type == "notBlank":
+        return value.is_not_null()
+    if filter_type == "notEqual":
+        return (value != number).fill_null(True)
+    if filter_type == "lessThan":
+        return value < number
+    if filter_type == "lessThanOrEqual":
+        return value <= number
+    if filter_type == "greaterThan":
+        return value > number
+    if filter_type == "greaterThanOrEqual":
+        return value >= number
+    if filter_type == "inRange":
+        return (value >= number) & (value <= condition.get("filterTo"))
+    return value == number
+
+def _filter_expression(column, model):
+    """Expressão do filtro de uma coluna, incluindo filtros combinados (AND/OR)"""
+    conditions = model.get("conditions")
+    if conditions is None and "condition1" in model:
+        conditions = [model["condition1"], model["condition2"]]
+
+    if conditions is not None:
+        expressions = [_filter_expression(column, {"filterType": model.get("filterType"), **condition}) for condition in conditions]
+        if model.get("operator", "AND").upper() == "OR":
+            return pl.any_horizontal(expressions)
+        return pl.all_horizontal(expressions)
+
+    if model.get("filterType") == "number":
+        return _number_expression(column, model)
+    if model.get("filterType") == "set":
+        return pl.col(column).cast(pl.Utf8).is_in([str(value) for value in model.get("values") or []])
+    return _text_expression(column, model)
+
+def filter_frame(df, filter_model):
+    """
+    Aplica o filterModel do AG Grid em um DataFrame Polars.
+
+    Args:
+        df (pl.DataFrame): Dados completos da tabela.
+        filter_model (dict): filterModel do AG Grid (coluna -> filtro).
+
+    Returns:
+        pl.DataFrame: Linhas que passam em todos os filtros (colunas inexistentes são ignoradas).
+    """
+    expressions = [
+        _filter_expression(column, model)
+        for column, model in (filter_model or {}).items()
+        if column in df.columns
+    ]
+    if not expressions:
+        return df
+    return df.filter(pl.all_horizontal(expressions).fill_null(False))
+
+def sort_frame(df, sort_model):
+    """Aplica o sortModel do AG Grid ([{"colId": ..., "sort": "asc" | "desc"}]) em um DataFrame Polars"""
+    sort_model = [item for item in sort_model or [] if item.get("colId") in df.columns]
+    if not sort_model:
+        return df
+    return df.sort(
+        [item["colId"] for item in sort_model],
+        descending=[item.get("sort") == "desc" for item in sort_model],
+        nulls_last=True,
+        maintain_order=True,
+    )
+
+def apply_grid_request(df, request):
+    """
+    Responde a um getRowsRequest do AG Grid (modelo de linhas "infinite") a partir de um DataFrame Polars.
+
+    Filtro, ordenação e paginação são feitos no servidor; apenas o bloco pedido é enviado.
+
+    Args:
+        df (pl.DataFrame): Dados completos da tabela.
+        request (dict): getRowsRequest com startRow, endRow, sortModel e filterModel.
+
+    Returns:
+        dict: getRowsResponse com o bloco (rowData) e o total de linhas filtradas (rowCount).
+
+    Example:
+        >>> apply_grid_request(pl.DataFrame({"peca": ["A", "B", "C"]}), {"startRow": 0, "endRow": 2, "sortModel": [{"colId": "peca", "sort": "desc"}]})
+        {'rowData': [{'peca': 'C'}, {'peca': 'B'}], 'rowCount': 3}
+    """
+    start_row = int(request.get("startRow") or 0)
+    end_row = int(request.get("endRow") or start_row)
+
+    df = filter_frame(df, request.get("filterModel"))
+    df = sort_frame(df, request.get("sortModel"))
+
+    return {
+        "rowData": df.slice(start_row, max(end_row - start_row, 0)).to_dicts(),
+        "rowCount": df.height,
+    }
@@ -0,0 +1,33 @@
+def get_column_fields(column_defs, extra_fields=None):
+    """
+    Retorna a lista de campos (field) usados em uma definição de colunas do AG Grid,
+    percorrendo também os grupos de colunas (children). Usada para projetar as
+    colunas nas queries e trazer do banco somente o que a página utiliza.
+
+    Args:
+        column_defs (list): Definição de colunas do AG Grid.
+        extra_fields (list, optional): Campos adicionais que a página usa fora da tabela.
+
+    Returns:
+        list: Campos sem repetição, na ordem em que aparecem.
+
+    Example:
+        >>> get_column_fields([{"field": "peca"}, {"children": [{"field": "dp_final"}]}], ["uuid_alteracoes"])
+        ['peca', 'dp_final', 'uuid_alteracoes']
+    """
+    fields = []
+
+    def collect(defs):
+        for column in defs:
+            if "children" in column:
+                collect(column["children"])
+            elif column.get("field") and column["field"] not in fields:
+                fields.append(column["field"])
+
+    collect(column_defs)
+
+    for field in extra_fields or []:
+        if field not in fields:
+            fields.append(field)
+
+    return fields
@@ -39,7 +39,7 @@ def serialize_to_json(data):
 
     elif isinstance(data, pd.DataFrame):
         # Convert Decimal types in the DataFrame to float
-        data = data.applymap(lambda x: float(x) if isinstance(x, Decimal) else x)
+        data = data.map(lambda x: float(x) if isinstance(x, Decimal) else x)
         return data.to_json(orient='records')
 
     elif isinstance(data, pl.DataFrame):